@@ -8,7 +8,8 @@ import os
 import logging
 import time
 from scripts.initialize_taxonomies import initialize_taxonomies
-from services.neo4j_service import Neo4jService
+from services import get_neo4j_service
+from services.neo4j_schema import ensure_schema
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -23,7 +24,7 @@ def initialize_database():
     logger.info("Starting database initialization process")
     
     # Create Neo4j service
-    neo4j_service = Neo4jService()
+    neo4j_service = get_neo4j_service()
     
     # Wait for Neo4j to be available
     max_retries = 10
@@ -47,6 +48,16 @@ def initialize_database():
         logger.error("Could not connect to Neo4j after maximum retries")
         return False
     
+    # Create constraints and indexes before loading taxonomy nodes
+    try:
+        schema_report = ensure_schema(neo4j_service.driver)
+        if schema_report["missing"]["constraints"] or schema_report["missing"]["indexes"]:
+            logger.error(f"Neo4j schema incomplete: {schema_report['missing']}")
+            return False
+    except Exception as e:
+        logger.error(f"Error creating Neo4j schema: {str(e)}")
+        return False
+    
     # Initialize taxonomies
     try:
         logger.info("Initializing and refreshing taxonomies")
@@ -4,11 +4,13 @@ API routes for the Insights module.
 These routes provide access to advanced insights generated from therapy session data.
 """
 
+import asyncio
 import logging
 from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body
-from typing import List, Dict, Any, Optional
+from typing import List, Optional
 from services import neo4j_service
 from services.auth_service import get_current_user
+from services.user_repository import UserRecord
 from .service import InsightsService
 
 # Initialize router
@@ -36,15 +38,15 @@ async def get_insights_service():
 async def get_turning_point(
     emotion: str = Query("Anxiety", description="The emotion to track for turning points"),
     service: InsightsService = Depends(get_insights_service),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: UserRecord = Depends(get_current_user)
 ):
     """
     Get a turning point insight for when a specific emotion significantly changed.
     
     This identifies the session where the biggest positive change occurred.
     """
-    user_id = current_user["userId"]
-    result = service.calculate_turning_point(user_id, emotion)
+    user_id = current_user.user_id
+    result = await asyncio.to_thread(service.calculate_turning_point, user_id, emotion)
     
     if not result:
         raise HTTPException(status_code=404, detail="No turning point found")
@@ -56,15 +58,15 @@ async def get_turning_point(
 async def get_correlations(
     limit: int = Query(5, description="Maximum number of correlations to return"),
     service: InsightsService = Depends(get_insights_service),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: UserRecord = Depends(get_current_user)
 ):
     """
     Get correlations between emotions and topics.
     
     This identifies which topics tend to appear together with specific emotions.
     """
-    user_id = current_user["userId"]
-    results = service.calculate_correlations(user_id, limit)
+    user_id = current_user.user_id
+    results = await asyncio.to_thread(service.calculate_correlations, user_id, limit)
     
     return {"correlations": results}
 
@@ -72,15 +74,15 @@ async def get_correlations(
 @router.get("/cascade-map")
 async def get_insight_cascade(
     service: InsightsService = Depends(get_insights_service),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: UserRecord = Depends(get_current_user)
 ):
     """
     Get a cascade map showing how insights lead to other insights.
     
     This visualizes the connection between different insights over time.
     """
-    user_id = current_user["userId"]
-    result = service.build_insight_cascade(user_id)
+    user_id = current_user.user_id
+    result = await asyncio.to_thread(service.build_insight_cascade, user_id)
     
     if not result:
         raise HTTPException(status_code=404, detail="No insight cascade found")
@@ -91,15 +93,15 @@ async def get_insight_cascade(
 @router.get("/future-prediction")
 async def get_future_prediction(
     service: InsightsService = Depends(get_insights_service),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: UserRecord = Depends(get_current_user)
 ):
     """
     Get predictions for future session topics based on previous patterns.
     
     Uses a Markov chain model to predict likely upcoming topics.
     """
-    user_id = current_user["userId"]
-    result = service.predict_future_focus(user_id)
+    user_id = current_user.user_id
+    result = await asyncio.to_thread(service.predict_future_focus, user_id)
     
     if not result:
         raise HTTPException(
@@ -113,15 +115,15 @@ async def get_future_prediction(
 @router.get("/challenge-persistence")
 async def get_challenge_persistence(
     service: InsightsService = Depends(get_insights_service),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: UserRecord = Depends(get_current_user)
 ):
     """
     Get insights about challenge persistence and achievement badges.
     
     Tracks how challenges persist over time and provides badge achievements.
     """
-    user_id = current_user["userId"]
-    results = service.track_challenge_persistence(user_id)
+    user_id = current_user.user_id
+    results = await asyncio.to_thread(service.track_challenge_persistence, user_id)
     
     return {"challenges": results}
 
@@ -129,7 +131,7 @@ async def get_challenge_persistence(
 @router.get("/therapist-snapshot")
 async def get_therapist_snapshot(
     service: InsightsService = Depends(get_insights_service),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: UserRecord = Depends(get_current_user)
 ):
     """
     Generate a comprehensive therapist-friendly snapshot of progress.
@@ -137,8 +139,8 @@ async def get_therapist_snapshot(
     Includes emotion progress, breakthrough timeline, belief shifts,
     action item adherence, and next session forecast.
     """
-    user_id = current_user["userId"]
-    result = service.generate_therapist_snapshot(user_id)
+    user_id = current_user.user_id
+    result = await asyncio.to_thread(service.generate_therapist_snapshot, user_id)
     
     if not result:
         raise HTTPException(status_code=404, detail="Not enough data for therapist snapshot")
@@ -150,7 +152,7 @@ async def get_therapist_snapshot(
 async def add_client_reflection(
     reflection: str = Body(..., embed=True),
     service: InsightsService = Depends(get_insights_service),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: UserRecord = Depends(get_current_user)
 ):
     """
     Add a client reflection to the therapist snapshot.
@@ -165,21 +167,21 @@ async def add_client_reflection(
 @router.get("/all")
 async def get_all_insights(
     service: InsightsService = Depends(get_insights_service),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: UserRecord = Depends(get_current_user)
 ):
     """
     Get all available insights for the current user.
     
     Returns a collection of the most relevant insights from all categories.
     """
-    user_id = current_user["userId"]
+    user_id = current_user.user_id
     
     # Collect insights from all categories
-    turning_point = service.calculate_turning_point(user_id)
-    correlations = service.calculate_correlations(user_id, limit=3)
-    cascade = service.build_insight_cascade(user_id)
-    prediction = service.predict_future_focus(user_id)
-    challenges = service.track_challenge_persistence(user_id)
+    turning_point = await asyncio.to_thread(service.calculate_turning_point, user_id)
+    correlations = await asyncio.to_thread(service.calculate_correlations, user_id, limit=3)
+    cascade = await asyncio.to_thread(service.build_insight_cascade, user_id)
+    prediction = await asyncio.to_thread(service.predict_future_focus, user_id)
+    challenges = await asyncio.to_thread(service.track_challenge_persistence, user_id)
     
     # Combine results
     results = {
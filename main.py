@@ -15,6 +15,10 @@ from routes.transcription_routes import router as transcription_router
 from routes.action_items import router as action_items_router
 from routes.settings import router as settings_router  # Import the new settings router
 from insights import insights_router  # Import the new insights router
+from services import get_async_neo4j_service, close_async_neo4j_service, close_llm_client
+from services.neo4j_schema import ensure_schema_async
+from services.job_queue import get_analysis_job_queue, close_analysis_job_queue
+from services.password_hasher import close_password_hasher
 
 # Configure logging - container-friendly configuration 
 logging.basicConfig(
@@ -82,6 +86,36 @@ async def health_check():
     """API health check endpoint"""
     return {"status": "healthy", "api_version": "1.0.0"}
 
+# Make sure every lookup key has its constraint or index
+@app.on_event("startup")
+async def startup_event():
+    """Create any missing Neo4j constraints and indexes"""
+    if os.getenv("NEO4J_ENSURE_SCHEMA", "true").lower() != "true":
+        return
+    try:
+        report = await ensure_schema_async(get_async_neo4j_service().driver)
+        for item in report["failed"]:
+            logger.warning(f"Neo4j schema item {item['name']} failed: {item['error']} ({item['statement']})")
+    except Exception as e:
+        logger.warning(f"Could not verify Neo4j schema: {str(e)}")
+
+# Run queued analysis jobs in this instance
+@app.on_event("startup")
+async def start_job_workers():
+    """Start the background analysis job workers"""
+    queue = get_analysis_job_queue()
+    if queue.workers > 0:
+        await queue.start()
+
+# Release pooled database and LLM connections and worker threads on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the job workers, then close the async Neo4j driver, the pooled LLM clients and the hashing pool"""
+    await close_analysis_job_queue()
+    await close_async_neo4j_service()
+    await close_llm_client()
+    close_password_hasher()
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -3,13 +3,13 @@ Action Items routes for the API.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+import asyncio
 import logging
 from datetime import datetime
-from services import get_neo4j_service, get_action_item_service, get_auth_service
-import jwt
+from services import get_action_item_service
+from services.auth_service import get_current_user_id
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -17,9 +17,6 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter()
 
-# OAuth2 scheme
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
 # Models
 class ActionItemBase(BaseModel):
     title: str
@@ -42,36 +39,9 @@ class ActionItem(ActionItemBase):
     class Config:
         from_attributes = True
 
-# Authentication dependency
-async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> str:
-    """Get current user ID from JWT token"""
-    try:
-        auth_service = get_auth_service()
-        payload = jwt.decode(token, auth_service.secret_key, algorithms=["HS256"])
-        user_id_or_email = payload.get("sub")
-        
-        # If it's an email, get the user ID
-        if "@" in str(user_id_or_email):
-            neo4j_service = get_neo4j_service()
-            user = neo4j_service.get_user_by_email(user_id_or_email)
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="User not found",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-            return user["userId"]
-        
-        return user_id_or_email
-    except Exception as e:
-        logger.error(f"Authentication error: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
 # Routes
+# ActionItemService runs on the synchronous driver, so its calls go to a
+# worker thread rather than blocking the event loop
 @router.get("/action-items")
 async def get_all_user_action_items(
     current_user_id: str = Depends(get_current_user_id)
@@ -79,7 +49,7 @@ async def get_all_user_action_items(
     """Get all action items for the current user across all sessions"""
     try:
         action_item_service = get_action_item_service()
-        action_items = action_item_service.get_all_user_action_items(current_user_id)
+        action_items = await asyncio.to_thread(action_item_service.get_all_user_action_items, current_user_id)
         return {"actionItems": action_items}
     except Exception as e:
         logger.error(f"Error getting user action items: {str(e)}")
@@ -98,7 +68,7 @@ async def create_action_item(
     try:
         action_item_service = get_action_item_service()
         data = action_item.dict()
-        result = action_item_service.create_action_item(session_id, data)
+        result = await asyncio.to_thread(action_item_service.create_action_item, session_id, data)
         return result
     except Exception as e:
         logger.error(f"Error creating action item: {str(e)}")
@@ -115,7 +85,7 @@ async def get_action_items(
     """Get all action items for a session"""
     try:
         action_item_service = get_action_item_service()
-        action_items = action_item_service.get_action_items(session_id)
+        action_items = await asyncio.to_thread(action_item_service.get_action_items, session_id)
         return {"actionItems": action_items}
     except Exception as e:
         logger.error(f"Error getting action items: {str(e)}")
@@ -134,7 +104,7 @@ async def update_action_item(
     """Update an action item"""
     try:
         action_item_service = get_action_item_service()
-        result = action_item_service.update_action_item(session_id, action_item_id, data)
+        result = await asyncio.to_thread(action_item_service.update_action_item, session_id, action_item_id, data)
         if not result:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -159,7 +129,7 @@ async def delete_action_item(
     """Delete an action item"""
     try:
         action_item_service = get_action_item_service()
-        success = action_item_service.delete_action_item(session_id, action_item_id)
+        success = await asyncio.to_thread(action_item_service.delete_action_item, session_id, action_item_id)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -3,19 +3,19 @@ Analysis routes for the API.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+import json
 import logging
 from datetime import datetime
 import uuid
-from services import get_neo4j_service, get_session_service, get_auth_service
-from services.analysis_service import analyze_transcript_and_extract
+from services import get_async_neo4j_service, get_session_service
+from services.auth_service import get_current_user_id
+from services.analysis_service import run_session_analysis, stream_session_analysis, format_results
+from services.job_queue import get_analysis_job_queue
+from services.errors import CapacityError
 from services.session_service import SessionService
-from routes.auth import User
-from utils import get_current_user
-import jwt
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -23,38 +23,6 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter(prefix="/analysis")
 
-# OAuth2 scheme
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
-# Authentication dependency
-async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> str:
-    """Get current user ID from JWT token"""
-    try:
-        auth_service = get_auth_service()
-        payload = jwt.decode(token, auth_service.secret_key, algorithms=["HS256"])
-        user_id_or_email = payload.get("sub")
-        
-        # If it's an email, get the user ID
-        if "@" in str(user_id_or_email):
-            neo4j_service = get_neo4j_service()
-            user = neo4j_service.get_user_by_email(user_id_or_email)
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="User not found",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-            return user["userId"]
-        
-        return user_id_or_email
-    except Exception as e:
-        logger.error(f"Authentication error: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
 # Models
 class AnalysisRequest(BaseModel):
     session_id: str
@@ -65,6 +33,11 @@ class AnalysisResponse(BaseModel):
     status: str
     results: Optional[Dict[str, Any]] = None
     created_at: datetime = datetime.now()
+    job_id: Optional[str] = None
+    progress: Optional[str] = None
+    attempts: Optional[int] = None
+    error: Optional[str] = None
+    updated_at: Optional[datetime] = None
 
 class AnalysisResults(BaseModel):
     emotions: List[Dict[str, Any]] = []
@@ -102,6 +75,60 @@ class UpdateElementsResponse(BaseModel):
     status: str
     message: str
     session_id: str
+    changes: Optional[Dict[str, Any]] = None
+
+# Helpers
+async def _transcript_for_analysis(neo4j_service, request: AnalysisRequest, current_user_id: str) -> str:
+    """Check that the user owns the session and return the transcript to analyze"""
+    logger.info(f"Transcript length: {len(request.transcript) if request.transcript else 0} characters")
+    
+    # Get session from database
+    session_data = await neo4j_service.get_session_data(request.session_id)
+    
+    if not session_data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session {request.session_id} not found"
+        )
+    
+    # Check if user owns this session
+    if session_data.get("userId") != current_user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    # Use transcript from request or session; the session's is only read when needed
+    transcript = request.transcript
+    if not transcript:
+        stored = await neo4j_service.get_session_transcript(request.session_id)
+        transcript = stored["transcript"] if stored else ""
+    
+    if not transcript:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No transcript provided"
+        )
+    return transcript
+
+def _job_response(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a stored analysis job as an AnalysisResponse"""
+    result = job.get("result") or {}
+    return {
+        "session_id": job["session_id"],
+        "status": job["status"],
+        "results": result.get("results"),
+        "created_at": datetime.fromtimestamp(job["created_at"]),
+        "job_id": job["id"],
+        "progress": job.get("progress"),
+        "attempts": job.get("attempts"),
+        "error": job.get("error"),
+        "updated_at": datetime.fromtimestamp(job["updated_at"]),
+    }
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
 # Routes
 @router.post("/analyze", response_model=AnalysisResponse)
@@ -112,147 +139,24 @@ async def analyze_transcript(
     """Analyze a transcript and store results"""
     try:
         logger.info(f"Starting analysis for session {request.session_id}")
-        logger.info(f"Transcript length: {len(request.transcript) if request.transcript else 0} characters")
-        
-        # Get session from database
-        neo4j_service = get_neo4j_service()
-        session_data = neo4j_service.get_session_data(request.session_id)
+        neo4j_service = get_async_neo4j_service()
+        transcript = await _transcript_for_analysis(neo4j_service, request, current_user_id)
         
-        if not session_data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Session {request.session_id} not found"
-            )
-        
-        # Check if user owns this session
-        if session_data.get("userId") != current_user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied"
+        # Run the analysis pipeline without blocking the event loop
+        try:
+            analysis_results = await run_session_analysis(
+                session_id=request.session_id,
+                transcript=transcript,
+                user_id=current_user_id,
+                neo4j_service=neo4j_service
             )
-        
-        # Use transcript from request or session
-        transcript = request.transcript or session_data.get("transcript", "")
-        
-        if not transcript:
+        except CapacityError as busy_error:
+            logger.warning(f"Analysis rejected for session {request.session_id}: {str(busy_error)}")
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No transcript provided"
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many analyses in progress, please retry shortly",
+                headers={"Retry-After": "30"},
             )
-        
-        # Use analysis service to process transcript
-        try:
-            analysis_results = analyze_transcript_and_extract(transcript, user_id=current_user_id)
-            
-            if analysis_results.get("status") != "completed":
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Analysis failed: {analysis_results.get('error', 'Unknown error')}"
-                )
-            
-            # Extract elements from analysis results
-            elements = analysis_results.get("elements", {})
-            logger.info(f"Analysis completed successfully for session {request.session_id}")
-            logger.info(f"Analysis results keys: {list(elements.keys())}")
-            
-            # Format the data for Neo4j storage as expected by save_session_analysis
-            formatted_analysis_data = {}
-            
-            # Format emotions: [name, intensity, context, topics, timestamp]
-            if "emotions" in elements:
-                formatted_analysis_data["Emotions"] = [
-                    [
-                        emotion.get("name"),
-                        emotion.get("intensity", 3),
-                        emotion.get("context", ""),
-                        emotion.get("topic"),
-                        emotion.get("timestamp", "")
-                    ]
-                    for emotion in elements["emotions"]
-                ]
-            
-            # Format beliefs: [id, name, description, impact, topics, timestamp]  
-            if "beliefs" in elements:
-                formatted_analysis_data["Beliefs"] = [
-                    [
-                        str(uuid.uuid4()),  # Generate unique ID
-                        belief.get("name"),
-                        belief.get("description", belief.get("text", "")),
-                        belief.get("impact", ""),
-                        belief.get("topic"),
-                        belief.get("timestamp", "")
-                    ]
-                    for belief in elements["beliefs"]
-                ]
-            
-            # Format action items: [id, name, description, topics, status]
-            if "action_items" in elements:
-                formatted_analysis_data["actionitems"] = [
-                    [
-                        str(uuid.uuid4()),  # Generate unique ID
-                        action.get("name"),
-                        action.get("description", action.get("text", "")),
-                        action.get("topic"),
-                        action.get("status", "hasn't started")
-                    ]
-                    for action in elements["action_items"]
-                ]
-            
-            # Format challenges: [name, text, impact, topics]
-            if "challenges" in elements:
-                formatted_analysis_data["Challenges"] = [
-                    [
-                        challenge.get("name"),
-                        challenge.get("description", challenge.get("text", "")),
-                        challenge.get("impact", ""),
-                        challenge.get("topic")
-                    ]
-                    for challenge in elements["challenges"]
-                ]
-            
-            # Format insights: [name, text, context, topics]
-            if "insights" in elements:
-                formatted_analysis_data["Insights"] = [
-                    [
-                        insight.get("name"),
-                        insight.get("description", insight.get("text", "")),
-                        insight.get("context", ""),
-                        insight.get("topic")
-                    ]
-                    for insight in elements["insights"]
-                ]
-            
-            # Store the analysis results in the database using the proper Neo4j method
-            try:
-                success = neo4j_service.save_session_analysis(
-                    session_id=request.session_id,
-                    analysis_data=formatted_analysis_data,
-                    user_id=current_user_id
-                )
-                if success:
-                    logger.info(f"Successfully stored analysis results for session {request.session_id}")
-                else:
-                    logger.error(f"Failed to store analysis results for session {request.session_id}")
-            except Exception as storage_error:
-                logger.error(f"Failed to store analysis results: {str(storage_error)}")
-                # Continue anyway, as we still have the results to return
-            
-            # Transform the results to match the expected format
-            formatted_results = {
-                "emotions": analysis_results.get("elements", {}).get("emotions", []),
-                "insights": analysis_results.get("elements", {}).get("insights", []),
-                "beliefs": analysis_results.get("elements", {}).get("beliefs", []),
-                "action_items": analysis_results.get("elements", {}).get("action_items", []),
-                "challenges": analysis_results.get("elements", {}).get("challenges", [])
-            }
-            
-            return {
-                "session_id": request.session_id,
-                "status": "completed",
-                "results": formatted_results,
-                "created_at": datetime.now()
-            }
-            
         except Exception as analysis_error:
             logger.error(f"Analysis service error: {str(analysis_error)}")
             raise HTTPException(
@@ -260,6 +164,23 @@ async def analyze_transcript(
                 detail=f"Analysis failed: {str(analysis_error)}"
             )
         
+        if analysis_results.get("status") != "completed":
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Analysis failed: {analysis_results.get('error', 'Unknown error')}"
+            )
+        
+        elements = analysis_results.get("elements", {})
+        logger.info(f"Analysis completed successfully for session {request.session_id}")
+        logger.info(f"Analysis results keys: {list(elements.keys())}")
+        
+        return {
+            "session_id": request.session_id,
+            "status": "completed",
+            "results": format_results(elements),
+            "created_at": datetime.now()
+        }
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -269,20 +190,93 @@ async def analyze_transcript(
             detail="An unexpected error occurred during analysis"
         )
 
+@router.post("/jobs", response_model=AnalysisResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_analysis_job(
+    request: AnalysisRequest,
+    current_user_id: str = Depends(get_current_user_id)
+):
+    """Queue a transcript analysis and return its job id immediately"""
+    try:
+        logger.info(f"Queueing analysis for session {request.session_id}")
+        neo4j_service = get_async_neo4j_service()
+        transcript = await _transcript_for_analysis(neo4j_service, request, current_user_id)
+        
+        job = await get_analysis_job_queue().submit(
+            "analysis",
+            user_id=current_user_id,
+            payload={"transcript": transcript},
+            session_id=request.session_id
+        )
+        return _job_response(job)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error queueing analysis: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while queueing the analysis"
+        )
+
+@router.post("/stream")
+async def stream_analysis(
+    request: AnalysisRequest,
+    current_user_id: str = Depends(get_current_user_id)
+):
+    """Analyze a transcript and push each element to the client as server-sent events.
+
+    Emits one "element" event per extracted element as soon as it is parsed
+    (it is stored on the session at the same time), an "element_updated"
+    event when a later repeat changes an element already sent, then a "done"
+    event with the merged results, or an "error" event if the analysis fails.
+    """
+    logger.info(f"Starting streaming analysis for session {request.session_id}")
+    neo4j_service = get_async_neo4j_service()
+    transcript = await _transcript_for_analysis(neo4j_service, request, current_user_id)
+
+    async def events():
+        try:
+            async for event in stream_session_analysis(
+                session_id=request.session_id,
+                transcript=transcript,
+                user_id=current_user_id,
+                neo4j_service=neo4j_service
+            ):
+                yield _sse(event["event"], event["data"])
+        except CapacityError as busy_error:
+            logger.warning(f"Streaming analysis rejected for session {request.session_id}: {str(busy_error)}")
+            yield _sse("error", {
+                "error": "Too many analyses in progress, please retry shortly",
+                "error_code": busy_error.error_code
+            })
+        except Exception as e:
+            logger.error(f"Streaming analysis failed for session {request.session_id}: {str(e)}")
+            yield _sse("error", {"error": f"Analysis failed: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/status/{analysis_id}", response_model=AnalysisResponse)
-async def get_analysis_status(analysis_id: str):
-    """Get the status of an analysis"""
+async def get_analysis_status(
+    analysis_id: str,
+    current_user_id: str = Depends(get_current_user_id)
+):
+    """Get the status, progress and, once completed, the results of an analysis job"""
     try:
-        # Get Neo4j service
-        neo4j_service = get_neo4j_service()
+        job = await get_analysis_job_queue().get(analysis_id)
         
-        # Mock analysis status
-        return {
-            "session_id": analysis_id,
-            "status": "completed",
-            "results": None,
-            "created_at": datetime.now()
-        }
+        # Other users' jobs are reported as missing
+        if not job or job["user_id"] != current_user_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Analysis {analysis_id} not found"
+            )
+        
+        return _job_response(job)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting analysis status: {str(e)}")
         raise HTTPException(
@@ -295,7 +289,7 @@ async def get_analysis_results(session_id: str):
     """Get analysis results for a session"""
     try:
         # Get Neo4j service
-        neo4j_service = get_neo4j_service()
+        neo4j_service = get_async_neo4j_service()
         
         # Mock analysis results
         return {
@@ -336,10 +330,10 @@ async def get_session_elements(
         logger.info(f"Retrieving session elements for session {session_id}")
         
         # Get Neo4j service
-        neo4j_service = get_neo4j_service()
+        neo4j_service = get_async_neo4j_service()
         
         # Get session data with all relationships and elements
-        session_data = neo4j_service.get_session_with_relationships(session_id)
+        session_data = await neo4j_service.get_session_with_relationships(session_id)
         
         if not session_data:
             raise HTTPException(
@@ -397,10 +391,11 @@ async def update_session_elements(
         logger.info(f"Updating session elements for session {session_id}")
         
         # Get Neo4j service
-        neo4j_service = get_neo4j_service()
+        neo4j_service = get_async_neo4j_service()
         
-        # Verify session exists and user owns it
-        session_data = neo4j_service.get_session_with_relationships(session_id)
+        # Verify session exists and user owns it; only the owner is needed,
+        # the stored elements are read by the diffing update itself
+        session_data = await neo4j_service.get_session_data(session_id)
         if not session_data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -424,7 +419,7 @@ async def update_session_elements(
                     emotion.get("name", "Unnamed Emotion"),
                     emotion.get("intensity", 3),  # Default intensity
                     emotion.get("context", ""),
-                    emotion.get("topic", "Personal Growth")  # Default topic
+                    emotion.get("topics") or emotion.get("topic", "Personal Growth")  # All topics, or the single topic
                 ]
                 for emotion in request.elements["emotions"]
             ]
@@ -437,7 +432,7 @@ async def update_session_elements(
                     belief.get("name", "Unnamed Belief"),
                     belief.get("description", belief.get("text", "")),  # Use text or description
                     belief.get("impact", "Medium"),  # Default impact
-                    belief.get("topic", "Personal Growth")  # Default topic
+                    belief.get("topics") or belief.get("topic", "Personal Growth")  # All topics, or the single topic
                 ]
                 for belief in request.elements["beliefs"]
             ]
@@ -449,7 +444,7 @@ async def update_session_elements(
                     action.get("id", str(uuid.uuid4())),  # Generate ID if not provided
                     action.get("name", "Unnamed Action"),
                     action.get("description", ""),
-                    action.get("topic", "Personal Growth"),  # Default topic
+                    action.get("topics") or action.get("topic", "Personal Growth"),  # All topics, or the single topic
                     action.get("status", "Not Started")  # Default status
                 ]
                 for action in request.elements["action_items"]
@@ -462,7 +457,7 @@ async def update_session_elements(
                     insight.get("name", "Unnamed Insight"),
                     insight.get("description", insight.get("text", "")),  # Use text or description
                     insight.get("context", ""),
-                    insight.get("topic", "Personal Growth")  # Default topic
+                    insight.get("topics") or insight.get("topic", "Personal Growth")  # All topics, or the single topic
                 ]
                 for insight in request.elements["insights"]
             ]
@@ -474,19 +469,19 @@ async def update_session_elements(
                     challenge.get("name", "Unnamed Challenge"),
                     challenge.get("description", challenge.get("text", "")),  # Use text or description
                     challenge.get("impact", "Medium"),  # Default impact
-                    challenge.get("topic", "Personal Growth")  # Default topic
+                    challenge.get("topics") or challenge.get("topic", "Personal Growth")  # All topics, or the single topic
                 ]
                 for challenge in request.elements["challenges"]
             ]
         
-        # Update elements using Neo4j service
-        success = neo4j_service.update_session_with_elements(
+        # Update elements using Neo4j service (writes only what changed)
+        changes = await neo4j_service.update_session_with_elements(
             session_id=session_id,  # Use session_id directly as it's the graph ID
             elements=formatted_analysis_data,
             user_id=current_user_id
         )
         
-        if not success:
+        if not changes:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to update session elements"
@@ -497,7 +492,8 @@ async def update_session_elements(
         return UpdateElementsResponse(
             status="success",
             message=f"Successfully updated elements for session {session_id}",
-            session_id=session_id
+            session_id=session_id,
+            changes=changes
         )
         
     except HTTPException:
@@ -544,13 +540,13 @@ async def run_neo4j_query(request: Neo4jQueryRequest):
                 )
         
         # Get Neo4j service
-        neo4j_service = get_neo4j_service()
+        neo4j_service = get_async_neo4j_service()
         
         # Time the query execution
         start_time = datetime.now()
         
         # Execute the query
-        results = neo4j_service.run_query(request.query, request.parameters)
+        results = await neo4j_service.run_query(request.query, request.parameters)
         
         # Calculate execution time
         execution_time = (datetime.now() - start_time).total_seconds()
@@ -578,16 +574,16 @@ async def run_neo4j_query(request: Neo4jQueryRequest):
 @router.post("/export", response_model=ExportResponse)
 async def export_to_neo4j(
     request: ExportRequest,
-    current_user: User = Depends(get_current_user)
+    current_user_id: str = Depends(get_current_user_id)
 ):
     """
     Export session analysis data to Neo4j
     """
     try:
-        neo4j_service = get_neo4j_service()
+        neo4j_service = get_async_neo4j_service()
         
         # Get session to verify it exists
-        session = neo4j_service.get_session_data(request.session_id)
+        session = await neo4j_service.get_session_data(request.session_id)
         if not session:
             return JSONResponse(
                 status_code=404,
@@ -595,7 +591,7 @@ async def export_to_neo4j(
             )
         
         # Get elements for the session
-        elements = neo4j_service.get_session_elements(request.session_id)
+        elements = await neo4j_service.get_session_elements(request.session_id)
         
         # Count elements by type
         element_counts = {
@@ -608,10 +604,10 @@ async def export_to_neo4j(
         
         # Export to Neo4j (this part depends on your Neo4j service implementation)
         # This is a simplified example
-        success = neo4j_service.update_session_with_elements(
+        success = await neo4j_service.update_session_with_elements(
             request.session_id, 
             elements,
-            current_user.id
+            current_user_id
         )
         
         if success:
@@ -6,13 +6,16 @@ from fastapi import APIRouter, Depends, HTTPException, status, Path
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, Dict, Any, List
+import asyncio
 import logging
 from datetime import datetime, timedelta
 import jwt
-from jwt import InvalidTokenError, ExpiredSignatureError  # Import correct JWT exceptions
+from jwt import ExpiredSignatureError
 import secrets
 import uuid
-from services import get_neo4j_service, get_auth_service, Neo4jService, AuthService
+from services import get_async_neo4j_service, get_auth_service, Neo4jService, AuthService
+from services.auth_service import get_current_principal, get_current_user_id
+from services.user_repository import UserRecord
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -71,7 +74,7 @@ async def login(
         auth_service = get_auth_service()
         
         # Login user
-        success, response, error_message = auth_service.login_user(
+        success, response, error_message = await auth_service.login_user(
             email=form_data.username,
             password=form_data.password
         )
@@ -123,7 +126,7 @@ async def register(
         auth_service = get_auth_service()
         
         # Register user using auth service
-        success, response, error_message = auth_service.register_user(
+        success, response, error_message = await auth_service.register_user(
             email=user.email,
             password=user.password,
             name=user.name or ""
@@ -165,69 +168,30 @@ async def register(
 async def logout(
     token: str = Depends(oauth2_scheme)
 ):
-    """Logout current user"""
-    # In a JWT-based system, the client should discard the token
-    # Here we just return success as there's no server-side session
+    """Logout current user (revokes every token issued to them so far)"""
+    if not await asyncio.to_thread(get_auth_service().logout_user, token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return {"message": "Logged out successfully"}
 
 @router.get("/me", response_model=User)
 async def get_current_user(
-    token: str = Depends(oauth2_scheme)
+    user: UserRecord = Depends(get_current_principal)
 ):
     """Get current user info"""
     try:
-        # Get auth service
-        auth_service = get_auth_service()
-        
-        # Log token info for debugging
-        logger.info(f"Verifying token: {token[:10]}...")
-        
-        # Extract token payload directly first for detailed logging
-        try:
-            payload = jwt.decode(token, auth_service.secret_key, algorithms=["HS256"])
-            user_id_or_email = payload.get("sub")
-            logger.info(f"Token decoded successfully, subject: {user_id_or_email}")
-        except Exception as token_error:
-            logger.error(f"Token decode error: {str(token_error)}")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token format",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Determine if subject is an email or user ID
-        is_email = "@" in str(user_id_or_email) if user_id_or_email else False
-        
-        # Get user information based on token subject type
-        user = None
-        if is_email:
-            logger.info(f"Looking up user by email: {user_id_or_email}")
-            user = auth_service.user_service.get_user_by_email(user_id_or_email)
-        else:
-            logger.info(f"Looking up user by ID: {user_id_or_email}")
-            user = auth_service.user_service.get_user_by_id(user_id_or_email)
-        
-        if not user:
-            logger.error(f"User not found for token subject: {user_id_or_email}")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, 
-                detail="User not found"
-            )
-            
-        logger.info(f"User found: {user.get('userId', 'unknown')}")
-        
         # Return user data in expected format
         return {
-            "id": user.get("userId"),
-            "email": user.get("email"),
-            "name": user.get("name", ""),
-            "is_admin": user.get("is_admin", False),
-            "created_at": datetime.fromisoformat(user.get("created_at", datetime.now().isoformat())),
-            "disabled": user.get("disabled", False)
+            "id": user.user_id,
+            "email": user.email,
+            "name": user.name or "",
+            "is_admin": user.is_admin,
+            "created_at": datetime.fromisoformat(user.created_at or datetime.now().isoformat()),
+            "disabled": user.disabled
         }
-    except HTTPException:
-        # Re-raise HTTP exceptions
-        raise
     except Exception as e:
         logger.error(f"Error getting current user: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -239,26 +203,15 @@ async def get_current_user(
 @router.put("/credentials/password", status_code=status.HTTP_200_OK)
 async def update_password(
     password_data: PasswordUpdateRequest,
-    token: str = Depends(oauth2_scheme)
+    user_id: str = Depends(get_current_user_id)
 ):
-    """Update the current user's password"""
+    """Update the current user's password; earlier tokens stop working"""
     try:
         # Get auth service
         auth_service = get_auth_service()
         
-        # Extract user_id from token
-        payload = jwt.decode(token, auth_service.secret_key, algorithms=["HS256"])
-        user_id = payload.get("sub")
-        
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
         # Update password
-        success, error_message = auth_service.change_password(
+        success, error_message = await auth_service.change_password(
             user_id, password_data.current_password, password_data.new_password
         )
         
@@ -275,16 +228,15 @@ async def update_password(
                     detail=error_message or "Failed to update password"
                 )
         
-        return {"message": "Password updated successfully"}
+        # The token used for this request was revoked with the others
+        return {
+            "message": "Password updated successfully",
+            "access_token": auth_service.generate_token(user_id),
+            "token_type": "bearer"
+        }
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
-    except InvalidTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
     except Exception as e:
         logger.error(f"Error updating password: {str(e)}")
         raise HTTPException(
@@ -294,32 +246,20 @@ async def update_password(
 
 @router.post("/credentials/api-key", response_model=ApiKeyResponse)
 async def generate_api_key(
-    token: str = Depends(oauth2_scheme)
+    user_id: str = Depends(get_current_user_id)
 ):
     """Generate a new API key for the current user"""
     try:
         # Get services
-        neo4j_service = get_neo4j_service()
-        auth_service = get_auth_service()
-        
-        # Extract user_id from token
-        payload = jwt.decode(token, auth_service.secret_key, algorithms=["HS256"])
-        user_id = payload.get("sub")
-        
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        neo4j_service = get_async_neo4j_service()
         
         # Generate API key
         api_key = f"ij-{secrets.token_hex(16)}"
         expiration = datetime.utcnow() + timedelta(days=90)  # API key valid for 90 days
         
         # Store API key in user properties
-        with neo4j_service.driver.session() as session:
-            result = session.run("""
+        async with neo4j_service.driver.session() as session:
+            result = await session.run("""
                 MATCH (u:User {userId: $userId})
                 SET u.apiKey = $apiKey,
                     u.apiKeyExpires = $expires
@@ -329,7 +269,7 @@ async def generate_api_key(
             apiKey=api_key,
             expires=expiration.isoformat())
             
-            if not result.single():
+            if not await result.single():
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="User not found"
@@ -339,12 +279,8 @@ async def generate_api_key(
             "api_key": api_key,
             "expires_at": expiration
         }
-    except InvalidTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating API key: {str(e)}")
         raise HTTPException(
@@ -354,27 +290,22 @@ async def generate_api_key(
 
 @router.get("/credentials", response_model=List[UserCredential])
 async def get_user_credentials(
-    token: str = Depends(oauth2_scheme)
+    user_id: str = Depends(get_current_user_id)
 ):
     """Get all credentials for the current user"""
     try:
         # Get services
-        neo4j_service = get_neo4j_service()
-        auth_service = get_auth_service()
-        
-        # Extract user_id from token
-        payload = jwt.decode(token, auth_service.secret_key, algorithms=["HS256"])
-        user_id = payload.get("sub")
-        
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        neo4j_service = get_async_neo4j_service()
         
-        # Get user data
-        user = neo4j_service.get_user_by_id(user_id)
+        # Get the user's credential properties
+        async with neo4j_service.driver.session() as session:
+            result = await session.run("""
+                MATCH (u:User {userId: $userId})
+                RETURN u.password_hash IS NOT NULL AS has_password,
+                       u.apiKey AS apiKey,
+                       u.apiKeyExpires AS apiKeyExpires
+            """, userId=user_id)
+            user = await result.single()
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -384,7 +315,7 @@ async def get_user_credentials(
         credentials = []
         
         # Add password credential (masked)
-        if user.get("password_hash"):
+        if user["has_password"]:
             credentials.append({
                 "type": "password",
                 "value": "********",  # Masked for security
@@ -392,9 +323,9 @@ async def get_user_credentials(
             })
         
         # Add API key if exists
-        if user.get("apiKey"):
+        if user["apiKey"]:
             expires_at = None
-            if user.get("apiKeyExpires"):
+            if user["apiKeyExpires"]:
                 try:
                     expires_at = datetime.fromisoformat(user["apiKeyExpires"])
                 except:
@@ -407,12 +338,8 @@ async def get_user_credentials(
             })
         
         return credentials
-    except InvalidTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting user credentials: {str(e)}")
         raise HTTPException(
@@ -422,47 +349,31 @@ async def get_user_credentials(
 
 @router.delete("/credentials/api-key", status_code=status.HTTP_200_OK)
 async def revoke_api_key(
-    token: str = Depends(oauth2_scheme)
+    user_id: str = Depends(get_current_user_id)
 ):
     """Revoke the current user's API key"""
     try:
         # Get services
-        neo4j_service = get_neo4j_service()
-        auth_service = get_auth_service()
-        
-        # Extract user_id from token
-        payload = jwt.decode(token, auth_service.secret_key, algorithms=["HS256"])
-        user_id = payload.get("sub")
-        
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        neo4j_service = get_async_neo4j_service()
         
         # Remove API key from user properties
-        with neo4j_service.driver.session() as session:
-            result = session.run("""
+        async with neo4j_service.driver.session() as session:
+            result = await session.run("""
                 MATCH (u:User {userId: $userId})
                 REMOVE u.apiKey
                 REMOVE u.apiKeyExpires
                 RETURN u
             """, userId=user_id)
             
-            if not result.single():
+            if not await result.single():
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="User not found"
                 )
         
         return {"message": "API key revoked successfully"}
-    except InvalidTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error revoking API key: {str(e)}")
         raise HTTPException(
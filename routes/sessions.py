@@ -2,14 +2,16 @@
 Sessions routes for the API.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+import base64
+import json
 import logging
 from datetime import datetime
-from services import get_neo4j_service, get_session_service, get_auth_service
-import jwt
+from services import get_async_neo4j_service
+from services.auth_service import get_current_user_id
+from services.errors import ValidationError
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -17,8 +19,9 @@ logger = logging.getLogger(__name__)
 # Create router with prefix to avoid conflicts with health endpoint
 router = APIRouter(prefix="/sessions")
 
-# OAuth2 scheme
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
 
 # Models
 class SessionBase(BaseModel):
@@ -40,34 +43,49 @@ class Session(SessionBase):
     class Config:
         from_attributes = True
 
-# Authentication dependency
-async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> str:
-    """Get current user ID from JWT token"""
+class SessionSummary(BaseModel):
+    """A session as shown in the session list: no transcript, just its size"""
+    id: str
+    title: str
+    description: Optional[str] = None
+    date: Optional[str] = None
+    user_id: str
+    created_at: datetime
+    updated_at: datetime
+    status: str = "pending"
+    analysis_status: Optional[str] = None
+    transcript_length: int = 0
+    element_counts: Dict[str, int] = {}
+
+class SessionTranscript(BaseModel):
+    id: str
+    transcript: str
+
+# Cursors are opaque to clients: base64url JSON of the last row's (created_at, id)
+def encode_cursor(session_data: Dict[str, Any]) -> str:
+    """Build the cursor for the page after this session"""
+    key = json.dumps([session_data.get("created_at"), session_data.get("id")])
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Parse a cursor from encode_cursor, raising 400 if it isn't one"""
     try:
-        auth_service = get_auth_service()
-        payload = jwt.decode(token, auth_service.secret_key, algorithms=["HS256"])
-        user_id_or_email = payload.get("sub")
-        
-        # If it's an email, get the user ID
-        if "@" in str(user_id_or_email):
-            neo4j_service = get_neo4j_service()
-            user = neo4j_service.get_user_by_email(user_id_or_email)
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="User not found",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-            return user["userId"]
-        
-        return user_id_or_email
-    except Exception as e:
-        logger.error(f"Authentication error: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        created_at, session_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if isinstance(created_at, str) and isinstance(session_id, str):
+            return created_at, session_id
+    except (ValueError, TypeError):
+        pass
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+
+def parse_timestamp(value: Any, default: datetime) -> datetime:
+    """Parse a stored ISO timestamp; legacy sessions may have none or an odd one"""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return default
 
 # Routes
 @router.post("", response_model=Session)
@@ -79,8 +97,8 @@ async def create_session(
     try:
         logger.info(f"Creating new session with title: {session.title}")
         
-        # Get session service
-        session_service = get_session_service()
+        # Get Neo4j service
+        neo4j_service = get_async_neo4j_service()
         
         # Prepare session data for creation
         session_data = {
@@ -94,7 +112,7 @@ async def create_session(
         }
         
         # Create session using the real service
-        session_id = session_service.create_session(session_data)
+        session_id = await neo4j_service.create_session(session_data)
         
         if not session_id:
             logger.error("Failed to create session in database")
@@ -127,34 +145,25 @@ async def create_session(
             detail="An unexpected error occurred"
         )
 
-@router.get("", response_model=List[Session])
+@router.get("", response_model=List[SessionSummary])
 async def get_sessions(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user_id: str = Depends(get_current_user_id)
 ):
-    """Get all sessions for the current user"""
+    """Get one page of the current user's sessions, newest first
+
+    Transcripts are left out; fetch them from /sessions/{id}/transcript.
+    When there are more sessions, the X-Next-Cursor header carries the
+    cursor for the next page.
+    """
+    before = decode_cursor(cursor) if cursor else None
     try:
-        # Get session service
-        session_service = get_session_service()
-        
-        # Get sessions from database
-        sessions = session_service.get_user_sessions(current_user_id)
-        
-        # Convert to response format
-        result = []
-        for session_data in sessions:
-            result.append({
-                "id": session_data.get("id"),
-                "title": session_data.get("title", ""),
-                "description": session_data.get("description", ""),
-                "transcript": session_data.get("transcript", ""),
-                "user_id": session_data.get("userId", current_user_id),
-                "created_at": datetime.fromisoformat(session_data.get("created_at", datetime.now().isoformat())),
-                "updated_at": datetime.fromisoformat(session_data.get("updated_at", datetime.now().isoformat())),
-                "status": session_data.get("status", "pending"),
-                "analysis_status": session_data.get("analysis_status", "pending")
-            })
-        
-        return result
+        neo4j_service = get_async_neo4j_service()
+
+        # One extra row tells us whether there is a next page
+        sessions = await neo4j_service.get_user_session_summaries(current_user_id, limit + 1, before)
     except Exception as e:
         logger.error(f"Error getting sessions: {str(e)}")
         raise HTTPException(
@@ -162,6 +171,81 @@ async def get_sessions(
             detail="An unexpected error occurred"
         )
 
+    if len(sessions) > limit:
+        sessions = sessions[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(sessions[-1])
+
+    # Sessions without a usable created_at are listed as created now, as before
+    now = datetime.now()
+    summaries = []
+    for session_data in sessions:
+        created_at = parse_timestamp(session_data.get("created_at"), now)
+        summaries.append({
+            "id": session_data.get("id"),
+            "title": session_data.get("title") or "",
+            "description": session_data.get("description") or "",
+            "date": session_data.get("date"),
+            "user_id": session_data.get("userId", current_user_id),
+            "created_at": created_at,
+            "updated_at": parse_timestamp(session_data.get("updated_at"), created_at),
+            "status": session_data.get("status") or "pending",
+            "analysis_status": session_data.get("analysis_status") or "pending",
+            "transcript_length": session_data.get("transcript_length", 0),
+            "element_counts": session_data.get("element_counts") or {}
+        })
+    return summaries
+
+@router.get("/{session_id}/transcript", response_model=SessionTranscript)
+async def get_session_transcript(
+    session_id: str,
+    start: Optional[int] = Query(None, ge=0, description="First UTF-8 byte offset"),
+    end: Optional[int] = Query(None, ge=0, description="Byte offset to stop before"),
+    start_time: Optional[float] = Query(None, ge=0, description="Seconds; lines stamped from here on"),
+    end_time: Optional[float] = Query(None, ge=0, description="Seconds; stop at the first line stamped here"),
+    current_user_id: str = Depends(get_current_user_id)
+):
+    """Get the transcript of a session, or a byte or timestamp range of it"""
+    ranges = {name: value for name, value in
+              (("start", start), ("end", end), ("start_time", start_time), ("end_time", end_time))
+              if value is not None}
+    neo4j_service = get_async_neo4j_service()
+
+    # Check ownership with the session's properties before reading the transcript
+    session_data = await neo4j_service.get_session_data(session_id)
+    if not session_data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session {session_id} not found"
+        )
+
+    if session_data.get("userId") != current_user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+
+    try:
+        transcript = await neo4j_service.get_session_transcript(session_id, **ranges)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error getting transcript for session {session_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
+
+    if not transcript:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session {session_id} not found"
+        )
+
+    return {"id": session_id, "transcript": transcript.get("transcript") or ""}
+
 @router.get("/{session_id}", response_model=Session)
 async def get_session(
     session_id: str,
@@ -171,11 +255,11 @@ async def get_session(
     try:
         logger.info(f"Getting session {session_id}")
         
-        # Get session service
-        session_service = get_session_service()
+        # Get Neo4j service
+        neo4j_service = get_async_neo4j_service()
         
         # Get session from database
-        session_data = session_service.get_session(session_id)
+        session_data = await neo4j_service.get_session_data(session_id)
         
         if not session_data:
             raise HTTPException(
@@ -190,12 +274,15 @@ async def get_session(
                 detail="Access denied"
             )
         
+        # The transcript is kept outside the session node
+        transcript = await neo4j_service.get_session_transcript(session_id)
+
         # Return session data
         return {
             "id": session_data.get("id"),
             "title": session_data.get("title", ""),
             "description": session_data.get("description", ""),
-            "transcript": session_data.get("transcript", ""),
+            "transcript": transcript["transcript"] if transcript else "",
             "user_id": session_data.get("userId", ""),
             "created_at": datetime.fromisoformat(session_data.get("created_at", datetime.now().isoformat())),
             "updated_at": datetime.fromisoformat(session_data.get("updated_at", datetime.now().isoformat())),
@@ -220,11 +307,11 @@ async def delete_session(
     try:
         logger.info(f"Deleting session {session_id}")
         
-        # Get session service
-        session_service = get_session_service()
+        # Get Neo4j service
+        neo4j_service = get_async_neo4j_service()
         
         # Get session from database to verify it exists and user owns it
-        session_data = session_service.get_session(session_id)
+        session_data = await neo4j_service.get_session_data(session_id)
         
         if not session_data:
             raise HTTPException(
@@ -240,7 +327,7 @@ async def delete_session(
             )
         
         # Delete the session
-        session_service.delete_session(session_id, current_user_id)
+        await neo4j_service.delete_session(session_id)
         
         logger.info(f"Successfully deleted session {session_id}")
         
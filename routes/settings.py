@@ -4,14 +4,15 @@ Provides user settings and admin settings management.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
 from fastapi.responses import Response
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 import logging
 from datetime import datetime
-from services import get_neo4j_service, get_auth_service
-import jwt
+from services import get_async_neo4j_service
+from services.auth_service import get_current_principal, get_current_user_id, invalidate_principal
+from services.user_repository import UserRecord
+from services.settings_cache import get_settings_cache
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -19,9 +20,6 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter(prefix="/settings")
 
-# OAuth2 scheme
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
 # Pydantic models for settings
 class UserSettings(BaseModel):
     notifications: Optional[bool] = True
@@ -37,6 +35,7 @@ class UserSettings(BaseModel):
     temperature: Optional[float] = 0.7
     system_prompt_template: Optional[str] = None
     analysis_prompt_template: Optional[str] = None
+    analysis_mode: Optional[Literal["text", "structured"]] = None
 
 class AdminSettings(BaseModel):
     gpt_model: Optional[str] = "gpt-4"
@@ -45,6 +44,7 @@ class AdminSettings(BaseModel):
     temperature: Optional[float] = 0.7
     system_prompt_template: Optional[str] = None
     analysis_prompt_template: Optional[str] = None
+    analysis_mode: Optional[Literal["text", "structured"]] = None
     available_topics: Optional[List[str]] = None
     analysis_elements: Optional[List[Dict[str, Any]]] = None
     max_sessions: Optional[int] = 50
@@ -64,51 +64,15 @@ class AnalysisElement(BaseModel):
     requires_timestamp: Optional[bool] = True
     additional_fields: Optional[List[str]] = []
 
-# Helper function to get current user ID from token
-async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> str:
-    """Extract user ID from JWT token"""
-    try:
-        auth_service = get_auth_service()
-        payload = jwt.decode(token, auth_service.secret_key, algorithms=["HS256"])
-        user_id = payload.get("sub")
-        
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        return user_id
-    except jwt.PyJWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
 # Helper function to check admin privileges
-async def get_current_admin_user(current_user_id: str = Depends(get_current_user_id)) -> str:
+async def get_current_admin_user(principal: UserRecord = Depends(get_current_principal)) -> str:
     """Verify user has admin privileges"""
-    try:
-        neo4j_service = get_neo4j_service()
-        user = neo4j_service.get_user_by_id(current_user_id)
-        
-        if not user or not user.get('is_admin', False):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Admin privileges required"
-            )
-        
-        return current_user_id
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error checking admin privileges: {str(e)}")
+    if not principal.is_admin:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error verifying admin privileges"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
         )
+    return principal.user_id
 
 # User Settings Routes
 @router.get("/user", response_model=UserSettings)
@@ -117,8 +81,8 @@ async def get_user_settings(
 ):
     """Get current user's settings"""
     try:
-        neo4j_service = get_neo4j_service()
-        settings = neo4j_service.get_user_settings(current_user_id)
+        neo4j_service = get_async_neo4j_service()
+        settings = await neo4j_service.get_user_settings(current_user_id)
         
         if not settings:
             # Return default settings if none exist
@@ -138,7 +102,8 @@ async def get_user_settings(
             max_tokens=settings.get('max_tokens', 1500),
             temperature=settings.get('temperature', 0.7),
             system_prompt_template=settings.get('system_prompt_template'),
-            analysis_prompt_template=settings.get('analysis_prompt_template')
+            analysis_prompt_template=settings.get('analysis_prompt_template'),
+            analysis_mode=settings.get('analysis_mode')
         )
     except Exception as e:
         logger.error(f"Error getting user settings: {str(e)}")
@@ -154,13 +119,15 @@ async def update_user_settings(
 ):
     """Update current user's settings"""
     try:
-        neo4j_service = get_neo4j_service()
+        neo4j_service = get_async_neo4j_service()
         
         # Convert Pydantic model to dict, excluding None values
         settings_dict = settings.dict(exclude_none=True)
         
         # Save settings to Neo4j
-        success = neo4j_service.save_user_settings(current_user_id, settings_dict)
+        success = await neo4j_service.save_user_settings(current_user_id, settings_dict)
+        # Analysis and transcription read settings through the cache
+        get_settings_cache().invalidate(current_user_id)
         
         if not success:
             raise HTTPException(
@@ -185,8 +152,8 @@ async def get_admin_settings(
 ):
     """Get admin settings (admin only)"""
     try:
-        neo4j_service = get_neo4j_service()
-        settings = neo4j_service.get_user_settings(current_admin_id)
+        neo4j_service = get_async_neo4j_service()
+        settings = await neo4j_service.get_user_settings(current_admin_id)
         
         if not settings:
             # Return default admin settings
@@ -200,6 +167,7 @@ async def get_admin_settings(
             temperature=settings.get('temperature', 0.7),
             system_prompt_template=settings.get('system_prompt_template'),
             analysis_prompt_template=settings.get('analysis_prompt_template'),
+            analysis_mode=settings.get('analysis_mode'),
             available_topics=settings.get('available_topics', [
                 "Work", "Relationships", "Health", "Family", "Personal Growth", "Other"
             ]),
@@ -224,7 +192,7 @@ async def update_admin_settings(
 ):
     """Update admin settings (admin only)"""
     try:
-        neo4j_service = get_neo4j_service()
+        neo4j_service = get_async_neo4j_service()
         
         # Convert Pydantic model to dict, excluding None values
         settings_dict = settings.dict(exclude_none=True)
@@ -252,7 +220,8 @@ async def update_admin_settings(
             )
         
         # Save settings to Neo4j
-        success = neo4j_service.save_user_settings(current_admin_id, settings_dict)
+        success = await neo4j_service.save_user_settings(current_admin_id, settings_dict)
+        get_settings_cache().invalidate(current_admin_id)
         
         if not success:
             raise HTTPException(
@@ -278,11 +247,11 @@ async def get_all_users(
 ):
     """Get all users (admin only)"""
     try:
-        neo4j_service = get_neo4j_service()
+        neo4j_service = get_async_neo4j_service()
         
         # Get all users from Neo4j
-        with neo4j_service.driver.session() as session:
-            result = session.run(
+        async with neo4j_service.driver.session() as session:
+            result = await session.run(
                 """
                 MATCH (u:User)
                 RETURN u.userId AS id, u.email AS email, u.name AS name, 
@@ -291,7 +260,7 @@ async def get_all_users(
                 ORDER BY u.created_at DESC
                 """
             )
-            users = [dict(record) for record in result]
+            users = [dict(record) async for record in result]
         
         return {"users": users}
     except HTTPException:
@@ -311,10 +280,10 @@ async def update_user(
 ):
     """Update user details (admin only)"""
     try:
-        neo4j_service = get_neo4j_service()
+        neo4j_service = get_async_neo4j_service()
         
         # Get user from Neo4j
-        user = neo4j_service.get_user_by_id(user_id)
+        user = await neo4j_service.get_user_by_id(user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -331,7 +300,9 @@ async def update_user(
             properties['is_admin'] = user_data['is_admin']
         
         # Update user in Neo4j
-        success = neo4j_service.update_user(user_id, **properties)
+        success = await neo4j_service.update_user(user_id, **properties)
+        # Requests authorize against the cached principal (is_admin included)
+        invalidate_principal(user_id, email=user.get('email') if 'email' in properties else None)
         
         if not success:
             raise HTTPException(
@@ -340,7 +311,7 @@ async def update_user(
             )
         
         # Get updated user data
-        updated_user = neo4j_service.get_user_by_id(user_id)
+        updated_user = await neo4j_service.get_user_by_id(user_id)
         
         return {
             'message': 'User updated successfully',
@@ -367,23 +338,23 @@ async def get_admin_stats(
 ):
     """Get admin statistics (admin only)"""
     try:
-        neo4j_service = get_neo4j_service()
+        neo4j_service = get_async_neo4j_service()
         
         # Get admin users
-        admin_users = neo4j_service.get_admin_users()
+        admin_users = await neo4j_service.get_admin_users()
         
         # Get all statistics from Neo4j
-        with neo4j_service.driver.session() as session:
+        async with neo4j_service.driver.session() as session:
             # Get user count
-            result = session.run("MATCH (u:User) RETURN count(u) AS count")
-            total_users = result.single()["count"]
+            result = await session.run("MATCH (u:User) RETURN count(u) AS count")
+            total_users = (await result.single())["count"]
             
             # Get session count
-            result = session.run("MATCH (s:Session) RETURN count(s) AS count")
-            total_sessions = result.single()["count"]
+            result = await session.run("MATCH (s:Session) RETURN count(s) AS count")
+            total_sessions = (await result.single())["count"]
             
             # Get recent users
-            result = session.run(
+            result = await session.run(
                 """
                 MATCH (u:User)
                 RETURN u.userId AS id, u.email AS email, u.name AS name, 
@@ -391,10 +362,10 @@ async def get_admin_stats(
                 ORDER BY u.created_at DESC LIMIT 5
                 """
             )
-            recent_users = [dict(record) for record in result]
+            recent_users = [dict(record) async for record in result]
             
             # Get recent sessions
-            result = session.run(
+            result = await session.run(
                 """
                 MATCH (s:Session)
                 RETURN s.id AS id, s.title AS title, s.userId AS user_id,
@@ -402,10 +373,10 @@ async def get_admin_stats(
                 ORDER BY s.created_at DESC LIMIT 5
                 """
             )
-            recent_sessions = [dict(record) for record in result]
+            recent_sessions = [dict(record) async for record in result]
             
             # Get most active users
-            result = session.run(
+            result = await session.run(
                 """
                 MATCH (u:User {userId: s.userId}), (s:Session)
                 WITH u, count(s) AS session_count
@@ -415,7 +386,7 @@ async def get_admin_stats(
                 ORDER BY session_count DESC LIMIT 5
                 """
             )
-            active_users = [dict(record) for record in result]
+            active_users = [dict(record) async for record in result]
         
         logger.info("Admin statistics retrieved successfully")
         return {
@@ -2,6 +2,7 @@
 API routes for handling audio file transcription requests and retrieving results.
 """
 
+import asyncio
 import os
 import uuid
 import tempfile
@@ -14,7 +15,9 @@ from fastapi import APIRouter, Depends, File, UploadFile, Form, HTTPException, B
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
+from services.errors import ValidationError
 from services.transcription_service import TranscriptionService
+from services.upload_storage import save_upload
 from routes.auth import User, oauth2_scheme
 
 # Set up logging
@@ -112,8 +115,9 @@ async def transcribe_audio(
     # For testing, use a fixed user ID
     current_user_id = "test_user_id"
     
-    # Validate file size
-    if audio.size > MAX_FILE_SIZE:
+    # Reject early when the declared size is already over the limit;
+    # the limit is enforced again on the actual bytes while streaming
+    if audio.size is not None and audio.size > MAX_FILE_SIZE:
         raise HTTPException(
             status_code=400, 
             detail=f"File too large, maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB"
@@ -146,14 +150,13 @@ async def transcribe_audio(
         os.makedirs(storage_dir, exist_ok=True)
         file_path = storage_dir / filename
         
-        # Read file content - use more memory-efficient approach for large files
-        contents = await audio.read()
+        # Stream to disk in bounded chunks, hashing as we go
+        try:
+            stored = await save_upload(audio, file_path, MAX_FILE_SIZE)
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Write the file
-        with open(file_path, "wb") as f:
-            f.write(contents)
-        
-        logger.info(f"Saved audio file to {file_path}")
+        logger.info(f"Saved audio file to {file_path} (sha256 {stored.sha256[:12]})")
         
         # Initialize transcription options
         options = {
@@ -166,7 +169,8 @@ async def transcribe_audio(
         result = await transcription_service.api_transcribe(
             str(file_path),
             current_user_id,
-            options=options
+            options=options,
+            upload=stored
         )
         
         # Schedule cleanup of old transcription jobs
@@ -174,11 +178,34 @@ async def transcribe_audio(
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing audio file: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing audio file: {str(e)}")
 
 
+@router.get("")
+async def list_transcriptions(
+    status: Optional[str] = Query(None, description="Only jobs with this status"),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    List the current user's most recent transcription jobs.
+    
+    Args:
+        status: Optional status filter ("processing", "completed", "failed")
+        limit: Maximum number of jobs to return
+        
+    Returns:
+        Transcription jobs, newest first
+    """
+    # For testing, use a fixed user ID
+    current_user_id = "test_user_id"
+    
+    return {"transcriptions": transcription_service.list_transcriptions(current_user_id, status=status, limit=limit)}
+
+
 @router.get("/{transcription_id}")
 async def get_transcription_status(
     transcription_id: str
@@ -260,8 +287,9 @@ async def link_transcription_to_session(
     # if status.get("user_id") and status.get("user_id") != current_user.id:
     #     raise HTTPException(status_code=403, detail="Not authorized to access this transcription")
     
-    # Link the transcription to the session
-    result = transcription_service.link_transcription_to_session(
+    # Link the transcription to the session (a synchronous Neo4j write, so off the event loop)
+    result = await asyncio.to_thread(
+        transcription_service.link_transcription_to_session,
         transcription_id,
         request.session_id
     )
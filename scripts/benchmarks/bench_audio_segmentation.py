@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Benchmark single-pass audio segmentation against per-chunk extraction.
+
+Generates a synthetic speech-length recording with ffmpeg (a sine tone, so
+no real audio is needed), then times:
+
+- legacy: one `ffmpeg -i file -ss start -t dur` re-encode per chunk, which
+  decodes the file from the start for every chunk
+- segment (copy): one segment-muxer pass with stream copy
+- segment (encode): one segment-muxer pass re-encoding to MP3
+
+Usage:
+    python scripts/benchmarks/bench_audio_segmentation.py [--minutes 10 30 60] [--chunk 300]
+
+Requires ffmpeg on PATH.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from services.audio_segmentation import segment_command, _collect_segments
+
+def make_recording(path: Path, seconds: int) -> None:
+    """Write a mono 64 kbps MP3 tone of the given length"""
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi",
+         "-i", f"sine=frequency=220:sample_rate=16000:duration={seconds}",
+         "-ac", "1", "-b:a", "64k", "-acodec", "libmp3lame", str(path)],
+        check=True, capture_output=True
+    )
+
+def legacy_extract(audio: Path, seconds: int, chunk: int, out_dir: Path) -> int:
+    """The old per-chunk extraction, with -ss after -i"""
+    count = 0
+    for start in range(0, seconds, chunk):
+        subprocess.run(
+            ["ffmpeg", "-y", "-i", str(audio), "-ss", str(start), "-t", str(chunk),
+             "-acodec", "libmp3lame", "-loglevel", "error", str(out_dir / f"chunk_{start}.mp3")],
+            check=True, capture_output=True
+        )
+        count += 1
+    return count
+
+def single_pass(audio: Path, chunk: int, out_dir: Path, copy: bool) -> int:
+    subprocess.run(
+        segment_command(audio, chunk, str(out_dir / "chunk_%04d.mp3"), copy=copy),
+        check=True, capture_output=True
+    )
+    return len(_collect_segments(out_dir, chunk))
+
+def timed(func, *args):
+    """Wall time in seconds and child CPU seconds of one run"""
+    cpu_before = os.times()
+    started = time.perf_counter()
+    result = func(*args)
+    wall = time.perf_counter() - started
+    cpu_after = os.times()
+    cpu = (cpu_after.children_user - cpu_before.children_user) + (cpu_after.children_system - cpu_before.children_system)
+    return result, wall, cpu
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--minutes", type=int, nargs="+", default=[10, 30, 60])
+    parser.add_argument("--chunk", type=int, default=300, help="chunk length in seconds")
+    args = parser.parse_args()
+
+    if shutil.which("ffmpeg") is None:
+        sys.exit("ffmpeg is required for this benchmark")
+
+    print(f"{'minutes':>7} {'chunks':>6} {'method':>16} {'wall s':>8} {'cpu s':>8}")
+    with tempfile.TemporaryDirectory(prefix="bench_segmentation_") as tmp:
+        tmp = Path(tmp)
+        for minutes in args.minutes:
+            seconds = minutes * 60
+            audio = tmp / f"synthetic_{minutes}m.mp3"
+            make_recording(audio, seconds)
+
+            methods = [
+                ("legacy", lambda out: legacy_extract(audio, seconds, args.chunk, out)),
+                ("segment (copy)", lambda out: single_pass(audio, args.chunk, out, copy=True)),
+                ("segment (encode)", lambda out: single_pass(audio, args.chunk, out, copy=False)),
+            ]
+            for name, method in methods:
+                out_dir = Path(tempfile.mkdtemp(dir=tmp))
+                chunks, wall, cpu = timed(method, out_dir)
+                print(f"{minutes:>7} {chunks:>6} {name:>16} {wall:>8.2f} {cpu:>8.2f}")
+                shutil.rmtree(out_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Benchmark extract_elements against the per-section regex extractor it replaced.
+
+Parses the response corpus built from data/generators/output (one
+PROMPT_TEMPLATE-format analysis per generated session) with:
+
+- legacy: five re.VERBOSE patterns compiled on every call, one DOTALL
+  section search per element type and an emotion scan over the whole text
+- single-pass: services.element_stream, one line-oriented walk
+
+and reports the mean time per response and the throughput. Both parsers are
+checked to return the same elements first.
+
+Usage:
+    python scripts/benchmarks/bench_extract_elements.py [--runs 5] [--repeat 1]
+
+Needs the usual service environment (OPENAI_API_KEY etc.) to import
+services, but makes no API calls.
+
+--repeat concatenates each response with itself N times, to see how the
+parsers scale with response length. The legacy extractor reads only the
+first of each repeated section, so with --repeat it returns fewer elements
+(and does less work) than the single-pass parser.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from dotenv import load_dotenv
+
+# services/__init__ reads the environment at import time
+load_dotenv()
+
+from services.analysis_service import extract_elements
+from tests.element_corpus import build_corpus
+
+# The extractor as it was before the single-pass parser
+LEGACY_PATTERNS = {
+    "beliefs": ("BELIEFS", r"""
+        Name:\s*(?P<name>[^\n]+)\s*\n
+        Description:\s*(?P<description>[^\n]+)\s*\n
+        Impact:\s*(?P<impact>[^\n]+)\s*\n
+        Topic:\s*(?P<topic>[^\n]+)\s*\n
+        Timestamp:\s*(?P<timestamp>[^\n]+)
+    """),
+    "action_items": ("ACTION ITEMS", r"""
+        Name:\s*(?P<name>[^\n]+)\s*\n
+        Description:\s*(?P<description>[^\n]+)\s*\n
+        Topic:\s*(?P<topic>[^\n]+)\s*\n
+        Timestamp:\s*(?P<timestamp>[^\n]+)
+    """),
+    "challenges": ("CHALLENGES", r"""
+        Name:\s*(?P<name>[^\n]+)\s*\n
+        Impact:\s*(?P<impact>[^\n]+)\s*\n
+        Topic:\s*(?P<topic>[^\n]+)\s*\n
+        Timestamp:\s*(?P<timestamp>[^\n]+)
+    """),
+    "insights": ("INSIGHTS", r"""
+        Name:\s*(?P<name>[^\n]+)\s*\n
+        Context:\s*(?P<context>[^\n]+)\s*\n
+        Topic:\s*(?P<topic>[^\n]+)\s*\n
+        Timestamp:\s*(?P<timestamp>[^\n]+)
+    """),
+}
+
+LEGACY_EMOTION = r"""
+    Name:\s*(?P<name>[^\n]+)\s*\n
+    Intensity:\s*(?P<intensity>\d+)\s*\n
+    Context:\s*(?P<context>[^\n]+)\s*\n
+    Topic:\s*(?P<topic>[^\n]+)\s*\n
+    Timestamp:\s*(?P<timestamp>[^\n]+)
+"""
+
+def legacy_extract(text):
+    elements = {"emotions": [], "beliefs": [], "action_items": [], "challenges": [], "insights": []}
+    for match in re.compile(LEGACY_EMOTION, re.VERBOSE).finditer(text):
+        elements["emotions"].append({k: v.strip() for k, v in match.groupdict().items()})
+    for element_type, (header, pattern) in LEGACY_PATTERNS.items():
+        section = re.search(rf"===\s*{header}\s*===\s*\n(.*?)(?=\n\s*===|$)", text, re.DOTALL)
+        if section:
+            for match in re.compile(pattern, re.VERBOSE).finditer(section.group(1)):
+                elements[element_type].append({k: v.strip() for k, v in match.groupdict().items()})
+    return elements
+
+def measure(func, responses, runs):
+    """Mean seconds per response over the best of several passes"""
+    passes = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        for response in responses:
+            func(response)
+        passes.append((time.perf_counter() - started) / len(responses))
+    return min(passes), statistics.mean(passes)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=1, help="copies of each response to concatenate")
+    args = parser.parse_args()
+
+    corpus = build_corpus()
+    if not corpus:
+        sys.exit("no transcripts found in data/generators/output")
+    for response, _ in corpus:
+        if legacy_extract(response) != extract_elements(response):
+            sys.exit("legacy and single-pass parsers disagree on the corpus")
+
+    responses = ["\n".join([response] * args.repeat) for response, _ in corpus]
+    size = statistics.mean(len(response) for response in responses)
+    print(f"{len(responses)} responses, mean {size / 1024:.1f} KiB")
+    print(f"{'parser':>12} {'best us':>9} {'mean us':>9} {'MiB/s':>8}")
+    for name, func in (("legacy", legacy_extract), ("single-pass", extract_elements)):
+        best, mean = measure(func, responses, args.runs)
+        print(f"{name:>12} {best * 1e6:>9.1f} {mean * 1e6:>9.1f} {size / best / 2**20:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""
+Benchmark get_session_with_relationships against element count.
+
+Builds throwaway sessions with N elements of each of the five types (each
+linked to several topics), then times the session retrieval query. The
+per-type pattern comprehensions should grow linearly with N; the legacy
+chained OPTIONAL MATCH query grows with the product of the element counts
+and is only run for small N.
+
+Usage:
+    python scripts/benchmarks/bench_session_elements.py [--sizes 5 10 20 40] [--runs 5]
+
+Requires NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD. All benchmark data is
+created under a dedicated user and deleted afterwards.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from neo4j import GraphDatabase
+from dotenv import load_dotenv
+
+# services/__init__ reads the environment at import time
+load_dotenv()
+
+from services import neo4j_queries as queries
+
+BENCH_USER = "U_bench_session_elements"
+
+# The retrieval query as it was before the pattern-comprehension rewrite
+LEGACY_SESSION_WITH_RELATIONSHIPS = """
+    MATCH (s:Session {id: $session_id})
+    OPTIONAL MATCH (s)-[re:HAS_EMOTION]->(e:Emotion)
+    OPTIONAL MATCH (e)-[ret:RELATED_TO]->(et:Topic)
+    OPTIONAL MATCH (s)-[ri:HAS_INSIGHT]->(i:Insight)
+    OPTIONAL MATCH (i)-[rit:RELATED_TO]->(it:Topic)
+    OPTIONAL MATCH (s)-[rb:HAS_BELIEF]->(b:Belief)
+    OPTIONAL MATCH (b)-[rbt:RELATED_TO]->(bt:Topic)
+    OPTIONAL MATCH (s)-[rc:HAS_CHALLENGE]->(c:Challenge)
+    OPTIONAL MATCH (c)-[rct:RELATED_TO]->(ct:Topic)
+    OPTIONAL MATCH (s)-[ra:HAS_ACTION_ITEM]->(a:ActionItem)
+    OPTIONAL MATCH (a)-[rat:RELATED_TO]->(at:Topic)
+    OPTIONAL MATCH (prev:Session)-[:NEXT_SESSION]->(s)
+    OPTIONAL MATCH (s)-[:NEXT_SESSION]->(next:Session)
+    RETURN s,
+        collect(DISTINCT {emotion: e, relationship: re, topic: et, topic_relationship: ret}) as emotions,
+        collect(DISTINCT {insight: i, relationship: ri, topic: it, topic_relationship: rit}) as insights,
+        collect(DISTINCT {belief: b, relationship: rb, topic: bt, topic_relationship: rbt}) as beliefs,
+        collect(DISTINCT {challenge: c, relationship: rc, topic: ct, topic_relationship: rct}) as challenges,
+        collect(DISTINCT {action_item: a, relationship: ra, topic: at, topic_relationship: rat}) as action_items,
+        prev, next
+"""
+
+SEED_SESSION = """
+    CREATE (s:Session {id: $session_id, userId: $user_id, title: 'bench'})
+    WITH s
+    UNWIND range(1, $n) AS k
+    CREATE (s)-[:HAS_EMOTION {intensity: 3}]->(e:Emotion {id: $session_id + '-E' + k, name: 'E' + k, user_id: $user_id})
+    CREATE (s)-[:HAS_INSIGHT]->(i:Insight {id: $session_id + '-I' + k, name: 'I' + k, user_id: $user_id})
+    CREATE (s)-[:HAS_BELIEF]->(b:Belief {id: $session_id + '-B' + k, text: 'B' + k, user_id: $user_id})
+    CREATE (s)-[:HAS_CHALLENGE]->(c:Challenge {id: $session_id + '-C' + k, name: 'C' + k, user_id: $user_id})
+    CREATE (s)-[:HAS_ACTION_ITEM]->(a:ActionItem {id: $session_id + '-A' + k, name: 'A' + k, user_id: $user_id})
+    WITH e, i, b, c, a
+    UNWIND range(1, $topics) AS t
+    MERGE (topic:Topic {name: 'bench-topic-' + t, user_id: $user_id})
+    CREATE (e)-[:RELATED_TO {relevance: 0.8}]->(topic)
+    CREATE (i)-[:RELATED_TO {relevance: 0.8}]->(topic)
+    CREATE (b)-[:RELATED_TO {relevance: 0.8}]->(topic)
+    CREATE (c)-[:RELATED_TO {relevance: 0.8}]->(topic)
+    CREATE (a)-[:RELATED_TO {relevance: 0.8}]->(topic)
+"""
+
+CLEANUP = """
+    MATCH (n {user_id: $user_id}) DETACH DELETE n
+    WITH count(*) AS ignored
+    MATCH (s:Session {userId: $user_id}) DETACH DELETE s
+"""
+
+def time_query(session, query, session_id, runs):
+    """Median wall time in ms and db hits for one query"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        session.run(query, session_id=session_id).consume()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    profile = session.run(f"PROFILE {query}", session_id=session_id).consume().profile
+    return statistics.median(timings), _db_hits(profile)
+
+def _db_hits(profile):
+    return profile.get("dbHits", 0) + sum(_db_hits(child) for child in profile.get("children", []))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 10, 20, 40])
+    parser.add_argument("--topics", type=int, default=3, help="topics linked to each element")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--legacy-max", type=int, default=5,
+                        help="largest N to run the legacy query for (it is exponential)")
+    args = parser.parse_args()
+
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI", "bolt://localhost:7687"),
+        auth=(os.getenv("NEO4J_USER") or os.getenv("NEO4J_USERNAME", "neo4j"),
+              os.getenv("NEO4J_PASSWORD", "password"))
+    )
+
+    print(f"{'N/type':>7} {'elements':>9} {'new ms':>9} {'new dbHits':>11} {'legacy ms':>10} {'legacy dbHits':>14}")
+    try:
+        with driver.session() as session:
+            for n in args.sizes:
+                session_id = f"S_bench_{uuid.uuid4()}"
+                session.run(SEED_SESSION, session_id=session_id, user_id=BENCH_USER,
+                            n=n, topics=args.topics).consume()
+
+                new_ms, new_hits = time_query(session, queries.SESSION_WITH_RELATIONSHIPS, session_id, args.runs)
+                if n <= args.legacy_max:
+                    legacy_ms, legacy_hits = time_query(session, LEGACY_SESSION_WITH_RELATIONSHIPS, session_id, 1)
+                    legacy = f"{legacy_ms:>10.1f} {legacy_hits:>14}"
+                else:
+                    legacy = f"{'skipped':>10} {'-':>14}"
+
+                print(f"{n:>7} {n * 5:>9} {new_ms:>9.1f} {new_hits:>11} {legacy}")
+    finally:
+        with driver.session() as session:
+            session.run(CLEANUP, user_id=BENCH_USER).consume()
+        driver.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+Benchmark the session list: full Session nodes vs. paged summaries.
+
+Grows a throwaway user's history to each size in --sizes (every session
+carrying a transcript of --transcript-kb), then times the legacy
+USER_SESSIONS query, which returns every full node, against the first page
+of USER_SESSION_SUMMARIES. It reports median latency, db hits and the size
+of the JSON the list endpoint would send. The summary page should stay flat
+as the history grows; the legacy list grows with sessions x transcript.
+
+Usage:
+    python scripts/benchmarks/bench_session_list.py [--sizes 10 50 200] [--transcript-kb 50] [--page 50]
+
+Requires NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD. All benchmark data is
+created under a dedicated user and deleted afterwards.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from neo4j import GraphDatabase
+from dotenv import load_dotenv
+
+# services/__init__ reads the environment at import time
+load_dotenv()
+
+from services import neo4j_queries as queries
+from services.neo4j_schema import ensure_schema
+
+BENCH_USER = "U_bench_session_list"
+
+SEED_USER = "MERGE (:User {userId: $user_id})"
+
+# Sessions start..stop-1, a minute apart, each with two elements
+SEED_SESSIONS = """
+    MATCH (u:User {userId: $user_id})
+    UNWIND range($start, $stop - 1) AS k
+    CREATE (u)-[:HAS_SESSION]->(s:Session {
+        id: 'S_bench_list_' + k,
+        userId: $user_id,
+        title: 'Session ' + k,
+        description: 'bench',
+        transcript: $transcript,
+        status: 'completed',
+        analysis_status: 'completed',
+        created_at: toString(datetime('2025-01-01T00:00:00') + duration({minutes: k})),
+        updated_at: toString(datetime('2025-01-01T00:00:00') + duration({minutes: k}))
+    })
+    CREATE (s)-[:HAS_EMOTION]->(:Emotion {user_id: $user_id})
+    CREATE (s)-[:HAS_INSIGHT]->(:Insight {user_id: $user_id})
+"""
+
+CLEANUP = """
+    MATCH (n {user_id: $user_id}) DETACH DELETE n
+    WITH count(*) AS ignored
+    MATCH (n) WHERE (n:Session OR n:User) AND n.userId = $user_id
+    DETACH DELETE n
+"""
+
+def time_query(session, query, runs, **params):
+    """Median ms, db hits and JSON bytes of the rows for one query"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        rows = [record.data() for record in session.run(query, **params)]
+        timings.append((time.perf_counter() - started) * 1000)
+
+    profile = session.run(f"PROFILE {query}", **params).consume().profile
+    payload = len(json.dumps(rows, default=str).encode())
+    return statistics.median(timings), _db_hits(profile), payload
+
+def _db_hits(profile):
+    return profile.get("dbHits", 0) + sum(_db_hits(child) for child in profile.get("children", []))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--transcript-kb", type=int, default=50, help="transcript size per session")
+    parser.add_argument("--page", type=int, default=50, help="summary page size")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI", "bolt://localhost:7687"),
+        auth=(os.getenv("NEO4J_USER") or os.getenv("NEO4J_USERNAME", "neo4j"),
+              os.getenv("NEO4J_PASSWORD", "password"))
+    )
+    transcript = "Client: I've been feeling anxious lately.\n" * (args.transcript_kb * 1024 // 42)
+    before_created_at, before_id = None, None
+
+    print(f"{'sessions':>8} {'legacy ms':>10} {'dbHits':>8} {'KB':>9}   "
+          f"{'page ms':>8} {'dbHits':>8} {'KB':>6}")
+    try:
+        # The summary query relies on the session_user_id index
+        ensure_schema(driver)
+        with driver.session() as session:
+            session.run(CLEANUP, user_id=BENCH_USER).consume()
+            session.run(SEED_USER, user_id=BENCH_USER).consume()
+            seeded = 0
+            for size in sorted(args.sizes):
+                session.run(SEED_SESSIONS, user_id=BENCH_USER, start=seeded, stop=size,
+                            transcript=transcript).consume()
+                seeded = size
+
+                legacy_ms, legacy_hits, legacy_bytes = time_query(
+                    session, queries.USER_SESSIONS, args.runs, user_id=BENCH_USER)
+                page_ms, page_hits, page_bytes = time_query(
+                    session, queries.USER_SESSION_SUMMARIES, args.runs, user_id=BENCH_USER,
+                    limit=args.page, before_created_at=before_created_at, before_id=before_id)
+
+                print(f"{size:>8} {legacy_ms:>10.1f} {legacy_hits:>8} {legacy_bytes / 1024:>9.0f}   "
+                      f"{page_ms:>8.1f} {page_hits:>8} {page_bytes / 1024:>6.1f}")
+    finally:
+        with driver.session() as session:
+            session.run(CLEANUP, user_id=BENCH_USER).consume()
+        driver.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Benchmark transcript range reads from the transcript store.
+
+Builds transcripts of each length in --minutes from the turns in
+data/test_transcripts (restamped every 15 seconds), stores them in a
+LocalBlobBackend under a temporary directory and reports, per length:
+
+- raw: the UTF-8 size, which every query returning a Session node used to
+  ship while the transcript was a node property
+- stored: the blob size (block-compressed, with its header)
+- full / window / bytes: median ms to read the whole transcript, a
+  --window minute timestamp range from the middle, and a --bytes byte range,
+  with the blob bytes each read fetched from the backend
+
+Usage:
+    python scripts/benchmarks/bench_transcript_store.py [--minutes 60 180 600] [--window 5] [--block-kb 16]
+
+Needs the usual service environment (OPENAI_API_KEY etc.) to import
+services; no database.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from dotenv import load_dotenv
+
+# services/__init__ reads the environment at import time
+load_dotenv()
+
+from services.transcript_store import TRANSCRIPT_BLOCK_SIZE, LocalBlobBackend, TranscriptStore
+
+TRANSCRIPTS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "test_transcripts")
+TURN = re.compile(r"^\d{1,2}:\d{2}\s*(.*)$")
+
+class CountingBackend(LocalBlobBackend):
+    """Counts the blob bytes each read fetches"""
+
+    bytes_read = 0
+
+    def get_range(self, key, start, end):
+        data = super().get_range(key, start, end)
+        self.bytes_read += len(data)
+        return data
+
+def load_turns():
+    """Speaker turns of the sample transcripts, without their timestamps"""
+    turns = []
+    for name in sorted(os.listdir(TRANSCRIPTS_DIR)):
+        with open(os.path.join(TRANSCRIPTS_DIR, name), encoding="utf-8") as handle:
+            turns += [match.group(1) for match in map(TURN.match, handle.read().splitlines()) if match]
+    return turns
+
+def build_transcript(turns, minutes):
+    """A transcript of the given length, one turn every 15 seconds"""
+    lines = []
+    for n, seconds in enumerate(range(0, minutes * 60, 15)):
+        stamp = f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+        lines.append(f"{stamp} — {turns[n % len(turns)]}")
+    return "\n\n".join(lines) + "\n"
+
+def measure(backend, read, runs):
+    """Median ms and blob bytes fetched per read"""
+    timings = []
+    for _ in range(runs):
+        backend.bytes_read = 0
+        started = time.perf_counter()
+        read()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), backend.bytes_read
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--minutes", type=int, nargs="+", default=[60, 180, 600])
+    parser.add_argument("--window", type=int, default=5, help="minutes read by the timestamp range")
+    parser.add_argument("--bytes", type=int, default=4096, help="bytes read by the byte range")
+    parser.add_argument("--block-kb", type=int, default=TRANSCRIPT_BLOCK_SIZE // 1024)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    turns = load_turns()
+    print(f"{'minutes':>7} {'raw KB':>8} {'stored KB':>10} {'full ms':>8} {'KB read':>8} "
+          f"{'window ms':>10} {'KB read':>8} {'bytes ms':>9} {'KB read':>8}")
+    with tempfile.TemporaryDirectory() as root:
+        backend = CountingBackend(root)
+        for minutes in args.minutes:
+            # A fresh store per size, so headers are read from the blob as in a new worker
+            store = TranscriptStore(backend, block_size=args.block_kb * 1024, header_cache_size=0)
+            transcript = build_transcript(turns, minutes)
+            ref = store.put(transcript)
+            stored = os.path.getsize(os.path.join(root, ref.digest[:2], ref.digest))
+            middle = minutes * 30
+
+            full_ms, full_read = measure(backend, lambda: store.read_text(ref.digest), args.runs)
+            window_ms, window_read = measure(backend, lambda: store.read_text(
+                ref.digest, start_time=middle, end_time=middle + args.window * 60), args.runs)
+            bytes_ms, bytes_read = measure(backend, lambda: store.read(
+                ref.digest, ref.size // 2, ref.size // 2 + args.bytes), args.runs)
+
+            print(f"{minutes:>7} {ref.size / 1024:>8.0f} {stored / 1024:>10.0f} {full_ms:>8.2f} {full_read / 1024:>8.0f} "
+                  f"{window_ms:>10.2f} {window_read / 1024:>8.0f} {bytes_ms:>9.2f} {bytes_read / 1024:>8.0f}")
+
+if __name__ == "__main__":
+    main()
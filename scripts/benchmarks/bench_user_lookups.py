@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""
+Benchmark user lookups: the legacy multi-query reads vs. UserRepository.
+
+Creates a throwaway User and EmailLookup, then times login, token
+resolution (userId and email subjects) and profile fetch both ways,
+reporting Cypher round trips, sessions opened and median latency. The
+legacy paths replay the queries Neo4jService ran before the repository:
+a login read the user twice through get_user_by_email, which itself looked
+up the userId and then ran get_user_by_id (User, then EmailLookup again).
+
+Usage:
+    python scripts/benchmarks/bench_user_lookups.py [--runs 200]
+
+Requires NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD. The benchmark user is
+deleted afterwards.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from neo4j import GraphDatabase
+from dotenv import load_dotenv
+
+# services/__init__ reads the environment at import time
+load_dotenv()
+
+from services.user_repository import UserRecord, UserRepository
+
+BENCH_USER = "U_bench_user_lookups"
+BENCH_EMAIL = "bench-user-lookups@example.com"
+
+# The lookups as they were before the repository
+LEGACY_USER_ID_BY_EMAIL = """
+    MATCH (e:EmailLookup {email: $email})
+    RETURN e.userId as userId
+"""
+LEGACY_USER_BY_ID = "MATCH (u:User {userId: $userId}) RETURN u"
+LEGACY_EMAIL_BY_USER_ID = "MATCH (e:EmailLookup {userId: $userId}) RETURN e.email as email"
+
+SEED = """
+    CREATE (:User {userId: $userId, email: 'bench-hash', name: 'bench', password_hash: 'x'})
+    CREATE (:EmailLookup {email: $email, userId: $userId})
+"""
+
+CLEANUP = """
+    MATCH (n) WHERE (n:User OR n:EmailLookup) AND n.userId = $userId
+    DETACH DELETE n
+"""
+
+class CountingDriver:
+    """Wraps a driver to count sessions and queries"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.sessions = 0
+        self.round_trips = 0
+
+    def session(self):
+        self.sessions += 1
+        return _CountingSession(self, self.driver.session())
+
+class _CountingSession:
+    def __init__(self, counter, session):
+        self.counter = counter
+        self.session = session
+
+    def __enter__(self):
+        self.session.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.session.__exit__(*exc)
+
+    def run(self, query, **params):
+        self.counter.round_trips += 1
+        return self.session.run(query, **params)
+
+def legacy_get_user_by_id(driver, user_id):
+    with driver.session() as session:
+        record = session.run(LEGACY_USER_BY_ID, userId=user_id).single()
+        if not record:
+            return None
+        lookup = session.run(LEGACY_EMAIL_BY_USER_ID, userId=user_id).single()
+        return UserRecord.from_node(record["u"], lookup["email"] if lookup else None)
+
+def legacy_get_user_by_email(driver, email):
+    with driver.session() as session:
+        record = session.run(LEGACY_USER_ID_BY_EMAIL, email=email).single()
+        if not record:
+            return None
+        user_id = record["userId"]
+    return legacy_get_user_by_id(driver, user_id)
+
+def legacy_login(driver):
+    # verify_password, then the user fetch
+    legacy_get_user_by_email(driver, BENCH_EMAIL)
+    return legacy_get_user_by_email(driver, BENCH_EMAIL)
+
+class _DriverHolder:
+    """What UserRepository needs from a Neo4jService: a driver"""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+def measure(counter, action, runs):
+    """Round trips and sessions for one call, and median ms over runs"""
+    counter.sessions = counter.round_trips = 0
+    assert action() is not None, "benchmark user not found"
+    trips, sessions = counter.round_trips, counter.sessions
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        action()
+        timings.append((time.perf_counter() - started) * 1000)
+    return trips, sessions, statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI", "bolt://localhost:7687"),
+        auth=(os.getenv("NEO4J_USER") or os.getenv("NEO4J_USERNAME", "neo4j"),
+              os.getenv("NEO4J_PASSWORD", "password"))
+    )
+    counter = CountingDriver(driver)
+    users = UserRepository(_DriverHolder(counter))
+
+    paths = [
+        ("login", lambda: legacy_login(counter), lambda: users.get_by_email(BENCH_EMAIL)),
+        ("token (userId sub)", lambda: legacy_get_user_by_id(counter, BENCH_USER), lambda: users.get_by_subject(BENCH_USER)),
+        ("token (email sub)", lambda: legacy_get_user_by_email(counter, BENCH_EMAIL), lambda: users.get_by_subject(BENCH_EMAIL)),
+        ("profile", lambda: legacy_get_user_by_id(counter, BENCH_USER), lambda: users.get_by_id(BENCH_USER)),
+    ]
+
+    print(f"{'path':<20} {'legacy trips':>12} {'sessions':>9} {'ms':>7}   {'new trips':>9} {'sessions':>9} {'ms':>7}")
+    try:
+        with driver.session() as session:
+            session.run(CLEANUP, userId=BENCH_USER).consume()
+            session.run(SEED, userId=BENCH_USER, email=BENCH_EMAIL).consume()
+
+        for name, legacy, new in paths:
+            legacy_trips, legacy_sessions, legacy_ms = measure(counter, legacy, args.runs)
+            new_trips, new_sessions, new_ms = measure(counter, new, args.runs)
+            print(f"{name:<20} {legacy_trips:>12} {legacy_sessions:>9} {legacy_ms:>7.2f}   "
+                  f"{new_trips:>9} {new_sessions:>9} {new_ms:>7.2f}")
+    finally:
+        with driver.session() as session:
+            session.run(CLEANUP, userId=BENCH_USER).consume()
+        driver.close()
+
+if __name__ == "__main__":
+    main()
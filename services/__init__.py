@@ -4,6 +4,9 @@ Provides service initialization to ensure consistent configuration across the ap
 
 import os
 from .neo4j_service import Neo4jService
+from .async_neo4j_service import AsyncNeo4jService
+from .llm_client import get_llm_client, close_llm_client
+from .job_queue import get_analysis_job_queue, close_analysis_job_queue
 from .session_service import SessionService
 from .file_service import FileService
 from .user_service import UserService
@@ -14,27 +17,47 @@ from dotenv import load_dotenv
 
 # Singleton service instances
 _neo4j_service = None
+_async_neo4j_service = None
 _session_service = None
 _file_service = None
 _user_service = None
 _admin_service = None
 _auth_service = None
 
+def _neo4j_config() -> Dict[str, str]:
+    """Read Neo4j connection settings from the environment"""
+    load_dotenv()
+    return {
+        "uri": os.getenv("NEO4J_URI", "bolt://localhost:7687"),
+        # Check for both NEO4J_USER and NEO4J_USERNAME for compatibility
+        "user": os.getenv("NEO4J_USER") or os.getenv("NEO4J_USERNAME", "neo4j"),
+        "password": os.getenv("NEO4J_PASSWORD", "password"),
+    }
+
 def get_neo4j_service():
     """Get or create a Neo4j service singleton instance"""
     global _neo4j_service
     if _neo4j_service is None:
-        load_dotenv()
-        
-        # Get Neo4j configuration from environment
-        uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-        # Check for both NEO4J_USER and NEO4J_USERNAME for compatibility
-        user = os.getenv("NEO4J_USER") or os.getenv("NEO4J_USERNAME", "neo4j")
-        password = os.getenv("NEO4J_PASSWORD", "password")
-        
-        _neo4j_service = Neo4jService(uri=uri, user=user, password=password)
+        _neo4j_service = Neo4jService(**_neo4j_config())
     return _neo4j_service
 
+def get_async_neo4j_service():
+    """Get or create the async Neo4j service singleton used by FastAPI routes"""
+    global _async_neo4j_service
+    if _async_neo4j_service is None:
+        _async_neo4j_service = AsyncNeo4jService(
+            sync_service=get_neo4j_service(),
+            **_neo4j_config()
+        )
+    return _async_neo4j_service
+
+async def close_async_neo4j_service():
+    """Close the async Neo4j driver if it was created"""
+    global _async_neo4j_service
+    if _async_neo4j_service is not None:
+        await _async_neo4j_service.close()
+        _async_neo4j_service = None
+
 def get_session_service():
     """Get or create a session service singleton instance"""
     global _session_service
@@ -179,6 +202,12 @@ __all__ = [
     "analyze_transcript",
     "extract_elements",
     "get_neo4j_service",
+    "get_async_neo4j_service",
+    "close_async_neo4j_service",
+    "get_llm_client",
+    "close_llm_client",
+    "get_analysis_job_queue",
+    "close_analysis_job_queue",
     "get_session_service",
     "get_file_service",
     "get_user_service",
@@ -0,0 +1,139 @@
+"""
+Analysis Schema Module
+
+Pydantic models for the structured-output analysis mode. The model is asked
+to call a function whose parameters are the SessionAnalysis JSON schema, so
+its answer is JSON rather than sectioned text; the arguments are validated
+element by element and returned in the same shape as
+analysis_service.extract_elements, ready for format_analysis_for_storage.
+
+Emotion names and topics are constrained to VALID_EMOTIONS and VALID_TOPICS
+(case-insensitively). An element that fails validation is dropped and
+logged; the rest of the analysis is kept.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Literal, Type
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+logger = logging.getLogger(__name__)
+
+# Predefined lists of valid emotions and topics
+VALID_EMOTIONS = [
+    "Anxiety", "Sadness", "Anger", "Fear", "Hope",
+    "Joy", "Frustration", "Confusion", "Relief", "Gratitude"
+]
+
+VALID_TOPICS = [
+    "Relationships", "Career", "Health", "Self-Esteem", "Stress Management",
+    "Time Management", "Boundaries", "Personal Growth", "Trauma", "Life Transitions",
+    "Purpose"
+]
+
+EmotionName = Literal[tuple(VALID_EMOTIONS)]
+TopicName = Literal[tuple(VALID_TOPICS)]
+
+_CANONICAL = {value.lower(): value for value in VALID_EMOTIONS + VALID_TOPICS}
+
+def _canonical(value: Any) -> Any:
+    """Map "anxiety" or " Career " onto the spelling in the valid lists"""
+    if isinstance(value, str):
+        return _CANONICAL.get(value.strip().lower(), value)
+    return value
+
+class _Element(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    name: str = Field(min_length=1)
+    topic: TopicName
+    timestamp: str = Field(min_length=1, description="MM:SS in the session")
+
+    @field_validator("topic", mode="before")
+    @classmethod
+    def _canonical_topic(cls, value: Any) -> Any:
+        return _canonical(value)
+
+class Emotion(_Element):
+    name: EmotionName
+    intensity: int = Field(ge=1, le=10)
+    context: str = Field(min_length=1)
+
+    @field_validator("name", mode="before")
+    @classmethod
+    def _canonical_name(cls, value: Any) -> Any:
+        return _canonical(value)
+
+class Belief(_Element):
+    description: str = Field(min_length=1)
+    impact: str = Field(min_length=1)
+
+class ActionItem(_Element):
+    description: str = Field(min_length=1)
+
+class Challenge(_Element):
+    impact: str = Field(min_length=1)
+
+class Insight(_Element):
+    context: str = Field(min_length=1)
+
+class SessionAnalysis(BaseModel):
+    """Everything extracted from one session (or one chunk of it)"""
+    emotions: List[Emotion] = []
+    beliefs: List[Belief] = []
+    action_items: List[ActionItem] = []
+    challenges: List[Challenge] = []
+    insights: List[Insight] = []
+
+ELEMENT_MODELS: Dict[str, Type[_Element]] = {
+    "emotions": Emotion,
+    "beliefs": Belief,
+    "action_items": ActionItem,
+    "challenges": Challenge,
+    "insights": Insight,
+}
+
+ANALYSIS_FUNCTION = "record_session_analysis"
+
+ANALYSIS_TOOL = {
+    "type": "function",
+    "function": {
+        "name": ANALYSIS_FUNCTION,
+        "description": "Record the emotions, beliefs, action items, challenges and insights found in the transcript.",
+        "parameters": SessionAnalysis.model_json_schema(),
+    },
+}
+
+def parse_structured_analysis(arguments: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Validate function-call arguments into extract_elements-shaped elements
+
+    Args:
+        arguments: JSON arguments of the analysis function call
+
+    Returns:
+        Element lists per type; invalid elements are left out, and a response
+        that is not a JSON object yields empty lists
+    """
+    elements = {element_type: [] for element_type in ELEMENT_MODELS}
+    try:
+        data = json.loads(arguments)
+    except (TypeError, ValueError) as e:
+        logger.error(f"Structured analysis is not valid JSON: {e}")
+        return elements
+    if not isinstance(data, dict):
+        logger.error(f"Structured analysis is a {type(data).__name__}, not an object")
+        return elements
+
+    rejected = 0
+    for element_type, model in ELEMENT_MODELS.items():
+        items = data.get(element_type) or []
+        for item in items if isinstance(items, list) else []:
+            try:
+                elements[element_type].append(model.model_validate(item).model_dump())
+            except ValidationError as e:
+                rejected += 1
+                logger.warning(f"Dropped invalid {element_type} element: {e.errors()[0]['msg']}")
+    if rejected:
+        logger.info(f"Structured analysis: {rejected} invalid elements dropped")
+    return elements
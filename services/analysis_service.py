@@ -2,21 +2,36 @@
 ================================================
 • Focuses only on the *detailed* prompt that returns all seven sections, each with an optional
   **Topic** field.
-• Drops JSON‑schema mode, legacy prompt, CLI wrapper, and tiktoken chunker – leaving just the
-  essentials: prompt, regex extraction.
+• Drops legacy prompt and CLI wrapper – leaving just the essentials:
+  prompt, single-pass extraction (services.element_stream).
+• ANALYSIS_MODE=structured asks for the elements as a function call instead, validated
+  by the pydantic models in services.analysis_schema (no text parsing).
+• Transcripts over ANALYSIS_CHUNK_TOKENS are split at turn boundaries and the pieces are
+  analyzed concurrently, then merged (services.transcript_chunking).
 """
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
-import re
-from typing import Any, Dict, List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional
 from datetime import datetime
 
 from dotenv import load_dotenv
-from openai import OpenAI, RateLimitError, APIError
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 from services.transcription_service import TranscriptionService
+from services.llm_client import get_llm_client
+from services.analysis_schema import (
+    ANALYSIS_FUNCTION, ANALYSIS_TOOL, VALID_EMOTIONS, VALID_TOPICS, parse_structured_analysis,
+)
+from services.element_rows import format_analysis_for_storage
+from services.element_stream import ELEMENT_FIELDS, ElementStreamParser, ParsedElement, parse_elements
+from services.errors import CapacityError
+from services.result_cache import ResultCache, cache_key, create_backend, DEFAULT_CACHE_DB
+from services.settings_cache import get_cached_user_settings
+from services.transcript_chunking import NEW, UPDATED, ElementMerger, TranscriptChunk, chunk_transcript, merge_elements
 
 # ---------------------------------------------------------------------------
 # Env & logging
@@ -25,35 +40,29 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format="%(asctime)s • %(levelname)s • %(message)s")
 log = logging.getLogger("analysis-core")
 
-# Predefined lists of valid emotions and topics
-VALID_EMOTIONS = [
-    "Anxiety", "Sadness", "Anger", "Fear", "Hope",
-    "Joy", "Frustration", "Confusion", "Relief", "Gratitude"
-]
-
-VALID_TOPICS = [
-    "Relationships", "Career", "Health", "Self-Esteem", "Stress Management",
-    "Time Management", "Boundaries", "Personal Growth", "Trauma", "Life Transitions",
-    "Purpose"
-]
-
 OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
 if not OPENAI_KEY:
     raise RuntimeError("OPENAI_API_KEY not set")
 
+# "text": sectioned text parsed by services.element_stream;
+# "structured": JSON function call validated by services.analysis_schema
+ANALYSIS_MODES = ("text", "structured")
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "text")
+
+# Transcripts longer than ANALYSIS_CHUNK_TOKENS are analyzed in chunks, up to
+# ANALYSIS_CHUNK_CONCURRENCY at once
+ANALYSIS_CHUNK_TOKENS = int(os.getenv("ANALYSIS_CHUNK_TOKENS", "6000"))
+ANALYSIS_CHUNK_CONCURRENCY = int(os.getenv("ANALYSIS_CHUNK_CONCURRENCY", "4"))
+
 # ---------------------------------------------------------------------------
 # Settings integration
 # ---------------------------------------------------------------------------
 def get_user_analysis_settings(user_id: str = None) -> Dict[str, Any]:
-    """Get user's analysis settings from Neo4j, with fallbacks to defaults"""
+    """Get user's analysis settings (through the settings cache), with fallbacks to defaults"""
     try:
         if user_id:
-            # Import here to avoid circular imports
-            from services import get_neo4j_service
-            
-            neo4j_service = get_neo4j_service()
-            settings = neo4j_service.get_user_settings(user_id)
+            settings = get_cached_user_settings(user_id)
             
             if settings:
                 log.info(f"Loaded user settings for {user_id}: model={settings.get('gpt_model', DEFAULT_MODEL)}")
@@ -63,6 +72,7 @@ def get_user_analysis_settings(user_id: str = None) -> Dict[str, Any]:
                     'temperature': settings.get('temperature', 0.7),
                     'system_prompt_template': settings.get('system_prompt_template'),
                     'analysis_prompt_template': settings.get('analysis_prompt_template'),
+                    'analysis_mode': settings.get('analysis_mode') or ANALYSIS_MODE,
                 }
             else:
                 log.info(f"No settings found for user {user_id}, using defaults")
@@ -79,6 +89,7 @@ def get_user_analysis_settings(user_id: str = None) -> Dict[str, Any]:
         'temperature': 0.7,
         'system_prompt_template': None,
         'analysis_prompt_template': None,
+        'analysis_mode': ANALYSIS_MODE,
     }
 
 # ---------------------------------------------------------------------------
@@ -181,109 +192,225 @@ Transcript:
 {{transcript}}
 """
 
+# Same guidelines; the format comes from the function schema
+STRUCTURED_PROMPT_TEMPLATE = f"""
+Transcript Analysis for Coaching Session
+Instructions: Carefully analyze the transcript and extract key elements that represent significant moments, patterns, or shifts in the session.
+Record them by calling the {ANALYSIS_FUNCTION} function. Include every required field for each element.
+
+Valid Emotions: {', '.join(VALID_EMOTIONS)}
+Valid Topics: {', '.join(VALID_TOPICS)}
+
+Guidelines for extraction:
+- Emotions: Look for explicit emotional states and their intensity. Include context that triggered them.
+- Beliefs: Capture both limiting and empowering beliefs. Focus on their impact on client's life.
+- Action Items: Include specific, actionable commitments or changes the client plans to make.
+- Challenges: Identify current struggles or obstacles the client is facing.
+- Insights: Note moments of realization, understanding, or perspective shifts.
+
+For each element, include the timestamp (in minutes:seconds format, e.g. 05:30) when it occurred in the session.
+Use ONLY emotions and topics from the valid lists.
+
+Transcript:
+{{transcript}}
+"""
+
+def _structured(user_settings: Dict[str, Any]) -> bool:
+    mode = user_settings.get('analysis_mode') or "text"
+    if mode not in ANALYSIS_MODES:
+        log.warning(f"Unknown analysis mode {mode!r}, using text")
+    return mode == "structured"
+
 # ---------------------------------------------------------------------------
-# Regex patterns for element extraction (now done inline in extract_elements)
+# OpenAI call (pooled client; retries and backoff live in services.llm_client)
 # ---------------------------------------------------------------------------
+DEFAULT_SYSTEM_PROMPT = "You are a helpful therapy analysis assistant that extracts structured insights from therapy session transcripts."
+
+def _chat_request(prompt: str, user_settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Build chat completion arguments from user-configured settings"""
+    model = user_settings.get('gpt_model', DEFAULT_MODEL)
+    max_tokens = user_settings.get('max_tokens', 1500)
+    temperature = user_settings.get('temperature', 0.7)
+    log.info(f"Using OpenAI settings: model={model}, max_tokens={max_tokens}, temperature={temperature}")
+
+    # Use custom system prompt if provided in settings
+    system_prompt = user_settings.get('system_prompt_template') or DEFAULT_SYSTEM_PROMPT
+
+    request = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ],
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
+    if _structured(user_settings):
+        # Forcing the call means the reply is always the function arguments
+        request["tools"] = [ANALYSIS_TOOL]
+        request["tool_choice"] = {"type": "function", "function": {"name": ANALYSIS_FUNCTION}}
+    return request
 
 # ---------------------------------------------------------------------------
-# OpenAI call with retries
+# Analysis cache (identical requests are answered without an OpenAI call)
 # ---------------------------------------------------------------------------
-retry_openai = retry(
-    retry=retry_if_exception_type((RateLimitError, APIError)),
-    wait=wait_exponential_jitter(initial=1, max=20),
-    stop=stop_after_attempt(6),
-)
+_analysis_cache = None
+_analysis_cache_configured = False
+
+def get_analysis_cache() -> Optional[ResultCache]:
+    """Process-wide analysis cache, or None when ANALYSIS_CACHE_BACKEND=off"""
+    global _analysis_cache, _analysis_cache_configured
+    if not _analysis_cache_configured:
+        backend = create_backend(
+            os.getenv("ANALYSIS_CACHE_BACKEND", "memory"),
+            path=os.getenv("ANALYSIS_CACHE_DB", DEFAULT_CACHE_DB),
+            max_entries=int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "1000")),
+        )
+        if backend is not None:
+            _analysis_cache = ResultCache(
+                backend, ttl=float(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600))), name="analysis-cache"
+            )
+        _analysis_cache_configured = True
+    return _analysis_cache
+
+def analysis_cache_key(request: Dict[str, Any]) -> str:
+    """Key over everything that shapes a completion.
+
+    The user message is the effective prompt template formatted with the
+    transcript, so a change to either, to the system prompt, the model,
+    temperature, max_tokens or the structured-output schema yields a
+    different key.
+    """
+    # Text-mode keys are unchanged from before structured mode existed
+    structured = {"tools": request["tools"]} if "tools" in request else {}
+    return cache_key(
+        "analysis",
+        model=request["model"],
+        messages=request["messages"],
+        temperature=request["temperature"],
+        max_tokens=request["max_tokens"],
+        **structured,
+    )
+
+def _cache_entry(response) -> Dict[str, Any]:
+    usage = getattr(response, "usage", None)
+    message = response.choices[0].message
+    # In structured mode the answer is the function call's JSON arguments
+    tool_calls = getattr(message, "tool_calls", None)
+    return {
+        "content": tool_calls[0].function.arguments if tool_calls else message.content,
+        "model": getattr(response, "model", None),
+        "total_tokens": getattr(usage, "total_tokens", None),
+    }
+
+def _log_cache_hit(entry: Dict[str, Any]) -> None:
+    log.info(f"Analysis cache hit, skipped OpenAI call ({entry.get('total_tokens') or 'unknown'} tokens saved)")
 
-@retry_openai
 def _ask_llm(prompt: str, user_settings: Dict[str, Any] = None) -> str:
-    """Call OpenAI API with user-configured settings"""
-    log.info("Creating OpenAI client...")
+    """Call OpenAI API with user-configured settings, serving repeats from the cache"""
+    if user_settings is None:
+        user_settings = get_user_analysis_settings()
+
+    request = _chat_request(prompt, user_settings)
+    cache = get_analysis_cache()
+    key = analysis_cache_key(request) if cache else None
+    if cache:
+        entry = cache.get(key)
+        if entry:
+            _log_cache_hit(entry)
+            return entry["content"]
+
+    log.info("Sending request to OpenAI...")
     try:
-        # Get settings with defaults
-        if user_settings is None:
-            user_settings = get_user_analysis_settings()
-        
-        model = user_settings.get('gpt_model', DEFAULT_MODEL)
-        max_tokens = user_settings.get('max_tokens', 1500)
-        temperature = user_settings.get('temperature', 0.7)
-        
-        log.info(f"Using OpenAI settings: model={model}, max_tokens={max_tokens}, temperature={temperature}")
-        
-        # Initialize OpenAI client with modern v1.82.0 compatible parameters
-        log.info("Attempting to initialize OpenAI client...")
-        client = OpenAI(
-            api_key=OPENAI_KEY,
-            timeout=60.0,  # Use timeout instead of deprecated parameters
-            max_retries=3
-        )
-        log.info("OpenAI client created successfully")
-        
-        log.info("Sending request to OpenAI...")
-        try:
-            # Use custom system prompt if provided in settings
-            system_prompt = user_settings.get('system_prompt_template')
-            if not system_prompt:
-                system_prompt = "You are a helpful therapy analysis assistant that extracts structured insights from therapy session transcripts."
-            
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature,
-            )
-            log.info("Received response from OpenAI")
-            return response.choices[0].message.content
-        except Exception as e:
-            log.error(f"Error in OpenAI API call: {str(e)}")
-            raise
+        response = get_llm_client().chat_completion(**request)
+        log.info("Received response from OpenAI")
     except Exception as e:
-        log.error(f"Error initializing or calling OpenAI client: {str(e)}")
-        log.error(f"Exception type: {type(e)}")
-        log.error(f"Exception args: {e.args}")
-        # Instead of returning an error string, raise the exception so the system can handle it properly
+        log.error(f"Error in OpenAI API call: {type(e).__name__}: {str(e)}")
         raise
 
+    entry = _cache_entry(response)
+    if cache and entry["content"]:
+        cache.set(key, entry)
+    return entry["content"]
+
+async def _ask_llm_async(prompt: str, user_settings: Dict[str, Any] = None) -> str:
+    """Async variant of _ask_llm using the pooled AsyncOpenAI client"""
+    if user_settings is None:
+        user_settings = get_user_analysis_settings()
+
+    request = _chat_request(prompt, user_settings)
+    cache = get_analysis_cache()
+    key = analysis_cache_key(request) if cache else None
+    if cache:
+        entry = await asyncio.to_thread(cache.get, key)
+        if entry:
+            _log_cache_hit(entry)
+            return entry["content"]
+
+    log.info("Sending async request to OpenAI...")
+    try:
+        response = await get_llm_client().achat_completion(**request)
+        log.info("Received response from OpenAI")
+    except Exception as e:
+        log.error(f"Error in OpenAI API call: {type(e).__name__}: {str(e)}")
+        raise
+
+    entry = _cache_entry(response)
+    if cache and entry["content"]:
+        await asyncio.to_thread(cache.set, key, entry)
+    return entry["content"]
+
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
 
+def _check_api_key() -> None:
+    """Fail fast when no usable OpenAI API key is configured"""
+    # Verify OpenAI API key is provided
+    if not OPENAI_KEY:
+        log.error("No OpenAI API key found in environment variables")
+        raise ValueError("OpenAI API key is required for analysis")
+
+    # Check for placeholder values
+    if OPENAI_KEY == "placeholder":
+        log.error("OpenAI API key is set to placeholder value")
+        raise ValueError("Please provide a valid OpenAI API key")
+
+def _build_prompt(transcript: str, user_settings: Dict[str, Any]) -> str:
+    """Format the user's custom prompt template, or the default one, with the transcript"""
+    # Use custom prompt template if provided, otherwise use default
+    prompt_template = user_settings.get('analysis_prompt_template')
+    if not prompt_template:
+        prompt_template = STRUCTURED_PROMPT_TEMPLATE if _structured(user_settings) else PROMPT_TEMPLATE
+        log.info("Using default prompt template")
+    else:
+        log.info("Using custom prompt template from user settings")
+
+    # Format the prompt with the transcript
+    try:
+        prompt = prompt_template.format(transcript=transcript)
+        log.info("Formatted prompt with transcript")
+    except Exception as e:
+        log.error(f"Error formatting prompt: {str(e)}")
+        raise
+    return prompt
+
 def analyze_transcript(transcript: str, user_id: str = None) -> Dict[str, Any]:
     """Return dict with five element arrays, each item contains a Topic field."""
     try:
         log.info("Starting transcript analysis...")
-        
-        # Verify OpenAI API key is provided
-        if not OPENAI_KEY:
-            log.error("No OpenAI API key found in environment variables")
-            raise ValueError("OpenAI API key is required for analysis")
-            
-        # Check for placeholder values
-        if OPENAI_KEY == "placeholder":
-            log.error("OpenAI API key is set to placeholder value")
-            raise ValueError("Please provide a valid OpenAI API key")
+        _check_api_key()
         
         # Load user settings for analysis configuration
         user_settings = get_user_analysis_settings(user_id)
         log.info(f"Loaded analysis settings: {user_settings}")
         
-        # Use custom prompt template if provided, otherwise use default
-        prompt_template = user_settings.get('analysis_prompt_template')
-        if not prompt_template:
-            prompt_template = PROMPT_TEMPLATE
-            log.info("Using default prompt template")
-        else:
-            log.info("Using custom prompt template from user settings")
+        # Long transcripts: analyze the pieces in parallel and merge
+        chunks = chunk_transcript(transcript, ANALYSIS_CHUNK_TOKENS)
+        if len(chunks) > 1:
+            return _analyze_chunks(chunks, user_settings)
         
-        # Format the prompt with the transcript
-        try:
-            prompt = prompt_template.format(transcript=transcript)
-            log.info("Formatted prompt with transcript")
-        except Exception as e:
-            log.error(f"Error formatting prompt: {str(e)}")
-            raise
+        prompt = _build_prompt(transcript, user_settings)
         
         # Get analysis from LLM with user settings
         log.info("Calling OpenAI API with user settings...")
@@ -297,7 +424,7 @@ def analyze_transcript(transcript: str, user_id: str = None) -> Dict[str, Any]:
         # Extract elements from analysis
         log.info("Extracting elements from analysis...")
         try:
-            elements = extract_elements(analysis_text)
+            elements = _extract(analysis_text, user_settings)
             log.info(f"Successfully extracted {len(elements.get('emotions', []))} emotions, {len(elements.get('beliefs', []))} beliefs, {len(elements.get('action_items', []))} action items, {len(elements.get('challenges', []))} challenges, {len(elements.get('insights', []))} insights")
         except Exception as e:
             log.error(f"Error extracting elements: {str(e)}")
@@ -309,117 +436,62 @@ def analyze_transcript(transcript: str, user_id: str = None) -> Dict[str, Any]:
         log.error(f"Error analyzing transcript: {str(e)}")
         raise  # Re-raise the exception instead of returning mock data
 
+# ---------------------------------------------------------------------------
+# Long transcripts (map: analyze each chunk concurrently, reduce: merge)
+# ---------------------------------------------------------------------------
+def _chunk_prompt(chunk: TranscriptChunk, total: int, user_settings: Dict[str, Any]) -> str:
+    return _build_prompt(chunk.labelled(total), user_settings)
+
+def _analyze_chunks(chunks: List[TranscriptChunk], user_settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Analyze transcript chunks in worker threads and merge the extracted elements"""
+    log.info(f"Analyzing {len(chunks)} transcript chunks, up to {ANALYSIS_CHUNK_CONCURRENCY} at once")
+
+    def analyze(chunk: TranscriptChunk) -> Dict[str, Any]:
+        return _extract(_ask_llm(_chunk_prompt(chunk, len(chunks), user_settings), user_settings), user_settings)
+
+    with ThreadPoolExecutor(max_workers=max(1, ANALYSIS_CHUNK_CONCURRENCY)) as executor:
+        parts = list(executor.map(analyze, chunks))
+    return merge_elements(parts)
+
+async def _analyze_chunks_async(chunks: List[TranscriptChunk], user_settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Analyze transcript chunks concurrently and merge the extracted elements.
+
+    Latency is that of the slowest chunk when the chunk count is within
+    ANALYSIS_CHUNK_CONCURRENCY.
+    """
+    log.info(f"Analyzing {len(chunks)} transcript chunks, up to {ANALYSIS_CHUNK_CONCURRENCY} at once")
+    semaphore = asyncio.Semaphore(max(1, ANALYSIS_CHUNK_CONCURRENCY))
+
+    async def analyze(chunk: TranscriptChunk) -> Dict[str, Any]:
+        async with semaphore:
+            analysis_text = await _ask_llm_async(_chunk_prompt(chunk, len(chunks), user_settings), user_settings)
+        return await asyncio.to_thread(_extract, analysis_text, user_settings)
+
+    parts = await asyncio.gather(*(analyze(chunk) for chunk in chunks))
+    return merge_elements(parts)
+
+def _extract(analysis_text: str, user_settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Elements from a completion, parsed according to the analysis mode"""
+    if _structured(user_settings):
+        return parse_structured_analysis(analysis_text)
+    return extract_elements(analysis_text)
+
 def extract_elements(text):
-    """Extract structured elements from the analysis text."""
+    """Extract structured elements from the analysis text.
+
+    The text is parsed in one pass by services.element_stream; repeated
+    section headers are merged and elements with missing fields skipped.
+    """
     try:
         # If text is already a dictionary, return it
         if isinstance(text, dict):
             return text
-            
-        # Otherwise, try to extract elements using regex
-        elements = {
-            'emotions': [],
-            'beliefs': [],
-            'action_items': [],
-            'challenges': [],
-            'insights': []
-        }
-        
-        try:
-            # Extract emotions - find all emotions anywhere in text (handles duplicate headers)
-            emotion_pattern = re.compile(r"""
-                Name:\s*(?P<name>[^\n]+)\s*\n
-                Intensity:\s*(?P<intensity>\d+)\s*\n
-                Context:\s*(?P<context>[^\n]+)\s*\n
-                Topic:\s*(?P<topic>[^\n]+)\s*\n
-                Timestamp:\s*(?P<timestamp>[^\n]+)
-            """, re.VERBOSE)
-            
-            for match in emotion_pattern.finditer(text):
-                emotion_data = match.groupdict()
-                # Clean up whitespace
-                for key, value in emotion_data.items():
-                    emotion_data[key] = value.strip() if isinstance(value, str) else value
-                elements['emotions'].append(emotion_data)
-            
-            # Extract beliefs section and then individual beliefs
-            belief_section_match = re.search(r'===\s*BELIEFS\s*===\s*\n(.*?)(?=\n\s*===|$)', text, re.DOTALL)
-            if belief_section_match:
-                belief_section = belief_section_match.group(1)
-                belief_pattern = re.compile(r"""
-                    Name:\s*(?P<name>[^\n]+)\s*\n
-                    Description:\s*(?P<description>[^\n]+)\s*\n
-                    Impact:\s*(?P<impact>[^\n]+)\s*\n
-                    Topic:\s*(?P<topic>[^\n]+)\s*\n
-                    Timestamp:\s*(?P<timestamp>[^\n]+)
-                """, re.VERBOSE)
-                
-                for match in belief_pattern.finditer(belief_section):
-                    belief_data = match.groupdict()
-                    # Clean up whitespace
-                    for key, value in belief_data.items():
-                        belief_data[key] = value.strip() if isinstance(value, str) else value
-                    elements['beliefs'].append(belief_data)
-            
-            # Extract action items section and then individual action items  
-            action_section_match = re.search(r'===\s*ACTION ITEMS\s*===\s*\n(.*?)(?=\n\s*===|$)', text, re.DOTALL)
-            if action_section_match:
-                action_section = action_section_match.group(1)
-                action_pattern = re.compile(r"""
-                    Name:\s*(?P<name>[^\n]+)\s*\n
-                    Description:\s*(?P<description>[^\n]+)\s*\n
-                    Topic:\s*(?P<topic>[^\n]+)\s*\n
-                    Timestamp:\s*(?P<timestamp>[^\n]+)
-                """, re.VERBOSE)
-                
-                for match in action_pattern.finditer(action_section):
-                    action_data = match.groupdict()
-                    # Clean up whitespace
-                    for key, value in action_data.items():
-                        action_data[key] = value.strip() if isinstance(value, str) else value
-                    elements['action_items'].append(action_data)
-            
-            # Extract challenges section and then individual challenges
-            challenge_section_match = re.search(r'===\s*CHALLENGES\s*===\s*\n(.*?)(?=\n\s*===|$)', text, re.DOTALL)
-            if challenge_section_match:
-                challenge_section = challenge_section_match.group(1)
-                challenge_pattern = re.compile(r"""
-                    Name:\s*(?P<name>[^\n]+)\s*\n
-                    Impact:\s*(?P<impact>[^\n]+)\s*\n
-                    Topic:\s*(?P<topic>[^\n]+)\s*\n
-                    Timestamp:\s*(?P<timestamp>[^\n]+)
-                """, re.VERBOSE)
-                
-                for match in challenge_pattern.finditer(challenge_section):
-                    challenge_data = match.groupdict()
-                    # Clean up whitespace
-                    for key, value in challenge_data.items():
-                        challenge_data[key] = value.strip() if isinstance(value, str) else value
-                    elements['challenges'].append(challenge_data)
-            
-            # Extract insights section and then individual insights
-            insight_section_match = re.search(r'===\s*INSIGHTS\s*===\s*\n(.*?)(?=\n\s*===|$)', text, re.DOTALL)
-            if insight_section_match:
-                insight_section = insight_section_match.group(1)
-                insight_pattern = re.compile(r"""
-                    Name:\s*(?P<name>[^\n]+)\s*\n
-                    Context:\s*(?P<context>[^\n]+)\s*\n
-                    Topic:\s*(?P<topic>[^\n]+)\s*\n
-                    Timestamp:\s*(?P<timestamp>[^\n]+)
-                """, re.VERBOSE)
-                
-                for match in insight_pattern.finditer(insight_section):
-                    insight_data = match.groupdict()
-                    # Clean up whitespace
-                    for key, value in insight_data.items():
-                        insight_data[key] = value.strip() if isinstance(value, str) else value
-                    elements['insights'].append(insight_data)
-        
-        except Exception as e:
-            logging.error(f"Error extracting elements: {e}")
-        
+
+        elements = {element_type: [] for element_type in ELEMENT_FIELDS}
+        for element_type, element in parse_elements(text):
+            elements[element_type].append(element)
         return elements
-        
+
     except Exception as e:
         logging.error(f"Error in extract_elements: {e}")
         return {
@@ -471,3 +543,326 @@ def analyze_transcript_and_extract(transcript: str, user_id: str = None) -> Dict
             "error": str(e),
             "elements": {}
         }
+
+# ---------------------------------------------------------------------------
+# Async pipeline (keeps the FastAPI event loop free during the LLM call)
+# ---------------------------------------------------------------------------
+ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "4"))
+ANALYSIS_QUEUE_TIMEOUT = float(os.getenv("ANALYSIS_QUEUE_TIMEOUT", "30"))
+
+class AnalysisLimiter:
+    """Per-process cap on concurrently running analyses.
+
+    Requests over the limit wait up to queue_timeout seconds for a slot and
+    then fail with CapacityError. The semaphore is created for the running
+    event loop, so the limiter also works across separate asyncio.run calls.
+    """
+
+    def __init__(self, limit: int = ANALYSIS_CONCURRENCY, queue_timeout: float = ANALYSIS_QUEUE_TIMEOUT):
+        self.limit = max(1, limit)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = None
+        self._loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.limit)
+            self._loop = loop
+            self.active = 0
+            self.waiting = 0
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one analysis slot for the duration of the block"""
+        semaphore = self._get_semaphore()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise CapacityError(
+                f"All {self.limit} analysis slots are busy",
+                error_code="ANALYSIS_BUSY",
+                details=self.stats(),
+            )
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        """Current slot usage"""
+        return {"limit": self.limit, "active": self.active, "waiting": self.waiting}
+
+analysis_limiter = AnalysisLimiter()
+
+async def analyze_transcript_async(transcript: str, user_id: str = None) -> Dict[str, Any]:
+    """Async variant of analyze_transcript.
+
+    The LLM request goes through the pooled AsyncOpenAI client; the blocking
+    settings lookup and the element extraction run in worker threads.
+    """
+    log.info("Starting async transcript analysis...")
+    _check_api_key()
+
+    user_settings = await asyncio.to_thread(get_user_analysis_settings, user_id)
+
+    # Long transcripts: analyze the pieces concurrently and merge
+    chunks = chunk_transcript(transcript, ANALYSIS_CHUNK_TOKENS)
+    if len(chunks) > 1:
+        return await _analyze_chunks_async(chunks, user_settings)
+
+    prompt = _build_prompt(transcript, user_settings)
+
+    try:
+        analysis_text = await _ask_llm_async(prompt, user_settings)
+        log.info(f"Received response from OpenAI: {analysis_text[:200]}...")
+    except Exception as e:
+        log.error(f"Error calling OpenAI API: {str(e)}")
+        raise
+
+    return await asyncio.to_thread(_extract, analysis_text, user_settings)
+
+async def analyze_transcript_and_extract_async(transcript: str, user_id: str = None) -> Dict[str, Any]:
+    """Async variant of analyze_transcript_and_extract, with the same result format."""
+    try:
+        elements = await analyze_transcript_async(transcript, user_id=user_id)
+    except Exception as e:
+        log.error(f"Error analyzing transcript: {str(e)}")
+        return {
+            "status": "failed",
+            "error": str(e),
+            "elements": {}
+        }
+
+    return {
+        "status": "completed",
+        "elements": elements
+    }
+
+async def run_session_analysis(session_id: str, transcript: str, user_id: str, neo4j_service,
+                               progress=None) -> Dict[str, Any]:
+    """Analyze a transcript and store the elements on its session without blocking the event loop.
+
+    Args:
+        session_id: Session the analysis belongs to
+        transcript: Transcript text to analyze
+        user_id: Owner of the session and of the stored elements
+        neo4j_service: AsyncNeo4jService used to store the analysis
+        progress: Optional coroutine called with each stage name
+
+    Returns:
+        The analyze_transcript_and_extract result, plus "stored" (bool) when
+        the analysis completed
+
+    Raises:
+        CapacityError: If no analysis slot frees up within the queue timeout
+    """
+    async with analysis_limiter.slot():
+        log.info(f"Running analysis for session {session_id} ({analysis_limiter.stats()})")
+        if progress:
+            await progress("analyzing")
+        result = await analyze_transcript_and_extract_async(transcript, user_id=user_id)
+        if result.get("status") != "completed":
+            return result
+
+        if progress:
+            await progress("storing")
+        # Storage failures are logged; the caller still gets the analysis
+        try:
+            result["stored"] = bool(await neo4j_service.save_session_analysis(
+                session_id=session_id,
+                analysis_data=format_analysis_for_storage(result["elements"]),
+                user_id=user_id
+            ))
+        except Exception as e:
+            log.error(f"Failed to store analysis results: {str(e)}")
+            result["stored"] = False
+
+        if result["stored"]:
+            log.info(f"Successfully stored analysis results for session {session_id}")
+        else:
+            log.error(f"Failed to store analysis results for session {session_id}")
+        return result
+
+# ---------------------------------------------------------------------------
+# Streaming analysis (each element is emitted and stored as its block completes)
+# ---------------------------------------------------------------------------
+async def _stream_elements(prompt: str, user_settings: Dict[str, Any]) -> AsyncIterator[ParsedElement]:
+    """Yield elements from a streamed completion; cached completions are replayed"""
+    request = _chat_request(prompt, user_settings)
+    cache = get_analysis_cache()
+    key = analysis_cache_key(request) if cache else None
+    if cache:
+        entry = await asyncio.to_thread(cache.get, key)
+        if entry:
+            _log_cache_hit(entry)
+            for element in parse_elements(entry["content"]):
+                yield element
+            return
+
+    parser = ElementStreamParser()
+    parts = []
+    async for delta in get_llm_client().astream_chat_completion(**request):
+        parts.append(delta)
+        for element in parser.feed(delta):
+            yield element
+    for element in parser.close():
+        yield element
+
+    content = "".join(parts)
+    if cache and content:
+        await asyncio.to_thread(cache.set, key, {"content": content, "model": request["model"], "total_tokens": None})
+
+async def stream_session_analysis(session_id: str, transcript: str, user_id: str,
+                                  neo4j_service) -> AsyncIterator[Dict[str, Any]]:
+    """Analyze a transcript, yielding each element as soon as the model has written it.
+
+    Long transcripts are streamed chunk by chunk concurrently; elements
+    repeated across chunks are only emitted once, and again as an update when
+    the repeat adds a timestamp or raises an emotion's intensity. Elements
+    are stored on the session in the background, one write at a time, so a
+    slow database does not hold up the stream. The session's analysis status
+    is set once the stream ends: "completed" if every element was stored,
+    "failed" otherwise.
+
+    Args:
+        session_id: Session the analysis belongs to
+        transcript: Transcript text to analyze
+        user_id: Owner of the session and of the stored elements
+        neo4j_service: AsyncNeo4jService used to store the elements
+
+    Yields:
+        {"event": "element", "data": {"type", "element"}} per new element,
+        {"event": "element_updated", "data": {"type", "element"}} when a
+        repeat changes an element already sent, then
+        {"event": "done", "data": {"results", "elements", "stored",
+        "first_element_ms", "elapsed_ms"}}
+
+    Raises:
+        CapacityError: If no analysis slot frees up within the queue timeout
+    """
+    started = time.perf_counter()
+    async with analysis_limiter.slot():
+        _check_api_key()
+        user_settings = await asyncio.to_thread(get_user_analysis_settings, user_id)
+        # Elements are parsed out of the text as it streams, so streaming is always text mode
+        user_settings = {**user_settings, 'analysis_mode': "text"}
+        chunks = chunk_transcript(transcript, ANALYSIS_CHUNK_TOKENS)
+        if len(chunks) > 1:
+            prompts = [_chunk_prompt(chunk, len(chunks), user_settings) for chunk in chunks]
+        else:
+            prompts = [_build_prompt(transcript, user_settings)]
+
+        queue: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(max(1, ANALYSIS_CHUNK_CONCURRENCY))
+        # asyncio.Lock wakes waiters in order, so writes land in the order they were started
+        write_lock = asyncio.Lock()
+
+        async def produce(prompt: str) -> None:
+            async with semaphore:
+                async for element in _stream_elements(prompt, user_settings):
+                    await queue.put(element)
+
+        async def produce_all() -> None:
+            try:
+                await asyncio.gather(*(produce(prompt) for prompt in prompts))
+            finally:
+                await queue.put(None)
+
+        async def write(description: str, operation) -> bool:
+            async with write_lock:
+                try:
+                    return bool(await operation())
+                except Exception as e:
+                    log.error(f"Failed to {description} for session {session_id}: {str(e)}")
+                    return False
+
+        def store(element_type: str, element: Dict[str, Any]) -> Awaitable[bool]:
+            return write(f"store streamed {element_type}", lambda: neo4j_service.insert_session_elements(
+                session_id=session_id,
+                analysis_data=format_analysis_for_storage({element_type: [element]}),
+                user_id=user_id
+            ))
+
+        def store_intensity(element: Dict[str, Any]) -> Awaitable[bool]:
+            # Of what a repeat can change, only an emotion's intensity is stored
+            return write("update streamed emotion", lambda: neo4j_service.update_session_emotion_intensities(
+                session_id=session_id,
+                analysis_data=format_analysis_for_storage({"emotions": [element]}),
+                user_id=user_id
+            ))
+
+        def finish(status: str) -> Awaitable[bool]:
+            return write(f"mark analysis {status}", lambda: neo4j_service.set_analysis_status(session_id, status))
+
+        merger = ElementMerger()
+        stores, updates = [], []
+        first_element_ms = None
+        status = "failed"
+        producer = asyncio.create_task(produce_all())
+        try:
+            while (item := await queue.get()) is not None:
+                element_type, element = item
+                element, outcome = merger.add(element_type, element)
+                if outcome == NEW:
+                    if first_element_ms is None:
+                        first_element_ms = round((time.perf_counter() - started) * 1000, 1)
+                        log.info(f"First element for session {session_id} after {first_element_ms}ms")
+                    stores.append(asyncio.create_task(store(element_type, element)))
+                    yield {"event": "element", "data": {"type": element_type, "element": element}}
+                elif outcome == UPDATED:
+                    if element_type == "emotions":
+                        updates.append(asyncio.create_task(store_intensity(element)))
+                    yield {"event": "element_updated", "data": {"type": element_type, "element": element}}
+
+            await producer
+            stored = await asyncio.gather(*stores)
+            if all(stored) and all(await asyncio.gather(*updates)):
+                status = "completed"
+        finally:
+            # Writes already started finish even if the client went away
+            producer.cancel()
+            await finish(status)
+
+        yield {"event": "done", "data": {
+            "results": format_results(merger.elements),
+            "elements": len(stored),
+            "stored": sum(stored),
+            "first_element_ms": first_element_ms,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }}
+
+def format_results(elements: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """Shape extracted elements into the results object returned by the analysis API"""
+    return {
+        "emotions": elements.get("emotions", []),
+        "insights": elements.get("insights", []),
+        "beliefs": elements.get("beliefs", []),
+        "action_items": elements.get("action_items", []),
+        "challenges": elements.get("challenges", [])
+    }
+
+async def run_analysis_job(job: Dict[str, Any], progress) -> Dict[str, Any]:
+    """Job queue handler for "analysis" jobs; raising makes the queue retry the job"""
+    # Import here to avoid circular imports
+    from services import get_async_neo4j_service
+
+    result = await run_session_analysis(
+        session_id=job["session_id"],
+        transcript=job["payload"]["transcript"],
+        user_id=job["user_id"],
+        neo4j_service=get_async_neo4j_service(),
+        progress=progress
+    )
+    if result.get("status") != "completed":
+        raise RuntimeError(f"Analysis failed: {result.get('error', 'Unknown error')}")
+    return {"results": format_results(result["elements"]), "stored": result["stored"]}
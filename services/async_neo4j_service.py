@@ -0,0 +1,542 @@
+"""
+Async Neo4j Service Module
+
+This module provides an asyncio-native service layer for the Neo4j graph
+database, built on neo4j.AsyncGraphDatabase. FastAPI route handlers await
+these methods so a slow Cypher query no longer blocks the event loop and a
+single uvicorn worker can keep many queries in flight at once.
+
+The method surface mirrors Neo4jService. Hot paths are implemented natively
+on the async driver using the shared statements in neo4j_queries; any other
+Neo4jService method is still reachable and runs on a worker thread.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+
+from neo4j import AsyncGraphDatabase
+
+from .neo4j_service import Neo4jService
+from . import neo4j_queries as queries
+from . import element_rows
+from .user_repository import UserRecord
+from .transcript_store import read_session_transcript
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class AsyncNeo4jService:
+    """Async service for managing Neo4j database operations"""
+
+    # Pure helpers are shared with the synchronous service
+    _handle_error = Neo4jService._handle_error
+    _generate_id = Neo4jService._generate_id
+    _ensure_timestamps = Neo4jService._ensure_timestamps
+    _get_timestamp = Neo4jService._get_timestamp
+    _store_transcript = Neo4jService._store_transcript
+
+    def __init__(self, uri: str, user: str, password: str, sync_service: Optional[Neo4jService] = None):
+        """Initialize async Neo4j service
+
+        Args:
+            uri: Neo4j connection URI
+            user: Neo4j username
+            password: Neo4j password
+            sync_service: Synchronous service used for methods without a native async port
+        """
+        self.logger = logging.getLogger(__name__)
+        self.uri = uri
+        self.user = user
+        self.password = password
+        self.sync_service = sync_service
+        self.driver = None
+        self._ensure_driver()
+
+    def _ensure_driver(self):
+        """Ensure the async driver is initialized"""
+        if self.driver is None:
+            try:
+                self.driver = AsyncGraphDatabase.driver(
+                    self.uri,
+                    auth=(self.user, self.password)
+                )
+                self.logger.info("Async Neo4j driver initialized successfully")
+            except Exception as e:
+                self.logger.error(f"Failed to initialize async Neo4j driver: {str(e)}")
+                raise
+
+    async def close(self):
+        """Close the async Neo4j driver"""
+        if self.driver:
+            await self.driver.close()
+            self.driver = None
+
+    def __getattr__(self, name: str):
+        """Expose the rest of the Neo4jService surface as awaitables.
+
+        Methods without a native async port run on a worker thread so they
+        still never block the event loop.
+        """
+        sync_service = self.__dict__.get("sync_service")
+        if sync_service is None or name.startswith("__"):
+            raise AttributeError(name)
+
+        attr = getattr(sync_service, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def _run_in_thread(*args, **kwargs):
+            return await asyncio.to_thread(attr, *args, **kwargs)
+
+        return _run_in_thread
+
+    async def check_connection(self) -> bool:
+        """Check if the connection to Neo4j is working"""
+        try:
+            async with self.driver.session() as session:
+                result = await session.run(queries.CHECK_CONNECTION)
+                return bool(await result.single())
+        except Exception as e:
+            self.logger.error(f"Connection check failed: {str(e)}")
+            return False
+
+    #######################
+    # User Management
+    #######################
+
+    async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Get a user by their email address using the EmailLookup node"""
+        try:
+            return await self._fetch_user(queries.USER_BY_EMAIL, email=email)
+        except Exception as e:
+            logger.error(f"Error getting user by email: {str(e)}")
+            return None
+
+    async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user by their ID"""
+        try:
+            return await self._fetch_user(queries.USER_BY_ID, userId=user_id)
+        except Exception as e:
+            logger.error(f"Error getting user by ID: {str(e)}")
+            return None
+
+    async def _fetch_user(self, query: str, **params) -> Optional[Dict[str, Any]]:
+        """Run a single-row user lookup; errors propagate to the caller"""
+        async with self.driver.session() as session:
+            result = await session.run(query, **params)
+            record = await result.single()
+            if not record:
+                return None
+            return UserRecord.from_node(record["u"], record["email"]).as_dict()
+
+    async def get_user_settings(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get user settings from Neo4j"""
+        try:
+            async with self.driver.session() as session:
+                result = await session.run(queries.USER_SETTINGS, user_id=user_id)
+
+                record = await result.single()
+                if record:
+                    return dict(record["s"])
+                return None
+        except Exception as e:
+            self._handle_error(e, "get_user_settings")
+            return None
+
+    async def save_user_settings(self, user_id: str, settings_data: Dict[str, Any]) -> bool:
+        """Save user settings to Neo4j"""
+        try:
+            async with self.driver.session() as session:
+                # Check if settings already exist
+                result = await session.run(queries.USER_SETTINGS, user_id=user_id)
+                record = await result.single()
+
+                if record:
+                    # Update existing settings
+                    result = await session.run(queries.UPDATE_USER_SETTINGS,
+                        user_id=user_id,
+                        settings=settings_data,
+                        timestamp=datetime.now().isoformat())
+                else:
+                    # Create new settings
+                    result = await session.run(queries.CREATE_USER_SETTINGS,
+                        user_id=user_id,
+                        settings_id=self._generate_id("S"),
+                        settings=settings_data,
+                        timestamp=datetime.now().isoformat())
+
+                return bool(await result.single())
+        except Exception as e:
+            self._handle_error(e, "save_user_settings")
+            return False
+
+    async def get_user_sessions(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get all sessions for a user"""
+        try:
+            async with self.driver.session() as session:
+                result = await session.run(queries.USER_SESSIONS, user_id=user_id)
+                return [dict(record["s"]) async for record in result]
+        except Exception as e:
+            self._handle_error(e, "get_user_sessions")
+            return []
+
+    async def get_user_session_summaries(self, user_id: str, limit: int,
+                                         before: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        """Get one page of a user's sessions, newest first, without transcripts
+
+        Args:
+            user_id: Owner of the sessions
+            limit: Maximum number of sessions to return
+            before: (created_at, id) of the last session on the previous page
+
+        Returns:
+            Session summaries with transcript_length and element_counts
+        """
+        before_created_at, before_id = before or (None, None)
+        async with self.driver.session() as session:
+            result = await session.run(queries.USER_SESSION_SUMMARIES, user_id=user_id, limit=limit,
+                                       before_created_at=before_created_at, before_id=before_id)
+            return [record["session"] async for record in result]
+
+    async def get_session_transcript(self, session_id: str, **ranges) -> Optional[Dict[str, Any]]:
+        """Get a session's owner and transcript, or None if the session doesn't exist
+
+        Args:
+            session_id: Session to read
+            **ranges: start/end (byte offsets) or start_time/end_time (seconds)
+                to read only part of the transcript
+
+        Returns:
+            Dict with userId and transcript
+        """
+        async with self.driver.session() as session:
+            result = await session.run(queries.SESSION_TRANSCRIPT, session_id=session_id)
+            record = await result.single()
+        if not record:
+            return None
+        transcript = await asyncio.to_thread(read_session_transcript, dict(record), **ranges)
+        return {"userId": record["userId"], "transcript": transcript}
+
+    #######################
+    # Session Management
+    #######################
+
+    async def create_session(self, data: Dict[str, Any]) -> str:
+        """Create a new session based on the provided data"""
+        try:
+            # Extract user ID from data
+            user_id = data.pop('userId', None)
+            if not user_id:
+                self.logger.error("No user ID provided for session creation")
+                return None
+
+            async with self.driver.session() as session:
+                # 1. Find the current LastSession before creating a new one
+                result = await session.run(queries.LAST_SESSION_FOR_USER, user_id=user_id)
+                record = await result.single()
+                previous_session_id = record["previous_session_id"] if record else None
+
+                # 2. Create the new session (this handles LastSession flag update)
+                new_session_id = await self.create_session_node(user_id, data)
+                if not new_session_id:
+                    self.logger.error("Failed to create new session")
+                    return None
+
+                # 3. If there was a previous session, create the NEXT_SESSION relationship
+                if previous_session_id:
+                    self.logger.info(f"Linking previous session {previous_session_id} to new session {new_session_id}")
+                    result = await session.run(queries.LINK_NEXT_SESSION,
+                        prev_id=previous_session_id,
+                        next_id=new_session_id,
+                        timestamp=datetime.now().isoformat())
+                    await result.consume()
+
+                return new_session_id
+        except Exception as e:
+            self._handle_error(e, "create_session")
+            return None
+
+    async def create_session_node(self, user_id: str, session_data: Dict[str, Any]) -> str:
+        """Create a new session node"""
+        try:
+            async with self.driver.session() as session:
+                # First, find and update the previous LastSession
+                result = await session.run(queries.CLEAR_LAST_SESSION)
+                await result.consume()
+
+                # Prepare session data
+                session_id = self._generate_id("S")
+                session_data = self._ensure_timestamps(session_data)
+                stored = await asyncio.to_thread(self._store_transcript, session_data.get('transcript'))
+
+                result = await session.run(queries.CREATE_SESSION_NODE,
+                    user_id=user_id,
+                    session_id=session_id,
+                    title=session_data.get('title', ''),
+                    date=session_data.get('date', ''),
+                    description=session_data.get('description', ''),
+                    status=session_data.get('status', 'pending'),
+                    analysis_status=session_data.get('analysis_status', 'pending'),
+                    created_at=session_data.get('created_at', ''),
+                    updated_at=session_data.get('updated_at', ''),
+                    timestamp=datetime.now().isoformat(),
+                    **stored)
+
+                record = await result.single()
+                if record:
+                    self.logger.info(f"Successfully created session node with ID: {record['session_id']}")
+                    return record["session_id"]
+
+                self.logger.error(f"Failed to create session node for user {user_id}")
+                return None
+        except Exception as e:
+            self.logger.error(f"Error in create_session_node: {str(e)}")
+            self._handle_error(e, "create_session_node")
+            return None
+
+    async def delete_session(self, session_id: str) -> bool:
+        """Delete only the session node and its direct relationships, preserving analysis elements"""
+        try:
+            async with self.driver.session() as session:
+                result = await session.run(queries.SESSION_DELETE_SUMMARY, session_id=session_id)
+                session_info = await result.single()
+
+                if session_info:
+                    self.logger.info(f"Deleting session '{session_info['title']}' with "
+                                     f"{session_info['emotions_count']} emotions, "
+                                     f"{session_info['insights_count']} insights, "
+                                     f"{session_info['beliefs_count']} beliefs, "
+                                     f"{session_info['challenges_count']} challenges, "
+                                     f"{session_info['action_items_count']} action items "
+                                     f"(analysis elements will be preserved)")
+
+                result = await session.run(queries.DELETE_SESSION, session_id=session_id)
+                record = await result.single()
+                if record:
+                    self.logger.info(f"Deleted session node and {record['relationship_count']} direct relationships")
+                    return True
+
+                self.logger.warning(f"Session {session_id} not found")
+                return False
+
+        except Exception as e:
+            self.logger.error(f"Error deleting session {session_id}: {str(e)}")
+            return False
+
+    async def get_session_data(self, session_id: str) -> Dict[str, Any]:
+        """Get session data from Neo4j"""
+        try:
+            async with self.driver.session() as session:
+                result = await session.run(queries.SESSION_DATA, session_id=session_id)
+                record = await result.single()
+                if record:
+                    return record['session']
+                return None
+        except Exception as e:
+            self.logger.error(f"Error getting session data: {str(e)}")
+            return None
+
+    async def get_session_with_relationships(self, session_id: str) -> Dict[str, Any]:
+        """Get a session with all its relationships and elements"""
+        try:
+            async with self.driver.session() as session:
+                result = await session.run(queries.SESSION_WITH_RELATIONSHIPS, session_id=session_id)
+                record = await result.single()
+                if not record:
+                    return None
+
+                return queries.build_session_with_relationships(record)
+        except Exception as e:
+            self._handle_error(e, "get_session_with_relationships")
+
+    async def get_session_analysis(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get analysis results for a session."""
+        try:
+            async with self.driver.session() as session:
+                result = await session.run(queries.SESSION_ANALYSIS, session_id=session_id)
+                record = await result.single()
+                if not record:
+                    return None
+
+                return queries.build_session_analysis(session_id, record)
+        except Exception as e:
+            self.logger.error(f"Error getting session analysis: {str(e)}")
+            return None
+
+    async def update_session_transcript(self, session_id: str, transcript: str) -> bool:
+        """Update a session's transcript field"""
+        try:
+            stored = await asyncio.to_thread(self._store_transcript, transcript)
+            async with self.driver.session() as session:
+                result = await session.run(queries.UPDATE_SESSION_TRANSCRIPT,
+                    session_id=session_id,
+                    updated_at=datetime.now().isoformat(),
+                    **stored)
+
+                if await result.single():
+                    self.logger.info(f"Successfully updated transcript for session {session_id}")
+                    return True
+
+                self.logger.error(f"Session {session_id} not found for transcript update")
+                return False
+        except Exception as e:
+            self.logger.error(f"Error updating session transcript: {str(e)}")
+            return False
+
+    #######################
+    # Analysis
+    #######################
+
+    async def save_session_analysis(self, session_id: str, analysis_data: Dict[str, Any], user_id: str) -> bool:
+        """Save analysis results to Neo4j in a single write transaction"""
+        report = await self.bulk_save_session_analysis(session_id, analysis_data, user_id)
+        return report["success"]
+
+    async def bulk_save_session_analysis(self, session_id: str, analysis_data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+        """Persist a whole analysis in one UNWIND-based write transaction.
+
+        Returns:
+            dict: Write report with success, round_trips, elapsed_ms and counts
+        """
+        try:
+            self.logger.info(f"Saving analysis for session {session_id}")
+            return await self._write_element_rows(queries.SAVE_SESSION_ANALYSIS, session_id, analysis_data, user_id)
+        except Exception as e:
+            self._handle_error(e, "save_session_analysis")
+
+    async def insert_session_elements(self, session_id: str, analysis_data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+        """Add elements to a session without touching its analysis status.
+
+        Used while an analysis streams in; set_analysis_status marks the
+        analysis completed or failed once it ends.
+
+        Returns:
+            dict: Write report, as for bulk_save_session_analysis
+        """
+        try:
+            return await self._write_element_rows(queries.INSERT_SESSION_ELEMENTS, session_id, analysis_data, user_id)
+        except Exception as e:
+            self._handle_error(e, "insert_session_elements")
+
+    async def set_analysis_status(self, session_id: str, status: str) -> bool:
+        """Set a session's analysis_status and analysis_timestamp"""
+        try:
+            async with self.driver.session() as session:
+                result = await session.run(queries.SET_ANALYSIS_STATUS,
+                    session_id=session_id,
+                    status=status,
+                    timestamp=datetime.now().isoformat())
+                return await result.single() is not None
+        except Exception as e:
+            self._handle_error(e, "set_analysis_status")
+
+    async def update_session_emotion_intensities(self, session_id: str, analysis_data: Dict[str, Any], user_id: str) -> bool:
+        """Set the intensity of emotions already linked to a session"""
+        try:
+            timestamp = datetime.now().isoformat()
+            rows = element_rows.analysis_to_rows(analysis_data, user_id, timestamp)
+            async with self.driver.session() as session:
+                result = await session.run(queries.UPDATE_SESSION_EMOTION_INTENSITIES,
+                    session_id=session_id,
+                    user_id=user_id,
+                    timestamp=timestamp,
+                    emotions=rows["emotions"])
+                record = await result.single()
+                return bool(record and record["updated"])
+        except Exception as e:
+            self._handle_error(e, "update_session_emotion_intensities")
+
+    async def _write_element_rows(self, query: str, session_id: str, analysis_data: Dict[str, Any],
+                                  user_id: str) -> Dict[str, Any]:
+        """Run an element-row write query in one transaction and report on it"""
+        timestamp = datetime.now().isoformat()
+        rows = element_rows.analysis_to_rows(analysis_data, user_id, timestamp)
+
+        async def _write(tx):
+            result = await tx.run(query,
+                session_id=session_id,
+                user_id=user_id,
+                timestamp=timestamp,
+                relevance=element_rows.DEFAULT_RELEVANCE,
+                **rows)
+            return await result.single()
+
+        started = time.perf_counter()
+        async with self.driver.session() as session:
+            record = await session.execute_write(_write)
+        elapsed = time.perf_counter() - started
+
+        if not record:
+            self.logger.error(f"Session {session_id} not found, analysis not saved")
+            return element_rows.write_report(session_id, rows, elapsed, success=False,
+                                             error="Session not found")
+
+        report = element_rows.write_report(session_id, rows, elapsed)
+        self.logger.info(f"Successfully saved analysis for session {session_id}: {report}")
+        return report
+
+    async def update_session_with_elements(self, session_id: str, elements: Dict[str, Any], user_id: str):
+        """Diff submitted elements against the stored ones and write only the changes.
+
+        Returns:
+            dict: Counts of inserted/updated/deleted/unchanged elements (overall
+            and under "by_type"), or False if the update failed
+        """
+        try:
+            self.logger.info(f"Starting efficient update for session {session_id}")
+
+            timestamp = datetime.now().isoformat()
+            desired = element_rows.analysis_to_rows(
+                element_rows.to_analysis_data(elements), user_id, timestamp
+            )
+
+            async def _update(tx):
+                result = await tx.run(queries.SESSION_ELEMENT_STATE, session_id=session_id)
+                record = await result.single()
+                if not record:
+                    return None
+
+                diff = element_rows.diff_rows(record.data(), desired)
+                if diff["deletes"] or diff["updates"] or any(diff["inserts"].values()):
+                    result = await tx.run(queries.UPDATE_SESSION_ELEMENTS,
+                        session_id=session_id,
+                        user_id=user_id,
+                        timestamp=timestamp,
+                        relevance=element_rows.DEFAULT_RELEVANCE,
+                        deletes=diff["deletes"],
+                        updates=diff["updates"],
+                        **diff["inserts"])
+                    await result.consume()
+                return diff["counts"]
+
+            async with self.driver.session() as session:
+                counts = await session.execute_write(_update)
+
+            if counts is None:
+                self.logger.error(f"Session {session_id} not found")
+                return False
+
+            changes = element_rows.total_changes(counts)
+            changes["by_type"] = counts
+            self.logger.info(f"Successfully updated session {session_id} with elements: {changes}")
+            return changes
+        except Exception as e:
+            self.logger.error(f"Error updating session with elements: {str(e)}")
+            return False
+
+    async def run_query(self, query: str, params: Dict[str, Any] = None) -> Optional[List[Dict[str, Any]]]:
+        """Run an arbitrary Cypher query against Neo4j."""
+        try:
+            self.logger.info(f"Executing Neo4j query: {query}")
+
+            async with self.driver.session() as session:
+                result = await session.run(query, parameters=params or {})
+                return [queries.serialize_record(record) async for record in result]
+        except Exception as e:
+            self.logger.error(f"Error executing Neo4j query: {str(e)}")
+            return None
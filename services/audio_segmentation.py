@@ -0,0 +1,267 @@
+"""
+Audio Segmentation Module
+
+Splits a recording into chunks with a single ffmpeg pass using the segment
+muxer. Stream copy is used when the input format can be sent to the
+transcription API as-is, so the file is read once and not re-encoded;
+otherwise the audio is re-encoded to MP3 in the same single pass.
+
+An optional silence-detection pre-pass (ffmpeg silencedetect) produces a
+ChunkPlan: chunk boundaries are placed at pauses instead of mid-word, and
+long silent stretches are cut out and never uploaded.
+
+Each call writes into its own private directory, so concurrent jobs never
+share chunk files.
+"""
+
+import logging
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Containers the transcription API accepts and the segment muxer can stream-copy
+COPYABLE_EXTENSIONS = {".mp3", ".m4a", ".mp4", ".mpeg", ".mpga", ".wav", ".webm"}
+
+@dataclass
+class AudioSegment:
+    """One chunk of a segmented recording"""
+    index: int
+    path: Path
+    start: float
+    end: Optional[float] = None
+
+@dataclass
+class SegmentationResult:
+    """Chunks written by segment_audio, their private directory and stage timings"""
+    segments: List[AudioSegment]
+    directory: Path
+    mode: str
+    timings: Dict[str, float] = field(default_factory=dict)
+    plan: Optional["ChunkPlan"] = None
+
+    def cleanup(self) -> None:
+        """Delete the private chunk directory"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+#######################
+# Silence detection
+#######################
+
+SILENCE_START = re.compile(r"silence_start:\s*(-?[\d.]+)")
+SILENCE_END = re.compile(r"silence_end:\s*(-?[\d.]+)")
+
+Span = Tuple[float, float]
+
+def silencedetect_command(audio_path: Path, noise_db: float, min_pause: float) -> List[str]:
+    """ffmpeg arguments that log every pause of at least min_pause seconds below noise_db"""
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-nostats",
+        "-i", str(audio_path),
+        "-vn",
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_pause}",
+        "-f", "null",
+        "-",
+    ]
+
+def parse_silences(output: str, duration: float) -> List[Span]:
+    """Extract (start, end) silences from silencedetect log output"""
+    silences = []
+    start = None
+    for line in output.splitlines():
+        match = SILENCE_START.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = SILENCE_END.search(line)
+        if match and start is not None:
+            silences.append((start, min(float(match.group(1)), duration)))
+            start = None
+    # Silence running to the end of the file has no silence_end line
+    if start is not None and start < duration:
+        silences.append((start, duration))
+    return silences
+
+def detect_silences(audio_path: Path, duration: float, noise_db: float = -35.0,
+                    min_pause: float = 0.5, timeout: float = 600) -> List[Span]:
+    """Run silencedetect over the whole recording in one decode pass"""
+    result = subprocess.run(
+        silencedetect_command(audio_path, noise_db, min_pause),
+        check=True, capture_output=True, timeout=timeout
+    )
+    return parse_silences(result.stderr.decode("utf-8", "replace"), duration)
+
+@dataclass
+class ChunkPlan:
+    """Speech regions of a recording and the chunks to upload"""
+    duration: float
+    speech: List[Span]
+    chunks: List[Span]
+
+    @property
+    def dropped_seconds(self) -> float:
+        return round(self.duration - sum(end - start for start, end in self.speech), 3)
+
+    def boundaries(self) -> List[float]:
+        """Every cut point strictly inside the recording, in order"""
+        points = {point for chunk in self.chunks for point in chunk}
+        return sorted(point for point in points if 0 < point < self.duration)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Speech map reported in job status"""
+        return {
+            "duration": round(self.duration, 3),
+            "speech": [list(span) for span in self.speech],
+            "chunks": [list(span) for span in self.chunks],
+            "speech_seconds": round(self.duration - self.dropped_seconds, 3),
+            "dropped_seconds": self.dropped_seconds,
+        }
+
+def plan_chunks(duration: float, silences: List[Span], target: float, drop_silence: float = 3.0,
+                min_speech: float = 0.5, min_fill: float = 0.5) -> ChunkPlan:
+    """Choose chunk boundaries at pauses and leave out long silences
+
+    Args:
+        duration: Recording length in seconds
+        silences: (start, end) pauses from detect_silences
+        target: Maximum chunk length in seconds
+        drop_silence: Pauses at least this long are cut out of the upload
+        min_speech: Speech regions shorter than this (clicks, breaths) are dropped
+        min_fill: A chunk is only cut at a pause once it is this fraction of target long
+
+    Returns:
+        ChunkPlan whose chunks are all at most target seconds long
+    """
+    # Speech regions: the recording minus long silences
+    regions = []
+    cursor = 0.0
+    for start, end in sorted(silences):
+        if end - start >= drop_silence:
+            if start - cursor >= min_speech:
+                regions.append((cursor, start))
+            cursor = max(cursor, end)
+    if duration - cursor >= min_speech:
+        regions.append((cursor, duration))
+
+    # Short pauses are candidate cut points; cut at their midpoint
+    pauses = sorted((start + end) / 2 for start, end in silences if end - start < drop_silence)
+
+    chunks = []
+    for region_start, region_end in regions:
+        start = region_start
+        while region_end - start > target:
+            window = [p for p in pauses if start + min_fill * target <= p <= start + target]
+            cut = window[-1] if window else start + target
+            chunks.append((start, cut))
+            start = cut
+        chunks.append((start, region_end))
+
+    def rounded(spans):
+        return [(round(a, 3), round(b, 3)) for a, b in spans]
+
+    return ChunkPlan(duration=duration, speech=rounded(regions), chunks=rounded(chunks))
+
+#######################
+# Segmentation
+#######################
+
+def segment_command(audio_path: Path, chunk_seconds: int, pattern: str, copy: bool,
+                    cut_times: List[float] = None) -> List[str]:
+    """ffmpeg arguments that split audio_path in one pass, at cut_times or every chunk_seconds"""
+    codec = ["-c", "copy"] if copy else ["-vn", "-acodec", "libmp3lame"]
+    if cut_times:
+        split = ["-segment_times", ",".join(f"{t:.3f}" for t in cut_times)]
+    else:
+        split = ["-segment_time", str(chunk_seconds)]
+    return [
+        "ffmpeg",
+        "-y",
+        "-loglevel", "error",
+        "-i", str(audio_path),
+        "-map", "0:a:0",
+        *codec,
+        "-f", "segment",
+        *split,
+        "-reset_timestamps", "1",
+        pattern,
+    ]
+
+def _collect_segments(directory: Path, chunk_seconds: int, plan: ChunkPlan = None) -> List[AudioSegment]:
+    """Chunk files in order; with a plan, silent pieces are deleted and left out"""
+    paths = sorted(path for path in directory.iterdir() if path.name.startswith("chunk_"))
+    if plan is None:
+        return [AudioSegment(index=n, path=path, start=float(n * chunk_seconds)) for n, path in enumerate(paths)]
+
+    points = [0.0] + plan.boundaries() + [plan.duration]
+    pieces = list(zip(points, points[1:]))
+    if len(pieces) != len(paths):
+        logger.warning(f"Expected {len(pieces)} pieces from the chunk plan, got {len(paths)}; keeping all")
+        return [AudioSegment(index=n, path=path, start=float(n * chunk_seconds)) for n, path in enumerate(paths)]
+
+    chunk_starts = {start for start, _ in plan.chunks}
+    segments = []
+    for path, (start, end) in zip(paths, pieces):
+        if start in chunk_starts:
+            segments.append(AudioSegment(index=len(segments), path=path, start=start, end=end))
+        else:
+            path.unlink()
+    return segments
+
+def segment_audio(audio_path: Path, chunk_seconds: int, work_dir: str = None, timeout: float = 600,
+                  plan: ChunkPlan = None) -> SegmentationResult:
+    """Split a recording into chunks with one ffmpeg invocation
+
+    Args:
+        audio_path: Recording to split
+        chunk_seconds: Target chunk length in seconds
+        work_dir: Parent directory for the private chunk directory (default: system temp)
+        timeout: Seconds to allow ffmpeg per attempt
+        plan: Optional ChunkPlan; cuts are made at its boundaries and the
+            pieces between its chunks (long silences) are discarded
+
+    Returns:
+        SegmentationResult; the caller must call cleanup() when done
+
+    Raises:
+        RuntimeError: If ffmpeg produced no chunks
+    """
+    audio_path = Path(audio_path)
+    directory = Path(tempfile.mkdtemp(prefix="segments_", dir=work_dir))
+    extension = audio_path.suffix.lower()
+    attempts = [("copy", extension)] if extension in COPYABLE_EXTENSIONS else []
+    attempts.append(("encode", ".mp3"))
+
+    started = time.perf_counter()
+    error = None
+    for mode, suffix in attempts:
+        pattern = str(directory / f"chunk_%04d{suffix}")
+        try:
+            subprocess.run(
+                segment_command(audio_path, chunk_seconds, pattern, copy=(mode == "copy"),
+                                cut_times=plan.boundaries() if plan else None),
+                check=True, capture_output=True, timeout=timeout
+            )
+            segments = _collect_segments(directory, chunk_seconds, plan)
+            if segments:
+                elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+                logger.info(f"Segmented {audio_path.name} into {len(segments)} chunks ({mode}) in {elapsed_ms}ms")
+                return SegmentationResult(segments, directory, mode, {"segment_ms": elapsed_ms}, plan)
+        except (subprocess.SubprocessError, OSError) as e:
+            stderr = getattr(e, "stderr", b"") or b""
+            error = stderr.decode("utf-8", "replace").strip() or str(e)
+            logger.warning(f"Segmenting {audio_path.name} with {mode} failed: {error}")
+
+        # Start the next attempt from an empty directory
+        for path in directory.iterdir():
+            path.unlink()
+
+    shutil.rmtree(directory, ignore_errors=True)
+    raise RuntimeError(f"Could not segment {audio_path.name}: {error or 'no chunks produced'}")
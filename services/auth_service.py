@@ -1,6 +1,20 @@
-from datetime import datetime, timedelta
+"""
+Auth Service Module
+
+Registration, login and credential management, plus the FastAPI
+dependencies every router uses to authenticate a request.
+
+Request authentication is a fast path: the JWT is verified locally and the
+user it names (the "principal") comes from a short-TTL in-process cache, so
+a warm request runs no auth queries at all. Logout and password changes
+revoke the user's earlier tokens by moving User.tokens_valid_after forward;
+they, and disabling an account, also drop the cached principal. Other
+workers see such a change once their entry expires (PRINCIPAL_CACHE_TTL).
+"""
+
+import asyncio
+import time
 from typing import Optional, Dict, Any, Tuple
-from werkzeug.security import check_password_hash, generate_password_hash
 import jwt
 import os
 from dotenv import load_dotenv
@@ -10,6 +24,9 @@ from jwt import ExpiredSignatureError, InvalidTokenError
 
 from services.neo4j_service import Neo4jService
 from services.user_service import UserService
+from services.loading_cache import LoadingCache, is_missing
+from services.password_hasher import PasswordHasher, get_password_hasher
+from services.user_repository import UserRecord
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
@@ -22,30 +39,38 @@ logger = logging.getLogger(__name__)
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+# Seconds a principal is served from memory before it is read again
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
 class AuthService:
-    def __init__(self, neo4j_service: Neo4jService, secret_key: str, token_expiry: int = 24):
+    def __init__(self, neo4j_service: Neo4jService, secret_key: str, token_expiry: int = 24,
+                 password_hasher: Optional[PasswordHasher] = None):
         self.neo4j_service = neo4j_service
         self.user_service = UserService(neo4j_service)
         self.secret_key = secret_key
         self.token_expiry = token_expiry  # in hours
+        self.password_hasher = password_hasher or get_password_hasher()
         logger.debug("AuthService initialized")
 
-    def register_user(self, email: str, password: str, name: str) -> Tuple[bool, Dict, Optional[str]]:
+    async def register_user(self, email: str, password: str, name: str) -> Tuple[bool, Dict, Optional[str]]:
         """
         Register a new user with the provided email, password, and name.
         Returns a tuple of (success, response_dict, error_message).
         """
         try:
-            # Create user using user service
-            user_id = self.user_service.create_user(email, password, name)
+            # Hash off the event loop, then create the user (Neo4j calls run on a worker thread)
+            password_hash = await self.password_hasher.hash(password)
+            user_id = await asyncio.to_thread(
+                self.user_service.create_user, email, password, name, password_hash=password_hash
+            )
             
             # Get created user
-            user = self.user_service.get_user_by_id(user_id)
+            user = await asyncio.to_thread(self.user_service.get_user_by_id, user_id)
             if not user:
                 return False, {}, "Failed to create user"
 
             # Generate token
-            token = self._generate_token(user_id)
+            token = self.generate_token(user_id)
             
             response = {
                 "access_token": token,
@@ -65,56 +90,54 @@ class AuthService:
             logger.error(f"Error during user registration: {str(e)}")
             return False, {}, "An unexpected error occurred"
 
-    def login_user(self, email: str, password: str) -> Tuple[bool, Dict[str, Any], Optional[str]]:
+    async def login_user(self, email: str, password: str) -> Tuple[bool, Dict[str, Any], Optional[str]]:
         """Login a user"""
         try:
-            # Verify user credentials
-            if not self.user_service.verify_password(email, password):
+            # One query returns the user together with its password hash
+            user = await asyncio.to_thread(self.neo4j_service.users.get_by_email, email)
+            if not user or not await self.password_hasher.verify(user.password_hash, password):
                 logger.warning(f"Invalid login attempt for email: {email}")
                 return False, {}, "Invalid credentials"
-                
-            # Get user data
-            user = self.user_service.get_user_by_email(email)
-            if not user:
-                logger.warning(f"User not found during login: {email}")
-                return False, {}, "User not found"
-                
+
             # Check if user is disabled
-            if user.get("disabled", False):
+            if user.disabled:
                 logger.warning(f"Attempted login to disabled account: {email}")
                 return False, {}, "User account is disabled"
-                
-            # Generate JWT token with user ID instead of email
-            user_id = user.get("userId")
-            if not user_id:
-                logger.error(f"User data missing userId: {user}")
-                return False, {}, "Invalid user data"
-                
-            # Generate token with proper subject field
-            expires = datetime.utcnow() + timedelta(hours=self.token_expiry)
-            token_data = {
-                "sub": user_id,  # Use user ID as subject for better security
-                "exp": int(expires.timestamp())
-            }
-            
-            access_token = jwt.encode(token_data, self.secret_key, algorithm='HS256')
+
+            if self.password_hasher.needs_rehash(user.password_hash):
+                await self._rehash_password(user.user_id, password)
+
+            # Generate token with the user ID as subject for better security
+            access_token = self.generate_token(user.user_id)
             logger.info(f"Login successful for user: {email}")
-            
+
             return True, {
                 "access_token": access_token,
-                "user": user
+                "user": user.without_secrets().as_dict()
             }, None
-            
+
         except Exception as e:
             logger.error(f"Error logging in user: {str(e)}", exc_info=True)
             return False, {}, str(e)
 
-    def _generate_token(self, user_id: str) -> str:
+    async def _rehash_password(self, user_id: str, password: str) -> None:
+        """Re-hash a password stored with old KDF parameters; failures only log"""
+        try:
+            password_hash = await self.password_hasher.hash(password)
+            await asyncio.to_thread(self.neo4j_service.change_user_password, user_id, password_hash)
+            logger.info(f"Re-hashed password for user {user_id} with {self.password_hasher.prefix}")
+        except Exception as e:
+            logger.warning(f"Could not re-hash password for user {user_id}: {str(e)}")
+
+    def generate_token(self, user_id: str) -> str:
         """Generate a JWT token for the user"""
         try:
+            # iat is a float so a token issued right after a revocation stays valid
+            now = time.time()
             payload = {
                 'sub': user_id,
-                'exp': datetime.utcnow() + timedelta(hours=self.token_expiry)
+                'iat': now,
+                'exp': int(now + self.token_expiry * 3600)
             }
             return jwt.encode(payload, self.secret_key, algorithm='HS256')
         except Exception as e:
@@ -146,58 +169,56 @@ class AuthService:
 
     def logout_user(self, token: str) -> bool:
         """
-        Logout a user by invalidating their token.
-        In a real implementation, you might want to add the token to a blacklist.
+        Logout a user by revoking their tokens.
+        Tokens are stateless, so this revokes every token issued to the user
+        so far (all devices), not only the one presented.
         """
-        # For now, we just verify the token is valid
-        user_id = self.verify_token(token)
-        if user_id:
-            logger.info(f"User {user_id} logged out")
-            return True
-        return False
-
-    def change_password(self, user_id: str, current_password: str, new_password: str) -> Tuple[bool, Optional[str]]:
+        subject = self.verify_token(token)
+        user_id = subject and user_id_for_subject(subject)
+        if not user_id:
+            return False
+        self.revoke_tokens(user_id)
+        logger.info(f"User {user_id} logged out")
+        return True
+
+    def revoke_tokens(self, user_id: str) -> None:
+        """Reject the user's existing tokens and drop their cached principal"""
+        self.neo4j_service.revoke_user_tokens(user_id, time.time())
+        invalidate_principal(user_id)
+
+    def set_user_disabled(self, user_id: str, disabled: bool = True) -> bool:
+        """Disable (or re-enable) an account; takes effect on the next request"""
+        success = self.neo4j_service.update_user(user_id, disabled=disabled)
+        invalidate_principal(user_id)
+        if success:
+            logger.info(f"User {user_id} {'disabled' if disabled else 'enabled'}")
+        return success
+
+    async def change_password(self, user_id: str, current_password: str, new_password: str) -> Tuple[bool, Optional[str]]:
         """
         Change a user's password after verifying the current password
         Returns a tuple of (success, error_message).
         """
         try:
-            # Get user
-            user = self.user_service.get_user_by_id(user_id)
+            # One query returns the user with its password hash
+            user = await asyncio.to_thread(self.neo4j_service.users.get_by_id, user_id)
             if not user:
                 return False, "User not found"
-            
-            # For password verification, we need to find the original email
-            # Let's get it from the EmailLookup table via neo4j service
-            try:
-                # Get all email lookups to find the one with this user_id
-                with self.neo4j_service.driver.session() as session:
-                    result = session.run("""
-                        MATCH (e:EmailLookup {userId: $user_id})
-                        RETURN e.email as email
-                    """, user_id=user_id)
-                    
-                    record = result.single()
-                    if not record:
-                        return False, "Unable to verify current password"
-                    
-                    original_email = record["email"]
-            except Exception as e:
-                logger.error(f"Could not retrieve original email for user: {user_id}: {str(e)}")
-                return False, "Unable to verify current password"
-            
-            # Verify current password using the original email
-            if not self.user_service.verify_password(original_email, current_password):
+
+            if not await self.password_hasher.verify(user.password_hash, current_password):
                 logger.warning(f"Failed password change attempt for user: {user_id}")
                 return False, "Current password is incorrect"
             
             # Hash the new password
-            new_password_hash = generate_password_hash(new_password)
+            new_password_hash = await self.password_hasher.hash(new_password)
             
             # Update password in database using neo4j service
-            success = self.neo4j_service.change_user_password(user_id, new_password_hash)
+            success = await asyncio.to_thread(self.neo4j_service.change_user_password, user_id, new_password_hash)
             if not success:
                 return False, "Failed to update password"
+
+            # Sessions signed in with the old password end here
+            await asyncio.to_thread(self.revoke_tokens, user_id)
             
             logger.info(f"Password changed successfully for user: {user_id}")
             return True, None
@@ -240,79 +261,133 @@ class AuthService:
             logger.error(f"Error checking admin status: {str(e)}")
             return False 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """
-    Get the current authenticated user from the JWT token.
-    
+#######################
+# Request authentication
+#######################
+
+def _load_principal(user_id: str) -> Optional[UserRecord]:
+    # Import here to avoid circular imports
+    from services import get_neo4j_service
+    user = get_neo4j_service().users.get_by_id(user_id)
+    return user.without_secrets() if user else None
+
+def _load_email_subject(email: str) -> Optional[str]:
+    from services import get_neo4j_service
+    user = get_neo4j_service().users.get_by_email(email)
+    return user.user_id if user else None
+
+_principal_cache: Optional[LoadingCache] = None
+_email_subject_cache: Optional[LoadingCache] = None
+
+def get_principal_cache() -> LoadingCache:
+    """Process-wide cache of principals keyed by user ID"""
+    global _principal_cache
+    if _principal_cache is None:
+        _principal_cache = LoadingCache(_load_principal, PRINCIPAL_CACHE_TTL, name="principal")
+    return _principal_cache
+
+def get_email_subject_cache() -> LoadingCache:
+    """Process-wide cache of the user ID that an email token subject names"""
+    global _email_subject_cache
+    if _email_subject_cache is None:
+        _email_subject_cache = LoadingCache(_load_email_subject, PRINCIPAL_CACHE_TTL, name="email subject")
+    return _email_subject_cache
+
+def user_id_for_subject(subject: str) -> Optional[str]:
+    """User ID a token subject names; older tokens name the user by email"""
+    if "@" in subject:
+        return get_email_subject_cache().get(subject)
+    return subject
+
+def invalidate_principal(user_id: str, email: Optional[str] = None) -> None:
+    """Drop a user's cached principal so the next request reads it again
+
+    Principals are cached by user ID whatever the token subject, so this
+    covers tokens that name the user by email too.
+
     Args:
-        token: JWT token from the Authorization header
-        
-    Returns:
-        User data dictionary
-        
-    Raises:
-        HTTPException: If authentication fails
+        user_id: User whose principal changed
+        email: An email the user is moving away from, so tokens naming it
+            stop resolving to the user
     """
+    get_principal_cache().invalidate(user_id)
+    if email:
+        get_email_subject_cache().invalidate(email)
+
+async def _cached_lookup(cache: LoadingCache, key: str) -> Any:
+    """Cached value for key, loaded on a worker thread on a miss"""
+    value = cache.peek(key)
+    if not is_missing(value):
+        return value
     try:
-        # Get the JWT secret key - use the same lookup logic as AuthService
-        jwt_secret = (
-            os.getenv("JWT_SECRET_KEY") or 
-            os.getenv("FLASK_SECRET_KEY") or 
-            os.getenv("SECRET_KEY") or
-            "dev-secret-key-change-in-production"
-        )
-        
-        # Decode the token
-        try:
-            payload = jwt.decode(token, jwt_secret, algorithms=["HS256"])
-            user_id = payload.get("sub")
-            if not user_id:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid token payload",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-        except ExpiredSignatureError:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token has expired",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        except InvalidTokenError:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Get the user from the database
-        from services import get_neo4j_service
-        neo4j_service = get_neo4j_service()
-        user = neo4j_service.get_user_by_id(user_id)
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Check if user is disabled
-        if user.get("disabled", False):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="User account is disabled",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        return user
-    except HTTPException:
-        # Re-raise HTTP exceptions
-        raise
+        return await asyncio.to_thread(cache.get, key)
     except Exception as e:
-        logger.error(f"Error getting current user: {str(e)}", exc_info=True)
+        logger.error(f"Error loading {cache.name} for {key}: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Authentication error",
             headers={"WWW-Authenticate": "Bearer"},
-        ) 
\ No newline at end of file
+        )
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+async def authenticate(token: str) -> UserRecord:
+    """
+    Resolve a bearer token to its principal.
+
+    The signature and expiry are checked locally; the user comes from the
+    principal cache and is only read from Neo4j on a miss.
+
+    Args:
+        token: JWT from the Authorization header
+
+    Returns:
+        The user's record, without its password hash
+
+    Raises:
+        HTTPException: 401 for a bad, expired or revoked token or an unknown
+            user, 403 for a disabled account, 500 when the lookup fails
+    """
+    from services import get_auth_service
+    try:
+        payload = jwt.decode(token, get_auth_service().secret_key, algorithms=["HS256"])
+    except ExpiredSignatureError:
+        raise _unauthorized("Token has expired")
+    except InvalidTokenError:
+        raise _unauthorized("Invalid token")
+    subject = payload.get("sub")
+    if not subject:
+        raise _unauthorized("Invalid token payload")
+
+    user_id = subject
+    if "@" in subject:
+        user_id = await _cached_lookup(get_email_subject_cache(), subject)
+    principal = await _cached_lookup(get_principal_cache(), user_id) if user_id else None
+
+    if not principal:
+        raise _unauthorized("User not found")
+    if principal.disabled:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is disabled",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if principal.tokens_valid_after and payload.get("iat", 0) < principal.tokens_valid_after:
+        raise _unauthorized("Token has been revoked")
+    return principal
+
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> UserRecord:
+    """FastAPI dependency: the authenticated principal"""
+    return await authenticate(token)
+
+async def get_current_user_id(principal: UserRecord = Depends(get_current_principal)) -> str:
+    """FastAPI dependency: the authenticated user's ID"""
+    return principal.user_id
+
+# Routers that take the whole user get the cached principal
+get_current_user = get_current_principal
@@ -0,0 +1,400 @@
+"""
+Element Rows Module
+
+Converts analysis output into flat parameter rows for the bulk Neo4j writer.
+Each element type becomes a list of plain dictionaries so that a single
+UNWIND-based statement can persist a whole analysis in one transaction.
+"""
+
+import hashlib
+import json
+import uuid
+from typing import Dict, Any, List, Optional
+
+DEFAULT_TOPIC = "Personal Growth"
+DEFAULT_RELEVANCE = 0.8
+
+# Row list keys, in the order they are written
+ELEMENT_KEYS = ["emotions", "beliefs", "insights", "challenges", "action_items"]
+
+# Property each element node is MERGEd on (together with user_id)
+NATURAL_KEYS = {
+    "emotions": "name",
+    "beliefs": "text",
+    "insights": "name",
+    "challenges": "name",
+    "action_items": "name",
+}
+
+# Properties stored on the HAS_* relationship and on the element node
+RELATIONSHIP_FIELDS = {
+    "emotions": ("intensity", "context"),
+    "beliefs": ("impact",),
+    "insights": ("context",),
+    "challenges": ("impact", "severity"),
+    "action_items": ("status",),
+}
+NODE_FIELDS = {
+    "emotions": (),
+    "beliefs": ("name",),
+    "insights": ("text",),
+    "challenges": ("text",),
+    "action_items": ("name", "text", "description", "status"),
+}
+
+def _generate_id(prefix: str) -> str:
+    """Generate a node ID in the same format as Neo4jService._generate_id"""
+    return f"{prefix}_{str(uuid.uuid4())}"
+
+def topic_name(topic) -> str:
+    """Extract a topic name from a topic object or string"""
+    if isinstance(topic, dict):
+        return topic.get('name', DEFAULT_TOPIC)
+    elif isinstance(topic, str):
+        return topic
+    else:
+        return DEFAULT_TOPIC
+
+def topic_names(topics) -> List[str]:
+    """Normalize a topic, or list of topics, into a de-duplicated list of names"""
+    if not isinstance(topics, list):
+        topics = [topics]
+
+    names = []
+    for topic in topics:
+        name = topic_name(topic)
+        if name not in names:
+            names.append(name)
+    return names
+
+def _field(values: List[Any], index: int, default: Any = None) -> Any:
+    """Return values[index] or default when the positional field is missing"""
+    return values[index] if len(values) > index else default
+
+def _to_float(value: Any, default: float = 0.0) -> float:
+    """Convert an intensity value to float"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+def analysis_to_rows(analysis_data: Dict[str, Any], user_id: str, timestamp: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Convert save_session_analysis input into bulk-write parameter rows.
+
+    Args:
+        analysis_data: Positional lists keyed by "Emotions", "Beliefs",
+            "actionitems", "Insights" and "Challenges"
+        user_id: Owner of the merged element nodes
+        timestamp: ISO timestamp used for created_at/updated_at
+
+    Returns:
+        Dict with one list of rows per key in ELEMENT_KEYS
+    """
+    rows = {key: [] for key in ELEMENT_KEYS}
+
+    # Format: [name, intensity, context, topics]
+    for emotion in analysis_data.get("Emotions") or []:
+        rows["emotions"].append({
+            "id": _generate_id("E"),
+            "name": emotion[0],
+            "intensity": _to_float(_field(emotion, 1, 0)),
+            "context": _field(emotion, 2, ""),
+            "topics": topic_names(_field(emotion, 3, [])),
+        })
+
+    # Format: [id, name, text, impact, topics]
+    for belief in analysis_data.get("Beliefs") or []:
+        text = _field(belief, 2, "")
+        rows["beliefs"].append({
+            "id": _generate_id("B"),
+            "submitted_id": belief[0] if belief else None,
+            "name": _field(belief, 1) or (text[:50] if text else ""),
+            "text": text,
+            "impact": _field(belief, 3, ""),
+            "topics": topic_names(_field(belief, 4, [])),
+        })
+
+    # Format: [name, text, context, topics]
+    for insight in analysis_data.get("Insights") or []:
+        text = _field(insight, 1, "")
+        rows["insights"].append({
+            "id": _generate_id("I"),
+            "name": insight[0] or (text[:50] if text else ""),
+            "text": text,
+            "context": _field(insight, 2, ""),
+            "topics": topic_names(_field(insight, 3, [])),
+        })
+
+    # Format: [name, text, impact, topics]
+    for challenge in analysis_data.get("Challenges") or []:
+        text = _field(challenge, 1, "")
+        rows["challenges"].append({
+            "id": _generate_id("C"),
+            "name": challenge[0] or (text[:50] if text else ""),
+            "text": text,
+            "impact": _field(challenge, 2, ""),
+            "severity": "",
+            "topics": topic_names(_field(challenge, 3, [])),
+        })
+
+    # Format: [id, name, description, topics, status]
+    for actionitem in analysis_data.get("actionitems") or []:
+        action_id = _generate_id("A")
+        text = _field(actionitem, 2, "") or ""
+        status = _field(actionitem, 4, "hasn't started")
+        name = _field(actionitem, 1) or text[:50]
+        rows["action_items"].append({
+            "id": action_id,
+            "submitted_id": actionitem[0] if actionitem else None,
+            "name": name,
+            "text": text,
+            "description": text,
+            "properties": {
+                "id": action_id,
+                "name": name,
+                "text": text,
+                "description": text,
+                "impact": "Action item identified from session analysis",
+                "user_id": user_id,
+                "isUserModified": False,
+                "status": status,
+                "created_at": timestamp,
+                "updated_at": timestamp,
+            },
+            "status": status,
+            "topics": topic_names(_field(actionitem, 3, [])),
+        })
+
+    return rows
+
+FORMATTED_KEYS = ["Emotions", "Beliefs", "actionitems", "Insights", "Challenges"]
+
+def _raw_topics(element: Dict[str, Any]):
+    """All topics of a raw element, falling back to its single "topic" """
+    return element.get("topics") or element.get("topic", DEFAULT_TOPIC)
+
+def to_analysis_data(elements: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert raw frontend elements into the positional analysis format.
+
+    Data that is already formatted (has any of FORMATTED_KEYS) is returned
+    unchanged.
+    """
+    if any(key in elements for key in FORMATTED_KEYS):
+        return elements
+
+    analysis_data = {}
+
+    # Format emotions: [name, intensity, context, topics]
+    if "emotions" in elements:
+        analysis_data["Emotions"] = [
+            [e["name"], e.get("intensity", 3), e.get("context", ""), _raw_topics(e)]
+            for e in elements["emotions"]
+        ]
+
+    # Format beliefs: [id, name, description, impact, topics]
+    if "beliefs" in elements:
+        analysis_data["Beliefs"] = [
+            [b.get("id", str(uuid.uuid4())), b["name"], b.get("description", b.get("text", "")), b.get("impact", "Medium"), _raw_topics(b)]
+            for b in elements["beliefs"]
+        ]
+
+    # Format action items: [id, name, description, topics, status]
+    if "action_items" in elements:
+        analysis_data["actionitems"] = [
+            [a.get("id", str(uuid.uuid4())), a["name"], a.get("description", ""), _raw_topics(a), a.get("status", "hasn't started")]
+            for a in elements["action_items"]
+        ]
+
+    # Format challenges: [name, text, impact, topics]
+    if "challenges" in elements:
+        analysis_data["Challenges"] = [
+            [c["name"], c.get("description", c.get("text", "")), c.get("impact", "Medium"), _raw_topics(c)]
+            for c in elements["challenges"]
+        ]
+
+    # Format insights: [name, text, context, topics]
+    if "insights" in elements:
+        analysis_data["Insights"] = [
+            [i["name"], i.get("description", i.get("text", "")), i.get("context", ""), _raw_topics(i)]
+            for i in elements["insights"]
+        ]
+
+    return analysis_data
+
+def format_analysis_for_storage(elements: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert extracted analysis elements into the positional save_session_analysis format.
+
+    Unlike to_analysis_data, new ids are always generated and only the single
+    "topic" extracted by the analysis is kept.
+    """
+    analysis_data = {}
+
+    # Format emotions: [name, intensity, context, topics, timestamp]
+    if "emotions" in elements:
+        analysis_data["Emotions"] = [
+            [e.get("name"), e.get("intensity", 3), e.get("context", ""), e.get("topic"), e.get("timestamp", "")]
+            for e in elements["emotions"]
+        ]
+
+    # Format beliefs: [id, name, description, impact, topics, timestamp]
+    if "beliefs" in elements:
+        analysis_data["Beliefs"] = [
+            [str(uuid.uuid4()), b.get("name"), b.get("description", b.get("text", "")), b.get("impact", ""), b.get("topic"), b.get("timestamp", "")]
+            for b in elements["beliefs"]
+        ]
+
+    # Format action items: [id, name, description, topics, status]
+    if "action_items" in elements:
+        analysis_data["actionitems"] = [
+            [str(uuid.uuid4()), a.get("name"), a.get("description", a.get("text", "")), a.get("topic"), a.get("status", "hasn't started")]
+            for a in elements["action_items"]
+        ]
+
+    # Format challenges: [name, text, impact, topics]
+    if "challenges" in elements:
+        analysis_data["Challenges"] = [
+            [c.get("name"), c.get("description", c.get("text", "")), c.get("impact", ""), c.get("topic")]
+            for c in elements["challenges"]
+        ]
+
+    # Format insights: [name, text, context, topics]
+    if "insights" in elements:
+        analysis_data["Insights"] = [
+            [i.get("name"), i.get("description", i.get("text", "")), i.get("context", ""), i.get("topic")]
+            for i in elements["insights"]
+        ]
+
+    return analysis_data
+
+def row_counts(rows: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
+    """Count rows per element type and the topic links they will create"""
+    counts = {key: len(rows.get(key, [])) for key in ELEMENT_KEYS}
+    counts["topic_links"] = sum(
+        len(row.get("topics", [])) for key in ELEMENT_KEYS for row in rows.get(key, [])
+    )
+    return counts
+
+def write_report(session_id: str, rows: Dict[str, List[Dict[str, Any]]], elapsed: float,
+                 round_trips: int = 1, success: bool = True, error: Optional[str] = None) -> Dict[str, Any]:
+    """Build the per-call report returned by the bulk writer"""
+    report = {
+        "session_id": session_id,
+        "success": success,
+        "round_trips": round_trips,
+        "elapsed_ms": round(elapsed * 1000, 2),
+        "counts": row_counts(rows),
+    }
+    if error:
+        report["error"] = error
+    return report
+
+def _normalize(value: Any) -> Any:
+    """Normalize stored and submitted values so equal content hashes equally"""
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+def content_hash(element_key: str, row: Dict[str, Any]) -> str:
+    """Hash the user-editable content of an element row"""
+    fields = (NATURAL_KEYS[element_key],) + RELATIONSHIP_FIELDS[element_key] + NODE_FIELDS[element_key]
+    content = [_normalize(row.get(field)) for field in sorted(set(fields))]
+    content.append(sorted(row.get("topics") or []))
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _node_changed(element_key: str, stored: Dict[str, Any], row: Dict[str, Any]) -> bool:
+    """Whether a row changes its element node: node properties or new topics"""
+    if any(_normalize(stored.get(field)) != _normalize(row.get(field)) for field in NODE_FIELDS[element_key]):
+        return True
+    return bool(set(row.get("topics") or []) - set(stored.get("topics") or []))
+
+def _relationship_changed(element_key: str, stored: Dict[str, Any], row: Dict[str, Any]) -> bool:
+    return any(_normalize(stored.get(field)) != _normalize(row.get(field)) for field in RELATIONSHIP_FIELDS[element_key])
+
+def diff_rows(stored: Dict[str, List[Dict[str, Any]]], desired: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Diff the elements stored on a session against the submitted ones.
+
+    Submitted rows are matched to stored rows by submitted id first, then by
+    natural key. Matched pairs with equal content hashes are left alone.
+
+    Element nodes are MERGEd and shared by every session of the user, so an
+    update in place only touches the session's own HAS_* relationship. A
+    change to the node itself (its properties or new topics) is re-linked
+    through the insert path, which MERGEs on the natural key, exactly as a
+    fresh analysis would; a changed natural key becomes a delete plus an
+    insert. Topics dropped from a shared node are left linked, since other
+    sessions still see them. Action items are keyed by id, so they are
+    re-MERGEd on their stored id rather than deleted.
+
+    Args:
+        stored: Rows from SESSION_ELEMENT_STATE, each with a "rel_id"
+        desired: Rows from analysis_to_rows
+
+    Returns:
+        Dict with "inserts" (rows per type, in the analysis_to_rows format),
+        "updates" (relationship rows for UPDATE_SESSION_ELEMENTS), "deletes"
+        (relationship element ids) and per-type "counts"
+    """
+    inserts = {key: [] for key in ELEMENT_KEYS}
+    updates = []
+    deletes = []
+    counts = {}
+
+    for key in ELEMENT_KEYS:
+        natural_key = NATURAL_KEYS[key]
+        remaining = list(stored.get(key) or [])
+        type_counts = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+
+        for row in desired.get(key) or []:
+            match = None
+            submitted_id = row.get("submitted_id")
+            if submitted_id:
+                match = next((item for item in remaining if item.get("id") == submitted_id), None)
+            if match is None:
+                match = next((item for item in remaining if item.get(natural_key) == row.get(natural_key)), None)
+
+            if match is None:
+                inserts[key].append(row)
+                type_counts["inserted"] += 1
+                continue
+
+            remaining.remove(match)
+            if content_hash(key, match) == content_hash(key, row):
+                type_counts["unchanged"] += 1
+            elif key != "action_items" and match.get(natural_key) != row.get(natural_key):
+                deletes.append(match["rel_id"])
+                inserts[key].append(row)
+                type_counts["deleted"] += 1
+                type_counts["inserted"] += 1
+            elif _node_changed(key, match, row):
+                if key == "action_items":
+                    inserts[key].append(dict(row, id=match["id"], properties=dict(row["properties"], id=match["id"])))
+                else:
+                    deletes.append(match["rel_id"])
+                    inserts[key].append(row)
+                type_counts["updated"] += 1
+            elif _relationship_changed(key, match, row):
+                updates.append({
+                    "rel_id": match["rel_id"],
+                    "rel_props": {field: row.get(field) for field in RELATIONSHIP_FIELDS[key]},
+                })
+                type_counts["updated"] += 1
+            else:
+                type_counts["unchanged"] += 1
+
+        for item in remaining:
+            deletes.append(item["rel_id"])
+            type_counts["deleted"] += 1
+
+        counts[key] = type_counts
+
+    return {"inserts": inserts, "updates": updates, "deletes": deletes, "counts": counts}
+
+def total_changes(counts: Dict[str, Dict[str, int]]) -> Dict[str, int]:
+    """Sum per-type diff counts into overall inserted/updated/deleted/unchanged"""
+    totals = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    for type_counts in counts.values():
+        for name in totals:
+            totals[name] += type_counts.get(name, 0)
+    return totals
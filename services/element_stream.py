@@ -0,0 +1,138 @@
+"""
+Element Stream Module
+
+Single-pass parser for the sectioned analysis format produced by
+PROMPT_TEMPLATE. It walks the text line by line with precompiled patterns,
+so the response is scanned once whatever its length or section count.
+
+Text can be fed in as it streams from the model: each element is returned
+as soon as its block is complete (normally when its Timestamp line has
+ended), so it can be shown and stored before the completion finishes. A
+complete response is parsed the same way by parse_elements, which backs
+analysis_service.extract_elements.
+
+The parser is lenient about formatting the model gets wrong: repeated
+section headers, markdown headers, bold or bulleted field names, fields
+out of order and CRLF line endings. An element with a missing or empty
+field is dropped without affecting its neighbours.
+"""
+
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+SECTION_HEADER = re.compile(r"(?:={2,}\s*(?P<sectioned>[A-Za-z ]+?)\s*={2,}|#+\s*(?P<markdown>[A-Za-z ]+?))")
+INTENSITY = re.compile(r"\d+")
+
+SECTIONS = {
+    "emotions": "emotions",
+    "beliefs": "beliefs",
+    "action items": "action_items",
+    "challenges": "challenges",
+    "insights": "insights",
+}
+
+# Fields of each element type, in prompt order; all are required
+ELEMENT_FIELDS = {
+    "emotions": ("name", "intensity", "context", "topic", "timestamp"),
+    "beliefs": ("name", "description", "impact", "topic", "timestamp"),
+    "action_items": ("name", "description", "topic", "timestamp"),
+    "challenges": ("name", "impact", "topic", "timestamp"),
+    "insights": ("name", "context", "topic", "timestamp"),
+}
+
+FIELD_NAMES = frozenset(field for fields in ELEMENT_FIELDS.values() for field in fields)
+
+# Characters around a field name in bulleted or bold lines ("- **Name:** ...")
+FIELD_DECORATION = " \t*-"
+
+class ParsedElement(NamedTuple):
+    """One element record: its type and its fields"""
+    element_type: str
+    element: Dict[str, str]
+
+class ElementStreamParser:
+    """Turns streamed analysis text into (element_type, element) pairs"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._section: Optional[str] = None
+        self._block: Dict[str, str] = {}
+
+    def feed(self, text: str) -> List[ParsedElement]:
+        """Add streamed text; returns the elements completed by it"""
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        return self._scan(lines)
+
+    def close(self) -> List[ParsedElement]:
+        """End of stream; returns any element completed by the final line"""
+        line, self._buffer = self._buffer, ""
+        elements = self._scan([line]) if line else []
+        self._flush(elements)
+        return elements
+
+    def _scan(self, lines: List[str]) -> List[ParsedElement]:
+        """Apply complete lines; plain string operations, with a regex only for headers"""
+        elements = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                # A blank line ends the block
+                self._flush(elements)
+                continue
+            if line[0] in "=#":
+                header = SECTION_HEADER.fullmatch(line)
+                if header:
+                    self._flush(elements)
+                    name = (header.group("sectioned") or header.group("markdown")).strip().lower()
+                    self._section = SECTIONS.get(name)
+                    continue
+
+            key, colon, value = line.partition(":")
+            key = key.strip(FIELD_DECORATION).lower()
+            if not colon or key not in FIELD_NAMES:
+                # Prose between elements is ignored
+                continue
+            value = value.strip()
+            if value.startswith("**"):
+                value = value[2:].lstrip()
+
+            if key == "name" and "name" in self._block:
+                self._flush(elements)
+            self._block[key] = value
+            # Timestamp is the last field in prompt order, but only ends a
+            # block that is already complete; otherwise the next name does
+            if key == "timestamp" and self._element_type() is not None:
+                self._flush(elements)
+        return elements
+
+    def _element_type(self) -> Optional[str]:
+        """Type of the current block if it has every required field"""
+        block = self._block
+        # Emotions are recognized by their fields even outside their section
+        element_type = self._section or ("emotions" if "intensity" in block else None)
+        if element_type is None:
+            return None
+        if not all(block.get(field) for field in ELEMENT_FIELDS[element_type]):
+            return None
+        return element_type
+
+    def _flush(self, elements: List[ParsedElement]) -> None:
+        """End the current block, appending it to elements if it is complete"""
+        element_type = self._element_type()
+        block, self._block = self._block, {}
+        if element_type is None:
+            return
+        element = {field: block[field] for field in ELEMENT_FIELDS[element_type]}
+        if element_type == "emotions":
+            # Intensity is a 1-10 score; "7/10" is kept as "7"
+            intensity = INTENSITY.match(element["intensity"])
+            if intensity is None:
+                return
+            element["intensity"] = intensity.group()
+        elements.append(ParsedElement(element_type, element))
+
+def parse_elements(text: str) -> List[ParsedElement]:
+    """Parse a complete analysis text in one go"""
+    parser = ElementStreamParser()
+    return parser.feed(text) + parser.close()
@@ -27,6 +27,10 @@ class NotFoundError(ServiceError):
     """Raised when a requested resource is not found."""
     pass
 
+class CapacityError(ServiceError):
+    """Raised when a service is at its concurrency limit and cannot accept more work."""
+    pass
+
 def handle_error(error: Exception, context: str = "") -> dict:
     """Convert exceptions to standardized error responses."""
     if isinstance(error, ServiceError):
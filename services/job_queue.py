@@ -0,0 +1,428 @@
+"""
+Job Queue Module
+
+Durable background jobs for transcript analysis. Jobs are persisted in SQLite,
+so submitting returns immediately, status survives restarts, and a job whose
+worker died is picked up again once its lease expires.
+
+Workers run as asyncio tasks inside the API process. The number of workers is
+the global concurrency limit; a per-user limit keeps one user's burst from
+starving everyone else. Failed jobs are retried with exponential backoff until
+max_attempts is reached.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "analysis_jobs.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT,
+    status TEXT NOT NULL,
+    progress TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    worker_id TEXT,
+    lease_expires REAL,
+    run_after REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs (status, run_after);
+CREATE INDEX IF NOT EXISTS idx_jobs_user_status ON jobs (user_id, status);
+"""
+
+# Handler signature: (job, progress) -> result, where progress(stage) records a stage name
+JobHandler = Callable[[Dict[str, Any], Callable[[str], Awaitable[None]]], Awaitable[Dict[str, Any]]]
+
+class JobStore:
+    """SQLite-backed job table; every method is one short transaction"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        """Open (and create if needed) the job database
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"]) if job["payload"] else {}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    #######################
+    # Producer
+    #######################
+
+    def enqueue(self, kind: str, user_id: str, payload: Dict[str, Any],
+                session_id: Optional[str] = None, max_attempts: int = 3) -> Dict[str, Any]:
+        """Persist a new queued job and return it"""
+        now = time.time()
+        job_id = f"J_{uuid.uuid4()}"
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT INTO jobs (id, kind, user_id, session_id, status, progress, max_attempts,
+                                     payload, run_after, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (job_id, kind, user_id, session_id, QUEUED, QUEUED, max(1, max_attempts),
+                 json.dumps(payload), now, now, now)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a job by id"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def list_for_user(self, user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent jobs of a user"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?", (user_id, limit)
+            ).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, COMPLETED, FAILED)}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    #######################
+    # Worker
+    #######################
+
+    def claim(self, worker_id: str, per_user_limit: int, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest runnable job whose user is under the per-user limit
+
+        Running jobs with an expired lease are recovered first: requeued if
+        they have attempts left, failed otherwise.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    """UPDATE jobs SET status = ?, finished_at = ?, updated_at = ?, worker_id = NULL,
+                                       error = 'Worker stopped responding'
+                       WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts""",
+                    (FAILED, now, now, RUNNING, now)
+                )
+                conn.execute(
+                    """UPDATE jobs SET status = ?, progress = 'requeued', updated_at = ?, worker_id = NULL
+                       WHERE status = ? AND lease_expires < ?""",
+                    (QUEUED, now, RUNNING, now)
+                )
+                row = conn.execute(
+                    """SELECT id FROM jobs AS j
+                       WHERE j.status = ? AND j.run_after <= ?
+                         AND (SELECT COUNT(*) FROM jobs AS r
+                              WHERE r.user_id = j.user_id AND r.status = ?) < ?
+                       ORDER BY j.run_after, j.created_at
+                       LIMIT 1""",
+                    (QUEUED, now, RUNNING, per_user_limit)
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        """UPDATE jobs SET status = ?, progress = 'started', attempts = attempts + 1,
+                                           worker_id = ?, lease_expires = ?, updated_at = ?,
+                                           started_at = COALESCE(started_at, ?)
+                           WHERE id = ?""",
+                        (RUNNING, worker_id, now + lease_seconds, now, now, row["id"])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def update_progress(self, job_id: str, worker_id: str, progress: str, lease_seconds: float) -> bool:
+        """Record the current stage of a running job and extend its lease
+
+        Returns:
+            False if worker_id no longer holds the job (its lease was lost)
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """UPDATE jobs SET progress = ?, lease_expires = ?, updated_at = ?
+                   WHERE id = ? AND worker_id = ? AND status = ?""",
+                (progress, now + lease_seconds, now, job_id, worker_id, RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    def renew_lease(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extend the lease of a job still held by worker_id; False if it was lost"""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker_id = ? AND status = ?",
+                (now + lease_seconds, job_id, worker_id, RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Mark a job held by worker_id completed with its result; False if its lease was lost"""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """UPDATE jobs SET status = ?, progress = ?, result = ?, error = NULL, worker_id = NULL,
+                                   lease_expires = NULL, finished_at = ?, updated_at = ?
+                   WHERE id = ? AND worker_id = ? AND status = ?""",
+                (COMPLETED, COMPLETED, json.dumps(result, default=str), now, now, job_id, worker_id, RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry_delay: float) -> Optional[str]:
+        """Record a failed attempt; requeue after retry_delay if attempts remain
+
+        Returns:
+            The job's new status, QUEUED or FAILED, or None if worker_id no
+            longer holds the job (its lease was lost) and nothing was changed
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """UPDATE jobs SET
+                       status = CASE WHEN attempts < max_attempts THEN ? ELSE ? END,
+                       progress = CASE WHEN attempts < max_attempts THEN 'retrying' ELSE ? END,
+                       finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END,
+                       run_after = ?, error = ?, worker_id = NULL, lease_expires = NULL, updated_at = ?
+                   WHERE id = ? AND worker_id = ? AND status = ?""",
+                (QUEUED, FAILED, FAILED, now, now + retry_delay, error, now, job_id, worker_id, RUNNING)
+            )
+            if cursor.rowcount != 1:
+                return None
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["status"] if row else FAILED
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        """Return a running job to the queue without counting the attempt (worker shutdown)
+
+        Returns:
+            False if worker_id no longer holds the job
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """UPDATE jobs SET status = ?, progress = 'requeued', attempts = MAX(attempts - 1, 0),
+                                   worker_id = NULL, lease_expires = NULL, updated_at = ?
+                   WHERE id = ? AND worker_id = ? AND status = ?""",
+                (QUEUED, now, job_id, worker_id, RUNNING)
+            )
+        return cursor.rowcount == 1
+
+class JobQueue:
+    """Runs stored jobs on a fixed pool of asyncio workers"""
+
+    def __init__(self, store: JobStore, handlers: Dict[str, JobHandler], workers: int = 4,
+                 per_user_limit: int = 1, max_attempts: int = 3, retry_backoff: float = 30.0,
+                 lease_seconds: float = 600.0, poll_interval: float = 1.0):
+        """Initialize the queue; workers start with start()
+
+        Args:
+            store: Persistent job store
+            handlers: Coroutine per job kind, called as handler(job, progress)
+            workers: Number of worker tasks, i.e. the global concurrency limit
+            per_user_limit: Maximum running jobs per user
+            max_attempts: Default attempts per job, including the first
+            retry_backoff: Delay before the first retry; doubles per attempt
+            lease_seconds: How long a running job may go without a lease
+                renewal before another worker may take it over; the worker
+                renews it every third of this while the job runs
+            poll_interval: Seconds between checks for newly runnable jobs
+        """
+        self.store = store
+        self.handlers = handlers
+        self.workers = workers
+        self.per_user_limit = per_user_limit
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    async def submit(self, kind: str, user_id: str, payload: Dict[str, Any],
+                     session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Persist a job and wake an idle worker"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = await asyncio.to_thread(
+            self.store.enqueue, kind, user_id, payload, session_id, self.max_attempts
+        )
+        logger.info(f"Queued {kind} job {job['id']} for user {user_id}")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a job by id"""
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    #######################
+    # Workers
+    #######################
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running event loop"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks = [
+            asyncio.create_task(self._worker(f"W_{os.getpid()}_{n}")) for n in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} job workers (per-user limit {self.per_user_limit})")
+
+    async def stop(self) -> None:
+        """Cancel the workers; jobs they were running go back to the queue"""
+        # Before Python 3.12, asyncio.wait_for can swallow a cancellation that
+        # arrives just as the wakeup event fires; the flag stops such a worker
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, worker_id: str) -> None:
+        while not self._stopping:
+            try:
+                job = await asyncio.to_thread(
+                    self.store.claim, worker_id, self.per_user_limit, self.lease_seconds
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} could not claim a job: {str(e)}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                    self._wakeup.clear()
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job)
+            # A finished job may unblock another job of the same user
+            self._wakeup.set()
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        worker_id = job["worker_id"]
+
+        async def progress(stage: str) -> None:
+            await asyncio.to_thread(self.store.update_progress, job_id, worker_id, stage, self.lease_seconds)
+
+        started = time.monotonic()
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, worker_id))
+        try:
+            result = await self.handlers[job["kind"]](job, progress)
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self.store.release, job_id, worker_id)
+            raise
+        except Exception as e:
+            delay = self.retry_backoff * (2 ** (job["attempts"] - 1))
+            new_status = await asyncio.to_thread(self.store.fail, job_id, worker_id, str(e), delay)
+            if new_status is None:
+                logger.warning(f"Job {job_id} failed ({str(e)}) after worker {worker_id} lost its lease")
+            else:
+                logger.warning(f"Job {job_id} attempt {job['attempts']} failed ({str(e)}), now {new_status}")
+            return
+        finally:
+            heartbeat.cancel()
+
+        if await asyncio.to_thread(self.store.complete, job_id, worker_id, result):
+            logger.info(f"Job {job_id} completed in {time.monotonic() - started:.1f}s")
+        else:
+            logger.warning(f"Job {job_id} finished after worker {worker_id} lost its lease; result discarded")
+
+    async def _heartbeat(self, job_id: str, worker_id: str) -> None:
+        # Stages of a long analysis can outlast the lease; renew it while the
+        # handler runs so no other worker takes the job over
+        interval = self.lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                renewed = await asyncio.to_thread(self.store.renew_lease, job_id, worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.warning(f"Could not renew the lease of job {job_id}: {str(e)}")
+                continue
+            if not renewed:
+                logger.warning(f"Worker {worker_id} lost the lease of job {job_id}")
+                return
+
+# Process-wide analysis queue
+_analysis_job_queue = None
+
+def get_analysis_job_queue() -> JobQueue:
+    """Get or create the process-wide analysis job queue from environment settings"""
+    global _analysis_job_queue
+    if _analysis_job_queue is None:
+        # Import here to avoid circular imports
+        from services.analysis_service import ANALYSIS_CONCURRENCY, run_analysis_job
+
+        _analysis_job_queue = JobQueue(
+            store=JobStore(os.getenv("ANALYSIS_JOB_DB", DEFAULT_DB_PATH)),
+            handlers={"analysis": run_analysis_job},
+            workers=int(os.getenv("ANALYSIS_JOB_WORKERS", str(ANALYSIS_CONCURRENCY))),
+            per_user_limit=int(os.getenv("ANALYSIS_JOB_PER_USER", "1")),
+            max_attempts=int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", "3")),
+            retry_backoff=float(os.getenv("ANALYSIS_JOB_RETRY_BACKOFF", "30")),
+            lease_seconds=float(os.getenv("ANALYSIS_JOB_LEASE", "600")),
+        )
+    return _analysis_job_queue
+
+async def close_analysis_job_queue() -> None:
+    """Stop the process-wide queue's workers"""
+    global _analysis_job_queue
+    if _analysis_job_queue is not None:
+        await _analysis_job_queue.stop()
+        _analysis_job_queue = None
@@ -0,0 +1,336 @@
+"""
+LLM Client Module
+
+Process-wide OpenAI clients backed by one shared, keep-alive httpx connection
+pool, so analysis calls reuse warm TLS connections instead of building a new
+client per transcript.
+
+Retries are handled here and only here: the OpenAI SDK's own retries are
+disabled and a single exponential-backoff policy with a total time budget is
+applied to both the sync and the async client. Per-call latency and retry
+counters are kept for monitoring.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import (
+    OpenAI, AsyncOpenAI, APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+)
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits, server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with jitter, bounded by attempts and total time"""
+    max_attempts: int = 4
+    initial_backoff: float = 1.0
+    max_backoff: float = 20.0
+    time_budget: float = 180.0
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number `attempt` (1-based)"""
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        delay = min(self.max_backoff, self.initial_backoff * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+@dataclass
+class PoolConfig:
+    """Shared HTTP connection pool settings"""
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    timeout: float = 60.0
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an OpenAI error is transient and worth retrying"""
+    if isinstance(error, (APIConnectionError, APITimeoutError, RateLimitError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds requested by a Retry-After header, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class LLMClientManager:
+    """Owns the pooled OpenAI clients and the retry policy for LLM calls"""
+
+    def __init__(self, api_key: str, pool: PoolConfig = None, retry_policy: RetryPolicy = None,
+                 base_url: str = None, transport: httpx.BaseTransport = None,
+                 async_transport: httpx.AsyncBaseTransport = None, history_size: int = 100):
+        """Initialize the manager; clients are created lazily on first use
+
+        Args:
+            api_key: OpenAI API key
+            pool: Shared HTTP connection pool settings
+            retry_policy: Retry/backoff policy applied to every call
+            base_url: Optional API base URL override
+            transport: Optional httpx transport for the sync client (tests)
+            async_transport: Optional httpx transport for the async client (tests)
+            history_size: Number of recent calls kept for inspection
+        """
+        self.api_key = api_key
+        self.pool = pool or PoolConfig()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.base_url = base_url
+        self._transport = transport
+        self._async_transport = async_transport
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "succeeded": 0, "failed": 0, "retries": 0,
+                       "total_latency_ms": 0.0, "max_latency_ms": 0.0}
+        self._recent_calls = deque(maxlen=history_size)
+
+    @property
+    def client(self) -> OpenAI:
+        """Shared synchronous OpenAI client"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    http_client = httpx.Client(
+                        limits=self.pool.limits(),
+                        timeout=self.pool.timeout,
+                        transport=self._transport,
+                    )
+                    self._client = OpenAI(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        http_client=http_client,
+                        max_retries=0,
+                    )
+                    logger.info(f"Created pooled OpenAI client (max_connections={self.pool.max_connections})")
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Shared asynchronous OpenAI client"""
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    http_client = httpx.AsyncClient(
+                        limits=self.pool.limits(),
+                        timeout=self.pool.timeout,
+                        transport=self._async_transport,
+                    )
+                    self._async_client = AsyncOpenAI(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        http_client=http_client,
+                        max_retries=0,
+                    )
+                    logger.info(f"Created pooled AsyncOpenAI client (max_connections={self.pool.max_connections})")
+        return self._async_client
+
+    #######################
+    # Calls
+    #######################
+
+    def chat_completion(self, **kwargs) -> Any:
+        """Create a chat completion with the shared retry policy"""
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = self.client.chat.completions.create(
+                    timeout=self._attempt_timeout(started), **kwargs
+                )
+                self._record(kwargs.get("model"), started, attempt, ok=True)
+                return response
+            except Exception as e:
+                delay = self._next_delay(e, attempt, started)
+                if delay is None:
+                    self._record(kwargs.get("model"), started, attempt, ok=False)
+                    raise
+                logger.warning(f"LLM call failed ({type(e).__name__}), retry {attempt} in {delay:.2f}s")
+                time.sleep(delay)
+
+    async def achat_completion(self, **kwargs) -> Any:
+        """Async variant of chat_completion using the shared AsyncOpenAI client"""
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = await self.async_client.chat.completions.create(
+                    timeout=self._attempt_timeout(started), **kwargs
+                )
+                self._record(kwargs.get("model"), started, attempt, ok=True)
+                return response
+            except Exception as e:
+                delay = self._next_delay(e, attempt, started)
+                if delay is None:
+                    self._record(kwargs.get("model"), started, attempt, ok=False)
+                    raise
+                logger.warning(f"LLM call failed ({type(e).__name__}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def astream_chat_completion(self, **kwargs) -> AsyncIterator[str]:
+        """Stream a chat completion's text as it is generated
+
+        Failures before the first token are retried with the shared policy;
+        once text has been yielded the call can no longer be retried and
+        errors propagate to the caller.
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            yielded = False
+            try:
+                stream = await self.async_client.chat.completions.create(
+                    timeout=self._attempt_timeout(started), stream=True, **kwargs
+                )
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        yielded = True
+                        yield delta
+                self._record(kwargs.get("model"), started, attempt, ok=True)
+                return
+            except Exception as e:
+                delay = None if yielded else self._next_delay(e, attempt, started)
+                if delay is None:
+                    self._record(kwargs.get("model"), started, attempt, ok=False)
+                    raise
+                logger.warning(f"LLM stream failed ({type(e).__name__}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def _attempt_timeout(self, started: float) -> float:
+        """Per-attempt timeout: the pool timeout, capped by the remaining budget"""
+        remaining = self.retry_policy.time_budget - (time.monotonic() - started)
+        return max(1.0, min(self.pool.timeout, remaining))
+
+    def _next_delay(self, error: Exception, attempt: int, started: float) -> Optional[float]:
+        """Delay before the next attempt, or None if the call should fail now"""
+        if not is_retryable(error) or attempt >= self.retry_policy.max_attempts:
+            return None
+        delay = self.retry_policy.backoff(attempt, _retry_after(error))
+        elapsed = time.monotonic() - started
+        if elapsed + delay >= self.retry_policy.time_budget:
+            logger.warning(f"LLM retry budget of {self.retry_policy.time_budget}s exhausted")
+            return None
+        return delay
+
+    #######################
+    # Metrics
+    #######################
+
+    def _record(self, model: Optional[str], started: float, attempts: int, ok: bool) -> None:
+        latency_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["succeeded" if ok else "failed"] += 1
+            self._stats["retries"] += attempts - 1
+            self._stats["total_latency_ms"] += latency_ms
+            self._stats["max_latency_ms"] = max(self._stats["max_latency_ms"], latency_ms)
+            self._recent_calls.append({
+                "model": model,
+                "latency_ms": round(latency_ms, 2),
+                "attempts": attempts,
+                "ok": ok,
+            })
+        logger.info(f"LLM call model={model} ok={ok} attempts={attempts} latency_ms={latency_ms:.0f}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregate call, retry and latency counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_latency_ms"] = round(stats["total_latency_ms"] / stats["calls"], 2) if stats["calls"] else 0.0
+        stats["total_latency_ms"] = round(stats["total_latency_ms"], 2)
+        stats["max_latency_ms"] = round(stats["max_latency_ms"], 2)
+        return stats
+
+    def recent_calls(self) -> List[Dict[str, Any]]:
+        """Latency and attempt count of the most recent calls"""
+        with self._lock:
+            return list(self._recent_calls)
+
+    #######################
+    # Lifecycle
+    #######################
+
+    def close(self) -> None:
+        """Close the sync client's connection pool"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self) -> None:
+        """Close both clients' connection pools"""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+        self.close()
+
+# Process-wide manager
+_llm_client_manager = None
+_manager_lock = threading.Lock()
+
+def _env_number(name: str, default, cast=float):
+    try:
+        return cast(os.getenv(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid {name} value, using default: {default}")
+        return default
+
+def get_llm_client() -> LLMClientManager:
+    """Get or create the process-wide LLM client manager from environment settings"""
+    global _llm_client_manager
+    if _llm_client_manager is None:
+        with _manager_lock:
+            if _llm_client_manager is None:
+                pool = PoolConfig(
+                    max_connections=_env_number("LLM_MAX_CONNECTIONS", 20, int),
+                    max_keepalive_connections=_env_number("LLM_MAX_KEEPALIVE_CONNECTIONS", 10, int),
+                    keepalive_expiry=_env_number("LLM_KEEPALIVE_EXPIRY", 30.0),
+                    timeout=_env_number("LLM_TIMEOUT", 60.0),
+                )
+                retry_policy = RetryPolicy(
+                    max_attempts=_env_number("LLM_MAX_ATTEMPTS", 4, int),
+                    initial_backoff=_env_number("LLM_INITIAL_BACKOFF", 1.0),
+                    max_backoff=_env_number("LLM_MAX_BACKOFF", 20.0),
+                    time_budget=_env_number("LLM_RETRY_BUDGET", 180.0),
+                )
+                _llm_client_manager = LLMClientManager(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    pool=pool,
+                    retry_policy=retry_policy,
+                    base_url=os.getenv("OPENAI_BASE_URL") or None,
+                )
+    return _llm_client_manager
+
+async def close_llm_client() -> None:
+    """Close the process-wide manager's connection pools"""
+    global _llm_client_manager
+    if _llm_client_manager is not None:
+        await _llm_client_manager.aclose()
+        _llm_client_manager = None
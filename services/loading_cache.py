@@ -0,0 +1,121 @@
+"""
+Loading Cache Module
+
+Small in-process TTL cache keyed by string, filled by a loader function.
+Loads are single-flight: concurrent misses for one key share a single call
+to the loader. Entries expire after a TTL and can be dropped explicitly;
+an invalidation that lands while a load is in flight keeps the (possibly
+stale) result of that load out of the cache.
+
+Used for per-user settings (settings_cache) and authenticated principals
+(auth_service). The cache is per process, so other workers only see a
+change once their own entry expires.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Generic, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+class LoadingCache(Generic[V]):
+    """TTL cache with single-flight loading"""
+
+    def __init__(self, loader: Callable[[str], V], ttl: float, name: str = "cache"):
+        """Initialize the cache
+
+        Args:
+            loader: Fetches the value for one key
+            ttl: Seconds a loaded value is served before it is fetched again
+            name: Label used in log messages
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self.name = name
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, V]] = {}
+        self._loading: Dict[str, Future] = {}
+        self._stats = {"hits": 0, "loads": 0, "shared_loads": 0, "invalidations": 0}
+
+    def peek(self, key: str, default: Any = _MISSING) -> Any:
+        """Cached value for key without loading it
+
+        Returns:
+            The value when a fresh entry exists, otherwise default (which
+            defaults to a sentinel, so a cached None is distinguishable)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._stats["hits"] += 1
+                return entry[1]
+        return default
+
+    def get(self, key: str) -> V:
+        """Value for key, loading it on a miss
+
+        Whatever the loader returns is cached, None included. A failed load
+        is not cached; every caller waiting on it gets the exception.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._stats["hits"] += 1
+                return entry[1]
+            future = self._loading.get(key)
+            leader = future is None
+            if leader:
+                future = self._loading[key] = Future()
+                self._stats["loads"] += 1
+            else:
+                self._stats["shared_loads"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = self.loader(key)
+        except BaseException as e:
+            with self._lock:
+                if self._loading.get(key) is future:
+                    del self._loading[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            # An invalidation during the load removed our future; don't cache stale data
+            if self._loading.get(key) is future:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                del self._loading[key]
+        future.set_result(value)
+        return value
+
+    def invalidate(self, key: str) -> None:
+        """Forget a key; the next get loads it again"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._loading.pop(key, None)
+            self._stats["invalidations"] += 1
+        logger.debug(f"Invalidated {self.name} entry for {key}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._loading.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and current size"""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats["hits"] + stats["loads"] + stats["shared_loads"]
+        stats["hit_rate"] = round((lookups - stats["loads"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+def is_missing(value: Any) -> bool:
+    """True when a peek found no fresh entry"""
+    return value is _MISSING
@@ -0,0 +1,636 @@
+"""
+Neo4j Queries Module
+
+Cypher statements and record-shaping helpers shared by the synchronous
+Neo4jService and the AsyncNeo4jService, so both drivers run exactly the
+same queries and return exactly the same shapes.
+"""
+
+from typing import Dict, Any, List
+
+#######################
+# Connection
+#######################
+
+CHECK_CONNECTION = "RETURN 1"
+
+#######################
+# Users
+#######################
+
+# A user and its original (EmailLookup) email in one round trip
+USER_BY_ID = """
+    MATCH (u:User {userId: $userId})
+    OPTIONAL MATCH (e:EmailLookup {userId: $userId})
+    RETURN u, e.email AS email
+    LIMIT 1
+"""
+
+USER_BY_EMAIL = """
+    MATCH (e:EmailLookup {email: $email})
+    MATCH (u:User {userId: e.userId})
+    RETURN u, e.email AS email
+    LIMIT 1
+"""
+
+# Tokens issued before tokens_valid_after (epoch seconds) are rejected
+REVOKE_USER_TOKENS = """
+    MATCH (u:User {userId: $userId})
+    SET u.tokens_valid_after = $validAfter
+    RETURN u.userId AS userId
+"""
+
+USER_SETTINGS = """
+    MATCH (u:User {userId: $user_id})-[:HAS_SETTINGS]->(s:UserSettings)
+    RETURN s
+"""
+
+UPDATE_USER_SETTINGS = """
+    MATCH (u:User {userId: $user_id})-[:HAS_SETTINGS]->(s:UserSettings)
+    SET s += $settings,
+        s.updated_at = $timestamp
+    RETURN s
+"""
+
+CREATE_USER_SETTINGS = """
+    MATCH (u:User {userId: $user_id})
+    CREATE (s:UserSettings {
+        id: $settings_id,
+        created_at: $timestamp,
+        updated_at: $timestamp
+    })
+    SET s += $settings
+    CREATE (u)-[r:HAS_SETTINGS {created_at: $timestamp}]->(s)
+    RETURN s
+"""
+
+USER_SESSIONS = """
+    MATCH (u:User {userId: $user_id})-[:HAS_SESSION]->(s:Session)
+    RETURN s
+    ORDER BY s.created_at DESC
+"""
+
+# One page of a user's session list, newest first, without the transcript.
+# Keyset pagination on (created_at, id): the page starts strictly after the
+# cursor row, so only the user's sessions are compared and only one page is
+# returned. created_at is coalesced to a string, so legacy sessions without
+# one still appear (last) and can be paged past. The first page passes null
+# cursor values and is not filtered at all. Served by the session_user_id
+# index; element counts are degree lookups rather than element fetches.
+USER_SESSION_SUMMARIES = """
+    MATCH (s:Session)
+    WHERE s.userId = $user_id
+    WITH s, coalesce(toString(s.created_at), '') AS created_at
+    WHERE $before_created_at IS NULL
+       OR created_at < $before_created_at
+       OR (created_at = $before_created_at AND s.id < $before_id)
+    ORDER BY created_at DESC, s.id DESC
+    LIMIT $limit
+    RETURN s {
+        .id,
+        .title,
+        .date,
+        .description,
+        .status,
+        .analysis_status,
+        .userId,
+        created_at: created_at,
+        .updated_at,
+        transcript_length: coalesce(s.transcript_length, size(coalesce(s.transcript, ''))),
+        element_counts: {
+            emotions: size([(s)-[:HAS_EMOTION]->() | 1]),
+            insights: size([(s)-[:HAS_INSIGHT]->() | 1]),
+            beliefs: size([(s)-[:HAS_BELIEF]->() | 1]),
+            challenges: size([(s)-[:HAS_CHALLENGE]->() | 1]),
+            action_items: size([(s)-[:HAS_ACTION_ITEM]->() | 1])
+        }
+    } as session
+"""
+
+# With the transcript store enabled (services.transcript_store) the text is
+# there and s.transcript is null; otherwise it is inline in s.transcript
+SESSION_TRANSCRIPT = """
+    MATCH (s:Session {id: $session_id})
+    RETURN s.userId as userId, s.transcript_ref as transcript_ref, s.transcript as transcript
+"""
+
+# Which of $transcript_refs some session still refers to, for the store's sweep
+TRANSCRIPT_REFS_IN_USE = """
+    UNWIND $transcript_refs AS ref
+    MATCH (s:Session {transcript_ref: ref})
+    RETURN collect(DISTINCT ref) as in_use
+"""
+
+INLINE_TRANSCRIPTS = """
+    MATCH (s:Session)
+    WHERE s.transcript <> '' AND s.transcript_ref IS NULL
+    RETURN s.id as session_id, s.transcript as transcript
+    LIMIT $limit
+"""
+
+MOVE_INLINE_TRANSCRIPTS = """
+    UNWIND $rows AS row
+    MATCH (s:Session {id: row.session_id})
+    WHERE s.transcript_ref IS NULL
+    SET s.transcript_ref = row.transcript_ref,
+        s.transcript_length = row.transcript_length
+    REMOVE s.transcript
+"""
+
+#######################
+# Sessions
+#######################
+
+LAST_SESSION_FOR_USER = """
+    MATCH (u:User {userId: $user_id})-[:HAS_SESSION]->(s:Session {isLastSession: true})
+    RETURN s.id as previous_session_id
+"""
+
+LINK_NEXT_SESSION = """
+    MATCH (prev:Session {id: $prev_id})
+    MATCH (next:Session {id: $next_id})
+    MERGE (prev)-[r:NEXT_SESSION]->(next)
+    ON CREATE SET r.created_at = $timestamp
+"""
+
+CLEAR_LAST_SESSION = """
+    MATCH (s:Session {isLastSession: true})
+    SET s.isLastSession = false
+"""
+
+CREATE_SESSION_NODE = """
+    MATCH (u:User {userId: $user_id})
+    CREATE (s:Session {
+        id: $session_id,
+        title: $title,
+        date: $date,
+        description: $description,
+        transcript: $transcript,
+        transcript_ref: $transcript_ref,
+        transcript_length: $transcript_length,
+        status: $status,
+        analysis_status: $analysis_status,
+        created_at: $created_at,
+        updated_at: $updated_at,
+        userId: $user_id
+    })
+    CREATE (u)-[r:HAS_SESSION {created_at: $timestamp, updated_at: $timestamp}]->(s)
+    RETURN s.id as session_id
+"""
+
+# Pattern comprehensions count each element type on its own; chained
+# OPTIONAL MATCHes would build the product of all of them first. Each HAS_*
+# relationship is one element of the session.
+SESSION_DELETE_SUMMARY = """
+    MATCH (s:Session {id: $session_id})
+    RETURN s.title as title,
+           size([(s)-[:HAS_EMOTION]->(e:Emotion) | e]) as emotions_count,
+           size([(s)-[:HAS_INSIGHT]->(i:Insight) | i]) as insights_count,
+           size([(s)-[:HAS_BELIEF]->(b:Belief) | b]) as beliefs_count,
+           size([(s)-[:HAS_CHALLENGE]->(c:Challenge) | c]) as challenges_count,
+           size([(s)-[:HAS_ACTION_ITEM]->(a:ActionItem) | a]) as action_items_count
+"""
+
+DELETE_SESSION = """
+    MATCH (s:Session {id: $session_id})
+
+    // Count relationships before deletion for logging
+    OPTIONAL MATCH (s)-[r]-()
+    WITH s, count(r) as relationship_count
+
+    // Delete all relationships connected to the session
+    DETACH DELETE s
+
+    RETURN relationship_count
+"""
+
+SESSION_DATA = """
+    MATCH (s:Session {id: $session_id})
+    RETURN s {
+        .id,
+        .title,
+        .date,
+        .description,
+        .duration,
+        .status,
+        .analysis_status,
+        .transcript_ref,
+        transcript_length: coalesce(s.transcript_length, size(coalesce(s.transcript, ''))),
+        .userId,
+        .created_at,
+        .updated_at
+    } as session
+"""
+
+# One row per session: each element type is gathered by its own pattern
+# comprehension, with that element's topics nested inside it, so the cost is
+# linear in the number of elements instead of the product of all of them.
+SESSION_WITH_RELATIONSHIPS = """
+    MATCH (s:Session {id: $session_id})
+    RETURN
+        s,
+        [(s)-[re:HAS_EMOTION]->(e:Emotion) | {
+            emotion: e,
+            relationship: re,
+            topics: [(e)-[ret:RELATED_TO]->(et:Topic) | {topic: et, topic_relationship: ret}]
+        }] as emotions,
+
+        [(s)-[ri:HAS_INSIGHT]->(i:Insight) | {
+            insight: i,
+            relationship: ri,
+            topics: [(i)-[rit:RELATED_TO]->(it:Topic) | {topic: it, topic_relationship: rit}]
+        }] as insights,
+
+        [(s)-[rb:HAS_BELIEF]->(b:Belief) | {
+            belief: b,
+            relationship: rb,
+            topics: [(b)-[rbt:RELATED_TO]->(bt:Topic) | {topic: bt, topic_relationship: rbt}]
+        }] as beliefs,
+
+        [(s)-[rc:HAS_CHALLENGE]->(c:Challenge) | {
+            challenge: c,
+            relationship: rc,
+            topics: [(c)-[rct:RELATED_TO]->(ct:Topic) | {topic: ct, topic_relationship: rct}]
+        }] as challenges,
+
+        [(s)-[ra:HAS_ACTION_ITEM]->(a:ActionItem) | {
+            action_item: a,
+            relationship: ra,
+            topics: [(a)-[rat:RELATED_TO]->(at:Topic) | {topic: at, topic_relationship: rat}]
+        }] as action_items,
+
+        // Adjacent sessions in sequence
+        head([(prev:Session)-[:NEXT_SESSION]->(s) | prev]) as prev,
+        head([(s)-[:NEXT_SESSION]->(next:Session) | next]) as next
+"""
+
+# Element nodes per type, gathered like SESSION_WITH_RELATIONSHIPS; a node
+# linked more than once is listed once by build_session_analysis
+SESSION_ANALYSIS = """
+    MATCH (s:Session {id: $session_id})
+    RETURN s,
+           [(s)-[:HAS_EMOTION]->(e:Emotion) | e] as emotions,
+           [(s)-[:HAS_INSIGHT]->(i:Insight) | i] as insights,
+           [(s)-[:HAS_BELIEF]->(b:Belief) | b] as beliefs,
+           [(s)-[:HAS_CHALLENGE]->(c:Challenge) | c] as challenges,
+           [(s)-[:HAS_ACTION_ITEM]->(a:ActionItem) | a] as action_items
+"""
+
+UPDATE_SESSION_TRANSCRIPT = """
+    MATCH (s:Session {id: $session_id})
+    SET s.transcript = $transcript,
+        s.transcript_ref = $transcript_ref,
+        s.transcript_length = $transcript_length,
+        s.updated_at = $updated_at
+    RETURN s.id as session_id
+"""
+
+#######################
+# Bulk writes
+#######################
+
+# Links the element bound to `el` to each of row.topics. Used inside the
+# per-type subqueries of SAVE_SESSION_ANALYSIS so links are made through the
+# merged node itself, not by re-matching on a freshly generated id.
+_LINK_ROW_TOPICS = """
+        WITH el, row
+        UNWIND row.topics AS topic_name
+        MERGE (t:Topic {name: topic_name})
+        ON CREATE SET t.id = 'T_' + randomUUID(), t.created_at = $timestamp, t.updated_at = $timestamp
+        ON MATCH SET t.updated_at = $timestamp
+        MERGE (el)-[tr:RELATED_TO]->(t)
+        ON CREATE SET tr.relevance = $relevance,
+                      tr.created_at = $timestamp,
+                      tr.updated_at = $timestamp,
+                      tr.modified_by = 'system'
+"""
+
+_ANALYSIS_SESSION = """
+    MATCH (s:Session {id: $session_id})
+    SET s.analysis_status = 'completed',
+        s.analysis_timestamp = $timestamp,
+        s.updated_at = $timestamp
+"""
+
+# Inserts every row of $emotions, $beliefs, $insights, $challenges and
+# $action_items (the element_rows.analysis_to_rows format) for session `s`
+_INSERT_ELEMENT_ROWS = """
+    CALL {
+        WITH s
+        UNWIND $emotions AS row
+        MERGE (el:Emotion {name: row.name, user_id: $user_id})
+        ON CREATE SET el.id = row.id, el.created_at = $timestamp, el.updated_at = $timestamp
+        ON MATCH SET el.updated_at = $timestamp
+        CREATE (s)-[:HAS_EMOTION {
+            intensity: row.intensity,
+            context: row.context,
+            timestamp: null,
+            confidence: 0,
+            created_at: $timestamp,
+            updated_at: $timestamp,
+            modified_by: 'system'
+        }]->(el)
+""" + _LINK_ROW_TOPICS + """
+    }
+
+    CALL {
+        WITH s
+        UNWIND $beliefs AS row
+        MERGE (el:Belief {text: row.text, user_id: $user_id})
+        ON CREATE SET el.id = row.id, el.name = row.name, el.created_at = $timestamp, el.updated_at = $timestamp
+        ON MATCH SET el.updated_at = $timestamp, el.name = row.name
+        CREATE (s)-[:HAS_BELIEF {
+            impact: row.impact,
+            timestamp: null,
+            confidence: 0,
+            created_at: $timestamp,
+            updated_at: $timestamp,
+            modified_by: 'system'
+        }]->(el)
+""" + _LINK_ROW_TOPICS + """
+    }
+
+    CALL {
+        WITH s
+        UNWIND $insights AS row
+        MERGE (el:Insight {name: row.name, user_id: $user_id})
+        ON CREATE SET el.id = row.id, el.text = row.text, el.created_at = $timestamp, el.updated_at = $timestamp
+        ON MATCH SET el.updated_at = $timestamp, el.text = row.text
+        CREATE (s)-[:HAS_INSIGHT {
+            context: row.context,
+            timestamp: null,
+            confidence: 0,
+            created_at: $timestamp,
+            updated_at: $timestamp,
+            modified_by: 'system'
+        }]->(el)
+""" + _LINK_ROW_TOPICS + """
+    }
+
+    CALL {
+        WITH s
+        UNWIND $challenges AS row
+        MERGE (el:Challenge {name: row.name, user_id: $user_id})
+        ON CREATE SET el.id = row.id, el.text = row.text, el.created_at = $timestamp, el.updated_at = $timestamp
+        ON MATCH SET el.updated_at = $timestamp, el.text = row.text
+        CREATE (s)-[:HAS_CHALLENGE {
+            impact: row.impact,
+            severity: row.severity,
+            timestamp: null,
+            confidence: 0,
+            created_at: $timestamp,
+            updated_at: $timestamp,
+            modified_by: 'system'
+        }]->(el)
+""" + _LINK_ROW_TOPICS + """
+    }
+
+    CALL {
+        WITH s
+        UNWIND $action_items AS row
+        MERGE (el:ActionItem {id: row.id})
+        SET el += row.properties
+        MERGE (s)-[r:HAS_ACTION_ITEM]->(el)
+        ON CREATE SET r += {
+            priority: 'medium',
+            status: row.status,
+            due_date: null,
+            context: '',
+            created_at: $timestamp,
+            updated_at: $timestamp,
+            modified_by: 'system'
+        }
+        ON MATCH SET r += {
+            priority: 'medium',
+            status: row.status,
+            due_date: null,
+            context: '',
+            updated_at: $timestamp,
+            modified_by: 'system'
+        }
+""" + _LINK_ROW_TOPICS + """
+    }
+"""
+
+SAVE_SESSION_ANALYSIS = _ANALYSIS_SESSION + _INSERT_ELEMENT_ROWS + """
+    RETURN s.id AS session_id
+"""
+
+# Streamed analyses insert elements as they arrive and set the session's
+# analysis status once, with SET_ANALYSIS_STATUS, when the stream ends
+INSERT_SESSION_ELEMENTS = """
+    MATCH (s:Session {id: $session_id})
+""" + _INSERT_ELEMENT_ROWS + """
+    RETURN s.id AS session_id
+"""
+
+SET_ANALYSIS_STATUS = """
+    MATCH (s:Session {id: $session_id})
+    SET s.analysis_status = $status,
+        s.analysis_timestamp = $timestamp,
+        s.updated_at = $timestamp
+    RETURN s.id AS session_id
+"""
+
+# Intensities of $emotions (element_rows format) already linked to the
+# session, for streamed emotions repeated later at a higher intensity
+UPDATE_SESSION_EMOTION_INTENSITIES = """
+    UNWIND $emotions AS row
+    MATCH (s:Session {id: $session_id})-[r:HAS_EMOTION]->(el:Emotion {name: row.name, user_id: $user_id})
+    WHERE coalesce(r.context, '') = coalesce(row.context, '')
+    SET r.intensity = row.intensity,
+        r.updated_at = $timestamp
+    RETURN count(r) AS updated
+"""
+
+# Current elements of a session in the element_rows format, keyed by the
+# HAS_* relationship they hang off, for diffing against submitted elements
+SESSION_ELEMENT_STATE = """
+    MATCH (s:Session {id: $session_id})
+    RETURN
+        [(s)-[r:HAS_EMOTION]->(e:Emotion) | {
+            rel_id: elementId(r), id: e.id, name: e.name,
+            intensity: r.intensity, context: r.context,
+            topics: [(e)-[:RELATED_TO]->(t:Topic) | t.name]
+        }] as emotions,
+        [(s)-[r:HAS_BELIEF]->(b:Belief) | {
+            rel_id: elementId(r), id: b.id, name: b.name, text: b.text,
+            impact: r.impact,
+            topics: [(b)-[:RELATED_TO]->(t:Topic) | t.name]
+        }] as beliefs,
+        [(s)-[r:HAS_INSIGHT]->(i:Insight) | {
+            rel_id: elementId(r), id: i.id, name: i.name, text: i.text,
+            context: r.context,
+            topics: [(i)-[:RELATED_TO]->(t:Topic) | t.name]
+        }] as insights,
+        [(s)-[r:HAS_CHALLENGE]->(c:Challenge) | {
+            rel_id: elementId(r), id: c.id, name: c.name, text: c.text,
+            impact: r.impact, severity: r.severity,
+            topics: [(c)-[:RELATED_TO]->(t:Topic) | t.name]
+        }] as challenges,
+        [(s)-[r:HAS_ACTION_ITEM]->(a:ActionItem) | {
+            rel_id: elementId(r), id: a.id, name: a.name, text: a.text,
+            description: a.description, status: r.status,
+            topics: [(a)-[:RELATED_TO]->(t:Topic) | t.name]
+        }] as action_items
+"""
+
+# Applies an element_rows.diff_rows result: removes $deletes relationships,
+# updates the session's own $updates relationships in place, then inserts the
+# remaining rows. Shared element nodes are only written through the MERGEs of
+# the insert path.
+UPDATE_SESSION_ELEMENTS = _ANALYSIS_SESSION + """
+    CALL {
+        WITH s
+        UNWIND $deletes AS rel_id
+        MATCH (s)-[r]->()
+        WHERE elementId(r) = rel_id
+        DELETE r
+    }
+
+    CALL {
+        WITH s
+        UNWIND $updates AS row
+        MATCH (s)-[r]->()
+        WHERE elementId(r) = row.rel_id
+        SET r += row.rel_props, r.updated_at = $timestamp
+    }
+""" + _INSERT_ELEMENT_ROWS + """
+    RETURN s.id AS session_id
+"""
+
+#######################
+# Record shaping
+#######################
+
+def serialize_record(record) -> Dict[str, Any]:
+    """Convert a query record into plain dictionaries (used by run_query)"""
+    record_dict = {}
+    for key, value in record.items():
+        # Handle Neo4j Node objects by converting to dict
+        if hasattr(value, 'items'):
+            record_dict[key] = dict(value)
+        # Handle Neo4j Relationship objects
+        elif hasattr(value, 'start_node'):
+            record_dict[key] = {
+                'start': dict(value.start_node),
+                'end': dict(value.end_node),
+                'type': value.type,
+                'properties': dict(value)
+            }
+        # Handle primitive types and lists
+        else:
+            record_dict[key] = value
+    return record_dict
+
+def _topic_dict(item) -> Dict[str, Any]:
+    """Shape a {topic, topic_relationship} pair into a topic dict"""
+    topic_dict = dict(item["topic"])
+
+    # Add topic relationship properties if useful
+    topic_rel = item.get("topic_relationship")
+    if topic_rel:
+        topic_rel_dict = dict(topic_rel)
+        if "relevance" in topic_rel_dict:
+            topic_dict["relevance"] = topic_rel_dict["relevance"]
+
+    return topic_dict
+
+def process_elements_with_topics(elements_data, element_type) -> List[Dict[str, Any]]:
+    """Process element data with topics from query results
+
+    Every element carries all of its topics in "topics"; "topic" keeps the
+    first one for callers that expect a single topic.
+    """
+    results = []
+
+    for item in elements_data:
+        element = item.get(element_type)
+        if not element:
+            continue
+
+        # Create element dictionary with properties
+        element_dict = dict(element)
+
+        # Add relationship properties
+        rel = item.get("relationship")
+        if rel:
+            for key, value in dict(rel).items():
+                if key not in ["created_at", "updated_at"] and key not in element_dict:
+                    element_dict[key] = value
+
+        # Add topics if present
+        topics = [_topic_dict(t) for t in item.get("topics") or [] if t.get("topic")]
+        if topics:
+            element_dict["topics"] = topics
+            element_dict["topic"] = topics[0]
+
+        results.append(element_dict)
+
+    return results
+
+def build_session_with_relationships(record) -> Dict[str, Any]:
+    """Shape a SESSION_WITH_RELATIONSHIPS record into the session dict"""
+    session_data = dict(record["s"])
+
+    # Process adjacent sessions
+    if record["prev"]:
+        session_data["previous_session"] = {
+            "id": record["prev"]["id"],
+            "title": record["prev"].get("title", ""),
+            "date": record["prev"].get("date", "")
+        }
+
+    if record["next"]:
+        session_data["next_session"] = {
+            "id": record["next"]["id"],
+            "title": record["next"].get("title", ""),
+            "date": record["next"].get("date", "")
+        }
+
+    # Process elements and their topics
+    session_data["emotions"] = process_elements_with_topics(record["emotions"], "emotion")
+    session_data["insights"] = process_elements_with_topics(record["insights"], "insight")
+    session_data["beliefs"] = process_elements_with_topics(record["beliefs"], "belief")
+    session_data["challenges"] = process_elements_with_topics(record["challenges"], "challenge")
+    session_data["actionitems"] = process_elements_with_topics(record["action_items"], "action_item")
+
+    # Collect all unique topics, by name
+    all_topics = {}
+
+    for element_type in ["emotions", "insights", "beliefs", "challenges", "actionitems"]:
+        for item in session_data[element_type]:
+            for topic in item.get("topics", []):
+                all_topics.setdefault(topic.get("name"), topic)
+
+    session_data["topics"] = list(all_topics.values())
+
+    return session_data
+
+def _distinct_nodes(nodes) -> List[Dict[str, Any]]:
+    """Properties of each node, in order, skipping repeats of the same node"""
+    seen = set()
+    distinct = []
+    for node in nodes:
+        if node is None or node.element_id in seen:
+            continue
+        seen.add(node.element_id)
+        distinct.append(dict(node))
+    return distinct
+
+def build_session_analysis(session_id: str, record) -> Dict[str, Any]:
+    """Shape a SESSION_ANALYSIS record into the analysis summary dict"""
+    session_data = dict(record['s'])
+
+    # Organize elements by type
+    analysis_results = {
+        key: _distinct_nodes(record[key])
+        for key in ('emotions', 'insights', 'beliefs', 'challenges', 'action_items')
+    }
+
+    return {
+        'session_id': session_id,
+        'status': session_data.get('status'),
+        'analysis_status': session_data.get('analysis_status'),
+        'elements': analysis_results
+    }
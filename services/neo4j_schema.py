@@ -0,0 +1,234 @@
+"""
+Neo4j Schema Module
+
+Idempotent management of the constraints and indexes behind every lookup key
+the services MATCH or MERGE on. Without them each lookup is a label scan that
+grows with the graph.
+
+Run at application startup (see main.py), from initialize_db.py, or directly:
+
+    python -m services.neo4j_schema           # create anything missing
+    python -m services.neo4j_schema --check   # report only, exit 1 if missing
+"""
+
+import argparse
+import logging
+import sys
+from typing import Dict, Any, List, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (name, label, properties) for uniqueness constraints on identifying keys
+CONSTRAINTS: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ("session_id_unique", "Session", ("id",)),
+    ("user_user_id_unique", "User", ("userId",)),
+    ("email_lookup_email_unique", "EmailLookup", ("email",)),
+    ("topic_taxonomy_name_unique", "TopicTaxonomy", ("name",)),
+    ("emotion_taxonomy_name_unique", "EmotionTaxonomy", ("name",)),
+    ("action_item_id_unique", "ActionItem", ("id",)),
+]
+
+# (name, label, properties) for range indexes on non-unique lookup keys.
+# Topic.name is not unique: add_topic merges topics per user.
+INDEXES: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ("topic_name", "Topic", ("name",)),
+    ("session_is_last_session", "Session", ("isLastSession",)),
+    ("session_user_id", "Session", ("userId",)),
+    ("session_user_id_created_at", "Session", ("userId", "created_at")),
+    ("session_transcript_ref", "Session", ("transcript_ref",)),
+    ("email_lookup_user_id", "EmailLookup", ("userId",)),
+    ("user_email", "User", ("email",)),
+    ("emotion_name_user_id", "Emotion", ("name", "user_id")),
+    ("insight_name_user_id", "Insight", ("name", "user_id")),
+    ("challenge_name_user_id", "Challenge", ("name", "user_id")),
+    ("belief_text_user_id", "Belief", ("text", "user_id")),
+    ("emotion_id", "Emotion", ("id",)),
+    ("insight_id", "Insight", ("id",)),
+    ("belief_id", "Belief", ("id",)),
+    ("challenge_id", "Challenge", ("id",)),
+]
+
+SHOW_CONSTRAINTS = "SHOW CONSTRAINTS YIELD name, type, labelsOrTypes, properties"
+SHOW_INDEXES = "SHOW INDEXES YIELD name, type, labelsOrTypes, properties, state"
+AWAIT_INDEXES = "CALL db.awaitIndexes($timeout)"
+
+def _property_list(properties: Iterable[str]) -> str:
+    return ", ".join(f"n.{prop}" for prop in properties)
+
+def constraint_statement(name: str, label: str, properties: Tuple[str, ...]) -> str:
+    """Build an idempotent CREATE CONSTRAINT statement"""
+    if len(properties) == 1:
+        target = f"n.{properties[0]}"
+    else:
+        target = f"({_property_list(properties)})"
+    return f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE {target} IS UNIQUE"
+
+def index_statement(name: str, label: str, properties: Tuple[str, ...]) -> str:
+    """Build an idempotent CREATE INDEX statement"""
+    return f"CREATE INDEX {name} IF NOT EXISTS FOR (n:{label}) ON ({_property_list(properties)})"
+
+def schema_statements() -> List[str]:
+    """All statements needed to bring a database up to the expected schema"""
+    return [statement for _, statement in _named_statements()]
+
+def find_missing(constraint_rows: List[Dict[str, Any]], index_rows: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Compare SHOW CONSTRAINTS / SHOW INDEXES rows against the expected schema.
+
+    Items are matched on label and property list rather than name, so an
+    equivalent constraint or index created under another name still counts.
+    A uniqueness constraint's backing index also satisfies an index entry.
+
+    Returns:
+        Dict with the names of missing "constraints" and "indexes"
+    """
+    unique_keys = {
+        (tuple(row.get("labelsOrTypes") or []), tuple(row.get("properties") or []))
+        for row in constraint_rows
+        if "UNIQUE" in (row.get("type") or "")
+    }
+    index_keys = unique_keys | {
+        (tuple(row.get("labelsOrTypes") or []), tuple(row.get("properties") or []))
+        for row in index_rows
+        if row.get("type") != "LOOKUP" and row.get("state", "ONLINE") != "FAILED"
+    }
+
+    return {
+        "constraints": [
+            name for name, label, properties in CONSTRAINTS
+            if ((label,), tuple(properties)) not in unique_keys
+        ],
+        "indexes": [
+            name for name, label, properties in INDEXES
+            if ((label,), tuple(properties)) not in index_keys
+        ],
+    }
+
+def check_schema(driver) -> Dict[str, List[str]]:
+    """Report which expected constraints and indexes are missing"""
+    with driver.session() as session:
+        constraint_rows = [record.data() for record in session.run(SHOW_CONSTRAINTS)]
+        index_rows = [record.data() for record in session.run(SHOW_INDEXES)]
+    return find_missing(constraint_rows, index_rows)
+
+def ensure_schema(driver, timeout: int = 300) -> Dict[str, Any]:
+    """Create any missing constraints and indexes, then verify them.
+
+    Args:
+        driver: A neo4j.Driver
+        timeout: Seconds to wait for new indexes to come online
+
+    Each statement runs on its own; a failure is logged and recorded, and the
+    remaining items are still created.
+
+    Returns:
+        Dict with the "created" item names, the "failed" items (name,
+        statement and error) and anything still "missing"
+    """
+    missing_before = check_schema(driver)
+    to_create = set(missing_before["constraints"]) | set(missing_before["indexes"])
+
+    failed: List[Dict[str, str]] = []
+    with driver.session() as session:
+        for name, statement in _named_statements():
+            if name not in to_create:
+                continue
+            logger.info(f"Creating schema item {name}")
+            try:
+                session.run(statement).consume()
+            except Exception as e:
+                failed.append(_failure(name, statement, e))
+        if len(failed) < len(to_create):
+            try:
+                session.run(AWAIT_INDEXES, timeout=timeout).consume()
+            except Exception as e:
+                failed.append(_failure("await_indexes", AWAIT_INDEXES, e))
+
+    missing_after = check_schema(driver)
+    return _report(to_create, missing_after, failed)
+
+async def ensure_schema_async(driver, timeout: int = 300) -> Dict[str, Any]:
+    """Async variant of ensure_schema for a neo4j.AsyncDriver"""
+    async with driver.session() as session:
+        missing_before = await _check_schema_async(session)
+        to_create = set(missing_before["constraints"]) | set(missing_before["indexes"])
+
+        failed: List[Dict[str, str]] = []
+        for name, statement in _named_statements():
+            if name not in to_create:
+                continue
+            logger.info(f"Creating schema item {name}")
+            try:
+                await (await session.run(statement)).consume()
+            except Exception as e:
+                failed.append(_failure(name, statement, e))
+        if len(failed) < len(to_create):
+            try:
+                await (await session.run(AWAIT_INDEXES, timeout=timeout)).consume()
+            except Exception as e:
+                failed.append(_failure("await_indexes", AWAIT_INDEXES, e))
+
+        missing_after = await _check_schema_async(session)
+    return _report(to_create, missing_after, failed)
+
+async def _check_schema_async(session) -> Dict[str, List[str]]:
+    result = await session.run(SHOW_CONSTRAINTS)
+    constraint_rows = await result.data()
+    result = await session.run(SHOW_INDEXES)
+    index_rows = await result.data()
+    return find_missing(constraint_rows, index_rows)
+
+def _named_statements() -> List[Tuple[str, str]]:
+    return (
+        [(item[0], constraint_statement(*item)) for item in CONSTRAINTS] +
+        [(item[0], index_statement(*item)) for item in INDEXES]
+    )
+
+def _failure(name: str, statement: str, error: Exception) -> Dict[str, str]:
+    # One bad item (e.g. a constraint over duplicate data) must not stop the rest
+    logger.warning(f"Could not create schema item {name}: {str(error)}")
+    return {"name": name, "statement": statement, "error": str(error)}
+
+def _report(attempted: Iterable[str], missing: Dict[str, List[str]],
+            failed: List[Dict[str, str]]) -> Dict[str, Any]:
+    failed_names = {item["name"] for item in failed}
+    report = {
+        "created": sorted(name for name in attempted if name not in failed_names),
+        "failed": failed,
+        "missing": missing,
+    }
+    if missing["constraints"] or missing["indexes"]:
+        logger.warning(f"Neo4j schema incomplete: {missing}")
+    else:
+        logger.info(f"Neo4j schema verified ({len(report['created'])} items created)")
+    return report
+
+def main(argv: List[str] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Create and verify Neo4j constraints and indexes")
+    parser.add_argument("--check", action="store_true",
+                        help="only report missing items; exit 1 if anything is missing")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from . import get_neo4j_service
+    driver = get_neo4j_service().driver
+
+    if args.check:
+        missing = check_schema(driver)
+    else:
+        report = ensure_schema(driver)
+        missing = report["missing"]
+        for item in report["failed"]:
+            print(f"failed: {item['name']}: {item['error']}")
+
+    for name in missing["constraints"]:
+        print(f"missing constraint: {name}")
+    for name in missing["indexes"]:
+        print(f"missing index: {name}")
+    if not missing["constraints"] and not missing["indexes"]:
+        print("Neo4j schema is complete")
+        return 0
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
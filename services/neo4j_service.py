@@ -19,6 +19,10 @@ from .errors import (
     ServiceError, DatabaseError, ValidationError,
     NotFoundError, handle_error
 )
+from . import neo4j_queries as queries
+from . import element_rows
+from .user_repository import UserRepository
+from .transcript_store import get_transcript_store, read_session_transcript
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -34,6 +38,7 @@ class Neo4jService:
         self.password = password
         self.driver = None
         self._ensure_driver()
+        self.users = UserRepository(self)
     
     async def initialize(self):
         """Initialize the Neo4j driver (kept for backwards compatibility)"""
@@ -50,7 +55,7 @@ class Neo4jService:
         """Check if the connection to Neo4j is working"""
         try:
             with self.driver.session() as session:
-                result = session.run("RETURN 1")
+                result = session.run(queries.CHECK_CONNECTION)
                 return bool(result.single())
         except Exception as e:
             self.logger.error(f"Connection check failed: {str(e)}")
@@ -109,6 +114,19 @@ class Neo4jService:
         """Get current timestamp in ISO format"""
         return datetime.now().isoformat()
 
+    def _store_transcript(self, transcript: Optional[str]) -> Dict[str, Any]:
+        """Return the transcript properties of a Session node
+
+        With the transcript store enabled the text goes to the store and the
+        node keeps its transcript_ref; otherwise the node keeps the text.
+        """
+        store = get_transcript_store()
+        if not transcript or store is None:
+            return {"transcript": transcript or "", "transcript_ref": None,
+                    "transcript_length": len(transcript or "")}
+        ref = store.put(transcript)
+        return {"transcript": None, "transcript_ref": ref.digest, "transcript_length": ref.length}
+
     #######################
     # User Management
     #######################
@@ -174,22 +192,8 @@ class Neo4jService:
     def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Get a user by their email address using the EmailLookup node"""
         try:
-            with self.driver.session() as session:
-                # First find the userId from EmailLookup
-                result = session.run("""
-                    MATCH (e:EmailLookup {email: $email})
-                    RETURN e.userId as userId
-                """, email=email)
-                
-                record = result.single()
-                if not record:
-                    return None
-                    
-                user_id = record["userId"]
-                
-                # Then get the user by ID
-                return self.get_user_by_id(user_id)
-                
+            user = self.users.get_by_email(email)
+            return user.as_dict() if user else None
         except Exception as e:
             logger.error(f"Error getting user by email: {str(e)}")
             return None
@@ -197,38 +201,8 @@ class Neo4jService:
     def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get a user by their ID"""
         try:
-            with self.driver.session() as session:
-                # Get user data
-                result = session.run(
-                    "MATCH (u:User {userId: $userId}) RETURN u",
-                    userId=user_id
-                )
-                record = result.single()
-                if not record:
-                    return None
-                    
-                user = record["u"]
-                
-                # Get original email from EmailLookup if needed for responses
-                lookup_result = session.run(
-                    "MATCH (e:EmailLookup {userId: $userId}) RETURN e.email as email",
-                    userId=user_id
-                )
-                lookup_record = lookup_result.single()
-                display_email = lookup_record["email"] if lookup_record else user["email"]
-                
-                return {
-                    "userId": user["userId"],
-                    "name": user["name"],  # This is hashed 
-                    "email": display_email,  # Use original for display/API responses
-                    "hashed_email": user["email"],  # Keep the hashed version
-                    "password_hash": user.get("password_hash"),
-                    "is_admin": user.get("is_admin", False),
-                    "status": user.get("status", "active"),
-                    "disabled": user.get("disabled", False),
-                    "last_login": user.get("last_login"),
-                    "created_at": user.get("created_at")
-                }
+            user = self.users.get_by_id(user_id)
+            return user.as_dict() if user else None
         except Exception as e:
             logger.error(f"Error getting user by ID: {str(e)}")
             return None
@@ -277,38 +251,20 @@ class Neo4jService:
         try:
             with self.driver.session() as session:
                 # Check if settings already exist
-                result = session.run("""
-                    MATCH (u:User {userId: $user_id})-[:HAS_SETTINGS]->(s:UserSettings)
-                    RETURN s
-                """, user_id=user_id)
+                result = session.run(queries.USER_SETTINGS, user_id=user_id)
                 
                 record = result.single()
                 
                 # Update existing settings
                 if record:
-                    result = session.run("""
-                        MATCH (u:User {userId: $user_id})-[:HAS_SETTINGS]->(s:UserSettings)
-                        SET s += $settings,
-                            s.updated_at = $timestamp
-                        RETURN s
-                    """, 
+                    result = session.run(queries.UPDATE_USER_SETTINGS,
                     user_id=user_id,
                     settings=settings_data,
                     timestamp=datetime.now().isoformat())
                 # Create new settings
                 else:
                     settings_id = self._generate_id("S")
-                    result = session.run("""
-                        MATCH (u:User {userId: $user_id})
-                        CREATE (s:UserSettings {
-                            id: $settings_id,
-                            created_at: $timestamp,
-                            updated_at: $timestamp
-                        })
-                        SET s += $settings
-                        CREATE (u)-[r:HAS_SETTINGS {created_at: $timestamp}]->(s)
-                        RETURN s
-                    """, 
+                    result = session.run(queries.CREATE_USER_SETTINGS,
                     user_id=user_id,
                     settings_id=settings_id,
                     settings=settings_data,
@@ -323,10 +279,7 @@ class Neo4jService:
         """Get user settings from Neo4j"""
         try:
             with self.driver.session() as session:
-                result = session.run("""
-                    MATCH (u:User {userId: $user_id})-[:HAS_SETTINGS]->(s:UserSettings)
-                    RETURN s
-                """, user_id=user_id)
+                result = session.run(queries.USER_SETTINGS, user_id=user_id)
                 
                 record = result.single()
                 if record:
@@ -349,11 +302,7 @@ class Neo4jService:
         """Get all sessions for a user"""
         try:
             with self.driver.session() as session:
-                result = session.run("""
-                    MATCH (u:User {userId: $user_id})-[:HAS_SESSION]->(s:Session)
-                    RETURN s
-                    ORDER BY s.created_at DESC
-                """, user_id=user_id)
+                result = session.run(queries.USER_SESSIONS, user_id=user_id)
                 
                 sessions = []
                 for record in result:
@@ -422,10 +371,7 @@ class Neo4jService:
 
             with self.driver.session() as session:
                 # 1. Find the current LastSession before creating a new one
-                result = session.run("""
-                    MATCH (u:User {userId: $user_id})-[:HAS_SESSION]->(s:Session {isLastSession: true})
-                    RETURN s.id as previous_session_id
-                """, user_id=user_id)
+                result = session.run(queries.LAST_SESSION_FOR_USER, user_id=user_id)
                 
                 record = result.single()
                 previous_session_id = record["previous_session_id"] if record else None
@@ -439,12 +385,7 @@ class Neo4jService:
                 # 3. If there was a previous session, create the NEXT_SESSION relationship
                 if previous_session_id:
                     self.logger.info(f"Linking previous session {previous_session_id} to new session {new_session_id}")
-                    session.run("""
-                        MATCH (prev:Session {id: $prev_id})
-                        MATCH (next:Session {id: $next_id})
-                        MERGE (prev)-[r:NEXT_SESSION]->(next)
-                        ON CREATE SET r.created_at = $timestamp
-                    """, 
+                    session.run(queries.LINK_NEXT_SESSION,
                     prev_id=previous_session_id,
                     next_id=new_session_id,
                     timestamp=datetime.now().isoformat())
@@ -459,10 +400,7 @@ class Neo4jService:
         try:
             with self.driver.session() as session:
                 # First, find and update the previous LastSession
-                session.run("""
-                    MATCH (s:Session {isLastSession: true})
-                    SET s.isLastSession = false
-                """)
+                session.run(queries.CLEAR_LAST_SESSION)
                 
                 # Prepare session data
                 session_id = self._generate_id("S")
@@ -471,34 +409,18 @@ class Neo4jService:
                 self.logger.info(f"Creating session node with data: {session_data}")
                 
                 # Create new session and create HAS_SESSION relationship from User to Session
-                result = session.run("""
-                    MATCH (u:User {userId: $user_id})
-                    CREATE (s:Session {
-                        id: $session_id,
-                        title: $title,
-                        date: $date,
-                        description: $description,
-                        transcript: $transcript,
-                        status: $status,
-                        analysis_status: $analysis_status,
-                        created_at: $created_at,
-                        updated_at: $updated_at,
-                        userId: $user_id
-                    })
-                    CREATE (u)-[r:HAS_SESSION {created_at: $timestamp, updated_at: $timestamp}]->(s)
-                    RETURN s.id as session_id
-                """, 
+                result = session.run(queries.CREATE_SESSION_NODE,
                 user_id=user_id, 
                 session_id=session_id,
                 title=session_data.get('title', ''),
                 date=session_data.get('date', ''),
                 description=session_data.get('description', ''),
-                transcript=session_data.get('transcript', ''),
                 status=session_data.get('status', 'pending'),
                 analysis_status=session_data.get('analysis_status', 'pending'),
                 created_at=session_data.get('created_at', ''),
                 updated_at=session_data.get('updated_at', ''),
-                timestamp=datetime.now().isoformat()
+                timestamp=datetime.now().isoformat(),
+                **self._store_transcript(session_data.get('transcript'))
                 )
                 
                 record = result.single()
@@ -521,20 +443,7 @@ class Neo4jService:
                 self.logger.info(f"Deleting session node {session_id} while preserving analysis elements")
                 
                 # Get session info before deletion for logging
-                session_info = session.run("""
-                    MATCH (s:Session {id: $session_id})
-                    OPTIONAL MATCH (s)-[:HAS_EMOTION]->(e:Emotion)
-                    OPTIONAL MATCH (s)-[:HAS_INSIGHT]->(i:Insight)
-                    OPTIONAL MATCH (s)-[:HAS_BELIEF]->(b:Belief)
-                    OPTIONAL MATCH (s)-[:HAS_CHALLENGE]->(c:Challenge)
-                    OPTIONAL MATCH (s)-[:HAS_ACTION_ITEM]->(a:ActionItem)
-                    RETURN s.title as title, 
-                           count(DISTINCT e) as emotions_count,
-                           count(DISTINCT i) as insights_count,
-                           count(DISTINCT b) as beliefs_count,
-                           count(DISTINCT c) as challenges_count,
-                           count(DISTINCT a) as action_items_count
-                """, session_id=session_id).single()
+                session_info = session.run(queries.SESSION_DELETE_SUMMARY, session_id=session_id).single()
                 
                 if session_info:
                     self.logger.info(f"Deleting session '{session_info['title']}' with "
@@ -547,18 +456,7 @@ class Neo4jService:
                 
                 # Delete only the session node and its direct relationships
                 # This removes the session but keeps all analysis elements intact
-                result = session.run("""
-                    MATCH (s:Session {id: $session_id})
-                    
-                    // Count relationships before deletion for logging
-                    OPTIONAL MATCH (s)-[r]-()
-                    WITH s, count(r) as relationship_count
-                    
-                    // Delete all relationships connected to the session
-                    DETACH DELETE s
-                    
-                    RETURN relationship_count
-                """, session_id=session_id)
+                result = session.run(queries.DELETE_SESSION, session_id=session_id)
                 
                 record = result.single()
                 if record:
@@ -578,22 +476,7 @@ class Neo4jService:
         """Get session data from Neo4j"""
         try:
             with self.driver.session() as session:
-                result = session.run("""
-                    MATCH (s:Session {id: $session_id})
-                    RETURN s {
-                        .id,
-                        .title,
-                        .date,
-                        .description,
-                        .duration,
-                        .status,
-                        .analysis_status,
-                        .transcript,
-                        .userId,
-                        .created_at,
-                        .updated_at
-                    } as session
-                """, session_id=session_id)
+                result = session.run(queries.SESSION_DATA, session_id=session_id)
                 
                 record = result.single()
                 if record:
@@ -604,159 +487,41 @@ class Neo4jService:
             self.logger.error(f"Error getting session data: {str(e)}")
             return None
 
+    def get_session_transcript(self, session_id: str, **ranges) -> Optional[Dict[str, Any]]:
+        """Get a session's owner and transcript, or None if the session doesn't exist
+
+        Args:
+            session_id: Session to read
+            **ranges: start/end (byte offsets) or start_time/end_time (seconds)
+                to read only part of the transcript
+
+        Returns:
+            Dict with userId and transcript
+        """
+        with self.driver.session() as session:
+            record = session.run(queries.SESSION_TRANSCRIPT, session_id=session_id).single()
+        if not record:
+            return None
+        return {"userId": record["userId"], "transcript": read_session_transcript(record, **ranges)}
+
     def get_session_with_relationships(self, session_id: str) -> Dict[str, Any]:
         """Get a session with all its relationships and elements"""
         try:
             with self.driver.session() as session:
                 # Enhanced query to get all session elements with their related topics
-                result = session.run("""
-                    MATCH (s:Session {id: $session_id})
-                    
-                    // Get all emotions and their topics
-                    OPTIONAL MATCH (s)-[re:HAS_EMOTION]->(e:Emotion)
-                    OPTIONAL MATCH (e)-[ret:RELATED_TO]->(et:Topic)
-                    
-                    // Get all insights and their topics
-                    OPTIONAL MATCH (s)-[ri:HAS_INSIGHT]->(i:Insight)
-                    OPTIONAL MATCH (i)-[rit:RELATED_TO]->(it:Topic)
-                    
-                    // Get all beliefs and their topics
-                    OPTIONAL MATCH (s)-[rb:HAS_BELIEF]->(b:Belief)
-                    OPTIONAL MATCH (b)-[rbt:RELATED_TO]->(bt:Topic)
-                    
-                    // Get all challenges and their topics
-                    OPTIONAL MATCH (s)-[rc:HAS_CHALLENGE]->(c:Challenge)
-                    OPTIONAL MATCH (c)-[rct:RELATED_TO]->(ct:Topic)
-                    
-                    // Get all action items and their topics
-                    OPTIONAL MATCH (s)-[ra:HAS_ACTION_ITEM]->(a:ActionItem)
-                    OPTIONAL MATCH (a)-[rat:RELATED_TO]->(at:Topic)
-                    
-                    // Adjacent sessions in sequence
-                    OPTIONAL MATCH (prev:Session)-[:NEXT_SESSION]->(s)
-                    OPTIONAL MATCH (s)-[:NEXT_SESSION]->(next:Session)
-                    
-                    // Return everything
-                    RETURN 
-                        s,
-                        collect(DISTINCT {
-                            emotion: e, 
-                            relationship: re,
-                            topic: et, 
-                            topic_relationship: ret
-                        }) as emotions,
-                        
-                        collect(DISTINCT {
-                            insight: i, 
-                            relationship: ri,
-                            topic: it, 
-                            topic_relationship: rit
-                        }) as insights,
-                        
-                        collect(DISTINCT {
-                            belief: b, 
-                            relationship: rb,
-                            topic: bt, 
-                            topic_relationship: rbt
-                        }) as beliefs,
-                        
-                        collect(DISTINCT {
-                            challenge: c, 
-                            relationship: rc,
-                            topic: ct, 
-                            topic_relationship: rct
-                        }) as challenges,
-                        
-                        collect(DISTINCT {
-                            action_item: a, 
-                            relationship: ra,
-                            topic: at, 
-                            topic_relationship: rat
-                        }) as action_items,
-                        
-                        prev,
-                        next
-                """, session_id=session_id)
+                result = session.run(queries.SESSION_WITH_RELATIONSHIPS, session_id=session_id)
                 
                 record = result.single()
                 if not record:
                     return None
                 
-                session_data = dict(record["s"])
-                
-                # Process adjacent sessions
-                if record["prev"]:
-                    session_data["previous_session"] = {
-                        "id": record["prev"]["id"],
-                        "title": record["prev"].get("title", ""),
-                        "date": record["prev"].get("date", "")
-                    }
-                
-                if record["next"]:
-                    session_data["next_session"] = {
-                        "id": record["next"]["id"],
-                        "title": record["next"].get("title", ""),
-                        "date": record["next"].get("date", "")
-                    }
-                
-                # Process elements and their topics
-                session_data["emotions"] = self._process_elements_with_topics(record["emotions"], "emotion")
-                session_data["insights"] = self._process_elements_with_topics(record["insights"], "insight")
-                session_data["beliefs"] = self._process_elements_with_topics(record["beliefs"], "belief")
-                session_data["challenges"] = self._process_elements_with_topics(record["challenges"], "challenge")
-                session_data["actionitems"] = self._process_elements_with_topics(record["action_items"], "action_item")
-                
-                # Collect all unique topics
-                all_topics = set()
-                
-                for element_type in ["emotions", "insights", "beliefs", "challenges", "actionitems"]:
-                    for item in session_data[element_type]:
-                        if "topic" in item and item["topic"]:
-                            topic_tuple = tuple(sorted(item["topic"].items()))
-                            all_topics.add(topic_tuple)
-                
-                session_data["topics"] = [dict(t) for t in all_topics]
-                
-                return session_data
+                return queries.build_session_with_relationships(record)
         except Exception as e:
             self._handle_error(e, "get_session_with_relationships")
     
     def _process_elements_with_topics(self, elements_data, element_type):
         """Process element data with topics from query results"""
-        results = []
-        
-        for item in elements_data:
-            element = item.get(element_type)
-            if not element:
-                continue
-                
-            # Create element dictionary with properties
-            element_dict = dict(element)
-            
-            # Add relationship properties
-            rel = item.get("relationship")
-            if rel:
-                for key, value in dict(rel).items():
-                    if key not in ["created_at", "updated_at"] and key not in element_dict:
-                        element_dict[key] = value
-            
-            # Add topic if present
-            topic = item.get("topic")
-            if topic:
-                topic_dict = dict(topic)
-                
-                # Add topic relationship properties if useful
-                topic_rel = item.get("topic_relationship")
-                if topic_rel:
-                    topic_rel_dict = dict(topic_rel)
-                    if "relevance" in topic_rel_dict:
-                        topic_dict["relevance"] = topic_rel_dict["relevance"]
-                
-                element_dict["topic"] = topic_dict
-            
-            results.append(element_dict)
-        
-        return results
+        return queries.process_elements_with_topics(elements_data, element_type)
 
     #######################
     # Element Management
@@ -1603,138 +1368,56 @@ class Neo4jService:
         Returns:
             bool: True if successful, False otherwise
         """
+        report = self.bulk_save_session_analysis(session_id, analysis_data, user_id)
+        return report["success"]
+
+    def bulk_save_session_analysis(self, session_id: str, analysis_data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+        """
+        Persist a whole analysis in one UNWIND-based write transaction.
+        
+        All five element types and their topic links are sent as parameter
+        lists, so the write costs a single round trip regardless of how many
+        elements the analysis produced.
+        
+        Args:
+            session_id (str): The ID of the session to save analysis for
+            analysis_data (dict): The analysis data from the analysis service
+            user_id (str): The user ID
+            
+        Returns:
+            dict: Write report with success, round_trips, elapsed_ms and counts
+        """
         try:
             self.logger.info(f"Saving analysis for session {session_id}")
             
-            # Helper function to extract topic name from topic object or string
-            def extract_topic_name(topic):
-                if isinstance(topic, dict):
-                    return topic.get('name', 'Personal Growth')
-                elif isinstance(topic, str):
-                    return topic
-                else:
-                    return 'Personal Growth'
-            
-            # 1. Update session with analysis status
-            with self.driver.session() as session:
-                session.run("""
-                    MATCH (s:Session {id: $session_id})
-                    SET s.analysis_status = 'completed',
-                        s.analysis_timestamp = $timestamp,
-                        s.updated_at = $timestamp
-                """, 
-                session_id=session_id,
-                timestamp=datetime.now().isoformat())
-            
-            # 2. Process emotions
-            if "Emotions" in analysis_data:
-                for emotion in analysis_data["Emotions"]:
-                    # Format: [name, intensity, context, topics]
-                    topics = emotion[3] if len(emotion) > 3 else []
-                    if isinstance(topics, list):
-                        topic_names = [extract_topic_name(t) for t in topics]
-                    else:
-                        topic_names = [extract_topic_name(topics)]
-                    
-                    emotion_data = {
-                        "name": emotion[0],  # name
-                        "intensity": float(emotion[1]),  # intensity
-                        "context": emotion[2],  # context
-                        "topics": topic_names,
-                        "user_id": user_id,
-                        "isUserModified": False
-                    }
-                    self.add_emotion_to_session(session_id, emotion_data)
+            timestamp = datetime.now().isoformat()
+            rows = element_rows.analysis_to_rows(analysis_data, user_id, timestamp)
             
-            # 3. Process beliefs
-            if "Beliefs" in analysis_data:
-                for belief in analysis_data["Beliefs"]:
-                    # Format: [id, name, text, impact, topics]
-                    topics = belief[4] if len(belief) > 4 else []
-                    if isinstance(topics, list):
-                        topic_names = [extract_topic_name(t) for t in topics]
-                    else:
-                        topic_names = [extract_topic_name(topics)]
-                    
-                    belief_data = {
-                        "name": belief[1],  # name
-                        "text": belief[2],  # text
-                        "impact": belief[3],  # impact
-                        "topics": topic_names,
-                        "user_id": user_id,
-                        "isUserModified": False
-                    }
-                    self.add_belief_to_session(session_id, belief_data)
-            
-            # 4. Process action items
-            if "actionitems" in analysis_data:
-                for actionitem in analysis_data["actionitems"]:
-                    # Format: [id, name, description, topics, status]
-                    topics = actionitem[3] if len(actionitem) > 3 else []
-                    if isinstance(topics, list):
-                        topic_names = [extract_topic_name(t) for t in topics]
-                    else:
-                        topic_names = [extract_topic_name(topics)]
-                    
-                    action_data = {
-                        "name": actionitem[1],  # name
-                        "text": actionitem[2],  # description
-                        "impact": "Action item identified from session analysis",
-                        "topics": topic_names,
-                        "user_id": user_id,
-                        "isUserModified": False,
-                        "status": actionitem[4] if len(actionitem) > 4 else "hasn't started"  # status
-                    }
-                    self.add_action_item_to_session(session_id, action_data)
+            def _write(tx):
+                result = tx.run(queries.SAVE_SESSION_ANALYSIS,
+                    session_id=session_id,
+                    user_id=user_id,
+                    timestamp=timestamp,
+                    relevance=element_rows.DEFAULT_RELEVANCE,
+                    **rows)
+                return result.single()
             
-            # 5. Process insights
-            if "Insights" in analysis_data:
-                for insight in analysis_data["Insights"]:
-                    # Format: [name, text, context, topics]
-                    topics = insight[3] if len(insight) > 3 else []
-                    if isinstance(topics, list):
-                        topic_names = [extract_topic_name(t) for t in topics]
-                    else:
-                        topic_names = [extract_topic_name(topics)]
-                    
-                    insight_data = {
-                        "name": insight[0],  # name
-                        "text": insight[1],  # text
-                        "context": insight[2],  # context
-                        "topics": topic_names,
-                        "user_id": user_id,
-                        "isUserModified": False
-                    }
-                    self.add_insight_to_session(session_id, insight_data)
+            started = time.perf_counter()
+            with self.driver.session() as session:
+                record = session.execute_write(_write)
+            elapsed = time.perf_counter() - started
             
-            # 6. Process challenges
-            if "Challenges" in analysis_data:
-                for challenge in analysis_data["Challenges"]:
-                    # Format: [name, text, impact, topics]
-                    topics = challenge[3] if len(challenge) > 3 else []
-                    if isinstance(topics, list):
-                        topic_names = [extract_topic_name(t) for t in topics]
-                    else:
-                        topic_names = [extract_topic_name(topics)]
-                    
-                    challenge_data = {
-                        "name": challenge[0],  # name
-                        "text": challenge[1],  # text
-                        "impact": challenge[2],  # impact
-                        "topics": topic_names,
-                        "user_id": user_id,
-                        "isUserModified": False,
-                        "severity": "",  # Default empty severity
-                        "status": "active"
-                    }
-                    self.add_challenge_to_session(session_id, challenge_data)
+            if not record:
+                self.logger.error(f"Session {session_id} not found, analysis not saved")
+                return element_rows.write_report(session_id, rows, elapsed, success=False,
+                                                 error="Session not found")
             
-            self.logger.info(f"Successfully saved analysis for session {session_id}")
-            return True
+            report = element_rows.write_report(session_id, rows, elapsed)
+            self.logger.info(f"Successfully saved analysis for session {session_id}: {report}")
+            return report
             
         except Exception as e:
             self._handle_error(e, "save_session_analysis")
-            return False
 
     def get_all_taxonomies(self):
         """
@@ -1912,6 +1595,17 @@ class Neo4jService:
             self._handle_error(e, "change_user_password")
             return False
 
+    def revoke_user_tokens(self, user_id: str, valid_after: float) -> bool:
+        """Reject the user's tokens issued before valid_after (epoch seconds)"""
+        try:
+            with self.driver.session() as session:
+                result = session.run(queries.REVOKE_USER_TOKENS, userId=user_id, validAfter=valid_after)
+                return result.single() is not None
+        except Exception as e:
+            logger.error(f"Error revoking user tokens: {str(e)}")
+            self._handle_error(e, "revoke_user_tokens")
+            return False
+
     def update_admin_settings(self, settings_id: str, settings_data: Dict[str, Any]) -> bool:
         """Update admin settings"""
         try:
@@ -2114,110 +1808,62 @@ class Neo4jService:
             logging.error(f"Error updating session status: {str(e)}")
             return False
 
-    def update_session_with_elements(self, session_id: str, elements: Dict[str, Any], user_id: str) -> bool:
+    def update_session_with_elements(self, session_id: str, elements: Dict[str, Any], user_id: str):
         """
         Update a session with extracted elements efficiently - only update modified items.
         
+        The submitted elements are the full desired state of the session. They
+        are diffed against the stored elements by id or content hash, and only
+        the inserts, updates and deletes are written, in one transaction.
+        
         Args:
             session_id: ID of the session to update
             elements: Dictionary containing extracted elements OR formatted analysis data
             user_id: ID of the user who owns the session
         
         Returns:
-            bool: True if successful, False otherwise
+            dict: Counts of inserted/updated/deleted/unchanged elements (overall
+            and under "by_type"), or False if the update failed
         """
         try:
             self.logger.info(f"Starting efficient update for session {session_id}")
-            self.logger.info(f"Elements received: {elements}")
             
-            # Verify session exists
-            session = self.get_session_data(session_id)
-            if not session:
-                self.logger.error(f"Session {session_id} not found")
-                return False
-
-            # Simple approach: Clear existing relationships and recreate all
-            # This is simpler than tracking individual changes and ensures consistency
-            self.logger.info(f"Clearing existing analysis relationships for session {session_id}")
-            with self.driver.session() as session_db:
-                result = session_db.run("""
-                    MATCH (s:Session {id: $session_id})
-                    OPTIONAL MATCH (s)-[r:HAS_EMOTION]->(e:Emotion)
-                    OPTIONAL MATCH (s)-[r2:HAS_INSIGHT]->(i:Insight)
-                    OPTIONAL MATCH (s)-[r3:HAS_BELIEF]->(b:Belief)
-                    OPTIONAL MATCH (s)-[r4:HAS_CHALLENGE]->(c:Challenge)
-                    OPTIONAL MATCH (s)-[r5:HAS_ACTION_ITEM]->(a:ActionItem)
-                    DELETE r, r2, r3, r4, r5
-                    RETURN count(r) + count(r2) + count(r3) + count(r4) + count(r5) as deleted_relationships
-                """, session_id=session_id)
+            timestamp = datetime.now().isoformat()
+            desired = element_rows.analysis_to_rows(
+                element_rows.to_analysis_data(elements), user_id, timestamp
+            )
+            
+            def _update(tx):
+                record = tx.run(queries.SESSION_ELEMENT_STATE, session_id=session_id).single()
+                if not record:
+                    return None
                 
-                deletion_result = result.single()
-                self.logger.info(f"Deleted {deletion_result['deleted_relationships']} relationships")
+                diff = element_rows.diff_rows(record.data(), desired)
+                if diff["deletes"] or diff["updates"] or any(diff["inserts"].values()):
+                    tx.run(queries.UPDATE_SESSION_ELEMENTS,
+                        session_id=session_id,
+                        user_id=user_id,
+                        timestamp=timestamp,
+                        relevance=element_rows.DEFAULT_RELEVANCE,
+                        deletes=diff["deletes"],
+                        updates=diff["updates"],
+                        **diff["inserts"]).consume()
+                return diff["counts"]
+            
+            with self.driver.session() as session_db:
+                counts = session_db.execute_write(_update)
             
-            # Check if we're receiving already formatted analysis data or raw elements
-            if any(key in elements for key in ['Emotions', 'Beliefs', 'actionitems', 'Insights', 'Challenges']):
-                # Already formatted data from the analysis route
-                analysis_data = elements
-                self.logger.info("Using pre-formatted analysis data")
-            else:
-                # Raw elements from frontend, need to format
-                analysis_data = {}
-                
-                # Format emotions: [name, intensity, context, topic, timestamp]
-                if "emotions" in elements:
-                    analysis_data["Emotions"] = [
-                        [e["name"], e.get("intensity", 3), e.get("context", ""), e.get("topic", "Personal Growth")]
-                        for e in elements["emotions"]
-                    ]
-                    self.logger.info(f"Formatted {len(analysis_data['Emotions'])} emotions")
-                
-                # Format beliefs: [id, name, description, impact, topic, timestamp]
-                if "beliefs" in elements:
-                    analysis_data["Beliefs"] = [
-                        [b.get("id", str(uuid.uuid4())), b["name"], b.get("description", ""), b.get("impact", "Medium"), b.get("topic", "Personal Growth")]
-                        for b in elements["beliefs"]
-                    ]
-                    self.logger.info(f"Formatted {len(analysis_data['Beliefs'])} beliefs")
-                
-                # Format action items: [id, name, description, topic, status]
-                if "action_items" in elements:
-                    analysis_data["actionitems"] = [
-                        [a.get("id", str(uuid.uuid4())), a["name"], a.get("description", ""), a.get("topic", "Personal Growth"), a.get("status", "hasn't started")]
-                        for a in elements["action_items"]
-                    ]
-                    self.logger.info(f"Formatted {len(analysis_data['actionitems'])} action items")
-                
-                # Format challenges: [name, text, impact, topic]
-                if "challenges" in elements:
-                    analysis_data["Challenges"] = [
-                        [c["name"], c.get("description", ""), c.get("impact", "Medium"), c.get("topic", "Personal Growth")]
-                        for c in elements["challenges"]
-                    ]
-                    self.logger.info(f"Formatted {len(analysis_data['Challenges'])} challenges")
-                
-                # Format insights: [name, text, context, topic]
-                if "insights" in elements:
-                    analysis_data["Insights"] = [
-                        [i["name"], i.get("description", ""), i.get("context", ""), i.get("topic", "Personal Growth")]
-                        for i in elements["insights"]
-                    ]
-                    self.logger.info(f"Formatted {len(analysis_data['Insights'])} insights")
-
-            self.logger.info(f"Calling save_session_analysis with data: {analysis_data}")
-            # Save analysis data and update session status
-            success = self.save_session_analysis(session_id, analysis_data, user_id)
-            if success:
-                self.logger.info(f"Successfully updated session {session_id} with elements")
-                return True
-            else:
-                self.logger.error(f"Failed to update session {session_id} with elements")
+            if counts is None:
+                self.logger.error(f"Session {session_id} not found")
                 return False
+            
+            changes = element_rows.total_changes(counts)
+            changes["by_type"] = counts
+            self.logger.info(f"Successfully updated session {session_id} with elements: {changes}")
+            return changes
                 
         except Exception as e:
             self.logger.error(f"Error updating session with elements: {str(e)}")
-            self.logger.error(f"Error type: {type(e)}")
-            import traceback
-            traceback.print_exc()
             return False
 
     def run_query(self, query: str, params: Dict[str, Any] = None) -> Optional[List[Dict[str, Any]]]:
@@ -2238,27 +1884,7 @@ class Neo4jService:
                 result = session.run(query, parameters=params or {})
                 
                 # Convert results to a list of dictionaries
-                records = []
-                for record in result:
-                    # Convert each record to a dictionary
-                    record_dict = {}
-                    for key, value in record.items():
-                        # Handle Neo4j Node objects by converting to dict
-                        if hasattr(value, 'items'):
-                            record_dict[key] = dict(value)
-                        # Handle Neo4j Relationship objects
-                        elif hasattr(value, 'start_node'):
-                            record_dict[key] = {
-                                'start': dict(value.start_node),
-                                'end': dict(value.end_node),
-                                'type': value.type,
-                                'properties': dict(value)
-                            }
-                        # Handle primitive types and lists
-                        else:
-                            record_dict[key] = value
-                    
-                    records.append(record_dict)
+                records = [queries.serialize_record(record) for record in result]
                 
                 return records
         except Exception as e:
@@ -2270,41 +1896,12 @@ class Neo4jService:
         try:
             with self.driver.session() as session:
                 # Get the session node with its analysis data and elements
-                result = session.run("""
-                    MATCH (s:Session {id: $session_id})
-                    OPTIONAL MATCH (s)-[:HAS_EMOTION]->(e:Emotion)
-                    OPTIONAL MATCH (s)-[:HAS_INSIGHT]->(i:Insight)
-                    OPTIONAL MATCH (s)-[:HAS_BELIEF]->(b:Belief)
-                    OPTIONAL MATCH (s)-[:HAS_CHALLENGE]->(c:Challenge)
-                    OPTIONAL MATCH (s)-[:HAS_ACTION_ITEM]->(a:ActionItem)
-                    RETURN s,
-                           collect(DISTINCT e) as emotions,
-                           collect(DISTINCT i) as insights,
-                           collect(DISTINCT b) as beliefs,
-                           collect(DISTINCT c) as challenges,
-                           collect(DISTINCT a) as action_items
-                """, session_id=session_id).single()
+                result = session.run(queries.SESSION_ANALYSIS, session_id=session_id).single()
                 
                 if not result:
                     return None
-                    
-                session_data = dict(result['s'])
-                
-                # Organize elements by type
-                analysis_results = {
-                    'emotions': [dict(e) for e in result['emotions'] if e is not None],
-                    'insights': [dict(i) for i in result['insights'] if i is not None],
-                    'beliefs': [dict(b) for b in result['beliefs'] if b is not None],
-                    'challenges': [dict(c) for c in result['challenges'] if c is not None],
-                    'action_items': [dict(a) for a in result['action_items'] if a is not None]
-                }
                 
-                return {
-                    'session_id': session_id,
-                    'status': session_data.get('status'),
-                    'analysis_status': session_data.get('analysis_status'),
-                    'elements': analysis_results
-                }
+                return queries.build_session_analysis(session_id, result)
                 
         except Exception as e:
             self.logger.error(f"Error getting session analysis: {str(e)}")
@@ -2314,15 +1911,11 @@ class Neo4jService:
         """Update a session's transcript field"""
         try:
             with self.driver.session() as session:
-                result = session.run("""
-                    MATCH (s:Session {id: $session_id})
-                    SET s.transcript = $transcript,
-                        s.updated_at = $updated_at
-                    RETURN s.id as session_id
-                """,
+                stored = self._store_transcript(transcript)
+                result = session.run(queries.UPDATE_SESSION_TRANSCRIPT,
                 session_id=session_id,
-                transcript=transcript,
-                updated_at=datetime.now().isoformat()
+                updated_at=datetime.now().isoformat(),
+                **stored
                 )
                 
                 record = result.single()
@@ -0,0 +1,96 @@
+"""
+Password Hasher Module
+
+Password hashing and verification off the event loop. The key derivation
+(werkzeug scrypt or PBKDF2) costs tens of milliseconds of CPU per call; run
+inline in an async route, a burst of logins stalls every other request on
+the worker. Here the KDF runs in a bounded thread pool and the route awaits
+it. hashlib releases the GIL inside scrypt and pbkdf2_hmac, so threads hash
+in parallel without the pickling and start-up cost of a process pool.
+
+The KDF and its cost are set by PASSWORD_HASH_METHOD, in werkzeug's method
+syntax ("scrypt:32768:8:1", "pbkdf2:sha256:600000"). A stored hash made
+with other parameters still verifies; needs_rehash() tells the login path
+to replace it with one made with the current parameters.
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+# werkzeug 3's default; existing hashes use it, so they are not rehashed
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+class PasswordHasher:
+    """Hashes and verifies passwords in a worker pool"""
+
+    def __init__(self, method: str = PASSWORD_HASH_METHOD, max_workers: int = PASSWORD_HASH_WORKERS):
+        """Initialize the hasher
+
+        Args:
+            method: werkzeug hash method, including its cost parameters
+            max_workers: Threads running the KDF; more hashes wait in line
+        """
+        self.method = method
+        self.max_workers = max_workers
+        # werkzeug fills in default parameters ("scrypt" -> "scrypt:32768:8:1");
+        # hash once to learn the exact prefix new hashes carry
+        self.prefix = _method_of(generate_password_hash("", method))
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def hash_now(self, password: str) -> str:
+        """Hash on the calling thread (for synchronous code paths)"""
+        return generate_password_hash(password, self.method)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password in the pool"""
+        return await self._run(generate_password_hash, password, self.method)
+
+    async def verify(self, password_hash: Optional[str], password: str) -> bool:
+        """Check a password against a stored hash in the pool"""
+        if not password_hash:
+            return False
+        return await self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: Optional[str]) -> bool:
+        """True when the hash was not made with the current method and cost"""
+        return bool(password_hash) and _method_of(password_hash) != self.prefix
+
+    def close(self) -> None:
+        """Shut the pool down; the next call starts a new one"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+def _method_of(password_hash: str) -> str:
+    return password_hash.split("$", 1)[0]
+
+_password_hasher: Optional[PasswordHasher] = None
+
+def get_password_hasher() -> PasswordHasher:
+    """Process-wide password hasher"""
+    global _password_hasher
+    if _password_hasher is None:
+        _password_hasher = PasswordHasher()
+        logger.info(f"Password hashing with {_password_hasher.prefix} on {_password_hasher.max_workers} threads")
+    return _password_hasher
+
+def close_password_hasher() -> None:
+    """Shut down the process-wide hasher's pool"""
+    global _password_hasher
+    if _password_hasher is not None:
+        _password_hasher.close()
+        _password_hasher = None
@@ -0,0 +1,243 @@
+"""
+Result Cache Module
+
+Content-addressed cache for expensive, repeatable results such as LLM
+analyses. Keys are SHA-256 hashes of every input that affects the result;
+values are JSON-serializable. Backends are pluggable: an in-process LRU for a
+single worker, or a SQLite file that survives restarts and is shared by all
+workers on the host. Both evict by TTL and by entry count.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "analysis_cache.db")
+
+def cache_key(namespace: str, **parts: Any) -> str:
+    """Hash the inputs of a result into a stable cache key"""
+    content = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return f"{namespace}:{hashlib.sha256(content.encode('utf-8')).hexdigest()}"
+
+class CacheBackend(ABC):
+    """Storage interface for ResultCache"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> int:
+        """Store a value; returns the number of entries evicted to make room"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+class MemoryLRUBackend(CacheBackend):
+    """In-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> int:
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+class SQLiteBackend(CacheBackend):
+    """On-disk cache table; least recently used entries are evicted first"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_DB, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS cache (
+                       key TEXT PRIMARY KEY,
+                       value TEXT NOT NULL,
+                       expires_at REAL NOT NULL,
+                       last_access REAL NOT NULL
+                   )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float) -> int:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, default=str), now + ttl, now)
+                )
+                evicted = conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,)).rowcount
+                overflow = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    evicted += conn.execute(
+                        "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_access LIMIT ?)",
+                        (overflow,)
+                    ).rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return evicted
+
+    def delete(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache")
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+class ResultCache:
+    """TTL cache over a pluggable backend, with hit/miss counters"""
+
+    def __init__(self, backend: CacheBackend, ttl: float = 7 * 24 * 3600, name: str = "cache"):
+        """Initialize the cache
+
+        Args:
+            backend: Storage backend
+            ttl: Seconds an entry stays valid
+            name: Label used in logs and stats
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.name = name
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "errors": 0}
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[counter] += amount
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value, or None on a miss; backend errors count as misses"""
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"{self.name} read failed: {str(e)}")
+            self._count("errors")
+            value = None
+        self._count("hits" if value is not None else "misses")
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value; backend errors are logged and ignored"""
+        try:
+            evicted = self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning(f"{self.name} write failed: {str(e)}")
+            self._count("errors")
+            return
+        self._count("sets")
+        self._count("evictions", evicted)
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(key)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, hit rate and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["backend"] = type(self.backend).__name__
+        try:
+            stats["entries"] = len(self.backend)
+        except Exception:
+            stats["entries"] = None
+        return stats
+
+def create_backend(kind: str, path: str = DEFAULT_CACHE_DB, max_entries: int = 1000) -> Optional[CacheBackend]:
+    """Build a backend by name: "memory", "sqlite", or "off"/"none" for no cache"""
+    kind = (kind or "").lower()
+    if kind == "memory":
+        return MemoryLRUBackend(max_entries=max_entries)
+    if kind == "sqlite":
+        return SQLiteBackend(path=path, max_entries=max_entries)
+    if kind not in ("off", "none", ""):
+        logger.warning(f"Unknown cache backend '{kind}', caching disabled")
+    return None
@@ -0,0 +1,59 @@
+"""
+Settings Cache Module
+
+Per-user cache of the UserSettings node read by the analysis and
+transcription pipelines, so a request does not pay a Neo4j round trip just
+to learn which model to use. Entries expire after a TTL and are dropped
+explicitly when the user saves new settings. Loads are single-flight:
+concurrent requests for one user's settings share a single query (see
+loading_cache).
+
+The cache is per process. Another worker picks up a settings change when its
+entry expires, so keep SETTINGS_CACHE_TTL short.
+"""
+
+import logging
+import os
+from typing import Any, Callable, Dict, Optional
+
+from services.loading_cache import LoadingCache
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_CACHE_TTL = float(os.getenv("SETTINGS_CACHE_TTL", "300"))
+
+Settings = Optional[Dict[str, Any]]
+
+def _load_from_neo4j(user_id: str) -> Settings:
+    # Import here to avoid circular imports
+    from services import get_neo4j_service
+    return get_neo4j_service().get_user_settings(user_id)
+
+class SettingsCache(LoadingCache[Settings]):
+    """TTL cache of user settings with single-flight loading
+
+    Users without settings are cached too (as None), so defaults do not
+    cost a query either.
+    """
+
+    def __init__(self, loader: Callable[[str], Settings] = _load_from_neo4j, ttl: float = SETTINGS_CACHE_TTL):
+        """Initialize the cache
+
+        Args:
+            loader: Fetches one user's settings (None when the user has none)
+            ttl: Seconds a loaded value is served before it is fetched again
+        """
+        super().__init__(loader, ttl, name="settings")
+
+_settings_cache: Optional[SettingsCache] = None
+
+def get_settings_cache() -> SettingsCache:
+    """Process-wide settings cache"""
+    global _settings_cache
+    if _settings_cache is None:
+        _settings_cache = SettingsCache()
+    return _settings_cache
+
+def get_cached_user_settings(user_id: str) -> Settings:
+    """Shortcut for get_settings_cache().get(user_id)"""
+    return get_settings_cache().get(user_id)
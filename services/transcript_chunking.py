@@ -0,0 +1,205 @@
+"""
+Transcript Chunking Module
+
+Splits long transcripts into pieces that fit a token budget, for map-reduce
+analysis. Cuts are made between speaker turns or timestamped lines, falling
+back to sentence boundaries for unstructured text (such as a Whisper
+transcript, which is one long paragraph), so no statement is split in half.
+
+Also merges the elements extracted from each piece back into one result,
+deduplicating elements found in more than one piece while keeping every
+timestamp at which they occurred.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to a character estimate
+    _encoding = None
+
+# Approximate characters per token for English text when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+TIMESTAMP = re.compile(r"[\[(]?\b(\d{1,2}:\d{2}(?::\d{2})?)\b[\])]?")
+TURN_START = re.compile(r"^\s*(?:[\[(]?\d{1,2}:\d{2}(?::\d{2})?[\])]?|[A-Z][\w .'-]{0,40}:\s)")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+ELEMENT_TYPES = ("emotions", "beliefs", "action_items", "challenges", "insights")
+
+# ElementMerger.add outcomes
+NEW = "new"
+UPDATED = "updated"
+REPEATED = "repeated"
+
+def estimate_tokens(text: str) -> int:
+    """Token count of text (exact with tiktoken, estimated otherwise)"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+@dataclass
+class TranscriptChunk:
+    """One piece of a transcript"""
+    index: int
+    text: str
+    tokens: int
+    start: Optional[str] = None
+
+    def labelled(self, total: int) -> str:
+        """Chunk text prefixed with its position, so the model can place timestamps"""
+        position = f"Part {self.index + 1} of {total}"
+        if self.start:
+            position += f", starting at {self.start}"
+        return f"[{position}]\n{self.text}"
+
+def _turns(transcript: str) -> List[str]:
+    """Speaker turns or timestamped lines; sentences when the text has neither"""
+    lines = [line for line in transcript.splitlines() if line.strip()]
+    if not any(TURN_START.match(line) for line in lines):
+        return [s for s in SENTENCE_END.split(transcript.strip()) if s]
+
+    turns = []
+    for line in lines:
+        if turns and not TURN_START.match(line):
+            turns[-1] += "\n" + line
+        else:
+            turns.append(line)
+    return turns
+
+def _fit(unit: str, max_tokens: int) -> List[str]:
+    """Split a unit that exceeds the budget: by sentence, then by words"""
+    if estimate_tokens(unit) <= max_tokens:
+        return [unit]
+    sentences = [s for s in SENTENCE_END.split(unit) if s]
+    if len(sentences) > 1:
+        return [part for sentence in sentences for part in _fit(sentence, max_tokens)]
+
+    # Each word is counted with the space joining it to the previous one;
+    # tokens don't span spaces, so the running total tracks the joined text
+    parts, current, current_tokens = [], [], 0
+    for word in unit.split():
+        tokens = estimate_tokens(" " + word)
+        if current and current_tokens + tokens > max_tokens:
+            parts.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(word)
+        current_tokens += tokens
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+def chunk_transcript(transcript: str, max_tokens: int) -> List[TranscriptChunk]:
+    """Split a transcript into chunks of at most max_tokens at turn boundaries
+
+    Args:
+        transcript: Full transcript text
+        max_tokens: Token budget per chunk
+
+    Returns:
+        Chunks in transcript order; a single chunk with the unchanged text
+        when the whole transcript fits the budget
+    """
+    total = estimate_tokens(transcript)
+    if total <= max_tokens:
+        return [TranscriptChunk(index=0, text=transcript, tokens=total, start=_first_timestamp(transcript))]
+
+    units = [part for turn in _turns(transcript) for part in _fit(turn, max_tokens)]
+    separator = "\n" if "\n" in transcript.strip() else " "
+
+    chunks, current, current_tokens = [], [], 0
+    for unit in units:
+        # Counting the separator keeps the joined chunk within the budget
+        tokens = estimate_tokens(unit + separator)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+
+    result = []
+    for index, parts in enumerate(chunks):
+        text = separator.join(parts)
+        result.append(TranscriptChunk(index=index, text=text, tokens=estimate_tokens(text),
+                                      start=_first_timestamp(text)))
+    logger.info(f"Split a {total}-token transcript into {len(result)} chunks of at most {max_tokens} tokens")
+    return result
+
+def _first_timestamp(text: str) -> Optional[str]:
+    match = TIMESTAMP.search(text)
+    return match.group(1) if match else None
+
+def _normalize(value: Any) -> str:
+    return re.sub(r"[^\w]+", " ", str(value or "")).strip().lower()
+
+def _intensity(element: Dict[str, Any]) -> float:
+    try:
+        return float(element.get("intensity", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+class ElementMerger:
+    """Incremental merge of extracted elements, deduplicating repeats
+
+    Elements are the same when their names match after normalization (for
+    emotions, the name and topic). The first occurrence is kept, with a
+    "timestamps" list of every occurrence; a repeated emotion keeps its
+    highest intensity.
+    """
+
+    def __init__(self):
+        self.elements = {element_type: [] for element_type in ELEMENT_TYPES}
+        self._seen = {}
+
+    def add(self, element_type: str, element: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """Merge one element
+
+        Returns:
+            The kept element and what happened to it: NEW for a first
+            occurrence, UPDATED for a repeat that changed the kept element's
+            timestamps or intensity, REPEATED for a repeat that changed nothing
+        """
+        key = _normalize(element.get("name"))
+        if element_type == "emotions":
+            key = (key, _normalize(element.get("topic")))
+        timestamp = element.get("timestamp")
+
+        existing = self._seen.get((element_type, key))
+        if existing is None:
+            element = dict(element, timestamps=[timestamp] if timestamp else [])
+            self._seen[(element_type, key)] = element
+            self.elements.setdefault(element_type, []).append(element)
+            return element, NEW
+
+        outcome = REPEATED
+        if timestamp and timestamp not in existing["timestamps"]:
+            existing["timestamps"].append(timestamp)
+            outcome = UPDATED
+        if element_type == "emotions" and _intensity(element) > _intensity(existing):
+            existing["intensity"] = element["intensity"]
+            outcome = UPDATED
+        return existing, outcome
+
+def merge_elements(parts: List[Dict[str, List[Dict[str, Any]]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Combine per-chunk extractions with ElementMerger
+
+    Args:
+        parts: extract_elements results, in transcript order
+
+    Returns:
+        One extract_elements-shaped result
+    """
+    merger = ElementMerger()
+    for element_type in ELEMENT_TYPES:
+        for part in parts:
+            for element in part.get(element_type, []):
+                merger.add(element_type, element)
+    return merger.elements
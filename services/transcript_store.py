@@ -0,0 +1,588 @@
+"""
+Transcript Store Module
+
+Session transcripts can be kept out of the graph. With the store enabled, a
+Session node holds only transcript_ref (the SHA-256 of the transcript) and
+transcript_length (in characters); the text lives in this store as a
+content-addressed blob, so any query that returns the node no longer ships
+the transcript with it.
+
+The store is opt-in: unless TRANSCRIPT_STORE_BACKEND is set, transcripts stay
+on the Session node. The local backend is only durable on a disk that
+outlives the process and is shared by every instance of the API; on
+ephemeral container disks (Cloud Run) it loses transcripts.
+
+A blob is the UTF-8 text cut into fixed-size blocks, each compressed on its
+own, behind a small JSON header of block sizes and a compressed index of the
+timestamped lines ("00:45 — T: ..."). A byte range read fetches and inflates
+only the blocks it overlaps; a timestamp range read first maps the times to
+byte offsets through the index. Identical transcripts share one blob.
+
+Blobs are never deleted along with a session: another session may be given
+the same blob at any moment. A periodic sweep deletes the blobs no session
+refers to once they are past a grace period (TRANSCRIPT_SWEEP_GRACE).
+
+Backends are pluggable: files under a local directory, or an in-memory
+stand-in for an object store (whole-object puts, ranged gets) that tests
+build directly; it can't be configured, since a transcript stored in one
+process's memory is lost on restart and unreadable elsewhere. Moving the
+transcripts of existing sessions into the store, and sweeping:
+
+    python -m services.transcript_store --migrate
+    python -m services.transcript_store --sweep
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from services.errors import NotFoundError, ServiceError, ValidationError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSCRIPT_STORE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "transcripts"
+)
+
+# Uncompressed bytes per block: the most a range read inflates beyond what it returns
+TRANSCRIPT_BLOCK_SIZE = int(os.getenv("TRANSCRIPT_BLOCK_SIZE", str(16 * 1024)))
+
+# Seconds an unreferenced blob is kept before a sweep may delete it
+TRANSCRIPT_SWEEP_GRACE = int(os.getenv("TRANSCRIPT_SWEEP_GRACE", str(24 * 3600)))
+
+MAGIC = b"TXB1"
+_PREAMBLE = struct.Struct(">4sI")
+
+# "MM:SS" or "HH:MM:SS" at the start of a line, optionally bracketed
+LINE_TIMESTAMP = re.compile(rb"^[ \t]*[\[(]?(\d{1,2}):(\d{2})(?::(\d{2}))?\b", re.MULTILINE)
+
+@dataclass(frozen=True)
+class TranscriptRef:
+    """What a Session node keeps of its transcript"""
+    digest: str
+    length: int
+    size: int
+
+class BlobBackend(ABC):
+    """Storage interface for TranscriptStore"""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def get_range(self, key: str, start: int, end: int) -> bytes:
+        """Bytes start..end-1 of a blob; raises KeyError if it doesn't exist"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def touch(self, key: str) -> bool:
+        """Mark a blob as just written; False if it doesn't exist"""
+
+    @abstractmethod
+    def stale_keys(self, cutoff: float) -> Iterator[str]:
+        """Keys of blobs last written or touched before cutoff (epoch seconds)"""
+
+    @abstractmethod
+    def delete_if_stale(self, key: str, cutoff: float) -> bool:
+        """Delete a blob unless it was written or touched at or after cutoff
+
+        The age check and the delete must be atomic with respect to touch,
+        so a blob re-put while it is being swept survives.
+        """
+
+class LocalBlobBackend(BlobBackend):
+    """One file per blob, fanned out by the first two characters of the key"""
+
+    def __init__(self, root: str = DEFAULT_TRANSCRIPT_STORE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        # Written under a temporary name and renamed, so readers never see half a blob
+        partial = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.part")
+        try:
+            partial.write_bytes(data)
+            os.replace(partial, path)
+        finally:
+            partial.unlink(missing_ok=True)
+
+    def get_range(self, key: str, start: int, end: int) -> bytes:
+        try:
+            with open(self._path(key), "rb") as handle:
+                handle.seek(start)
+                return handle.read(end - start)
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def touch(self, key: str) -> bool:
+        try:
+            os.utime(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def stale_keys(self, cutoff: float) -> Iterator[str]:
+        for path in self.root.glob("??/*"):
+            if "." in path.name:
+                continue
+            try:
+                if path.stat().st_mtime < cutoff:
+                    yield path.name
+            except FileNotFoundError:
+                pass
+
+    def delete_if_stale(self, key: str, cutoff: float) -> bool:
+        # Moved aside first: a touch after the move finds no blob and its put
+        # writes a new one, a touch before it shows in the moved file's mtime
+        path = self._path(key)
+        doomed = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.sweep")
+        try:
+            os.replace(path, doomed)
+        except FileNotFoundError:
+            return False
+        if doomed.stat().st_mtime >= cutoff:
+            # Blobs are content-addressed, so putting it back can't clobber a newer write
+            os.replace(doomed, path)
+            return False
+        doomed.unlink()
+        return True
+
+class MemoryBlobBackend(BlobBackend):
+    """In-process stand-in for an object store"""
+
+    def __init__(self):
+        self._blobs: Dict[str, Tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._blobs[key] = (data, time.time())
+
+    def get_range(self, key: str, start: int, end: int) -> bytes:
+        with self._lock:
+            return self._blobs[key][0][start:end]
+
+    def exists(self, key: str) -> bool:
+        with self._lock:
+            return key in self._blobs
+
+    def touch(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._blobs:
+                return False
+            self._blobs[key] = (self._blobs[key][0], time.time())
+            return True
+
+    def stale_keys(self, cutoff: float) -> Iterator[str]:
+        with self._lock:
+            return iter([key for key, (_, written) in self._blobs.items() if written < cutoff])
+
+    def delete_if_stale(self, key: str, cutoff: float) -> bool:
+        with self._lock:
+            if key not in self._blobs or self._blobs[key][1] >= cutoff:
+                return False
+            del self._blobs[key]
+            return True
+
+class TranscriptStore:
+    """Content-addressed, block-compressed transcripts with range reads"""
+
+    def __init__(self, backend: BlobBackend, block_size: int = TRANSCRIPT_BLOCK_SIZE, header_cache_size: int = 256):
+        """Initialize the store
+
+        Args:
+            backend: Blob storage
+            block_size: Uncompressed bytes per independently compressed block
+            header_cache_size: Blob headers kept in memory (blobs never change)
+        """
+        self.backend = backend
+        self.block_size = block_size
+        self.header_cache_size = header_cache_size
+        self._headers: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, text: str) -> TranscriptRef:
+        """Store a transcript, or refresh the identical one already stored
+
+        Refreshing restarts the blob's grace period, so a sweep running while
+        a new session is created from the same transcript leaves it alone.
+        """
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        if not self.backend.touch(digest):
+            self.backend.put(digest, self._encode(data, len(text)))
+            logger.debug(f"Stored transcript {digest[:12]} ({len(data)} bytes)")
+        return TranscriptRef(digest=digest, length=len(text), size=len(data))
+
+    def read(self, digest: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """UTF-8 bytes start..end-1 of a transcript, inflating only the blocks in range
+
+        Raises:
+            NotFoundError: If no transcript has this digest
+        """
+        header = self._header(digest)
+        size = header["size"]
+        end = size if end is None else min(end, size)
+        start = max(start, 0)
+        if start >= end:
+            return b""
+
+        block_size = header["block_size"]
+        first, last = start // block_size, (end - 1) // block_size
+        offsets = header["offsets"]
+        compressed = self._get(digest, offsets[first], offsets[last + 1])
+        base = offsets[first]
+        data = b"".join(
+            zlib.decompress(compressed[offsets[block] - base:offsets[block + 1] - base])
+            for block in range(first, last + 1)
+        )
+        skip = start - first * block_size
+        return data[skip:skip + end - start]
+
+    def read_text(self, digest: str, start: Optional[int] = None, end: Optional[int] = None,
+                  start_time: Optional[float] = None, end_time: Optional[float] = None) -> str:
+        """A transcript, or part of it, as text
+
+        Args:
+            digest: transcript_ref of the session
+            start: First UTF-8 byte offset to return
+            end: Byte offset to stop before
+            start_time: Return lines stamped at or after this many seconds
+            end_time: Stop at the first line stamped at or after this many seconds
+
+        Returns:
+            The text in range; characters cut by a byte range are dropped
+
+        Raises:
+            NotFoundError: If no transcript has this digest
+            ValidationError: If byte and time ranges are mixed, or a time range
+                is asked of a transcript without timestamped lines
+        """
+        if start_time is not None or end_time is not None:
+            start, end = _time_span(self._times(digest), start, end, start_time, end_time,
+                                    self._header(digest)["size"])
+        return self.read(digest, start or 0, end).decode("utf-8", errors="ignore")
+
+    def sweep(self, referenced: Callable[[List[str]], Set[str]], grace_seconds: float = TRANSCRIPT_SWEEP_GRACE,
+              batch_size: int = 500) -> int:
+        """Delete the blobs no session refers to
+
+        Sessions are created after their transcript is put, so a blob without
+        a session may be about to get one. Only blobs neither written nor
+        re-put for grace_seconds are considered, and each delete re-checks
+        that age atomically.
+
+        Args:
+            referenced: Returns the subset of the given digests some session refers to
+            grace_seconds: Minimum age of a blob before it can be deleted
+            batch_size: Digests checked per call to referenced
+
+        Returns:
+            Number of blobs deleted
+        """
+        cutoff = time.time() - grace_seconds
+        stale = list(self.backend.stale_keys(cutoff))
+        deleted = 0
+        for i in range(0, len(stale), batch_size):
+            batch = stale[i:i + batch_size]
+            in_use = referenced(batch)
+            for digest in batch:
+                if digest not in in_use and self.backend.delete_if_stale(digest, cutoff):
+                    with self._lock:
+                        self._headers.pop(digest, None)
+                    deleted += 1
+        logger.info(f"Swept {deleted} unreferenced transcripts of {len(stale)} past the grace period")
+        return deleted
+
+    def _encode(self, data: bytes, length: int) -> bytes:
+        # Layout: preamble, JSON header, timestamp index, blocks. The index is
+        # its own section so byte range reads never fetch it.
+        blocks = [zlib.compress(data[i:i + self.block_size], 6) for i in range(0, len(data), self.block_size)]
+        times = _pack_times(timestamp_index(data))
+        header = json.dumps({
+            "size": len(data),
+            "length": length,
+            "block_size": self.block_size,
+            "times": len(times),
+            "blocks": [len(block) for block in blocks],
+        }, separators=(",", ":")).encode()
+        return _PREAMBLE.pack(MAGIC, len(header)) + header + times + b"".join(blocks)
+
+    def _header(self, digest: str) -> Dict[str, Any]:
+        with self._lock:
+            header = self._headers.get(digest)
+            if header is not None:
+                self._headers.move_to_end(digest)
+                return header
+
+        magic, header_size = _PREAMBLE.unpack(self._get(digest, 0, _PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"Transcript blob {digest} is not in a known format")
+        header = json.loads(self._get(digest, _PREAMBLE.size, _PREAMBLE.size + header_size))
+        times_start = _PREAMBLE.size + header_size
+        header["times"] = (times_start, times_start + header["times"])
+        # Absolute blob offset of each block, plus the end of the last one
+        offsets = [header["times"][1]]
+        for block in header.pop("blocks"):
+            offsets.append(offsets[-1] + block)
+        header["offsets"] = offsets
+
+        with self._lock:
+            self._headers[digest] = header
+            while len(self._headers) > self.header_cache_size:
+                self._headers.popitem(last=False)
+        return header
+
+    def _times(self, digest: str) -> List[Tuple[int, int]]:
+        header = self._header(digest)
+        if "index" not in header:
+            # Cached with the header; a concurrent reader may unpack it too
+            header["index"] = _unpack_times(self._get(digest, *header["times"]))
+        return header["index"]
+
+    def _get(self, digest: str, start: int, end: int) -> bytes:
+        try:
+            return self.backend.get_range(digest, start, end)
+        except KeyError:
+            raise NotFoundError(f"Transcript {digest} not found", "TRANSCRIPT_NOT_FOUND")
+
+def timestamp_index(data: bytes) -> List[List[int]]:
+    """[seconds, byte offset] of every line that starts with a timestamp"""
+    index = []
+    for match in LINE_TIMESTAMP.finditer(data):
+        first, second, third = match.groups()
+        if third is None:
+            seconds = int(first) * 60 + int(second)
+        else:
+            seconds = int(first) * 3600 + int(second) * 60 + int(third)
+        index.append([seconds, match.start()])
+    return index
+
+def _pack_times(times: List[List[int]]) -> bytes:
+    # Deltas between consecutive entries are small and repetitive, so they compress well
+    deltas, previous = [], (0, 0)
+    for seconds, offset in times:
+        deltas += [seconds - previous[0], offset - previous[1]]
+        previous = (seconds, offset)
+    return zlib.compress(struct.pack(f">{len(deltas)}i", *deltas), 9)
+
+def _unpack_times(packed: bytes) -> List[Tuple[int, int]]:
+    data = zlib.decompress(packed)
+    deltas = struct.unpack(f">{len(data) // 4}i", data)
+    times, seconds, offset = [], 0, 0
+    for i in range(0, len(deltas), 2):
+        seconds += deltas[i]
+        offset += deltas[i + 1]
+        times.append((seconds, offset))
+    return times
+
+def slice_transcript(text: str, start: Optional[int] = None, end: Optional[int] = None,
+                     start_time: Optional[float] = None, end_time: Optional[float] = None) -> str:
+    """The range read of TranscriptStore.read_text, on a transcript already in memory"""
+    data = text.encode("utf-8")
+    if start_time is not None or end_time is not None:
+        start, end = _time_span(timestamp_index(data), start, end, start_time, end_time, len(data))
+    return data[start or 0:end].decode("utf-8", errors="ignore")
+
+def _time_span(times: List[Tuple[int, int]], start: Optional[int], end: Optional[int],
+               start_time: Optional[float], end_time: Optional[float], size: int) -> Tuple[int, int]:
+    """Byte offsets of the lines stamped in [start_time, end_time)"""
+    if start is not None or end is not None:
+        raise ValidationError("Use either a byte range or a time range, not both", "INVALID_RANGE")
+    if not times:
+        raise ValidationError("Transcript has no timestamped lines", "NO_TIMESTAMPS")
+
+    start = 0
+    if start_time is not None:
+        start = next((offset for seconds, offset in times if seconds >= start_time), size)
+    end = size
+    if end_time is not None:
+        end = next((offset for seconds, offset in times if offset >= start and seconds >= end_time), size)
+    return start, end
+
+def read_session_transcript(record: Dict[str, Any], **ranges: Any) -> str:
+    """Text of a SESSION_TRANSCRIPT record, from the store or the legacy inline property
+
+    Args:
+        record: Row with transcript_ref and transcript
+        **ranges: start, end, start_time and end_time, as for TranscriptStore.read_text
+    """
+    if record.get("transcript_ref"):
+        return require_transcript_store().read_text(record["transcript_ref"], **ranges)
+    if record.get("transcript"):
+        return slice_transcript(record["transcript"], **ranges)
+    return ""
+
+def create_transcript_backend(kind: str, path: str = DEFAULT_TRANSCRIPT_STORE_DIR) -> BlobBackend:
+    """Build a durable backend by name: "local"
+
+    Raises:
+        ServiceError: For "memory", whose transcripts would be the only copy
+            and die with the process, or an unknown name
+    """
+    kind = kind.lower()
+    if kind == "local":
+        return LocalBlobBackend(path)
+    if kind == "memory":
+        raise ServiceError("TRANSCRIPT_STORE_BACKEND=memory would keep new transcripts only in this "
+                           "process's memory; use \"local\" on a durable shared disk",
+                           "TRANSCRIPT_STORE_NOT_DURABLE")
+    raise ServiceError(f"Unknown transcript store backend '{kind}'", "TRANSCRIPT_STORE_UNKNOWN")
+
+_transcript_store: Optional[TranscriptStore] = None
+_transcript_store_lock = threading.Lock()
+
+def get_transcript_store() -> Optional[TranscriptStore]:
+    """Process-wide transcript store, or None if TRANSCRIPT_STORE_BACKEND isn't set
+
+    Configured by TRANSCRIPT_STORE_BACKEND ("local") and TRANSCRIPT_STORE_DIR.
+
+    Raises:
+        ServiceError: If TRANSCRIPT_STORE_BACKEND names a backend that isn't
+            durable ("memory") or doesn't exist
+    """
+    global _transcript_store
+    with _transcript_store_lock:
+        if _transcript_store is None:
+            kind = os.getenv("TRANSCRIPT_STORE_BACKEND", "").strip()
+            if not kind:
+                return None
+            backend = create_transcript_backend(
+                kind, path=os.getenv("TRANSCRIPT_STORE_DIR", DEFAULT_TRANSCRIPT_STORE_DIR)
+            )
+            _transcript_store = TranscriptStore(backend)
+            logger.info(f"Transcript store using {type(backend).__name__}")
+        return _transcript_store
+
+def require_transcript_store() -> TranscriptStore:
+    """The transcript store, for sessions that already refer to it
+
+    Raises:
+        ServiceError: If TRANSCRIPT_STORE_BACKEND isn't set
+    """
+    store = get_transcript_store()
+    if store is None:
+        raise ServiceError("Session transcripts are in the transcript store, but TRANSCRIPT_STORE_BACKEND "
+                           "is not set", "TRANSCRIPT_STORE_DISABLED")
+    return store
+
+def migrate_inline_transcripts(driver, batch_size: int = 100) -> int:
+    """Move Session.transcript properties into the store
+
+    Args:
+        driver: A neo4j.Driver
+        batch_size: Sessions moved per query
+
+    Returns:
+        Number of sessions migrated
+    """
+    from services import neo4j_queries as queries
+
+    store = require_transcript_store()
+    migrated = 0
+    with driver.session() as session:
+        while True:
+            rows = [record.data() for record in session.run(queries.INLINE_TRANSCRIPTS, limit=batch_size)]
+            if not rows:
+                return migrated
+            refs = []
+            for row in rows:
+                ref = store.put(row["transcript"])
+                refs.append({"session_id": row["session_id"], "transcript_ref": ref.digest,
+                             "transcript_length": ref.length})
+            session.run(queries.MOVE_INLINE_TRANSCRIPTS, rows=refs).consume()
+            migrated += len(refs)
+            logger.info(f"Moved {migrated} transcripts into the store")
+
+def sweep_unreferenced_transcripts(driver, grace_seconds: float = TRANSCRIPT_SWEEP_GRACE) -> int:
+    """Delete the blobs no Session node refers to, once past the grace period
+
+    Args:
+        driver: A neo4j.Driver
+        grace_seconds: Minimum age of a blob before it can be deleted
+
+    Returns:
+        Number of blobs deleted
+    """
+    from services import neo4j_queries as queries
+
+    def referenced(digests: List[str]) -> Set[str]:
+        with driver.session() as session:
+            record = session.run(queries.TRANSCRIPT_REFS_IN_USE, transcript_refs=digests).single()
+        return set(record["in_use"])
+
+    return require_transcript_store().sweep(referenced, grace_seconds)
+
+def main(argv: List[str] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Manage the session transcript store")
+    parser.add_argument("--migrate", action="store_true",
+                        help="move transcripts stored on Session nodes into the store")
+    parser.add_argument("--sweep", action="store_true",
+                        help="delete stored transcripts no session refers to")
+    parser.add_argument("--force", action="store_true",
+                        help="migrate into the local backend, whose disk must be durable and shared")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--grace-hours", type=float, default=TRANSCRIPT_SWEEP_GRACE / 3600,
+                        help="keep unreferenced transcripts this long before sweeping them")
+    args = parser.parse_args(argv)
+    if not (args.migrate or args.sweep):
+        parser.print_help()
+        return 1
+
+    try:
+        store = get_transcript_store()
+    except ServiceError as e:
+        print(str(e))
+        return 1
+    if store is None:
+        print("TRANSCRIPT_STORE_BACKEND is not set; transcripts are kept on Session nodes")
+        return 1
+    # Migrating removes the copy on the Session node, leaving the blob as the only one
+    if args.migrate and isinstance(store.backend, MemoryBlobBackend):
+        print("Refusing to migrate into the memory backend: the transcripts would be lost when this "
+              "process exits")
+        return 1
+    if args.migrate and isinstance(store.backend, LocalBlobBackend) and not args.force:
+        print(f"Refusing to migrate into local files under {store.backend.root}: pass --force if this "
+              f"disk survives restarts and is shared by every API instance")
+        return 1
+
+    logging.basicConfig(level=logging.INFO)
+    from . import get_neo4j_service
+    driver = get_neo4j_service().driver
+    if args.migrate:
+        migrated = migrate_inline_transcripts(driver, batch_size=args.batch_size)
+        print(f"Moved {migrated} session transcripts into the store")
+    if args.sweep:
+        deleted = sweep_unreferenced_transcripts(driver, grace_seconds=args.grace_hours * 3600)
+        print(f"Deleted {deleted} unreferenced transcripts")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,377 @@
+"""
+Transcription Job Store Module
+
+Shared state for transcription jobs, so a job started on one worker can be
+polled from any other and survives a restart. Each job is a JSON document
+with indexed id, user and status columns and an expiry time that is pushed
+forward on every update; expired jobs are invisible to readers and removed
+by cleanup_expired(), which only touches expired rows.
+
+Backends are pluggable: SQLite (default, one file shared by all workers on a
+host) or Redis (shared across hosts; needs the redis package).
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "transcription_jobs.db")
+
+def _merge_patch(target: Any, patch: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a JSON merge patch (RFC 7396), as SQLite's json_patch does
+
+    Nested dicts are merged, None removes a key, anything else replaces it.
+    """
+    merged = dict(target) if isinstance(target, dict) else {}
+    for name, value in patch.items():
+        if value is None:
+            merged.pop(name, None)
+        elif isinstance(value, dict):
+            merged[name] = _merge_patch(merged.get(name), value)
+        else:
+            merged[name] = value
+    return merged
+
+class JobStateBackend(ABC):
+    """Storage interface for TranscriptionJobStore"""
+
+    @abstractmethod
+    def create(self, job: Dict[str, Any], ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def update(self, job_id: str, fields: Dict[str, Any], ttl: float) -> bool:
+        """Merge fields into a live job in one atomic step; False if it does not exist"""
+
+    @abstractmethod
+    def list_for_user(self, user_id: str, status: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def delete_expired(self) -> int:
+        ...
+
+class SQLiteJobState(JobStateBackend):
+    """Job documents in a SQLite table, merged in place with json_patch"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS transcription_jobs (
+        id TEXT PRIMARY KEY,
+        user_id TEXT,
+        status TEXT NOT NULL,
+        data TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_transcription_jobs_user ON transcription_jobs (user_id, created_at);
+    CREATE INDEX IF NOT EXISTS idx_transcription_jobs_status ON transcription_jobs (status);
+    CREATE INDEX IF NOT EXISTS idx_transcription_jobs_expires ON transcription_jobs (expires_at);
+    """
+
+    def __init__(self, path: str = DEFAULT_JOB_DB):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def create(self, job: Dict[str, Any], ttl: float) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO transcription_jobs
+                       (id, user_id, status, data, created_at, updated_at, expires_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (job["id"], job.get("user_id"), job.get("status", "processing"),
+                 json.dumps(job, default=str), now, now, now + ttl)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM transcription_jobs WHERE id = ? AND expires_at > ?", (job_id, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, job_id: str, fields: Dict[str, Any], ttl: float) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """UPDATE transcription_jobs
+                   SET data = json_patch(data, ?), status = COALESCE(?, status),
+                       updated_at = ?, expires_at = ?
+                   WHERE id = ? AND expires_at > ?""",
+                (json.dumps(fields, default=str), fields.get("status"), now, now + ttl, job_id, now)
+            )
+        return cursor.rowcount == 1
+
+    def list_for_user(self, user_id: str, status: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        query = "SELECT data FROM transcription_jobs WHERE user_id = ? AND expires_at > ?"
+        params = [user_id, time.time()]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def delete_expired(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM transcription_jobs WHERE expires_at <= ?", (time.time(),)).rowcount
+
+class RedisJobState(JobStateBackend):
+    """Job documents as Redis hashes (one JSON value per field), with key expiry
+
+    Jobs are indexed in sorted sets by creation time, one per user and one
+    per user and status, so listing reads one page of ids and fetches their
+    hashes in a single pipeline. A global sorted set indexes jobs by expiry,
+    so delete_expired() only visits expired ids, and a hash records each
+    job's [user_id, status, created] so its index entries can be removed
+    after the job hash itself has expired.
+    """
+
+    def __init__(self, client, prefix: str = "transcription:"):
+        """Initialize the backend
+
+        Args:
+            client: redis.Redis (or compatible) client
+            prefix: Key prefix for every key this backend writes
+        """
+        self.client = client
+        self.prefix = prefix
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}job:{job_id}"
+
+    def _user_key(self, user_id: str, status: Optional[str] = None) -> str:
+        if status:
+            return f"{self.prefix}user:{user_id}:status:{status}"
+        return f"{self.prefix}user:{user_id}"
+
+    @property
+    def _expiry_key(self) -> str:
+        return f"{self.prefix}expiry"
+
+    @property
+    def _index_key(self) -> str:
+        return f"{self.prefix}index"
+
+    @staticmethod
+    def _encode(fields: Dict[str, Any]) -> Dict[str, str]:
+        return {name: json.dumps(value, default=str) for name, value in fields.items()}
+
+    @staticmethod
+    def _text(value) -> str:
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    @staticmethod
+    def _entry(raw) -> List[Any]:
+        """Decode an index entry: [user_id, status, created], or Nones"""
+        return json.loads(raw) if raw else [None, None, None]
+
+    def _write(self, pipe, job_id: str, fields: Dict[str, Any], ttl: float) -> None:
+        key = self._job_key(job_id)
+        if fields:
+            pipe.hset(key, mapping=self._encode(fields))
+        pipe.expire(key, max(1, int(ttl)))
+        pipe.zadd(self._expiry_key, {job_id: time.time() + ttl})
+
+    def _unindex(self, pipe, job_id: str, entry: List[Any]) -> None:
+        user_id, status, _ = entry
+        if user_id:
+            pipe.zrem(self._user_key(user_id), job_id)
+            if status:
+                pipe.zrem(self._user_key(user_id, status), job_id)
+
+    def _reindex(self, pipe, job_id: str, old: List[Any], user_id: Optional[str],
+                 status: Optional[str], created: float) -> None:
+        """Move a job between the user and status sets when its user or status changes"""
+        if [user_id, status] == old[:2]:
+            return
+        self._unindex(pipe, job_id, old)
+        if user_id:
+            pipe.zadd(self._user_key(user_id), {job_id: created})
+            if status:
+                pipe.zadd(self._user_key(user_id, status), {job_id: created})
+        pipe.hset(self._index_key, job_id, json.dumps([user_id, status, created]))
+
+    def create(self, job: Dict[str, Any], ttl: float) -> None:
+        old = self._entry(self.client.hget(self._index_key, job["id"]))
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(self._job_key(job["id"]))
+        self._write(pipe, job["id"], job, ttl)
+        # Re-creating a job re-indexes it under its new creation time
+        self._unindex(pipe, job["id"], old)
+        self._reindex(pipe, job["id"], [None, None, None], job.get("user_id"),
+                      job.get("status", "processing"), time.time())
+        pipe.execute()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._decode(self.client.hgetall(self._job_key(job_id)))
+
+    def _decode(self, raw) -> Optional[Dict[str, Any]]:
+        if not raw:
+            return None
+        return {self._text(name): json.loads(value) for name, value in raw.items()}
+
+    def update(self, job_id: str, fields: Dict[str, Any], ttl: float) -> bool:
+        from redis.exceptions import WatchError
+
+        key = self._job_key(job_id)
+        with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # Fail instead of recreating a job that expired or never existed
+                    pipe.watch(key)
+                    if not pipe.exists(key):
+                        pipe.unwatch()
+                        return False
+                    # Merge nested dicts into the stored values, as json_patch does
+                    nested = [name for name, value in fields.items() if isinstance(value, dict)]
+                    merged = dict(fields)
+                    for name, raw in zip(nested, pipe.hmget(key, nested) if nested else []):
+                        merged[name] = _merge_patch(json.loads(raw) if raw is not None else None, fields[name])
+                    removed = [name for name, value in fields.items() if value is None]
+                    old = self._entry(pipe.hget(self._index_key, job_id))
+                    pipe.multi()
+                    if removed:
+                        pipe.hdel(key, *removed)
+                    self._write(pipe, job_id, {name: value for name, value in merged.items() if value is not None}, ttl)
+                    if "user_id" in fields or "status" in fields:
+                        self._reindex(pipe, job_id, old, merged.get("user_id", old[0]),
+                                      merged.get("status", old[1]), old[2] or time.time())
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+
+    def list_for_user(self, user_id: str, status: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        key = self._user_key(user_id, status)
+        jobs = []
+        offset = 0
+        while len(jobs) < limit:
+            # One page of ids, then their hashes in one round trip; ids of jobs
+            # that expired but weren't swept yet are skipped
+            job_ids = self.client.zrevrange(key, offset, offset + limit - 1)
+            if not job_ids:
+                break
+            offset += len(job_ids)
+            pipe = self.client.pipeline(transaction=False)
+            for job_id in job_ids:
+                pipe.hgetall(self._job_key(self._text(job_id)))
+            for raw in pipe.execute():
+                job = self._decode(raw)
+                if job is not None and (not status or job.get("status") == status):
+                    jobs.append(job)
+        return jobs[:limit]
+
+    def delete_expired(self) -> int:
+        now = time.time()
+        expired = [self._text(job_id) for job_id in self.client.zrangebyscore(self._expiry_key, "-inf", now)]
+        if not expired:
+            return 0
+        entries = self.client.hmget(self._index_key, expired)
+        pipe = self.client.pipeline(transaction=True)
+        for job_id, raw in zip(expired, entries):
+            pipe.delete(self._job_key(job_id))
+            self._unindex(pipe, job_id, self._entry(raw))
+        pipe.zrem(self._expiry_key, *expired)
+        pipe.hdel(self._index_key, *expired)
+        pipe.execute()
+        return len(expired)
+
+class TranscriptionJobStore:
+    """Transcription job state shared by every worker"""
+
+    def __init__(self, backend: JobStateBackend, ttl: float = 24 * 3600):
+        """Initialize the store
+
+        Args:
+            backend: Storage backend
+            ttl: Seconds a job is kept after its last update
+        """
+        self.backend = backend
+        self.ttl = ttl
+
+    def create(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a new job; job must have an "id" """
+        self.backend.create(job, self.ttl)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The job, or None if it does not exist or has expired"""
+        return self.backend.get(job_id)
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> bool:
+        """Atomically merge fields into a job and refresh its expiry
+
+        Nested dicts are merged, None removes a field, and lists and other
+        values are replaced (JSON merge patch), on every backend.
+        """
+        updated = self.backend.update(job_id, fields, self.ttl)
+        if not updated:
+            logger.warning(f"Transcription job {job_id} not found for update")
+        return updated
+
+    def list_for_user(self, user_id: str, status: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent live jobs of a user, optionally with a given status"""
+        return self.backend.list_for_user(user_id, status, limit)
+
+    def cleanup_expired(self) -> int:
+        """Delete expired jobs; cost is proportional to the number expired"""
+        removed = self.backend.delete_expired()
+        if removed:
+            logger.info(f"Removed {removed} expired transcription jobs")
+        return removed
+
+def create_job_backend(kind: str, path: str = DEFAULT_JOB_DB, redis_url: Optional[str] = None) -> JobStateBackend:
+    """Build a backend by name: "sqlite" or "redis" """
+    kind = (kind or "").lower()
+    if kind == "redis":
+        import redis
+
+        return RedisJobState(redis.Redis.from_url(redis_url or "redis://localhost:6379/0"))
+    if kind != "sqlite":
+        logger.warning(f"Unknown transcription job backend '{kind}', using sqlite")
+    return SQLiteJobState(path)
+
+# Process-wide job store
+_transcription_job_store = None
+
+def get_transcription_job_store() -> TranscriptionJobStore:
+    """Get or create the process-wide job store from environment settings"""
+    global _transcription_job_store
+    if _transcription_job_store is None:
+        backend = create_job_backend(
+            os.getenv("TRANSCRIPTION_JOB_BACKEND", "sqlite"),
+            path=os.getenv("TRANSCRIPTION_JOB_DB", DEFAULT_JOB_DB),
+            redis_url=os.getenv("REDIS_URL"),
+        )
+        _transcription_job_store = TranscriptionJobStore(
+            backend, ttl=float(os.getenv("TRANSCRIPTION_JOB_TTL", str(24 * 3600)))
+        )
+    return _transcription_job_store
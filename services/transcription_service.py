@@ -1,5 +1,7 @@
 """Transcription service for handling both audio and text transcripts."""
 import asyncio
+import hashlib
+import inspect
 import logging
 import os
 import subprocess
@@ -12,8 +14,12 @@ import time
 from datetime import datetime, timedelta
 
 from openai import OpenAI
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
-from openai import RateLimitError, APIError
+
+from services.audio_segmentation import AudioSegment, ChunkPlan, detect_silences, plan_chunks, segment_audio
+from services.result_cache import ResultCache, cache_key, create_backend
+from services.settings_cache import get_cached_user_settings
+from services.transcription_jobs import TranscriptionJobStore, get_transcription_job_store
+from services.upload_storage import StoredUpload
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s • %(levelname)s • %(message)s")
@@ -23,18 +29,72 @@ log = logging.getLogger("transcription-service")
 OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 AUDIO_MODEL = os.getenv("OPENAI_AUDIO_MODEL", "whisper-1")
 
+# Silence detection pre-pass
+SILENCE_DETECTION = os.getenv("TRANSCRIPTION_SILENCE_DETECTION", "true").lower() == "true"
+SILENCE_DB = float(os.getenv("TRANSCRIPTION_SILENCE_DB", "-35"))
+MIN_PAUSE_SECONDS = float(os.getenv("TRANSCRIPTION_MIN_PAUSE", "0.5"))
+DROP_SILENCE_SECONDS = float(os.getenv("TRANSCRIPTION_DROP_SILENCE", "3.0"))
+
+# ---------------------------------------------------------------------------
+# Transcript cache (repeat uploads and chunks are answered without Whisper)
+# ---------------------------------------------------------------------------
+DEFAULT_TRANSCRIPT_CACHE_DB = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "transcript_cache.db"
+)
+_transcript_cache = None
+_transcript_cache_configured = False
+
+def get_transcript_cache() -> Optional[ResultCache]:
+    """Process-wide transcript cache, or None when TRANSCRIPT_CACHE_BACKEND=off"""
+    global _transcript_cache, _transcript_cache_configured
+    if not _transcript_cache_configured:
+        backend = create_backend(
+            os.getenv("TRANSCRIPT_CACHE_BACKEND", "sqlite"),
+            path=os.getenv("TRANSCRIPT_CACHE_DB", DEFAULT_TRANSCRIPT_CACHE_DB),
+            max_entries=int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", "5000")),
+        )
+        if backend is not None:
+            _transcript_cache = ResultCache(
+                backend, ttl=float(os.getenv("TRANSCRIPT_CACHE_TTL", str(30 * 24 * 3600))), name="transcript-cache"
+            )
+        _transcript_cache_configured = True
+    return _transcript_cache
+
+def transcript_cache_key(content_hash: str, model: str, language: str) -> str:
+    """Key of a whole recording's transcript"""
+    return cache_key("transcript", sha256=content_hash, model=model, language=language)
+
+def chunk_cache_key(content_hash: str, model: str, language: str) -> str:
+    """Key of one chunk's transcript"""
+    return cache_key("transcript-chunk", sha256=content_hash, model=model, language=language)
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 of a file, read in 1 MiB blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 class TranscriptionService:
-    def __init__(self, chunk_size_seconds: int = 300, max_concurrent: int = 5, max_retries: int = 3):
+    def __init__(self, chunk_size_seconds: int = 300, max_concurrent: int = 5, max_retries: int = 3,
+                 retry_backoff: float = 2.0, silence_detection: bool = SILENCE_DETECTION,
+                 job_store: Optional[TranscriptionJobStore] = None):
         """Initialize the transcription service.
         
         Args:
             chunk_size_seconds (int): Size of each audio chunk in seconds (default: 300 = 5 minutes)
-            max_concurrent (int): Maximum number of concurrent transcription tasks
-            max_retries (int): Maximum number of retries for failed transcriptions
+            max_concurrent (int): Maximum number of chunks transcribed at once per job
+            max_retries (int): Maximum number of retries for a failed chunk
+            retry_backoff (float): Seconds before the first chunk retry; doubles per retry
+            silence_detection (bool): Cut chunks at pauses and skip long silences
+            job_store (TranscriptionJobStore): Shared job state (default: the process-wide store)
         """
         self.chunk_size_seconds = chunk_size_seconds
-        self.max_concurrent = max_concurrent
+        self.max_concurrent = max(1, max_concurrent)
         self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.silence_detection = silence_detection
         
         # Initialize OpenAI client (with compatibility with different OpenAI versions)
         if OPENAI_KEY:
@@ -54,21 +114,17 @@ class TranscriptionService:
             self.client = None
             
         self.temp_dir = tempfile.gettempdir()
-        self.active_jobs = {}  # Store active transcription jobs
+        self.jobs = job_store or get_transcription_job_store()
 
     def get_user_transcription_settings(self, user_id: str = None) -> Dict[str, Any]:
-        """Load user's transcription settings from Neo4j"""
+        """Load user's transcription settings (through the settings cache)"""
         if not user_id:
             return {
                 'transcription_model': AUDIO_MODEL,  # Use default from environment
             }
         
         try:
-            # Import here to avoid circular imports
-            from services.neo4j_service import get_neo4j_service
-            
-            neo4j_service = get_neo4j_service()
-            settings = neo4j_service.get_user_settings(user_id)
+            settings = get_cached_user_settings(user_id)
             
             if settings:
                 transcription_model = settings.get('transcription_model', AUDIO_MODEL)
@@ -91,29 +147,17 @@ class TranscriptionService:
         """Transcribe an audio file using OpenAI's Whisper API."""
         try:
             # Load user's transcription settings
-            user_settings = self.get_user_transcription_settings(user_id)
+            user_settings = await asyncio.to_thread(self.get_user_transcription_settings, user_id)
             transcription_model = user_settings['transcription_model']
             log.info(f"Using transcription model: {transcription_model}")
             
-            # Get audio duration
-            duration = self._get_audio_duration(audio_path)
-            log.info(f"Audio duration: {duration} seconds")
-            
-            # Process in chunks
-            full_transcript = []
-            for start_time in range(0, int(duration), self.chunk_size_seconds):
-                # Extract chunk
-                chunk_path = self._extract_audio_chunk(audio_path, start_time, self.chunk_size_seconds)
-                if not chunk_path:
-                    continue
-                    
-                # Transcribe chunk with user's model
-                chunk_transcript = await self._transcribe_chunk(chunk_path, transcription_model)
-                if chunk_transcript:
-                    full_transcript.append(chunk_transcript)
-                    
-                # Clean up chunk file
-                os.remove(chunk_path)
+            # Choose chunk boundaries at pauses, then process up to max_concurrent chunks at once
+            plan = None
+            if self.silence_detection:
+                duration = await asyncio.to_thread(self._get_audio_duration, audio_path)
+                plan = await asyncio.to_thread(self._plan_chunks, audio_path, duration)
+            chunk_transcripts = await self._transcribe_chunks(audio_path, transcription_model, plan=plan)
+            full_transcript = [text for text in chunk_transcripts if text]
                 
             return " ".join(full_transcript) if full_transcript else None
             
@@ -166,55 +210,124 @@ class TranscriptionService:
                 log.warning("Could not determine audio duration, using default 60 seconds")
                 return 60.0
 
-    def _extract_audio_chunk(self, audio_path: Path, start_time: int, duration: int) -> Optional[Path]:
-        """Extract a chunk of audio using ffmpeg."""
+    async def _transcribe_chunk(self, chunk_path: Path, model: str, language: str = "en") -> str:
+        """Transcribe a single chunk using OpenAI's Whisper API; errors propagate to the caller."""
+        with open(chunk_path, 'rb') as audio_file:
+            response = await asyncio.to_thread(
+                self.client.audio.transcriptions.create,
+                file=audio_file,
+                model=model,
+                language=language
+            )
+        return response.text
+
+    def _plan_chunks(self, audio_path: Path, duration: float) -> Optional[ChunkPlan]:
+        """Silence-detection pre-pass; None when detection is off or fails"""
+        if not self.silence_detection:
+            return None
         try:
-            chunk_path = Path(self.temp_dir) / f"chunk_{start_time}.mp3"
-            
-            # Use -y flag to automatically overwrite existing files
-            cmd = [
-                'ffmpeg',
-                '-y',  # Automatically overwrite output files
-                '-i', str(audio_path),
-                '-ss', str(start_time),
-                '-t', str(duration),
-                '-acodec', 'libmp3lame',
-                '-loglevel', 'error',
-                str(chunk_path)
-            ]
-            
-            subprocess.run(cmd, check=True, capture_output=True)
-            return chunk_path
+            started = time.perf_counter()
+            silences = detect_silences(audio_path, duration, noise_db=SILENCE_DB, min_pause=MIN_PAUSE_SECONDS)
+            plan = plan_chunks(duration, silences, self.chunk_size_seconds, drop_silence=DROP_SILENCE_SECONDS)
+            log.info(
+                f"Silence detection found {len(silences)} pauses in {(time.perf_counter() - started) * 1000:.0f}ms; "
+                f"{len(plan.chunks)} chunks, {plan.dropped_seconds}s of silence skipped"
+            )
+            return plan
         except Exception as e:
-            log.error(f"Error extracting audio chunk: {str(e)}")
+            log.warning(f"Silence detection failed, using fixed-length chunks: {str(e)}")
             return None
 
-    @retry(
-        retry=retry_if_exception_type((RateLimitError, APIError)),
-        stop=stop_after_attempt(3),
-        wait=wait_exponential_jitter(initial=1, max=60)
-    )
-    async def _transcribe_chunk(self, chunk_path: Path, model: str) -> Optional[str]:
-        """Transcribe a single chunk using OpenAI's Whisper API."""
+    async def _transcribe_chunks(self, audio_path: Path, model: str, language: str = "en",
+                                 on_chunk=None, timings: Dict[str, float] = None,
+                                 plan: ChunkPlan = None) -> List[Optional[str]]:
+        """Segment the audio in one ffmpeg pass, then transcribe up to max_concurrent chunks at once.
+
+        A failed chunk is retried on its own, up to max_retries times, with
+        exponential backoff; the other chunks are unaffected. Each chunk's
+        transcript is cached by the hash of its audio, so chunks that succeeded
+        in an earlier, partly failed run are not sent to the API again.
+
+        Args:
+            audio_path: Audio file to transcribe
+            model: Transcription model
+            language: Language code passed to the API
+            on_chunk: Optional callback (or coroutine function) on_chunk(index, state)
+                with state one of "pending", "transcribing", "retrying",
+                "completed" or "failed"
+            timings: Optional dict that receives "segment_ms" and "transcribe_ms"
+            plan: Optional ChunkPlan from _plan_chunks; without one, chunks are
+                fixed chunk_size_seconds windows
+
+        Returns:
+            Chunk transcripts in audio order; None for chunks that failed
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        cache = get_transcript_cache()
+
+        def cached_chunk(path: Path) -> Tuple[str, Optional[str]]:
+            key = chunk_cache_key(file_sha256(path), model, language)
+            entry = cache.get(key)
+            return key, entry["text"] if entry else None
+
+        async def report(index: int, state: str) -> None:
+            if on_chunk:
+                result = on_chunk(index, state)
+                if inspect.isawaitable(result):
+                    await result
+
+        async def process(segment: AudioSegment) -> Optional[str]:
+            async with semaphore:
+                key = None
+                if cache is not None:
+                    key, text = await asyncio.to_thread(cached_chunk, segment.path)
+                    if text is not None:
+                        log.info(f"Transcript cache hit for chunk {segment.index}")
+                        await report(segment.index, "completed")
+                        return text
+                for attempt in range(self.max_retries + 1):
+                    await report(segment.index, "transcribing" if attempt == 0 else "retrying")
+                    try:
+                        text = await self._transcribe_chunk(segment.path, model, language)
+                        if key is not None:
+                            await asyncio.to_thread(cache.set, key, {"text": text})
+                        await report(segment.index, "completed")
+                        return text
+                    except Exception as e:
+                        log.error(f"Error transcribing chunk {segment.index} (attempt {attempt + 1}): {str(e)}")
+                    if attempt < self.max_retries:
+                        await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+                await report(segment.index, "failed")
+                return None
+
+        if plan is not None and not plan.chunks:
+            log.info("No speech detected, nothing to transcribe")
+            return []
+
+        segmentation = await asyncio.to_thread(
+            segment_audio, audio_path, self.chunk_size_seconds, self.temp_dir, plan=plan
+        )
         try:
-            with open(chunk_path, 'rb') as audio_file:
-                response = await asyncio.to_thread(
-                    self.client.audio.transcriptions.create,
-                    file=audio_file,
-                    model=model,
-                    language="en"
-                )
-                
-            return response.text
+            for segment in segmentation.segments:
+                await report(segment.index, "pending")
+            log.info(f"Transcribing {len(segmentation.segments)} chunks, up to {self.max_concurrent} at once")
 
-        except Exception as e:
-            log.error(f"Error transcribing chunk: {str(e)}")
-            return None
+            started = time.perf_counter()
+            texts = await asyncio.gather(*(process(segment) for segment in segmentation.segments))
+            transcribe_ms = round((time.perf_counter() - started) * 1000, 1)
+        finally:
+            segmentation.cleanup()
+
+        log.info(f"Chunk timings: segment_ms={segmentation.timings['segment_ms']} transcribe_ms={transcribe_ms}")
+        if timings is not None:
+            timings.update(segmentation.timings, transcribe_ms=transcribe_ms)
+        return list(texts)
             
     async def api_transcribe(self, 
                         audio_file_path: str, 
                         user_id: str,
-                        options: Dict[str, Any] = None) -> Dict[str, Any]:
+                        options: Dict[str, Any] = None,
+                        upload: Optional[StoredUpload] = None) -> Dict[str, Any]:
         """
         Handle API transcription requests with status tracking and options.
         
@@ -225,6 +338,10 @@ class TranscriptionService:
                 - language: Language code (default: "en")
                 - format: Output format (default: "text", options: "text", "json", "srt", "vtt")
                 - speaker_detection: Enable speaker detection (default: False)
+            upload: StoredUpload from save_upload, when the route streamed the file;
+                its size and content hash are recorded on the job. A recording
+                already transcribed with the same model and language completes
+                immediately from the transcript cache.
                 
         Returns:
             Dictionary with transcription job details including:
@@ -254,8 +371,34 @@ class TranscriptionService:
             
         # Get file info
         try:
-            audio_duration = self._get_audio_duration(Path(audio_file_path))
-            file_size = os.path.getsize(audio_file_path)
+            content_hash = upload.sha256 if upload else await asyncio.to_thread(file_sha256, Path(audio_file_path))
+            file_size = upload.size if upload else os.path.getsize(audio_file_path)
+            job_options = {
+                "language": language,
+                "format": output_format,
+                "speaker_detection": speaker_detection
+            }
+            
+            cached = await self._cached_transcript(content_hash, user_id, language)
+            if cached is not None:
+                log.info(f"Transcript cache hit for {content_hash[:12]}, skipping transcription")
+                job = {
+                    "id": transcription_id,
+                    "user_id": user_id,
+                    "status": "completed",
+                    "progress": 100,
+                    "start_time": datetime.now().isoformat(),
+                    "completed_at": datetime.now().isoformat(),
+                    "file_size_bytes": file_size,
+                    "content_sha256": content_hash,
+                    "cached": True,
+                    "options": job_options,
+                    "transcript": self._format_output(cached["transcript"], job_options)
+                }
+                await asyncio.to_thread(self.jobs.create, job)
+                return {key: job[key] for key in ("id", "status", "progress", "cached", "transcript")}
+            
+            audio_duration = await asyncio.to_thread(self._get_audio_duration, Path(audio_file_path))
             
             # Estimate completion time (rough estimate based on file duration)
             # Typically transcription takes 0.3-0.5x real-time duration
@@ -264,7 +407,7 @@ class TranscriptionService:
             estimated_completion_time = datetime.now() + timedelta(seconds=estimated_seconds)
             
             # Store job info
-            self.active_jobs[transcription_id] = {
+            await asyncio.to_thread(self.jobs.create, {
                 "id": transcription_id,
                 "user_id": user_id,
                 "file_path": audio_file_path,
@@ -274,12 +417,9 @@ class TranscriptionService:
                 "estimated_completion_time": estimated_completion_time.isoformat(),
                 "duration_seconds": audio_duration,
                 "file_size_bytes": file_size,
-                "options": {
-                    "language": language,
-                    "format": output_format,
-                    "speaker_detection": speaker_detection
-                }
-            }
+                "content_sha256": content_hash,
+                "options": job_options
+            })
             
             # Start async transcription process
             asyncio.create_task(self._process_transcription_job(transcription_id))
@@ -301,31 +441,56 @@ class TranscriptionService:
                 "error": f"Error starting transcription: {str(e)}"
             }
             
+    async def _cached_transcript(self, content_hash: str, user_id: str, language: str) -> Optional[Dict[str, Any]]:
+        """Cached transcript of this recording for the user's model, if any."""
+        cache = get_transcript_cache()
+        if cache is None:
+            return None
+        user_settings = await asyncio.to_thread(self.get_user_transcription_settings, user_id)
+        key = transcript_cache_key(content_hash, user_settings['transcription_model'], language)
+        return await asyncio.to_thread(cache.get, key)
+
+    async def _store_transcript(self, content_hash: Optional[str], model: str, language: str,
+                                transcript: str, chunks: List[str]) -> None:
+        """Cache a complete transcript and its chunk texts."""
+        cache = get_transcript_cache()
+        if cache is None or not content_hash:
+            return
+        key = transcript_cache_key(content_hash, model, language)
+        await asyncio.to_thread(cache.set, key, {"transcript": transcript, "chunks": chunks, "model": model})
+
+    def _format_output(self, transcript: str, options: Dict[str, Any]) -> Any:
+        """Apply the requested output format to a plain transcript."""
+        if options["format"] == "json" and options["speaker_detection"]:
+            # Format with speaker detection (simplified example)
+            return self._format_transcript_with_speakers(transcript)
+        # Plain text format
+        return transcript
+
     async def _process_transcription_job(self, transcription_id: str) -> None:
         """Process a transcription job asynchronously and update its status."""
-        if transcription_id not in self.active_jobs:
+        job = await asyncio.to_thread(self.jobs.get, transcription_id)
+        if job is None:
             log.error(f"Transcription job {transcription_id} not found")
             return
             
-        job = self.active_jobs[transcription_id]
         audio_path = Path(job["file_path"])
         options = job["options"]
         user_id = job.get("user_id")
         
         try:
             # Load user's transcription settings
-            user_settings = self.get_user_transcription_settings(user_id)
+            user_settings = await asyncio.to_thread(self.get_user_transcription_settings, user_id)
             transcription_model = user_settings['transcription_model']
             log.info(f"Using transcription model for job {transcription_id}: {transcription_model}")
             
             # Update status to processing
-            self.active_jobs[transcription_id]["status"] = "processing"
-            self.active_jobs[transcription_id]["progress"] = 10
+            await self._update_job(transcription_id, {"status": "processing", "progress": 10})
             
             # Check if we have a working OpenAI client
             if not self.client or not OPENAI_KEY or OPENAI_KEY == "placeholder":
                 log.error("No valid OpenAI client available for transcription")
-                self.active_jobs[transcription_id].update({
+                await self._update_job(transcription_id, {
                     "status": "failed",
                     "error": "OpenAI API key required for transcription. Please provide a valid API key."
                 })
@@ -335,11 +500,14 @@ class TranscriptionService:
             log.info("Starting real transcription with OpenAI Whisper...")
             
             # Get audio duration
-            duration = self._get_audio_duration(audio_path)
+            timings = {}
+            probe_started = time.perf_counter()
+            duration = await asyncio.to_thread(self._get_audio_duration, audio_path)
+            timings["probe_ms"] = round((time.perf_counter() - probe_started) * 1000, 1)
             log.info(f"Audio file duration: {duration} seconds")
             
             # Update progress
-            self.active_jobs[transcription_id]["progress"] = 20
+            await self._update_job(transcription_id, {"progress": 20, "timings": timings})
             
             # For shorter files, transcribe directly without chunking
             if duration <= self.chunk_size_seconds:
@@ -356,7 +524,11 @@ class TranscriptionService:
                     transcript = response.text
                     if transcript and transcript.strip():
                         # Success!
-                        self.active_jobs[transcription_id].update({
+                        await self._store_transcript(
+                            job.get("content_sha256"), transcription_model, options.get("language", "en"),
+                            transcript, [transcript]
+                        )
+                        await self._update_job(transcription_id, {
                             "status": "completed",
                             "progress": 100,
                             "transcript": transcript,
@@ -367,7 +539,7 @@ class TranscriptionService:
                     else:
                         # Empty transcript
                         log.error("OpenAI returned empty transcript")
-                        self.active_jobs[transcription_id].update({
+                        await self._update_job(transcription_id, {
                             "status": "failed",
                             "error": "Transcription returned empty result. The audio may be silent or corrupted."
                         })
@@ -375,49 +547,74 @@ class TranscriptionService:
                         
                 except Exception as e:
                     log.error(f"Error in direct transcription: {str(e)}")
-                    self.active_jobs[transcription_id].update({
+                    await self._update_job(transcription_id, {
                         "status": "failed",
                         "error": f"Transcription failed: {str(e)}"
                     })
                     return
             
-            # For longer files, process in chunks
+            # For longer files, process in chunks, up to max_concurrent at once
             log.info("Processing audio in chunks...")
-            full_transcript = []
-            chunks_total = max(1, int(duration) // self.chunk_size_seconds)
-            chunks_processed = 0
-            
-            for start_time in range(0, int(duration), self.chunk_size_seconds):
-                # Extract chunk
-                chunk_path = self._extract_audio_chunk(audio_path, start_time, self.chunk_size_seconds)
-                if not chunk_path:
-                    continue
-                    
-                # Transcribe chunk with user's model
-                chunk_transcript = await self._transcribe_chunk(chunk_path, transcription_model)
-                if chunk_transcript:
-                    full_transcript.append(chunk_transcript)
-                    
-                # Clean up chunk file
-                os.remove(chunk_path)
-                
-                # Update progress
-                chunks_processed += 1
-                progress = min(95, int((chunks_processed / chunks_total) * 100))
-                self.active_jobs[transcription_id]["progress"] = progress
+            chunk_states = []
+            chunk_lock = asyncio.Lock()
+
+            async def on_chunk(index: int, state: str) -> None:
+                # Writes go through a thread; the lock keeps them in state order
+                async with chunk_lock:
+                    if index >= len(chunk_states):
+                        chunk_states.extend(["pending"] * (index + 1 - len(chunk_states)))
+                    chunk_states[index] = state
+                    finished = sum(1 for value in chunk_states if value in ("completed", "failed"))
+                    await self._update_job(transcription_id, {
+                        "chunks": list(chunk_states),
+                        "progress": 20 + int(75 * finished / len(chunk_states))
+                    })
+
+            vad_started = time.perf_counter()
+            plan = await asyncio.to_thread(self._plan_chunks, audio_path, duration)
+            if plan is not None:
+                timings["vad_ms"] = round((time.perf_counter() - vad_started) * 1000, 1)
+                await self._update_job(transcription_id, {"speech_map": plan.to_dict(), "timings": timings})
+                if not plan.chunks:
+                    await self._update_job(transcription_id, {
+                        "status": "failed",
+                        "error": "No speech detected in the recording"
+                    })
+                    return
+
+            chunk_transcripts = await self._transcribe_chunks(
+                audio_path, transcription_model,
+                language=options.get("language", "en"), on_chunk=on_chunk, timings=timings, plan=plan
+            )
+            log.info(f"Job {transcription_id} stage timings: {timings}")
+            await self._update_job(transcription_id, {"timings": timings})
+            full_transcript = [text for text in chunk_transcripts if text]
+            failed_chunks = [index for index, text in enumerate(chunk_transcripts) if text is None]
+
+            if not full_transcript:
+                await self._update_job(transcription_id, {
+                    "status": "failed",
+                    "error": "All audio chunks failed to transcribe",
+                    "failed_chunks": failed_chunks
+                })
+                return
+            if failed_chunks:
+                log.warning(f"Job {transcription_id} completed without chunks {failed_chunks}")
+                await self._update_job(transcription_id, {"failed_chunks": failed_chunks})
                 
             # Format the transcript according to requested format
             final_transcript = " ".join(full_transcript) if full_transcript else ""
+            formatted_transcript = self._format_output(final_transcript, options)
             
-            if options["format"] == "json" and options["speaker_detection"]:
-                # Format with speaker detection (simplified example)
-                formatted_transcript = self._format_transcript_with_speakers(final_transcript)
-            else:
-                # Plain text format
-                formatted_transcript = final_transcript
+            # Only complete transcripts are cached; chunks are cached as they finish
+            if not failed_chunks:
+                await self._store_transcript(
+                    job.get("content_sha256"), transcription_model, options.get("language", "en"),
+                    final_transcript, chunk_transcripts
+                )
                 
             # Update job with completed status and results
-            self.active_jobs[transcription_id].update({
+            await self._update_job(transcription_id, {
                 "status": "completed",
                 "progress": 100,
                 "completed_at": datetime.now().isoformat(),
@@ -426,11 +623,15 @@ class TranscriptionService:
             
         except Exception as e:
             log.error(f"Error processing transcription job {transcription_id}: {str(e)}")
-            self.active_jobs[transcription_id].update({
+            await self._update_job(transcription_id, {
                 "status": "failed",
                 "error": str(e)
             })
-            
+
+    async def _update_job(self, transcription_id: str, fields: Dict[str, Any]) -> bool:
+        """Merge fields into a job without blocking the event loop on the job store."""
+        return await asyncio.to_thread(self.jobs.update, transcription_id, fields)
+
     def _format_transcript_with_speakers(self, transcript: str) -> Dict[str, Any]:
         """Format a transcript with speaker detection (simplified example)."""
         # This is a simplified implementation - in reality, you would use
@@ -472,14 +673,12 @@ class TranscriptionService:
             
     def get_transcription_status(self, transcription_id: str) -> Dict[str, Any]:
         """Get the status of a transcription job."""
-        if transcription_id not in self.active_jobs:
+        job = self.jobs.get(transcription_id)
+        if job is None:
             return {
                 "status": "not_found",
                 "error": "Transcription job not found"
             }
-            
-        # Return a copy of the job status to avoid modification
-        job = self.active_jobs[transcription_id].copy()
         
         # Filter out internal fields
         if "file_path" in job:
@@ -487,6 +686,13 @@ class TranscriptionService:
             
         return job
         
+    def list_transcriptions(self, user_id: str, status: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """List a user's most recent transcription jobs, optionally filtered by status."""
+        jobs = self.jobs.list_for_user(user_id, status=status, limit=limit)
+        for job in jobs:
+            job.pop("file_path", None)
+        return jobs
+        
     def get_completed_transcription(self, transcription_id: str) -> Dict[str, Any]:
         """Get a completed transcription result."""
         status = self.get_transcription_status(transcription_id)
@@ -502,13 +708,12 @@ class TranscriptionService:
         
     def link_transcription_to_session(self, transcription_id: str, session_id: str) -> Dict[str, Any]:
         """Link a completed transcription to a therapy session."""
-        if transcription_id not in self.active_jobs:
+        job = self.jobs.get(transcription_id)
+        if job is None:
             return {
                 "status": "failed",
                 "error": "Transcription job not found"
             }
-            
-        job = self.active_jobs[transcription_id]
         
         if job.get("status") != "completed":
             return {
@@ -534,7 +739,7 @@ class TranscriptionService:
         # Update the session with the transcript
         try:
             # Import here to avoid circular imports
-            from services.neo4j_service import get_neo4j_service
+            from services import get_neo4j_service
             
             neo4j_service = get_neo4j_service()
             success = neo4j_service.update_session_transcript(session_id, transcript)
@@ -556,7 +761,7 @@ class TranscriptionService:
             }
         
         # Link the transcription
-        self.active_jobs[transcription_id]["linked_session_id"] = session_id
+        self.jobs.update(transcription_id, {"linked_session_id": session_id})
         
         return {
             "status": "success",
@@ -566,26 +771,6 @@ class TranscriptionService:
             "transcript_length": len(transcript)
         }
         
-    def cleanup_old_jobs(self, max_age_hours: int = 24) -> int:
-        """Clean up old transcription jobs that exceed the maximum age."""
-        now = datetime.now()
-        max_age = timedelta(hours=max_age_hours)
-        jobs_to_remove = []
-        
-        for job_id, job in self.active_jobs.items():
-            # Check completed jobs
-            if job.get("completed_at"):
-                completed_time = datetime.fromisoformat(job["completed_at"])
-                if now - completed_time > max_age:
-                    jobs_to_remove.append(job_id)
-            # Check failed or stuck jobs
-            elif job.get("start_time"):
-                start_time = datetime.fromisoformat(job["start_time"])
-                if now - start_time > max_age:
-                    jobs_to_remove.append(job_id)
-                    
-        # Remove the old jobs
-        for job_id in jobs_to_remove:
-            del self.active_jobs[job_id]
-            
-        return len(jobs_to_remove) 
\ No newline at end of file
+    def cleanup_old_jobs(self) -> int:
+        """Remove jobs whose TTL has passed since their last update."""
+        return self.jobs.cleanup_expired()
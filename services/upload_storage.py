@@ -0,0 +1,82 @@
+"""
+Upload Storage Module
+
+Streams an uploaded file to disk in fixed-size chunks instead of reading it
+into memory, so peak memory per upload is one chunk regardless of file size.
+The size limit is enforced and the SHA-256 content hash is computed while the
+bytes stream through. The file is written under a ".part" name and renamed
+into place only once it is complete, so a rejected or interrupted upload
+never leaves a truncated file behind.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from services.errors import ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the upload and written to disk per step
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+@dataclass
+class StoredUpload:
+    """A completed upload on disk"""
+    path: Path
+    size: int
+    sha256: str
+    elapsed_ms: float
+
+async def save_upload(upload, destination: Path, max_bytes: int,
+                      chunk_size: int = UPLOAD_CHUNK_SIZE) -> StoredUpload:
+    """Copy an upload to destination in bounded chunks
+
+    Args:
+        upload: FastAPI UploadFile, or any object with an async read(size)
+        destination: Final file path; its directory must exist
+        max_bytes: Maximum accepted size in bytes
+        chunk_size: Bytes read and written per step
+
+    Returns:
+        StoredUpload with the size and SHA-256 hex digest of the content
+
+    Raises:
+        ValidationError: If the upload is larger than max_bytes (error_code
+            "FILE_TOO_LARGE"); nothing is left on disk
+    """
+    destination = Path(destination)
+    partial = destination.with_name(destination.name + ".part")
+    hasher = hashlib.sha256()
+    size = 0
+    started = time.perf_counter()
+
+    handle = await asyncio.to_thread(open, partial, "wb")
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValidationError(
+                    f"File too large, maximum size is {max_bytes // (1024 * 1024)}MB",
+                    error_code="FILE_TOO_LARGE",
+                    details={"max_bytes": max_bytes}
+                )
+            hasher.update(chunk)
+            await asyncio.to_thread(handle.write, chunk)
+        await asyncio.to_thread(handle.close)
+        await asyncio.to_thread(os.replace, partial, destination)
+    except BaseException:
+        handle.close()
+        partial.unlink(missing_ok=True)
+        raise
+
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"Stored upload {destination.name} ({size} bytes) in {elapsed_ms}ms")
+    return StoredUpload(path=destination, size=size, sha256=hasher.hexdigest(), elapsed_ms=elapsed_ms)
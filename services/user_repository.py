@@ -0,0 +1,116 @@
+"""
+User Repository Module
+
+Reads User nodes for login, token resolution and profile fetches. Each
+lookup is one Cypher round trip: the User node and its EmailLookup email
+come back together, whether the user is found by ID or by email.
+
+Users are returned as UserRecord, a compact immutable record. It is safe to
+share between requests (the principal cache does) and converts to the
+legacy user dictionary with as_dict() for code that still expects one.
+"""
+
+import dataclasses
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from . import neo4j_queries as queries
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True, slots=True)
+class UserRecord:
+    """A User node plus its original email"""
+    user_id: str
+    email: str  # Original email from EmailLookup (the hashed one when there is none)
+    hashed_email: str
+    name: str  # This is hashed
+    password_hash: Optional[str] = dataclasses.field(default=None, repr=False)
+    is_admin: bool = False
+    status: str = "active"
+    disabled: bool = False
+    last_login: Optional[str] = None
+    created_at: Optional[str] = None
+    tokens_valid_after: Optional[float] = None
+
+    @classmethod
+    def from_node(cls, user, display_email: Optional[str]) -> "UserRecord":
+        """Build a record from a User node and its EmailLookup email
+
+        Args:
+            user: User node (or any mapping with its properties)
+            display_email: Original email, if an EmailLookup node exists
+
+        Returns:
+            The user record
+        """
+        return cls(
+            user_id=user["userId"],
+            email=display_email or user["email"],
+            hashed_email=user["email"],
+            name=user["name"],
+            password_hash=user.get("password_hash"),
+            is_admin=user.get("is_admin", False),
+            status=user.get("status", "active"),
+            disabled=user.get("disabled", False),
+            last_login=user.get("last_login"),
+            created_at=user.get("created_at"),
+            tokens_valid_after=user.get("tokens_valid_after"),
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The user dictionary returned by Neo4jService.get_user_by_id"""
+        return {
+            "userId": self.user_id,
+            "name": self.name,
+            "email": self.email,
+            "hashed_email": self.hashed_email,
+            "password_hash": self.password_hash,
+            "is_admin": self.is_admin,
+            "status": self.status,
+            "disabled": self.disabled,
+            "last_login": self.last_login,
+            "created_at": self.created_at,
+            "tokens_valid_after": self.tokens_valid_after,
+        }
+
+    def without_secrets(self) -> "UserRecord":
+        """Copy without the password hash, for caching or passing around"""
+        return dataclasses.replace(self, password_hash=None)
+
+class UserRepository:
+    """Single-query user lookups on a Neo4jService's driver
+
+    Database errors are raised rather than reported as a missing user, so
+    callers can tell "no such user" from "could not look".
+    """
+
+    def __init__(self, neo4j_service):
+        """Initialize the repository
+
+        Args:
+            neo4j_service: Neo4jService whose driver runs the queries
+        """
+        self.neo4j = neo4j_service
+
+    def get_by_id(self, user_id: str) -> Optional[UserRecord]:
+        """User with this userId, or None"""
+        return self._fetch(queries.USER_BY_ID, userId=user_id)
+
+    def get_by_email(self, email: str) -> Optional[UserRecord]:
+        """User registered with this (original) email, or None"""
+        return self._fetch(queries.USER_BY_EMAIL, email=email)
+
+    def get_by_subject(self, subject: str) -> Optional[UserRecord]:
+        """User a token subject names: a userId, or an email in older tokens"""
+        if "@" in subject:
+            return self.get_by_email(subject)
+        return self.get_by_id(subject)
+
+    def _fetch(self, query: str, **params) -> Optional[UserRecord]:
+        with self.neo4j.driver.session() as session:
+            record = session.run(query, **params).single()
+        if not record:
+            return None
+        return UserRecord.from_node(record["u"], record["email"])
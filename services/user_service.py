@@ -3,7 +3,9 @@ import hashlib
 import hmac
 import os
 from typing import Optional, Dict, Any, List
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+
+from services.password_hasher import get_password_hasher
 
 logger = logging.getLogger(__name__)
 
@@ -13,8 +15,13 @@ class UserService:
         # Use a secret key for HMAC hashing - ideally from environment variable
         self.hash_key = os.getenv("DATA_HASH_KEY", "insightjourney-hash-key-change-in-production").encode()
 
-    def create_user(self, email: str, password: str, name: str = "", is_admin: bool = False) -> str:
-        """Create a new user with hashed password and anonymized data"""
+    def create_user(self, email: str, password: str, name: str = "", is_admin: bool = False,
+                    password_hash: Optional[str] = None) -> str:
+        """Create a new user with hashed password and anonymized data
+
+        Pass password_hash when the password was already hashed (off the
+        event loop) by the caller.
+        """
         try:
             # Check if user exists - we need a separate lookup mechanism
             existing_user = self.neo4j.get_user_by_email(email)
@@ -23,7 +30,8 @@ class UserService:
                 raise ValueError(f"User with email {email} already exists")
             
             # Hash the password
-            password_hash = generate_password_hash(password)
+            if password_hash is None:
+                password_hash = get_password_hasher().hash_now(password)
             
             # Hash the email and name for anonymization
             email_hash = self._hash_data(email)
@@ -134,7 +142,7 @@ class UserService:
         try:
             # Ensure password is hashed if being updated
             if 'password' in kwargs:
-                kwargs['password_hash'] = generate_password_hash(kwargs.pop('password'))
+                kwargs['password_hash'] = get_password_hasher().hash_now(kwargs.pop('password'))
             
             # Anonymize user data
             if 'email' in kwargs:
@@ -31,6 +31,79 @@ def test_transcript():
     """
 
 
+class FakeAsyncNeo4jService:
+    """In-memory stand-in for AsyncNeo4jService, for route and analysis tests.
+
+    Sessions are plain dicts with id, userId and transcript, plus created_at
+    and element_counts where a test lists them. Writes are recorded rather
+    than applied; set fail_writes to make element writes raise.
+    """
+
+    def __init__(self, sessions, fail_writes=False):
+        self.sessions = {session["id"]: session for session in sessions}
+        self.fail_writes = fail_writes
+        self.saved = []
+        self.inserted = []
+        self.intensity_updates = []
+        self.statuses = []
+        self.limits = []
+        self.transcript_reads = []
+
+    def _write(self, writes, session_id, analysis_data):
+        if self.fail_writes:
+            raise RuntimeError("database unavailable")
+        writes.append((session_id, analysis_data))
+
+    async def get_session_data(self, session_id):
+        session = self.sessions.get(session_id)
+        if not session:
+            return None
+        return {key: value for key, value in session.items() if key != "transcript"}
+
+    async def get_session_transcript(self, session_id, **ranges):
+        # Imported here so that tests which never touch services don't load them
+        from services.transcript_store import slice_transcript
+
+        self.transcript_reads.append(session_id)
+        session = self.sessions.get(session_id)
+        if not session:
+            return None
+        return {"userId": session["userId"], "transcript": slice_transcript(session["transcript"], **ranges)}
+
+    async def get_user_session_summaries(self, user_id, limit, before=None):
+        """Pages sessions the way USER_SESSION_SUMMARIES does"""
+        self.limits.append(limit)
+        rows = sorted((s for s in self.sessions.values()
+                       if s["userId"] == user_id and (before is None or (s.get("created_at") or "", s["id"]) < before)),
+                      key=lambda s: (s.get("created_at") or "", s["id"]), reverse=True)
+        return [{**{key: value for key, value in s.items() if key != "transcript"},
+                 "created_at": s.get("created_at") or "",
+                 "transcript_length": len(s["transcript"]),
+                 "element_counts": s.get("element_counts", {})} for s in rows[:limit]]
+
+    async def save_session_analysis(self, session_id, analysis_data, user_id):
+        self._write(self.saved, session_id, analysis_data)
+        return True
+
+    async def insert_session_elements(self, session_id, analysis_data, user_id):
+        self._write(self.inserted, session_id, analysis_data)
+        return {"success": True}
+
+    async def update_session_emotion_intensities(self, session_id, analysis_data, user_id):
+        self._write(self.intensity_updates, session_id, analysis_data)
+        return True
+
+    async def set_analysis_status(self, session_id, status):
+        self.statuses.append(status)
+        return True
+
+
+@pytest.fixture
+def fake_neo4j_service():
+    """Factory for FakeAsyncNeo4jService: fake_neo4j_service(sessions, fail_writes=False)"""
+    return FakeAsyncNeo4jService
+
+
 def pytest_configure(config):
     """Configure pytest markers."""
     config.addinivalue_line("markers", "essential: Essential tests for basic functionality")
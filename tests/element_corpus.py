@@ -0,0 +1,118 @@
+"""
+Analysis responses built from the generated sessions in data/generators/output
+
+Each response is written in the PROMPT_TEMPLATE format from the client turns
+of one transcript, together with the elements it should parse to. Used by
+the extract_elements tests and scripts/benchmarks/bench_extract_elements.py.
+"""
+
+import random
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+OUTPUT_DIR = Path(__file__).resolve().parent.parent / "data" / "generators" / "output"
+
+TURN = re.compile(r"^\W*\[?(\d{1,2}:\d{2})\]?\W*\s*([^:\n]{1,40}):\s*(.+)$")
+TOPICS = ("Career", "Relationships", "Self-Esteem", "Health", "Family", "Stress")
+
+HEADERS = {
+    "emotions": "EMOTIONS",
+    "beliefs": "BELIEFS",
+    "action_items": "ACTION ITEMS",
+    "challenges": "CHALLENGES",
+    "insights": "INSIGHTS",
+}
+
+Elements = Dict[str, List[Dict[str, str]]]
+
+def _client_turns(transcript: str) -> List[Tuple[str, str]]:
+    """(timestamp, text) of each turn by the client named in the header"""
+    client = re.search(r"^Client:\s*([^\s(]+)", transcript, re.MULTILINE)
+    turns = []
+    pending = None
+    for line in transcript.splitlines():
+        line = line.replace("**", "").strip()
+        match = TURN.match(line)
+        if match:
+            pending = None
+            timestamp, speaker, text = match.groups()
+            if client and speaker.strip().startswith(client.group(1)):
+                turns.append((timestamp, text.strip()))
+        elif re.fullmatch(r"\[?(\d{1,2}:\d{2})\]?", line):
+            # Timestamp on its own line, turn on the next
+            pending = line.strip("[]")
+        elif pending and client and line.startswith(client.group(1)) and ":" in line:
+            turns.append((pending, line.split(":", 1)[1].strip()))
+            pending = None
+    return [(t, text) for t, text in turns if re.search(r"\w", text)]
+
+def _element(element_type: str, number: int, timestamp: str, text: str) -> Dict[str, str]:
+    words = re.findall(r"[A-Za-z']+", text)
+    snippet = " ".join(text.split())[:120].strip()
+    element = {"name": " ".join(words[:3]).title() or f"Element {number}"}
+    if element_type == "emotions":
+        element["intensity"] = str(len(text) % 10 + 1)
+    if element_type in ("emotions", "insights"):
+        element["context"] = snippet
+    if element_type in ("beliefs", "action_items"):
+        element["description"] = snippet
+    if element_type in ("beliefs", "challenges"):
+        element["impact"] = " ".join(words[-6:]) or "Unclear"
+    element["topic"] = TOPICS[number % len(TOPICS)]
+    element["timestamp"] = timestamp
+    return element
+
+def render(elements: Elements) -> str:
+    """Response text in the PROMPT_TEMPLATE format"""
+    sections = []
+    for element_type, header in HEADERS.items():
+        blocks = []
+        for element in elements[element_type]:
+            blocks.append("\n".join(f"{key.title()}: {value}" for key, value in element.items()))
+        sections.append(f"=== {header} ===\n" + "\n\n".join(blocks))
+    return "\n\n".join(sections) + "\n"
+
+def build_corpus(limit: int = None) -> List[Tuple[str, Elements]]:
+    """(response, expected elements) for each generated transcript
+
+    Args:
+        limit: Use at most this many transcripts
+
+    Returns:
+        One entry per transcript that has client turns
+    """
+    corpus = []
+    for path in sorted(OUTPUT_DIR.glob("*/*.txt"))[:limit]:
+        turns = _client_turns(path.read_text(encoding="utf-8"))
+        if not turns:
+            continue
+        elements = {element_type: [] for element_type in HEADERS}
+        for number, (timestamp, text) in enumerate(turns):
+            element_type = list(HEADERS)[number % len(HEADERS)]
+            elements[element_type].append(_element(element_type, number, timestamp, text))
+        corpus.append((render(elements), elements))
+    return corpus
+
+def mutate(response: str, rng: random.Random) -> str:
+    """The same elements in formatting the model is known to drift into"""
+    mutations = [
+        # A repeated header partway through a section
+        lambda text: re.sub(r"(=== (.+) ===\n)((?:.+\n)+?)\n(?=Name:)", r"\1\3\n\1", text),
+        # No blank lines between elements
+        lambda text: re.sub(r"\n\n(?=Name:)", "\n", text),
+        # Markdown headers instead of === HEADER ===
+        lambda text: re.sub(r"^=== (.+) ===$", lambda m: f"## {m.group(1).title()}", text, flags=re.MULTILINE),
+        # Bold or bulleted field names
+        lambda text: re.sub(r"^(\w[\w ]*):", r"**\1:**", text, flags=re.MULTILINE),
+        lambda text: re.sub(r"^(\w[\w ]*):", r"- \1:", text, flags=re.MULTILINE),
+        # Prose before and after the sections
+        lambda text: "Here is the analysis of the session.\n\n" + text + "\nLet me know if you need more detail.\n",
+        # Windows line endings and trailing spaces
+        lambda text: text.replace("\n", " \r\n"),
+    ]
+    chosen = set(rng.sample(range(len(mutations)), rng.randint(1, 3)))
+    for index, mutation in enumerate(mutations):
+        if index in chosen:
+            response = mutation(response)
+    return response
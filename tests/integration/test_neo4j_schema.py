@@ -0,0 +1,198 @@
+"""
+Integration tests for the Neo4j schema bootstrap
+
+The plan tests need a reachable Neo4j (a local Docker instance is enough,
+configured through NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD). They are
+skipped when no database is available.
+"""
+
+import os
+import re
+import pytest
+import logging
+
+from services import neo4j_queries as queries
+from services import neo4j_schema
+
+logger = logging.getLogger(__name__)
+
+# Lookup statements the services run on every request
+LOOKUP_QUERIES = {
+    "user_by_id": queries.USER_BY_ID,
+    "user_by_email": queries.USER_BY_EMAIL,
+    "session_data": queries.SESSION_DATA,
+    "session_with_relationships": queries.SESSION_WITH_RELATIONSHIPS,
+    "session_analysis": queries.SESSION_ANALYSIS,
+    "session_delete_summary": queries.SESSION_DELETE_SUMMARY,
+    "clear_last_session": queries.CLEAR_LAST_SESSION,
+    "save_session_analysis": queries.SAVE_SESSION_ANALYSIS,
+    "topic_taxonomy": "MATCH (tt:TopicTaxonomy {name: $name}) RETURN tt",
+}
+
+
+def _plan_operators(plan):
+    """Flatten an EXPLAIN plan into its operator names."""
+    operators = [plan["operatorType"]]
+    for child in plan.get("children", []):
+        operators.extend(_plan_operators(child))
+    return operators
+
+
+@pytest.fixture(scope="module")
+def neo4j_driver():
+    """Driver for a local Neo4j, or skip when none is reachable."""
+    from neo4j import GraphDatabase
+
+    uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+    user = os.getenv("NEO4J_USER") or os.getenv("NEO4J_USERNAME", "neo4j")
+    password = os.getenv("NEO4J_PASSWORD", "password")
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+    try:
+        driver.verify_connectivity()
+    except Exception as e:
+        driver.close()
+        pytest.skip(f"Neo4j not available: {str(e)}")
+    yield driver
+    driver.close()
+
+
+@pytest.mark.unit
+def test_schema_statements_are_idempotent():
+    """Every statement can be re-run safely."""
+    statements = neo4j_schema.schema_statements()
+    assert len(statements) == len(neo4j_schema.CONSTRAINTS) + len(neo4j_schema.INDEXES)
+    assert all("IF NOT EXISTS" in statement for statement in statements)
+    logger.info("✅ Schema statements passed")
+
+
+@pytest.mark.unit
+def test_find_missing_matches_on_label_and_properties():
+    """Equivalent items under other names count; constraint indexes satisfy indexes."""
+    constraint_rows = [
+        {"name": "legacy_session_id", "type": "UNIQUENESS", "labelsOrTypes": ["Session"], "properties": ["id"]},
+        {"name": "topic_name_unique", "type": "UNIQUENESS", "labelsOrTypes": ["Topic"], "properties": ["name"]},
+    ]
+    index_rows = [
+        {"name": "lookup", "type": "LOOKUP", "labelsOrTypes": None, "properties": None, "state": "ONLINE"},
+        {"name": "x", "type": "RANGE", "labelsOrTypes": ["Emotion"], "properties": ["name", "user_id"], "state": "ONLINE"},
+        {"name": "y", "type": "RANGE", "labelsOrTypes": ["Insight"], "properties": ["name", "user_id"], "state": "FAILED"},
+    ]
+
+    missing = neo4j_schema.find_missing(constraint_rows, index_rows)
+
+    assert "session_id_unique" not in missing["constraints"]
+    assert "user_user_id_unique" in missing["constraints"]
+    assert "topic_name" not in missing["indexes"]
+    assert "emotion_name_user_id" not in missing["indexes"]
+    assert "insight_name_user_id" in missing["indexes"]
+    logger.info("✅ Schema diff passed")
+
+
+class _FakeResult:
+    def __init__(self, rows=()):
+        self._rows = list(rows)
+
+    def __iter__(self):
+        return iter(_FakeRecord(row) for row in self._rows)
+
+    def consume(self):
+        return None
+
+
+class _FakeRecord:
+    def __init__(self, row):
+        self._row = row
+
+    def data(self):
+        return dict(self._row)
+
+
+class _FakeSchemaSession:
+    """Records created items; raises on statements containing `fail_on`."""
+
+    def __init__(self, state, fail_on):
+        self.state = state
+        self.fail_on = fail_on
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, statement, **params):
+        if statement == neo4j_schema.SHOW_CONSTRAINTS:
+            return _FakeResult(self.state["constraints"])
+        if statement == neo4j_schema.SHOW_INDEXES:
+            return _FakeResult(self.state["indexes"])
+        if statement == neo4j_schema.AWAIT_INDEXES:
+            self.state["awaited"] = True
+            return _FakeResult()
+        if self.fail_on in statement:
+            raise RuntimeError("constraint violated by existing data")
+
+        for name, label, properties in neo4j_schema.CONSTRAINTS + neo4j_schema.INDEXES:
+            if f"CREATE CONSTRAINT {name} " in statement:
+                self.state["constraints"].append(
+                    {"name": name, "type": "UNIQUENESS", "labelsOrTypes": [label], "properties": list(properties)})
+            elif f"CREATE INDEX {name} " in statement:
+                self.state["indexes"].append(
+                    {"name": name, "type": "RANGE", "labelsOrTypes": [label], "properties": list(properties),
+                     "state": "ONLINE"})
+        return _FakeResult()
+
+
+class _FakeSchemaDriver:
+    def __init__(self, fail_on):
+        self.state = {"constraints": [], "indexes": [], "awaited": False}
+        self.fail_on = fail_on
+
+    def session(self):
+        return _FakeSchemaSession(self.state, self.fail_on)
+
+
+@pytest.mark.unit
+def test_ensure_schema_continues_past_a_failed_statement():
+    """One failing constraint is reported; every other item is still created."""
+    driver = _FakeSchemaDriver(fail_on="user_user_id_unique")
+
+    report = neo4j_schema.ensure_schema(driver)
+
+    assert [item["name"] for item in report["failed"]] == ["user_user_id_unique"]
+    assert "constraint violated" in report["failed"][0]["error"]
+    assert "user_user_id_unique" not in report["created"]
+    assert "action_item_id_unique" in report["created"]
+    assert "challenge_id" in report["created"]
+    assert report["missing"] == {"constraints": ["user_user_id_unique"], "indexes": []}
+    assert driver.state["awaited"] is True
+    logger.info("✅ Schema failure isolation passed")
+
+
+@pytest.mark.integration
+@pytest.mark.requires_neo4j
+def test_ensure_schema_is_complete_and_idempotent(neo4j_driver):
+    """A second run creates nothing and reports nothing missing."""
+    first = neo4j_schema.ensure_schema(neo4j_driver)
+    assert first["missing"] == {"constraints": [], "indexes": []}
+
+    second = neo4j_schema.ensure_schema(neo4j_driver)
+    assert second["created"] == []
+    assert second["missing"] == {"constraints": [], "indexes": []}
+    logger.info("✅ Schema bootstrap passed")
+
+
+@pytest.mark.integration
+@pytest.mark.requires_neo4j
+@pytest.mark.parametrize("name", sorted(LOOKUP_QUERIES))
+def test_lookup_plans_use_indexes(neo4j_driver, name):
+    """Lookup queries are planned as index seeks, never label scans."""
+    neo4j_schema.ensure_schema(neo4j_driver)
+
+    query = LOOKUP_QUERIES[name]
+    params = {param: None for param in re.findall(r"\$(\w+)", query)}
+    with neo4j_driver.session() as session:
+        plan = session.run(f"EXPLAIN {query}", params).consume().plan
+
+    operators = _plan_operators(plan)
+    assert not any(op.startswith("NodeByLabelScan") for op in operators), f"{name}: {operators}"
+    logger.info(f"✅ Index plan for {name} passed")
@@ -0,0 +1,132 @@
+"""
+Load tests for the non-blocking analysis pipeline
+
+Several /analysis/analyze requests run against a slow mocked OpenAI backend
+while the health endpoint is polled. The event loop must stay responsive and
+the per-process concurrency limit must hold.
+"""
+
+import asyncio
+import time
+import pytest
+import logging
+
+import httpx
+
+import main
+from routes import analysis as analysis_routes
+from services import analysis_service, llm_client
+from services.analysis_service import AnalysisLimiter
+from services.llm_client import LLMClientManager, PoolConfig, RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+LLM_DELAY = 0.3
+
+ANALYSIS_TEXT = """
+# Emotions
+Name: Anxiety
+Intensity: 4
+Context: Worried about the presentation
+Topic: Work
+Timestamp: 01:10
+"""
+
+
+SESSION_IDS = [f"S_{n}" for n in range(6)] + ["S_a", "S_b"]
+
+
+@pytest.fixture
+def load_env(monkeypatch, fake_neo4j_service):
+    """Slow mocked LLM, fake database and a 2-slot analysis limiter."""
+    in_flight = {"now": 0, "max": 0}
+
+    async def slow_llm(request):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(LLM_DELAY)
+        in_flight["now"] -= 1
+        return httpx.Response(200, json={
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "gpt-4",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": ANALYSIS_TEXT}}],
+        })
+
+    manager = LLMClientManager(
+        api_key="sk-test",
+        pool=PoolConfig(timeout=5.0),
+        retry_policy=RetryPolicy(max_attempts=1),
+        async_transport=httpx.MockTransport(slow_llm),
+    )
+    neo4j_service = fake_neo4j_service([
+        {"id": session_id, "userId": "U_load", "transcript": "We talked about work."} for session_id in SESSION_IDS
+    ])
+
+    monkeypatch.setattr(llm_client, "_llm_client_manager", manager)
+    monkeypatch.setattr(analysis_service, "analysis_limiter", AnalysisLimiter(limit=2, queue_timeout=5.0))
+    monkeypatch.setattr(analysis_service, "get_user_analysis_settings", lambda user_id=None: {})
+    monkeypatch.setattr(analysis_service, "get_analysis_cache", lambda: None)
+    monkeypatch.setattr(analysis_routes, "get_async_neo4j_service", lambda: neo4j_service)
+    main.app.dependency_overrides[analysis_routes.get_current_user_id] = lambda: "U_load"
+    yield in_flight, neo4j_service
+    main.app.dependency_overrides.clear()
+
+
+async def _analyze(client, session_id):
+    return await client.post("/api/v1/analysis/analyze", json={"session_id": session_id})
+
+
+@pytest.mark.unit
+def test_health_stays_responsive_during_analyses(load_env):
+    """Six concurrent analyses run two at a time while /health answers promptly."""
+    in_flight, neo4j_service = load_env
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            analyses = [asyncio.create_task(_analyze(client, f"S_{n}")) for n in range(6)]
+
+            health_latencies = []
+            while not all(task.done() for task in analyses):
+                started = time.perf_counter()
+                response = await client.get("/api/v1/health")
+                health_latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200
+                await asyncio.sleep(0.02)
+
+            return [task.result() for task in analyses], health_latencies
+
+    started = time.perf_counter()
+    responses, health_latencies = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+
+    assert [r.status_code for r in responses] == [200] * 6
+    assert responses[0].json()["results"]["emotions"][0]["name"] == "Anxiety"
+    assert sorted(session_id for session_id, _ in neo4j_service.saved) == SESSION_IDS[:6]
+    assert in_flight["max"] == 2
+    assert elapsed >= 3 * LLM_DELAY
+
+    health_latencies.sort()
+    p95 = health_latencies[int(len(health_latencies) * 0.95) - 1]
+    logger.info(f"health checks={len(health_latencies)} p95={p95 * 1000:.1f}ms max={health_latencies[-1] * 1000:.1f}ms")
+    assert len(health_latencies) >= 10
+    assert p95 < LLM_DELAY / 3
+    logger.info("✅ Responsive event loop passed")
+
+
+@pytest.mark.unit
+def test_analysis_over_capacity_returns_503(load_env, monkeypatch):
+    """Requests that cannot get a slot within the queue timeout are rejected."""
+    monkeypatch.setattr(analysis_service, "analysis_limiter", AnalysisLimiter(limit=1, queue_timeout=0.05))
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(_analyze(client, "S_a"), _analyze(client, "S_b"))
+
+    responses = asyncio.run(run())
+
+    assert sorted(r.status_code for r in responses) == [200, 503]
+    rejected = next(r for r in responses if r.status_code == 503)
+    assert rejected.headers["retry-after"] == "30"
+    logger.info("✅ Capacity limit passed")
@@ -0,0 +1,143 @@
+"""
+Tests for streaming analysis: incremental element parsing and the SSE endpoint
+"""
+
+import asyncio
+import json
+import pytest
+import logging
+
+import httpx
+
+import main
+from routes import analysis as analysis_routes
+from services import analysis_service, llm_client
+from services.analysis_service import AnalysisLimiter, PROMPT_TEMPLATE, extract_elements
+from services.element_stream import ElementStreamParser
+from services.llm_client import LLMClientManager, RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+TOKEN_DELAY = 0.01
+
+EXAMPLE = PROMPT_TEMPLATE.split("Example of correct format:")[1].split("Transcript:")[0]
+
+
+@pytest.mark.unit
+def test_parser_emits_each_element_when_its_block_completes():
+    """Fed a few characters at a time, each element appears right after its Timestamp line."""
+    parser = ElementStreamParser()
+    emitted_at = []
+    parsed = []
+    for offset in range(0, len(EXAMPLE), 5):
+        for element in parser.feed(EXAMPLE[offset:offset + 5]):
+            emitted_at.append(offset + 5)
+            parsed.append(element)
+    parsed += parser.close()
+
+    expected = extract_elements(EXAMPLE)
+    assert {t: [e for kind, e in parsed if kind == t] for t in expected} == expected
+    first_timestamp_line_end = EXAMPLE.index("\n", EXAMPLE.index("Timestamp:"))
+    assert emitted_at[0] - first_timestamp_line_end <= 5
+    assert emitted_at[0] < len(EXAMPLE) / 4
+    logger.info("✅ Incremental parsing passed")
+
+
+def _stream_session(fake_neo4j_service, **options):
+    return fake_neo4j_service([{"id": "S_1", "userId": "U_stream", "transcript": "We talked about work."}], **options)
+
+
+def _streaming_llm(text):
+    """OpenAI-style SSE stream that sends text a few characters per event."""
+    async def handle(request):
+        assert json.loads(request.content)["stream"] is True
+
+        async def body():
+            for offset in range(0, len(text), 8):
+                chunk = {"id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4",
+                         "choices": [{"index": 0, "delta": {"content": text[offset:offset + 8]}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n".encode()
+                await asyncio.sleep(TOKEN_DELAY)
+            yield b"data: [DONE]\n\n"
+
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body())
+    return handle
+
+
+def _events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _stream(monkeypatch, text, neo4j_service):
+    """POST /analysis/stream against a model that streams text; returns the parsed events."""
+    manager = LLMClientManager(api_key="sk-test", retry_policy=RetryPolicy(max_attempts=1),
+                               async_transport=httpx.MockTransport(_streaming_llm(text)))
+    monkeypatch.setattr(llm_client, "_llm_client_manager", manager)
+    monkeypatch.setattr(analysis_service, "analysis_limiter", AnalysisLimiter(limit=2, queue_timeout=5.0))
+    monkeypatch.setattr(analysis_service, "get_user_analysis_settings", lambda user_id=None: {})
+    monkeypatch.setattr(analysis_service, "get_analysis_cache", lambda: None)
+    monkeypatch.setattr(analysis_routes, "get_async_neo4j_service", lambda: neo4j_service)
+    main.app.dependency_overrides[analysis_routes.get_current_user_id] = lambda: "U_stream"
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/v1/analysis/stream", json={"session_id": "S_1"})
+
+    try:
+        response = asyncio.run(run())
+    finally:
+        main.app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return _events(response.text)
+
+
+@pytest.mark.unit
+def test_stream_endpoint_pushes_and_stores_elements(monkeypatch, fake_neo4j_service):
+    """/analysis/stream sends one event per element, stores each, and ends with the results."""
+    neo4j_service = _stream_session(fake_neo4j_service)
+    events = _stream(monkeypatch, EXAMPLE, neo4j_service)
+    kinds = [kind for kind, _ in events]
+    assert kinds == ["element"] * 5 + ["done"]
+    assert [data["type"] for _, data in events[:5]] == ["emotions", "beliefs", "action_items", "challenges", "insights"]
+    done = events[-1][1]
+    assert done["stored"] == done["elements"] == 5
+    assert done["results"]["emotions"][0]["name"] == "Anxiety"
+    assert done["first_element_ms"] < done["elapsed_ms"] / 2
+    assert [list(analysis_data) for _, analysis_data in neo4j_service.inserted] == [
+        ["Emotions"], ["Beliefs"], ["actionitems"], ["Challenges"], ["Insights"]
+    ]
+    assert neo4j_service.statuses == ["completed"]
+    logger.info(f"✅ Streaming endpoint passed (first element {done['first_element_ms']}ms "
+                f"of {done['elapsed_ms']}ms)")
+
+
+@pytest.mark.unit
+def test_stream_sends_updates_for_repeats_and_sets_status_once(monkeypatch, fake_neo4j_service):
+    """A repeat that raises an emotion's intensity is sent as an update and stored; status is set at the end."""
+    repeat = "\n=== EMOTIONS ===\nName: Anxiety\nIntensity: 5\nContext: Client feels anxious when thinking " \
+             "about upcoming work presentation\nTopic: Career\nTimestamp: 40:00\n"
+    neo4j_service = _stream_session(fake_neo4j_service)
+    events = _stream(monkeypatch, EXAMPLE + repeat, neo4j_service)
+
+    kinds = [kind for kind, _ in events]
+    assert kinds == ["element"] * 5 + ["element_updated", "done"]
+    updated = events[5][1]
+    assert updated["type"] == "emotions"
+    assert updated["element"]["intensity"] == "5"
+    assert updated["element"]["timestamps"] == ["12:45", "40:00"]
+    assert len(neo4j_service.inserted) == 5
+    assert [update["Emotions"][0][:2] for _, update in neo4j_service.intensity_updates] == [["Anxiety", "5"]]
+    assert neo4j_service.statuses == ["completed"]
+
+    failing = _stream_session(fake_neo4j_service, fail_writes=True)
+    done = _stream(monkeypatch, EXAMPLE, failing)[-1][1]
+    assert done["stored"] == 0
+    assert failing.statuses == ["failed"]
+    logger.info("✅ Streaming updates and status passed")
@@ -0,0 +1,187 @@
+"""
+Tests for the JWT fast path and the cached principal
+"""
+
+import asyncio
+import threading
+import pytest
+import logging
+
+import httpx
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import main
+import services
+from routes import settings as settings_routes
+from services import auth_service
+from services.auth_service import AuthService
+from services.loading_cache import LoadingCache
+from services.user_repository import UserRecord
+
+logger = logging.getLogger(__name__)
+
+
+class FakeUserStore:
+    """Neo4jService stand-in that counts user lookups."""
+
+    def __init__(self):
+        self.nodes = {
+            "U_1": {"userId": "U_1", "email": "hashed-email", "name": "hashed-name",
+                    "password_hash": generate_password_hash("old-password"),
+                    "created_at": "2024-01-01T00:00:00"},
+        }
+        self.emails = {"ada@example.com": "U_1"}
+        self.lookups = 0
+        self._lock = threading.Lock()
+        self.users = self
+
+    # UserRepository interface
+    def get_by_id(self, user_id):
+        with self._lock:
+            self.lookups += 1
+        node = self.nodes.get(user_id)
+        email = next((e for e, u in self.emails.items() if u == user_id), None)
+        return UserRecord.from_node(node, email) if node else None
+
+    def get_by_email(self, email):
+        return self.get_by_id(self.emails.get(email))
+
+    def get_by_subject(self, subject):
+        return self.get_by_email(subject) if "@" in subject else self.get_by_id(subject)
+
+    def revoke_user_tokens(self, user_id, valid_after):
+        self.nodes[user_id]["tokens_valid_after"] = valid_after
+        return True
+
+    def update_user(self, user_id, **kwargs):
+        self.nodes[user_id].update(kwargs)
+        return True
+
+    def change_user_password(self, user_id, new_password_hash):
+        self.nodes[user_id]["password_hash"] = new_password_hash
+        return True
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeUserStore()
+    monkeypatch.setattr(services, "get_neo4j_service", lambda: store)
+    monkeypatch.setattr(services, "_auth_service", AuthService(store, "test-secret"))
+    monkeypatch.setattr(auth_service, "_principal_cache",
+                        LoadingCache(auth_service._load_principal, ttl=60, name="principal"))
+    monkeypatch.setattr(auth_service, "_email_subject_cache",
+                        LoadingCache(auth_service._load_email_subject, ttl=60, name="email subject"))
+    return store
+
+
+def _call(*requests):
+    """Run (method, path, token, json) requests against the app in order."""
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = []
+            for method, path, token, body in requests:
+                headers = {"Authorization": f"Bearer {token}"} if token else {}
+                responses.append(await client.request(method, f"/api/v1{path}", headers=headers, json=body))
+            return responses
+    return asyncio.run(run())
+
+
+@pytest.mark.unit
+def test_hot_requests_run_no_auth_queries(store):
+    """The token is verified locally and the principal is loaded once."""
+    token = services.get_auth_service().generate_token("U_1")
+
+    responses = _call(*[("GET", "/auth/me", token, None)] * 20)
+    assert all(r.status_code == 200 for r in responses)
+    assert responses[0].json()["id"] == "U_1" and responses[0].json()["email"] == "ada@example.com"
+    assert store.lookups == 1
+
+    # Older tokens carry the email as subject; they resolve to the same user
+    legacy = services.get_auth_service().generate_token("ada@example.com")
+    assert _call(("GET", "/auth/me", legacy, None))[0].json()["id"] == "U_1"
+
+    bad, missing = _call(("GET", "/auth/me", token + "x", None),
+                         ("GET", "/auth/me", services.get_auth_service().generate_token("U_gone"), None))
+    assert bad.status_code == missing.status_code == 401
+    assert store.lookups == 3
+    assert auth_service.get_principal_cache().peek("U_1").password_hash is None
+    logger.info("✅ Auth fast path passed")
+
+
+@pytest.mark.unit
+def test_logout_and_disable_take_effect_immediately(store):
+    """Logout revokes earlier tokens; disabling an account drops its cached principal."""
+    auth = services.get_auth_service()
+    old_token = auth.generate_token("U_1")
+    assert _call(("GET", "/auth/me", old_token, None))[0].status_code == 200
+
+    logout, after_logout = _call(("POST", "/auth/logout", old_token, None),
+                                 ("GET", "/auth/me", old_token, None))
+    assert logout.status_code == 200
+    assert after_logout.status_code == 401
+    assert after_logout.json()["detail"] == "Token has been revoked"
+
+    new_token = auth.generate_token("U_1")
+    assert _call(("GET", "/auth/me", new_token, None))[0].status_code == 200
+
+    # Older tokens name the user by email; they share the user's cached principal
+    legacy = auth.generate_token("ada@example.com")
+    assert _call(("GET", "/auth/me", legacy, None))[0].status_code == 200
+    auth.set_user_disabled("U_1")
+    assert _call(("GET", "/auth/me", new_token, None))[0].status_code == 403
+    assert _call(("GET", "/auth/me", legacy, None))[0].status_code == 403
+
+    auth.set_user_disabled("U_1", disabled=False)
+    logout, after_logout = _call(("POST", "/auth/logout", legacy, None),
+                                 ("GET", "/auth/me", new_token, None))
+    assert logout.status_code == 200 and after_logout.status_code == 401
+    logger.info("✅ Logout and disable passed")
+
+
+class FakeAsyncUserStore:
+    """The admin routes' view of a FakeUserStore, through the async service."""
+
+    def __init__(self, store):
+        self.store = store
+
+    async def get_user_by_id(self, user_id):
+        user = self.store.get_by_id(user_id)
+        return user.as_dict() if user else None
+
+    async def update_user(self, user_id, **properties):
+        return self.store.update_user(user_id, **properties)
+
+
+@pytest.mark.unit
+def test_admin_demotion_takes_effect_immediately(store, monkeypatch):
+    """Admin checks read the cached principal, so changing is_admin invalidates it."""
+    monkeypatch.setattr(settings_routes, "get_async_neo4j_service", lambda: FakeAsyncUserStore(store))
+    store.nodes["U_1"]["is_admin"] = True
+    token = services.get_auth_service().generate_token("U_1")
+
+    demote, after = _call(("PUT", "/settings/admin/users/U_1", token, {"is_admin": False}),
+                          ("PUT", "/settings/admin/users/U_1", token, {"is_admin": True}))
+    assert demote.status_code == 200 and demote.json()["user"]["is_admin"] is False
+    assert after.status_code == 403
+    logger.info("✅ Admin demotion passed")
+
+
+@pytest.mark.unit
+def test_password_change_issues_a_new_token(store):
+    """After a password change only the token it returns is accepted."""
+    old_token = services.get_auth_service().generate_token("U_1")
+    change = {"current_password": "old-password", "new_password": "new-password"}
+
+    wrong, = _call(("PUT", "/auth/credentials/password", old_token, {**change, "current_password": "nope"}))
+    assert wrong.status_code == 400
+
+    changed, = _call(("PUT", "/auth/credentials/password", old_token, change))
+    assert changed.status_code == 200
+    new_token = changed.json()["access_token"]
+    assert check_password_hash(store.nodes["U_1"]["password_hash"], "new-password")
+
+    old, new = _call(("GET", "/auth/me", old_token, None), ("GET", "/auth/me", new_token, None))
+    assert old.status_code == 401
+    assert new.status_code == 200
+    logger.info("✅ Password change passed")
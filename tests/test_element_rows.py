@@ -0,0 +1,214 @@
+"""
+Tests for the bulk analysis writer's row normalization
+
+These tests run without a database: they verify that analysis output is
+converted into the parameter rows consumed by SAVE_SESSION_ANALYSIS.
+"""
+
+import re
+import pytest
+import logging
+
+from services import element_rows
+from services import neo4j_queries as queries
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP = "2025-01-01T10:00:00"
+
+
+@pytest.fixture
+def analysis_data():
+    """Analysis data in the positional format built by /analysis/analyze."""
+    return {
+        "Emotions": [
+            ["Anxiety", 4, "Worried about the presentation", "Work", ""],
+            ["Relief", "not-a-number", "", None, ""],
+        ],
+        "Beliefs": [
+            ["b-1", "Not good enough", "I am not good enough at work", "Limits confidence", ["Work", {"name": "Self-Worth"}], ""],
+        ],
+        "actionitems": [
+            ["a-1", "Practice talk", "Rehearse the presentation twice", "Work", "hasn't started"],
+        ],
+        "Challenges": [
+            ["Public speaking", "Freezing in front of groups", "Avoids meetings", "Work"],
+        ],
+        "Insights": [
+            ["Preparation helps", "Practice reduces anxiety", "", ["Work", "Work"]],
+        ],
+    }
+
+
+@pytest.mark.unit
+def test_analysis_to_rows_shapes(analysis_data):
+    """Every element type becomes one row with normalized topics."""
+    rows = element_rows.analysis_to_rows(analysis_data, "U_1", TIMESTAMP)
+
+    assert set(rows) == set(element_rows.ELEMENT_KEYS)
+    assert [row["name"] for row in rows["emotions"]] == ["Anxiety", "Relief"]
+    assert rows["emotions"][0]["intensity"] == 4.0
+    assert rows["emotions"][1]["intensity"] == 0.0
+    assert rows["emotions"][1]["topics"] == [element_rows.DEFAULT_TOPIC]
+
+    assert rows["beliefs"][0]["text"] == "I am not good enough at work"
+    assert rows["beliefs"][0]["topics"] == ["Work", "Self-Worth"]
+    assert rows["insights"][0]["topics"] == ["Work"]
+    assert rows["challenges"][0]["impact"] == "Avoids meetings"
+
+    action = rows["action_items"][0]
+    assert action["properties"]["id"] == action["id"]
+    assert action["properties"]["user_id"] == "U_1"
+    assert action["properties"]["created_at"] == TIMESTAMP
+    assert action["status"] == "hasn't started"
+    logger.info("✅ Analysis rows passed")
+
+
+@pytest.mark.unit
+def test_analysis_to_rows_empty():
+    """Missing element types produce empty row lists."""
+    rows = element_rows.analysis_to_rows({}, "U_1", TIMESTAMP)
+    assert all(rows[key] == [] for key in element_rows.ELEMENT_KEYS)
+    assert element_rows.row_counts(rows)["topic_links"] == 0
+    logger.info("✅ Empty analysis rows passed")
+
+
+@pytest.mark.unit
+def test_write_report(analysis_data):
+    """The write report counts elements and topic links for one round trip."""
+    rows = element_rows.analysis_to_rows(analysis_data, "U_1", TIMESTAMP)
+    report = element_rows.write_report("S_1", rows, 0.0123)
+
+    assert report["success"] is True
+    assert report["round_trips"] == 1
+    assert report["elapsed_ms"] == 12.3
+    assert report["counts"]["emotions"] == 2
+    assert report["counts"]["topic_links"] == 7
+    logger.info("✅ Write report passed")
+
+
+@pytest.mark.unit
+def test_bulk_query_parameters_are_supplied(analysis_data):
+    """Every parameter referenced by the bulk statement is provided by the writer."""
+    rows = element_rows.analysis_to_rows(analysis_data, "U_1", TIMESTAMP)
+    supplied = {"session_id", "user_id", "timestamp", "relevance", *rows}
+    referenced = set(re.findall(r"\$(\w+)", queries.SAVE_SESSION_ANALYSIS))
+
+    assert referenced == supplied
+    logger.info("✅ Bulk query parameters passed")
+
+
+def _stored(rows):
+    """Turn freshly converted rows into stored state with relationship ids."""
+    return {
+        key: [dict(row, rel_id=f"r-{key}-{n}") for n, row in enumerate(items)]
+        for key, items in rows.items()
+    }
+
+
+@pytest.mark.unit
+def test_diff_rows_unchanged(analysis_data):
+    """Re-submitting the stored elements writes nothing."""
+    stored = _stored(element_rows.analysis_to_rows(analysis_data, "U_1", TIMESTAMP))
+    desired = element_rows.analysis_to_rows(analysis_data, "U_1", TIMESTAMP)
+
+    diff = element_rows.diff_rows(stored, desired)
+
+    assert diff["deletes"] == []
+    assert diff["updates"] == []
+    assert not any(diff["inserts"].values())
+    assert element_rows.total_changes(diff["counts"])["unchanged"] == 6
+    logger.info("✅ Unchanged diff passed")
+
+
+@pytest.mark.unit
+def test_diff_rows_single_edit(analysis_data):
+    """Editing one emotion's intensity and context updates only its relationship."""
+    stored = _stored(element_rows.analysis_to_rows(analysis_data, "U_1", TIMESTAMP))
+    analysis_data["Emotions"][0] = ["Anxiety", 2, "Calmer after rehearsing", "Work", ""]
+    desired = element_rows.analysis_to_rows(analysis_data, "U_1", TIMESTAMP)
+
+    diff = element_rows.diff_rows(stored, desired)
+
+    assert diff["deletes"] == []
+    assert not any(diff["inserts"].values())
+    assert diff["updates"] == [{
+        "rel_id": "r-emotions-0",
+        "rel_props": {"intensity": 2.0, "context": "Calmer after rehearsing"},
+    }]
+    assert diff["counts"]["emotions"] == {"inserted": 0, "updated": 1, "deleted": 0, "unchanged": 1}
+    logger.info("✅ Single edit diff passed")
+
+
+@pytest.mark.unit
+def test_diff_rows_never_updates_shared_nodes_in_place(analysis_data):
+    """Node changes are re-linked through the MERGE insert path; dropped topics stay linked."""
+    stored = _stored(element_rows.analysis_to_rows(analysis_data, "U_1", TIMESTAMP))
+    analysis_data["Emotions"][0][3] = ["Work", "Health"]
+    analysis_data["Insights"][0][1] = "Practice and sleep reduce anxiety"
+    analysis_data["Beliefs"][0][4] = "Work"
+    desired = element_rows.analysis_to_rows(analysis_data, "U_1", TIMESTAMP)
+
+    diff = element_rows.diff_rows(stored, desired)
+
+    assert diff["updates"] == []
+    assert sorted(diff["deletes"]) == ["r-emotions-0", "r-insights-0"]
+    assert [row["name"] for row in diff["inserts"]["emotions"]] == ["Anxiety"]
+    assert [row["text"] for row in diff["inserts"]["insights"]] == ["Practice and sleep reduce anxiety"]
+    assert diff["inserts"]["beliefs"] == []
+    assert diff["counts"]["beliefs"]["unchanged"] == 1
+    assert element_rows.total_changes(diff["counts"])["updated"] == 2
+    assert "node_props" not in queries.UPDATE_SESSION_ELEMENTS
+    logger.info("✅ Shared node diff passed")
+
+
+@pytest.mark.unit
+def test_diff_rows_insert_delete_and_rekey(analysis_data):
+    """Removed elements are deleted, new ones inserted, renamed keys replaced."""
+    stored = _stored(element_rows.analysis_to_rows(analysis_data, "U_1", TIMESTAMP))
+    del analysis_data["Challenges"][0]
+    analysis_data["Insights"].append(["Sleep matters", "Rest improves focus", "", "Health"])
+    analysis_data["Emotions"][1][0] = "Calm"
+    desired = element_rows.analysis_to_rows(analysis_data, "U_1", TIMESTAMP)
+
+    diff = element_rows.diff_rows(stored, desired)
+
+    assert sorted(diff["deletes"]) == ["r-challenges-0", "r-emotions-1"]
+    assert [row["name"] for row in diff["inserts"]["insights"]] == ["Sleep matters"]
+    assert [row["name"] for row in diff["inserts"]["emotions"]] == ["Calm"]
+    totals = element_rows.total_changes(diff["counts"])
+    assert totals == {"inserted": 2, "updated": 0, "deleted": 2, "unchanged": 4}
+    logger.info("✅ Insert/delete diff passed")
+
+
+@pytest.mark.unit
+def test_diff_rows_matches_action_items_by_id():
+    """Action items are matched by submitted id and re-MERGEd on that id when renamed."""
+    stored = {"action_items": [{
+        "rel_id": "r-1", "id": "A_1", "name": "Journal", "text": "Write daily",
+        "description": "Write daily", "status": "pending", "topics": ["Health"],
+    }]}
+    desired = element_rows.analysis_to_rows(
+        {"actionitems": [["A_1", "Journal nightly", "Write daily", "Health", "pending"]]}, "U_1", TIMESTAMP
+    )
+
+    diff = element_rows.diff_rows(stored, desired)
+
+    assert diff["deletes"] == []
+    assert diff["updates"] == []
+    [row] = diff["inserts"]["action_items"]
+    assert row["id"] == row["properties"]["id"] == "A_1"
+    assert row["properties"]["name"] == "Journal nightly"
+    assert diff["counts"]["action_items"]["updated"] == 1
+    logger.info("✅ Action item diff passed")
+
+
+@pytest.mark.unit
+def test_update_query_parameters_are_supplied(analysis_data):
+    """Every parameter referenced by the update statement is provided by the writer."""
+    rows = element_rows.analysis_to_rows(analysis_data, "U_1", TIMESTAMP)
+    supplied = {"session_id", "user_id", "timestamp", "relevance", "deletes", "updates", *rows}
+    referenced = set(re.findall(r"\$(\w+)", queries.UPDATE_SESSION_ELEMENTS))
+
+    assert referenced == supplied
+    logger.info("✅ Update query parameters passed")
@@ -0,0 +1,91 @@
+"""
+Tests for the single-pass extract_elements parser, against a corpus built from the generated sessions
+"""
+
+import random
+import pytest
+import logging
+
+from services.analysis_service import extract_elements
+from tests.element_corpus import build_corpus, mutate, render
+
+logger = logging.getLogger(__name__)
+
+CORPUS = build_corpus()
+
+
+@pytest.mark.unit
+def test_corpus_responses_parse_exactly():
+    """Every well-formed corpus response yields exactly its elements."""
+    assert len(CORPUS) > 100
+    for response, expected in CORPUS:
+        assert extract_elements(response) == expected
+    logger.info(f"✅ Corpus parsing passed ({len(CORPUS)} responses)")
+
+
+@pytest.mark.unit
+def test_formatting_drift_does_not_change_elements():
+    """Repeated headers, markdown, bold or bulleted fields and CRLF parse the same."""
+    rng = random.Random(18)
+    for round_number in range(3):
+        for response, expected in CORPUS:
+            drifted = mutate(response, rng)
+            assert extract_elements(drifted) == expected, drifted[:400]
+    logger.info("✅ Formatting drift passed")
+
+
+@pytest.mark.unit
+def test_missing_fields_and_truncation_drop_only_affected_elements():
+    """An element missing a field is skipped; its neighbours and a truncated tail still parse."""
+    rng = random.Random(7)
+    for response, expected in CORPUS[:50]:
+        lines = response.split("\n")
+        field_lines = [i for i, line in enumerate(lines) if line.startswith(("Context:", "Impact:", "Topic:"))]
+        dropped = rng.choice(field_lines)
+        damaged = "\n".join(lines[:dropped] + lines[dropped + 1:])
+
+        result = extract_elements(damaged)
+        assert sum(map(len, result.values())) == sum(map(len, expected.values())) - 1
+        for element_type, elements in result.items():
+            assert all(element in expected[element_type] for element in elements)
+
+        truncated = extract_elements(response[:rng.randrange(len(response))])
+        for element_type, elements in truncated.items():
+            complete = [e for e in elements if e in expected[element_type]]
+            assert len(complete) >= len(elements) - 1
+            assert complete == expected[element_type][:len(complete)]
+    logger.info("✅ Damaged responses passed")
+
+
+@pytest.mark.unit
+def test_emotions_outside_their_section_and_bad_intensity():
+    """Emotion blocks are recognised anywhere; a non-numeric intensity is rejected."""
+    emotion = {"name": "Relief", "intensity": "6", "context": "Finished the project",
+               "topic": "Career", "timestamp": "05:00"}
+    text = "Name: Relief\nIntensity: 6/10\nContext: Finished the project\nTopic: Career\nTimestamp: 05:00\n"
+
+    assert extract_elements(text)["emotions"] == [emotion]
+    assert extract_elements(text.replace("6/10", "high"))["emotions"] == []
+    empty = {t: [] for t in ("emotions", "beliefs", "action_items", "challenges", "insights")}
+    assert extract_elements(render(empty)) == empty
+    assert extract_elements(None) == empty
+    logger.info("✅ Emotion edge cases passed")
+
+
+@pytest.mark.unit
+def test_out_of_order_fields_including_timestamp_first():
+    """A Timestamp line only ends a block that already has every field."""
+    text = (
+        "=== BELIEFS ===\n"
+        "Timestamp: 01:00\nName: Not good enough\nDescription: Doubts at work\nImpact: Avoids meetings\nTopic: Work\n"
+        "Name: Must be perfect\nTimestamp: 02:00\nDescription: Rewrites emails\nImpact: Stress\nTopic: Work\n"
+        "Name: Others judge me\nDescription: Fear of feedback\nImpact: Quiet\nTopic: Social\nTimestamp: 03:00\n"
+    )
+
+    beliefs = extract_elements(text)["beliefs"]
+
+    assert [(b["name"], b["timestamp"]) for b in beliefs] == [
+        ("Not good enough", "01:00"), ("Must be perfect", "02:00"), ("Others judge me", "03:00"),
+    ]
+    assert beliefs[1]["description"] == "Rewrites emails"
+    logger.info("✅ Out-of-order fields passed")
@@ -0,0 +1,236 @@
+"""
+Tests for the durable analysis job queue
+
+The store is exercised against a temporary SQLite file; the queue tests run
+real asyncio workers with in-process handlers.
+"""
+
+import asyncio
+import time
+import pytest
+import logging
+
+import httpx
+
+import main
+from routes import analysis as analysis_routes
+from services import job_queue
+from services.job_queue import JobQueue, JobStore, QUEUED, RUNNING, COMPLETED, FAILED
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+@pytest.mark.unit
+def test_enqueue_and_claim(store):
+    """Jobs are claimed oldest first and persisted with their payload."""
+    first = store.enqueue("analysis", "U_1", {"transcript": "one"}, session_id="S_1")
+    store.enqueue("analysis", "U_2", {"transcript": "two"}, session_id="S_2")
+
+    claimed = store.claim("W_1", per_user_limit=1, lease_seconds=60)
+
+    assert claimed["id"] == first["id"]
+    assert claimed["status"] == RUNNING
+    assert claimed["attempts"] == 1
+    assert claimed["payload"] == {"transcript": "one"}
+    assert store.counts() == {QUEUED: 1, RUNNING: 1, COMPLETED: 0, FAILED: 0}
+    logger.info("✅ Enqueue and claim passed")
+
+
+@pytest.mark.unit
+def test_per_user_limit(store):
+    """A user's second job waits while their first one runs."""
+    store.enqueue("analysis", "U_1", {}, session_id="S_1")
+    store.enqueue("analysis", "U_1", {}, session_id="S_2")
+    store.enqueue("analysis", "U_2", {}, session_id="S_3")
+
+    first = store.claim("W_1", per_user_limit=1, lease_seconds=60)
+    second = store.claim("W_2", per_user_limit=1, lease_seconds=60)
+
+    assert (first["user_id"], second["user_id"]) == ("U_1", "U_2")
+    assert store.claim("W_3", per_user_limit=1, lease_seconds=60) is None
+
+    store.complete(first["id"], "W_1", {"results": {}})
+    assert store.claim("W_3", per_user_limit=1, lease_seconds=60)["session_id"] == "S_2"
+    logger.info("✅ Per-user limit passed")
+
+
+@pytest.mark.unit
+def test_retry_then_fail(store):
+    """Failed attempts are requeued after the delay until max_attempts."""
+    job = store.enqueue("analysis", "U_1", {}, max_attempts=2)
+
+    store.claim("W_1", 1, 60)
+    assert store.fail(job["id"], "W_1", "timeout", retry_delay=0.2) == QUEUED
+    assert store.claim("W_1", 1, 60) is None  # not before run_after
+
+    time.sleep(0.25)
+    assert store.claim("W_1", 1, 60)["attempts"] == 2
+    assert store.fail(job["id"], "W_1", "timeout again", retry_delay=0) == FAILED
+
+    failed = store.get(job["id"])
+    assert failed["error"] == "timeout again"
+    assert failed["finished_at"] is not None
+    logger.info("✅ Retry and fail passed")
+
+
+@pytest.mark.unit
+def test_expired_lease_is_recovered(store):
+    """A job whose worker stopped renewing its lease is taken over."""
+    job = store.enqueue("analysis", "U_1", {})
+    store.claim("W_dead", 1, lease_seconds=0.05)
+    time.sleep(0.1)
+
+    recovered = store.claim("W_2", 1, 60)
+
+    assert recovered["id"] == job["id"]
+    assert recovered["worker_id"] == "W_2"
+    assert recovered["attempts"] == 2
+    logger.info("✅ Lease recovery passed")
+
+
+@pytest.mark.unit
+def test_stale_worker_cannot_change_a_job_taken_over(store):
+    """After a takeover the old worker's writes are rejected and the new worker's result stands."""
+    job = store.enqueue("analysis", "U_1", {})
+    store.claim("W_stale", 1, lease_seconds=0.05)
+    time.sleep(0.1)
+    store.claim("W_2", 1, 60)
+
+    assert not store.update_progress(job["id"], "W_stale", "still going", 60)
+    assert not store.renew_lease(job["id"], "W_stale", 60)
+    assert store.complete(job["id"], "W_2", {"results": {"n": 1}})
+    assert store.fail(job["id"], "W_stale", "timeout", retry_delay=0) is None
+    assert not store.release(job["id"], "W_stale")
+    assert not store.complete(job["id"], "W_stale", {"results": {}})
+
+    finished = store.get(job["id"])
+    assert finished["status"] == COMPLETED
+    assert finished["result"] == {"results": {"n": 1}}
+    assert finished["progress"] == COMPLETED
+    assert store.claim("W_3", 1, 60) is None
+    logger.info("✅ Stale worker rejection passed")
+
+
+@pytest.mark.unit
+def test_queue_runs_jobs_with_limits_and_retries(store):
+    """Workers respect the global limit, report progress and retry failures."""
+    running = {"now": 0, "max": 0}
+    calls = {}
+
+    async def handler(job, progress):
+        calls[job["id"]] = calls.get(job["id"], 0) + 1
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        try:
+            await progress("working")
+            await asyncio.sleep(0.05)
+            if job["payload"].get("flaky") and calls[job["id"]] == 1:
+                raise RuntimeError("transient")
+            return {"results": {"n": job["payload"]["n"]}}
+        finally:
+            running["now"] -= 1
+
+    queue = JobQueue(store, {"analysis": handler}, workers=2, per_user_limit=2,
+                     retry_backoff=0.0, poll_interval=0.02)
+
+    async def run():
+        await queue.start()
+        jobs = [
+            await queue.submit("analysis", f"U_{n % 3}", {"n": n, "flaky": n == 0}, session_id=f"S_{n}")
+            for n in range(6)
+        ]
+        while queue.store.counts()[COMPLETED] < len(jobs):
+            await asyncio.sleep(0.02)
+        await queue.stop()
+        return [queue.store.get(job["id"]) for job in jobs]
+
+    finished = asyncio.run(run())
+
+    assert running["max"] == 2
+    assert [job["result"]["results"]["n"] for job in finished] == list(range(6))
+    assert finished[0]["attempts"] == 2
+    assert all(job["progress"] == COMPLETED for job in finished)
+    logger.info("✅ Queue workers passed")
+
+
+@pytest.mark.unit
+def test_long_job_keeps_its_lease(store):
+    """A job running past its lease without progress updates is not run twice."""
+    calls = []
+
+    async def handler(job, progress):
+        calls.append(job["id"])
+        await asyncio.sleep(0.5)
+        return {"results": {}}
+
+    queue = JobQueue(store, {"analysis": handler}, workers=2, lease_seconds=0.15, poll_interval=0.02)
+
+    async def run():
+        await queue.start()
+        job = await queue.submit("analysis", "U_1", {})
+        while queue.store.counts()[COMPLETED] < 1:
+            await asyncio.sleep(0.02)
+        await queue.stop()
+        return queue.store.get(job["id"])
+
+    finished = asyncio.run(run())
+
+    assert calls == [finished["id"]]
+    assert finished["attempts"] == 1
+    logger.info("✅ Lease heartbeat passed")
+
+
+@pytest.mark.unit
+def test_submit_and_poll_endpoints(tmp_path, monkeypatch, fake_neo4j_service):
+    """POST /analysis/jobs returns at once; GET /analysis/status reports the job."""
+    release = None
+
+    async def handler(job, progress):
+        await progress("analyzing")
+        await release.wait()
+        return {"results": {"emotions": [{"name": "Calm"}]}, "stored": True}
+
+    queue = JobQueue(JobStore(str(tmp_path / "jobs.db")), {"analysis": handler},
+                     workers=1, poll_interval=0.02)
+    monkeypatch.setattr(job_queue, "_analysis_job_queue", queue)
+    neo4j_service = fake_neo4j_service([{"id": "S_1", "userId": "U_jobs", "transcript": "text"}])
+    monkeypatch.setattr(analysis_routes, "get_async_neo4j_service", lambda: neo4j_service)
+    main.app.dependency_overrides[analysis_routes.get_current_user_id] = lambda: "U_jobs"
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        await queue.start()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            submitted = await client.post("/api/v1/analysis/jobs", json={"session_id": "S_1"})
+            job_id = submitted.json()["job_id"]
+
+            while (await client.get(f"/api/v1/analysis/status/{job_id}")).json()["progress"] != "analyzing":
+                await asyncio.sleep(0.02)
+            in_progress = await client.get(f"/api/v1/analysis/status/{job_id}")
+
+            release.set()
+            while (await client.get(f"/api/v1/analysis/status/{job_id}")).json()["status"] != COMPLETED:
+                await asyncio.sleep(0.02)
+            done = await client.get(f"/api/v1/analysis/status/{job_id}")
+            missing = await client.get("/api/v1/analysis/status/J_unknown")
+        await queue.stop()
+        return submitted, in_progress, done, missing
+
+    try:
+        submitted, in_progress, done, missing = asyncio.run(run())
+    finally:
+        main.app.dependency_overrides.clear()
+
+    assert submitted.status_code == 202
+    assert submitted.json()["status"] == QUEUED
+    assert in_progress.json()["status"] == RUNNING
+    assert done.json()["results"]["emotions"][0]["name"] == "Calm"
+    assert missing.status_code == 404
+    logger.info("✅ Job endpoints passed")
@@ -0,0 +1,154 @@
+"""
+Tests for the pooled LLM client manager
+
+OpenAI traffic is served by httpx.MockTransport, so these tests exercise the
+real OpenAI SDK request path without network access.
+"""
+
+import asyncio
+import json
+import pytest
+import logging
+
+import httpx
+from openai import BadRequestError, RateLimitError
+
+from services.llm_client import LLMClientManager, PoolConfig, RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+def _completion(content="ok"):
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+        }],
+    }
+
+
+def _handler(statuses):
+    """Serve the given status codes in order, then 200 responses."""
+    calls = []
+
+    def handle(request):
+        calls.append(json.loads(request.content))
+        status = statuses[len(calls) - 1] if len(calls) <= len(statuses) else 200
+        if status == 200:
+            return httpx.Response(200, json=_completion(f"reply {len(calls)}"))
+        return httpx.Response(status, json={"error": {"message": "failure", "type": "test"}})
+
+    return handle, calls
+
+
+def _manager(handler, **policy):
+    retry_policy = RetryPolicy(initial_backoff=0.0, max_backoff=0.0, **policy)
+    return LLMClientManager(
+        api_key="sk-test",
+        pool=PoolConfig(timeout=5.0),
+        retry_policy=retry_policy,
+        transport=httpx.MockTransport(handler),
+        async_transport=httpx.MockTransport(handler),
+    )
+
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+@pytest.mark.unit
+def test_client_is_reused_across_calls():
+    """All calls share one client and connection pool."""
+    handler, calls = _handler([])
+    manager = _manager(handler)
+
+    first = manager.chat_completion(model="gpt-4", messages=MESSAGES)
+    client = manager.client
+    second = manager.chat_completion(model="gpt-4", messages=MESSAGES)
+
+    assert manager.client is client
+    assert first.choices[0].message.content == "reply 1"
+    assert second.choices[0].message.content == "reply 2"
+    assert manager.stats()["calls"] == 2
+    assert manager.stats()["retries"] == 0
+    manager.close()
+    logger.info("✅ Client reuse passed")
+
+
+@pytest.mark.unit
+def test_transient_errors_are_retried():
+    """429 and 5xx are retried by the single policy, not by the SDK as well."""
+    handler, calls = _handler([429, 503])
+    manager = _manager(handler, max_attempts=4)
+
+    response = manager.chat_completion(model="gpt-4", messages=MESSAGES)
+
+    assert response.choices[0].message.content == "reply 3"
+    assert len(calls) == 3
+    stats = manager.stats()
+    assert stats["retries"] == 2
+    assert stats["succeeded"] == 1
+    assert manager.recent_calls()[-1]["attempts"] == 3
+    manager.close()
+    logger.info("✅ Transient retry passed")
+
+
+@pytest.mark.unit
+def test_attempt_limit_and_non_retryable_errors():
+    """Retries stop at max_attempts; client errors are never retried."""
+    handler, calls = _handler([429, 429, 429])
+    manager = _manager(handler, max_attempts=2)
+    with pytest.raises(RateLimitError):
+        manager.chat_completion(model="gpt-4", messages=MESSAGES)
+    assert len(calls) == 2
+
+    handler, calls = _handler([400])
+    manager = _manager(handler, max_attempts=4)
+    with pytest.raises(BadRequestError):
+        manager.chat_completion(model="gpt-4", messages=MESSAGES)
+    assert len(calls) == 1
+    assert manager.stats()["failed"] == 1
+    logger.info("✅ Retry limits passed")
+
+
+@pytest.mark.unit
+def test_time_budget_stops_retries():
+    """A retry that would overrun the time budget is not attempted."""
+    handler, calls = _handler([503, 503])
+    manager = LLMClientManager(
+        api_key="sk-test",
+        retry_policy=RetryPolicy(max_attempts=5, initial_backoff=10.0, max_backoff=10.0, time_budget=1.0),
+        transport=httpx.MockTransport(handler),
+    )
+
+    with pytest.raises(Exception):
+        manager.chat_completion(model="gpt-4", messages=MESSAGES)
+    assert len(calls) == 1
+    logger.info("✅ Retry budget passed")
+
+
+@pytest.mark.unit
+def test_async_client_shares_policy_and_counters():
+    """The AsyncOpenAI variant retries with the same policy and counters."""
+    handler, calls = _handler([500])
+    manager = _manager(handler)
+
+    async def run():
+        responses = await asyncio.gather(
+            manager.achat_completion(model="gpt-4", messages=MESSAGES),
+            manager.achat_completion(model="gpt-4", messages=MESSAGES),
+        )
+        await manager.aclose()
+        return responses
+
+    responses = asyncio.run(run())
+
+    assert len(responses) == 2
+    assert len(calls) == 3
+    assert manager.stats()["retries"] == 1
+    assert manager.stats()["succeeded"] == 2
+    logger.info("✅ Async client passed")
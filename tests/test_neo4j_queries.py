@@ -0,0 +1,71 @@
+"""
+Tests for the record-shaping helpers in services.neo4j_queries
+
+Records are represented as plain dictionaries, which is all the helpers
+rely on, so these tests run without a database.
+"""
+
+import pytest
+import logging
+
+from services import neo4j_queries as queries
+
+logger = logging.getLogger(__name__)
+
+
+def _session_record(**elements):
+    record = {
+        "s": {"id": "S_1", "title": "Session", "userId": "U_1"},
+        "emotions": [],
+        "insights": [],
+        "beliefs": [],
+        "challenges": [],
+        "action_items": [],
+        "prev": None,
+        "next": {"id": "S_2", "title": "Next", "date": "2025-01-02"},
+    }
+    record.update(elements)
+    return record
+
+
+@pytest.mark.unit
+def test_session_with_relationships_keeps_every_topic():
+    """Elements carry all of their topics, not just one."""
+    record = _session_record(emotions=[{
+        "emotion": {"id": "E_1", "name": "Anxiety"},
+        "relationship": {"intensity": 4, "created_at": "x"},
+        "topics": [
+            {"topic": {"name": "Work"}, "topic_relationship": {"relevance": 0.8}},
+            {"topic": {"name": "Health"}, "topic_relationship": {"relevance": 0.5}},
+        ],
+    }], beliefs=[{
+        "belief": {"id": "B_1", "text": "I must be perfect"},
+        "relationship": None,
+        "topics": [{"topic": {"name": "Work"}, "topic_relationship": {"relevance": 0.9}}],
+    }])
+
+    session = queries.build_session_with_relationships(record)
+
+    emotion = session["emotions"][0]
+    assert emotion["intensity"] == 4
+    assert "created_at" not in emotion
+    assert [t["name"] for t in emotion["topics"]] == ["Work", "Health"]
+    assert emotion["topic"] == {"name": "Work", "relevance": 0.8}
+    assert sorted(t["name"] for t in session["topics"]) == ["Health", "Work"]
+    assert session["next_session"]["id"] == "S_2"
+    assert "previous_session" not in session
+    logger.info("✅ Multi-topic session shaping passed")
+
+
+@pytest.mark.unit
+def test_elements_without_topics():
+    """Elements with no topics have neither "topic" nor "topics"."""
+    record = _session_record(action_items=[
+        {"action_item": {"id": "A_1", "name": "Journal"}, "relationship": {"status": "pending"}, "topics": []},
+    ])
+
+    session = queries.build_session_with_relationships(record)
+
+    assert session["actionitems"] == [{"id": "A_1", "name": "Journal", "status": "pending"}]
+    assert session["topics"] == []
+    logger.info("✅ Topic-less session shaping passed")
@@ -0,0 +1,107 @@
+"""
+Tests for password hashing in the worker pool
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+import logging
+
+from werkzeug.security import generate_password_hash
+
+from services import password_hasher
+from services.auth_service import AuthService
+from services.password_hasher import PasswordHasher
+from services.user_repository import UserRecord
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.unit
+def test_kdf_runs_in_the_pool_without_stalling_the_loop(monkeypatch):
+    """A burst of verifications runs on pool threads while the loop keeps ticking."""
+    hasher = PasswordHasher("pbkdf2:sha256:100000", max_workers=2)
+    stored = hasher.hash_now("secret")
+    threads = set()
+    check_password_hash = password_hasher.check_password_hash
+
+    def check(password_hash, password):
+        threads.add(threading.current_thread().name)
+        return check_password_hash(password_hash, password)
+
+    async def storm():
+        monkeypatch.setattr(password_hasher, "check_password_hash", check)
+        lags = []
+        done = asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lags.append(time.perf_counter() - started - 0.005)
+
+        probing = asyncio.create_task(probe())
+        started = time.perf_counter()
+        results = await asyncio.gather(*[hasher.verify(stored, "secret") for _ in range(8)],
+                                       hasher.verify(stored, "wrong"), hasher.verify(None, "secret"))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probing
+        return results, elapsed, max(lags)
+
+    try:
+        results, elapsed, max_lag = asyncio.run(storm())
+    finally:
+        hasher.close()
+
+    assert results == [True] * 8 + [False, False]
+    assert threads and all(name.startswith("password-hash") for name in threads)
+    assert len(threads) <= 2
+    assert max_lag < elapsed / 3
+    logger.info(f"✅ Pool hashing passed (storm {elapsed * 1000:.0f} ms, max loop lag {max_lag * 1000:.1f} ms)")
+
+
+class FakeUsers:
+    """Just enough of Neo4jService and its user repository for login."""
+
+    def __init__(self, password_hash):
+        self.node = {"userId": "U_1", "email": "hashed", "name": "n", "password_hash": password_hash}
+        self.users = self
+        self.password_changes = 0
+
+    def get_by_email(self, email):
+        return UserRecord.from_node(self.node, email)
+
+    def change_user_password(self, user_id, new_password_hash):
+        self.password_changes += 1
+        self.node["password_hash"] = new_password_hash
+        return True
+
+
+@pytest.mark.unit
+def test_login_rehashes_when_kdf_parameters_change():
+    """A hash made with old parameters is replaced once, on the next successful login."""
+    assert PasswordHasher("scrypt").prefix == "scrypt:32768:8:1"
+
+    store = FakeUsers(generate_password_hash("secret", "pbkdf2:sha256:1000"))
+    hasher = PasswordHasher("pbkdf2:sha256:2000")
+    auth = AuthService(store, "test-secret", password_hasher=hasher)
+    assert hasher.needs_rehash(store.node["password_hash"])
+
+    async def logins():
+        wrong = await auth.login_user("ada@example.com", "wrong")
+        first = await auth.login_user("ada@example.com", "secret")
+        second = await auth.login_user("ada@example.com", "secret")
+        return wrong, first, second
+
+    try:
+        wrong, first, second = asyncio.run(logins())
+    finally:
+        hasher.close()
+
+    assert not wrong[0] and first[0] and second[0]
+    assert store.password_changes == 1
+    assert store.node["password_hash"].startswith("pbkdf2:sha256:2000$")
+    assert not hasher.needs_rehash(store.node["password_hash"])
+    logger.info("✅ Rehash on login passed")
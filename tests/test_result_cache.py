@@ -0,0 +1,108 @@
+"""
+Tests for the content-addressed result cache and the analysis cache layer
+"""
+
+import asyncio
+import time
+import pytest
+import logging
+
+import httpx
+
+from services import analysis_service, llm_client
+from services.llm_client import LLMClientManager, RetryPolicy
+from services.result_cache import MemoryLRUBackend, ResultCache, SQLiteBackend, cache_key
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.unit
+def test_cache_key_is_content_addressed():
+    """Equal inputs give equal keys regardless of argument order."""
+    assert cache_key("analysis", a=1, b=[1, 2]) == cache_key("analysis", b=[1, 2], a=1)
+    assert cache_key("analysis", a=1) != cache_key("analysis", a=2)
+    assert cache_key("analysis", a=1) != cache_key("transcript", a=1)
+    logger.info("✅ Cache key passed")
+
+
+@pytest.mark.unit
+def test_memory_backend_lru_and_ttl():
+    """The least recently used entry is evicted first; expired entries miss."""
+    cache = ResultCache(MemoryLRUBackend(max_entries=2), ttl=60)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}
+    cache.set("c", {"v": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (2, 1, 1, 2)
+
+    short = ResultCache(MemoryLRUBackend(), ttl=0.05)
+    short.set("a", "value")
+    time.sleep(0.1)
+    assert short.get("a") is None
+    logger.info("✅ Memory backend passed")
+
+
+@pytest.mark.unit
+def test_sqlite_backend_persists_and_evicts(tmp_path):
+    """Entries survive a new backend instance; size and TTL limits apply."""
+    path = str(tmp_path / "cache.db")
+    cache = ResultCache(SQLiteBackend(path, max_entries=2), ttl=60)
+    cache.set("a", {"content": "first"})
+    cache.set("b", {"content": "second"})
+    cache.get("a")
+    cache.set("c", {"content": "third"})
+
+    reopened = ResultCache(SQLiteBackend(path, max_entries=2), ttl=60)
+    assert reopened.get("a") == {"content": "first"}
+    assert reopened.get("b") is None
+    assert reopened.stats()["entries"] == 2
+
+    expiring = ResultCache(SQLiteBackend(path), ttl=0.05)
+    expiring.set("d", "soon gone")
+    time.sleep(0.1)
+    assert expiring.get("d") is None
+    logger.info("✅ SQLite backend passed")
+
+
+def _llm(calls):
+    def handle(request):
+        calls.append(request)
+        return httpx.Response(200, json={
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "gpt-4",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": f"analysis {len(calls)}"}}],
+            "usage": {"prompt_tokens": 900, "completion_tokens": 300, "total_tokens": 1200},
+        })
+    return handle
+
+
+@pytest.mark.unit
+def test_identical_analysis_requests_hit_the_cache(monkeypatch):
+    """Repeats skip OpenAI; a different model setting is a different entry."""
+    calls = []
+    manager = LLMClientManager(
+        api_key="sk-test",
+        retry_policy=RetryPolicy(max_attempts=1),
+        transport=httpx.MockTransport(_llm(calls)),
+        async_transport=httpx.MockTransport(_llm(calls)),
+    )
+    cache = ResultCache(MemoryLRUBackend(), ttl=60, name="analysis-cache")
+    monkeypatch.setattr(llm_client, "_llm_client_manager", manager)
+    monkeypatch.setattr(analysis_service, "get_analysis_cache", lambda: cache)
+
+    settings = {"gpt_model": "gpt-4", "max_tokens": 1500, "temperature": 0.7}
+    first = analysis_service._ask_llm("transcript prompt", settings)
+    second = analysis_service._ask_llm("transcript prompt", settings)
+    third = asyncio.run(analysis_service._ask_llm_async("transcript prompt", settings))
+    other = analysis_service._ask_llm("transcript prompt", dict(settings, temperature=0.2))
+
+    assert first == second == third == "analysis 1"
+    assert other == "analysis 2"
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+    logger.info("✅ Analysis cache passed")
@@ -0,0 +1,120 @@
+"""
+Tests for the transcript-free session list and its keyset pagination
+"""
+
+import asyncio
+import pytest
+import logging
+
+import httpx
+
+import main
+from routes import sessions as session_routes
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT = "Therapist: How are you feeling today?\n" * 2000
+
+
+def _sessions():
+    # Two sessions share a timestamp, so the id has to break the tie
+    stamps = ["2025-01-01T09:00:00", "2025-01-02T09:00:00", "2025-01-02T09:00:00",
+              "2025-01-03T09:00:00", "2025-01-04T09:00:00", "2025-01-05T09:00:00",
+              "2025-01-06T09:00:00"]
+    sessions = [{"id": f"S_{n}", "title": f"Session {n}", "userId": "U_1", "created_at": stamp,
+                 "updated_at": stamp, "transcript": TRANSCRIPT, "element_counts": {"emotions": 2, "insights": 1}}
+                for n, stamp in enumerate(stamps)]
+    sessions.append({"id": "S_other", "title": "Not yours", "userId": "U_2",
+                     "created_at": "2025-01-03T10:00:00", "transcript": "secret"})
+    return sessions
+
+
+@pytest.fixture
+def client(monkeypatch, fake_neo4j_service):
+    neo4j_service = fake_neo4j_service(_sessions())
+    monkeypatch.setattr(session_routes, "get_async_neo4j_service", lambda: neo4j_service)
+    main.app.dependency_overrides[session_routes.get_current_user_id] = lambda: "U_1"
+
+    def request(*paths):
+        async def run():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return [await http.get(f"/api/v1/sessions{path}") for path in paths]
+        return asyncio.run(run())
+
+    request.neo4j_service = neo4j_service
+    yield request
+    main.app.dependency_overrides.clear()
+
+
+@pytest.mark.unit
+def test_session_list_pages_summaries_without_transcripts(client):
+    """Pages are newest first, never repeat or skip a session, and carry no transcript."""
+    pages, cursor = [], ""
+    while True:
+        [response] = client(f"?limit=3{cursor}")
+        assert response.status_code == 200
+        pages.append(response.json())
+        if "x-next-cursor" not in response.headers:
+            break
+        cursor = f"&cursor={response.headers['x-next-cursor']}"
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    ids = [session["id"] for page in pages for session in page]
+    assert ids == ["S_6", "S_5", "S_4", "S_3", "S_2", "S_1", "S_0"]
+    first = pages[0][0]
+    assert "transcript" not in first
+    assert first["transcript_length"] == len(TRANSCRIPT)
+    assert first["element_counts"] == {"emotions": 2, "insights": 1}
+    assert len(str(pages)) < len(TRANSCRIPT)
+    assert client.neo4j_service.limits == [4, 4, 4]
+
+    [default, too_big, bad_cursor] = client("", "?limit=500", "?cursor=not-a-cursor")
+    assert len(default.json()) == 7 and "x-next-cursor" not in default.headers
+    assert too_big.status_code == 422
+    assert bad_cursor.status_code == 400
+    logger.info("✅ Session list pagination passed")
+
+
+@pytest.mark.unit
+def test_legacy_sessions_without_created_at_are_listed(client):
+    """Sessions with a missing, empty or unparseable created_at are paged like the rest."""
+    sessions = client.neo4j_service.sessions
+    sessions["S_none"] = {"id": "S_none", "title": "No date", "userId": "U_1", "transcript": ""}
+    sessions["S_empty"] = {"id": "S_empty", "title": "Empty date", "userId": "U_1", "created_at": "",
+                           "transcript": ""}
+    sessions["S_odd"] = {"id": "S_odd", "title": "Odd date", "userId": "U_1", "created_at": "last tuesday",
+                         "updated_at": None, "transcript": ""}
+
+    ids, cursor = [], ""
+    while True:
+        [response] = client(f"?limit=4{cursor}")
+        assert response.status_code == 200
+        ids += [session["id"] for session in response.json()]
+        if "x-next-cursor" not in response.headers:
+            break
+        cursor = f"&cursor={response.headers['x-next-cursor']}"
+
+    assert sorted(ids) == sorted(sessions.keys() - {"S_other"})
+    assert len(ids) == len(set(ids))
+    assert ids[-2:] == ["S_none", "S_empty"]
+    logger.info("✅ Legacy session listing passed")
+
+
+@pytest.mark.unit
+def test_transcript_is_fetched_separately_by_its_owner(client):
+    """The transcript endpoint returns the text, or a range of it, to the owner only."""
+    [mine, theirs, missing] = client("/S_3/transcript", "/S_other/transcript", "/S_gone/transcript")
+    assert mine.status_code == 200
+    assert mine.json() == {"id": "S_3", "transcript": TRANSCRIPT}
+    assert theirs.status_code == 403
+    assert missing.status_code == 404
+    # Another user's transcript is never read, only its owner checked
+    assert client.neo4j_service.transcript_reads == ["S_3"]
+
+    [part, untimed, negative] = client("/S_3/transcript?start=11&end=23", "/S_3/transcript?start_time=60",
+                                       "/S_3/transcript?start=-1")
+    assert part.json()["transcript"] == "How are you "
+    assert untimed.status_code == 400
+    assert negative.status_code == 422
+    logger.info("✅ Transcript endpoint passed")
@@ -0,0 +1,144 @@
+"""
+Tests for the per-user settings cache
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+import main
+from routes import settings as settings_routes
+from services import analysis_service, settings_cache
+from services.settings_cache import SettingsCache
+
+logger = logging.getLogger(__name__)
+
+
+class FakeSettingsStore:
+    """Counts settings queries; optionally slow or failing."""
+
+    def __init__(self, delay=0.0):
+        self.settings = {"U_1": {"gpt_model": "gpt-4o", "transcription_model": "whisper-1"}}
+        self.delay = delay
+        self.fail = False
+        self.queries = 0
+        self._lock = threading.Lock()
+
+    def get_user_settings(self, user_id):
+        with self._lock:
+            self.queries += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("neo4j unavailable")
+        return self.settings.get(user_id)
+
+    def save_user_settings(self, user_id, settings):
+        self.settings[user_id] = {**self.settings.get(user_id, {}), **settings}
+        return True
+
+
+class FakeAsyncSettingsStore:
+    """The settings routes' view of a FakeSettingsStore, through the async service."""
+
+    def __init__(self, store):
+        self.store = store
+
+    async def save_user_settings(self, user_id, settings):
+        return self.store.save_user_settings(user_id, settings)
+
+
+@pytest.mark.unit
+def test_settings_are_cached_until_ttl_or_invalidation():
+    """Repeat lookups are served from memory; expiry and invalidation reload."""
+    store = FakeSettingsStore()
+    cache = SettingsCache(store.get_user_settings, ttl=0.2)
+
+    assert cache.get("U_1")["gpt_model"] == "gpt-4o"
+    assert cache.get("U_1")["gpt_model"] == "gpt-4o"
+    assert cache.get("U_none") is None and cache.get("U_none") is None
+    assert store.queries == 2
+
+    store.settings["U_1"] = {"gpt_model": "gpt-4.1"}
+    cache.invalidate("U_1")
+    assert cache.get("U_1")["gpt_model"] == "gpt-4.1"
+    time.sleep(0.25)
+    cache.get("U_1")
+    assert store.queries == 4
+    assert cache.stats()["hits"] == 2
+    logger.info("✅ TTL and invalidation passed")
+
+
+@pytest.mark.unit
+def test_concurrent_misses_share_one_load():
+    """Concurrent lookups for one user wait on a single query, including when it fails."""
+    store = FakeSettingsStore(delay=0.2)
+    cache = SettingsCache(store.get_user_settings, ttl=60)
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(lambda _: cache.get("U_1"), range(10)))
+    assert store.queries == 1
+    assert all(result is results[0] for result in results)
+    assert cache.stats()["shared_loads"] == 9
+
+    store.fail = True
+    cache.invalidate("U_1")
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(cache.get, "U_1") for _ in range(5)]
+    assert all(isinstance(f.exception(), RuntimeError) for f in futures)
+    assert store.queries == 2
+
+    # The failure was not cached
+    store.fail = False
+    assert cache.get("U_1")["gpt_model"] == "gpt-4o"
+    assert store.queries == 3
+    logger.info("✅ Single-flight loading passed")
+
+
+@pytest.mark.unit
+def test_invalidation_during_load_is_not_overwritten():
+    """A load that started before a settings update does not cache the old value."""
+    store = FakeSettingsStore(delay=0.2)
+    cache = SettingsCache(store.get_user_settings, ttl=60)
+
+    loading = threading.Thread(target=cache.get, args=("U_1",))
+    loading.start()
+    time.sleep(0.05)
+    store.settings["U_1"] = {"gpt_model": "gpt-4.1"}
+    cache.invalidate("U_1")
+    loading.join()
+
+    assert cache.get("U_1")["gpt_model"] == "gpt-4.1"
+    logger.info("✅ Invalidation during load passed")
+
+
+@pytest.mark.unit
+def test_settings_update_route_invalidates_analysis_settings(monkeypatch):
+    """Analysis reads settings once; PUT /settings/user makes the next analysis see the change."""
+    store = FakeSettingsStore()
+    monkeypatch.setattr(settings_cache, "_settings_cache", SettingsCache(store.get_user_settings, ttl=60))
+    monkeypatch.setattr(settings_routes, "get_async_neo4j_service", lambda: FakeAsyncSettingsStore(store))
+    main.app.dependency_overrides[settings_routes.get_current_user_id] = lambda: "U_1"
+
+    for _ in range(5):
+        assert analysis_service.get_user_analysis_settings("U_1")["gpt_model"] == "gpt-4o"
+    assert store.queries == 1
+
+    async def update():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.put("/api/v1/settings/user", json={"gpt_model": "gpt-4.1"})
+
+    try:
+        response = asyncio.run(update())
+    finally:
+        main.app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert analysis_service.get_user_analysis_settings("U_1")["gpt_model"] == "gpt-4.1"
+    assert store.queries == 2
+    logger.info("✅ Settings route invalidation passed")
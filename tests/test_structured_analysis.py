@@ -0,0 +1,109 @@
+"""
+Tests for the structured-output (function calling) analysis mode
+"""
+
+import asyncio
+import json
+import pytest
+import logging
+
+import httpx
+
+from services import analysis_service, llm_client
+from services.analysis_schema import ANALYSIS_FUNCTION, parse_structured_analysis
+from services.element_rows import format_analysis_for_storage
+from services.llm_client import LLMClientManager, RetryPolicy
+from services.result_cache import MemoryLRUBackend, ResultCache
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS = {
+    "emotions": [
+        {"name": "anxiety", "intensity": 4, "context": "Upcoming presentation", "topic": "career", "timestamp": "12:45"},
+        {"name": "Boredom", "intensity": 2, "context": "Meetings", "topic": "Career", "timestamp": "14:00"},
+    ],
+    "beliefs": [
+        {"name": "Perfectionism", "description": "I must be perfect", "impact": "Overpreparation",
+         "topic": "Self-Esteem", "timestamp": "15:30"},
+    ],
+    "action_items": [
+        {"name": "Breathing", "description": "Practice daily", "topic": "Stress Management", "timestamp": "22:15"},
+        {"name": "Journal", "description": "Write nightly", "topic": "Hobbies", "timestamp": "23:00"},
+    ],
+    "challenges": [
+        {"name": "Work-Life Balance", "impact": "Less family time", "topic": "Boundaries", "timestamp": "28:00"},
+    ],
+    "insights": [
+        {"name": "External Validation", "context": "Overworks for approval", "topic": "Self-Esteem",
+         "timestamp": "32:10", "confidence": "high"},
+    ],
+}
+
+
+@pytest.mark.unit
+def test_schema_validates_and_canonicalizes_elements():
+    """Valid elements come back in extract_elements shape; invalid ones are dropped."""
+    elements = parse_structured_analysis(json.dumps(ANALYSIS))
+
+    assert elements["emotions"] == [
+        {"name": "Anxiety", "topic": "Career", "timestamp": "12:45", "intensity": 4, "context": "Upcoming presentation"}
+    ]
+    assert [a["name"] for a in elements["action_items"]] == ["Breathing"]
+    assert "confidence" not in elements["insights"][0]
+    assert len(elements["beliefs"]) == len(elements["challenges"]) == 1
+
+    stored = format_analysis_for_storage(elements)
+    assert stored["Emotions"] == [["Anxiety", 4, "Upcoming presentation", "Career", "12:45"]]
+    assert stored["Beliefs"][0][1:] == ["Perfectionism", "I must be perfect", "Overpreparation", "Self-Esteem", "15:30"]
+
+    empty = {t: [] for t in ("emotions", "beliefs", "action_items", "challenges", "insights")}
+    assert parse_structured_analysis("not json") == empty
+    assert parse_structured_analysis("[1, 2]") == empty
+    assert parse_structured_analysis(json.dumps({"emotions": [{**ANALYSIS["emotions"][0], "intensity": 11}]})) == empty
+    logger.info("✅ Schema validation passed")
+
+
+def _tool_call_llm(requests):
+    def handle(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "gpt-4",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {
+                "role": "assistant", "content": None,
+                "tool_calls": [{"id": "call_1", "type": "function",
+                                "function": {"name": ANALYSIS_FUNCTION, "arguments": json.dumps(ANALYSIS)}}],
+            }}],
+        })
+    return handle
+
+
+@pytest.mark.unit
+def test_structured_mode_requests_function_call_and_caches_it(monkeypatch):
+    """Structured mode forces the analysis function, validates its arguments and caches them."""
+    requests = []
+    manager = LLMClientManager(api_key="sk-test", retry_policy=RetryPolicy(max_attempts=1),
+                               transport=httpx.MockTransport(_tool_call_llm(requests)),
+                               async_transport=httpx.MockTransport(_tool_call_llm(requests)))
+    cache = ResultCache(MemoryLRUBackend(), name="test-analysis-cache")
+    monkeypatch.setattr(llm_client, "_llm_client_manager", manager)
+    monkeypatch.setattr(analysis_service, "get_analysis_cache", lambda: cache)
+    monkeypatch.setattr(analysis_service, "get_user_analysis_settings",
+                        lambda user_id=None: {"analysis_mode": "structured"})
+
+    first = asyncio.run(analysis_service.analyze_transcript_async("Client: I am anxious about work."))
+    second = analysis_service.analyze_transcript("Client: I am anxious about work.")
+
+    assert first == second == parse_structured_analysis(json.dumps(ANALYSIS))
+    assert len(requests) == 1
+    request = requests[0]
+    assert request["tool_choice"] == {"type": "function", "function": {"name": ANALYSIS_FUNCTION}}
+    assert request["tools"][0]["function"]["parameters"]["properties"].keys() == ANALYSIS.keys()
+    assert ANALYSIS_FUNCTION in request["messages"][-1]["content"]
+    assert "=== EMOTIONS ===" not in request["messages"][-1]["content"]
+
+    # Text mode builds a different request, so it never reads a structured cache entry
+    text_request = analysis_service._chat_request("prompt", {})
+    structured_request = analysis_service._chat_request("prompt", {"analysis_mode": "structured"})
+    assert "tools" not in text_request
+    assert analysis_service.analysis_cache_key(text_request) != analysis_service.analysis_cache_key(structured_request)
+    logger.info("✅ Structured analysis mode passed")
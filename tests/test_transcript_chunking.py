@@ -0,0 +1,139 @@
+"""
+Tests for token-aware transcript chunking and map-reduce analysis
+"""
+
+import asyncio
+import json
+import time
+import pytest
+import logging
+
+import httpx
+
+from services import analysis_service, llm_client
+from services.llm_client import LLMClientManager, RetryPolicy
+from services.transcript_chunking import chunk_transcript, estimate_tokens, merge_elements
+
+logger = logging.getLogger(__name__)
+
+LLM_DELAY = 0.2
+
+
+def _session(turns):
+    return "\n".join(
+        f"[{minute:02d}:00] {'Coach' if minute % 2 else 'Client'}: " + "I have been thinking about work a lot. " * 20
+        for minute in range(turns)
+    )
+
+
+@pytest.mark.unit
+def test_chunks_respect_budget_and_turn_boundaries():
+    """Every chunk fits the budget, starts at a turn and records its first timestamp."""
+    transcript = _session(30)
+
+    chunks = chunk_transcript(transcript, max_tokens=800)
+
+    assert len(chunks) > 1
+    assert all(chunk.tokens <= 800 for chunk in chunks)
+    assert all(chunk.text.startswith("[") for chunk in chunks)
+    assert "\n".join(chunk.text for chunk in chunks) == transcript
+    assert chunks[0].start == "00:00"
+    assert chunks[1].start != "00:00"
+    assert chunks[1].labelled(len(chunks)).startswith(f"[Part 2 of {len(chunks)}, starting at {chunks[1].start}]")
+    logger.info(f"✅ Turn chunking passed ({len(chunks)} chunks)")
+
+
+@pytest.mark.unit
+def test_unstructured_text_splits_at_sentences():
+    """A single-paragraph transcript is cut between sentences; short text stays whole."""
+    transcript = " ".join(f"Sentence number {n} is about my week." for n in range(400))
+
+    chunks = chunk_transcript(transcript, max_tokens=300)
+
+    assert all(chunk.tokens <= 300 for chunk in chunks)
+    assert all(chunk.text.endswith(".") for chunk in chunks)
+    assert " ".join(chunk.text for chunk in chunks) == transcript
+    assert chunk_transcript("Short session.", max_tokens=300)[0].text == "Short session."
+    assert estimate_tokens("") == 0
+    logger.info("✅ Sentence chunking passed")
+
+
+@pytest.mark.unit
+def test_unpunctuated_text_splits_between_words():
+    """A run-on turn with no sentence breaks is cut between words, within the budget."""
+    transcript = " ".join(f"word{n} and then" for n in range(3000))
+
+    chunks = chunk_transcript(transcript, max_tokens=200)
+
+    assert len(chunks) > 1
+    assert all(chunk.tokens <= 200 for chunk in chunks)
+    assert " ".join(chunk.text for chunk in chunks) == transcript
+    logger.info(f"✅ Word chunking passed ({len(chunks)} chunks)")
+
+
+@pytest.mark.unit
+def test_merge_deduplicates_and_keeps_timestamps():
+    """Repeated elements merge into one with every timestamp and the highest intensity."""
+    parts = [
+        {"emotions": [{"name": "Anxiety", "intensity": "3", "topic": "Career", "timestamp": "02:00"}],
+         "beliefs": [{"name": "Perfectionism", "timestamp": "04:00"}]},
+        {"emotions": [{"name": "anxiety", "intensity": "5", "topic": "Career", "timestamp": "21:00"},
+                      {"name": "Anxiety", "intensity": "2", "topic": "Health", "timestamp": "22:00"}],
+         "beliefs": [{"name": "Perfectionism!", "timestamp": "25:00"}],
+         "insights": [{"name": "Self-compassion", "timestamp": "30:00"}]},
+    ]
+
+    merged = merge_elements(parts)
+
+    assert [(e["topic"], e["intensity"], e["timestamps"]) for e in merged["emotions"]] == [
+        ("Career", "5", ["02:00", "21:00"]), ("Health", "2", ["22:00"])
+    ]
+    assert merged["beliefs"][0]["timestamps"] == ["04:00", "25:00"]
+    assert len(merged["insights"]) == 1
+    assert merged["action_items"] == [] and merged["challenges"] == []
+    logger.info("✅ Element merge passed")
+
+
+@pytest.mark.unit
+def test_long_transcript_analysis_runs_chunks_concurrently(monkeypatch):
+    """Chunks are analyzed in parallel and the elements merged into one result."""
+    in_flight = {"now": 0, "max": 0}
+
+    async def llm(request):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(LLM_DELAY)
+        in_flight["now"] -= 1
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        part = prompt.split("[Part ")[1].split(" ")[0]
+        content = (
+            "=== EMOTIONS ===\nName: Anxiety\nIntensity: 3\nContext: Work\nTopic: Career\n"
+            f"Timestamp: {part}0:00\n\n"
+            f"=== INSIGHTS ===\nName: Insight {part}\nContext: Reflection\nTopic: Career\nTimestamp: {part}0:30\n"
+        )
+        return httpx.Response(200, json={
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "gpt-4",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        })
+
+    manager = LLMClientManager(api_key="sk-test", retry_policy=RetryPolicy(max_attempts=1),
+                               async_transport=httpx.MockTransport(llm))
+    monkeypatch.setattr(llm_client, "_llm_client_manager", manager)
+    monkeypatch.setattr(analysis_service, "get_user_analysis_settings", lambda user_id=None: {})
+    monkeypatch.setattr(analysis_service, "get_analysis_cache", lambda: None)
+    monkeypatch.setattr(analysis_service, "ANALYSIS_CHUNK_TOKENS", 800)
+    monkeypatch.setattr(analysis_service, "ANALYSIS_CHUNK_CONCURRENCY", 8)
+    transcript = _session(30)
+    chunk_count = len(chunk_transcript(transcript, 800))
+
+    started = time.perf_counter()
+    elements = asyncio.run(analysis_service.analyze_transcript_async(transcript))
+    elapsed = time.perf_counter() - started
+
+    assert 1 < chunk_count <= 8
+    assert in_flight["max"] == chunk_count
+    assert elapsed < chunk_count * LLM_DELAY / 2
+    assert len(elements["emotions"]) == 1
+    assert len(elements["emotions"][0]["timestamps"]) == chunk_count
+    assert len(elements["insights"]) == chunk_count
+    logger.info(f"✅ Map-reduce analysis passed ({chunk_count} chunks in {elapsed:.2f}s)")
@@ -0,0 +1,224 @@
+"""
+Tests for the transcript store and sessions that keep only a reference to it
+"""
+
+import os
+import time
+import pytest
+import logging
+from contextlib import contextmanager
+
+from services import neo4j_queries as queries, transcript_store
+from services.errors import NotFoundError, ServiceError, ValidationError
+from services.neo4j_service import Neo4jService
+from services.transcript_store import (
+    BlobBackend, LocalBlobBackend, MemoryBlobBackend, TranscriptStore, slice_transcript
+)
+
+logger = logging.getLogger(__name__)
+
+# An hour of turns every 15 seconds, with multi-byte characters throughout
+TRANSCRIPT = "Therapy Session 1 – Café\n\n" + "".join(
+    f"{t // 60:02d}:{t % 60:02d} — {'T' if t % 30 else 'A'}: I’ve been thinking about turn {t}…\n\n"
+    for t in range(0, 3600, 15)
+)
+
+
+class CountingBackend(BlobBackend):
+    """Wraps a backend to count blob writes and bytes read."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.puts = 0
+        self.bytes_read = 0
+
+    def put(self, key, data):
+        self.puts += 1
+        self.backend.put(key, data)
+
+    def get_range(self, key, start, end):
+        data = self.backend.get_range(key, start, end)
+        self.bytes_read += len(data)
+        return data
+
+    def exists(self, key):
+        return self.backend.exists(key)
+
+    def touch(self, key):
+        return self.backend.touch(key)
+
+    def stale_keys(self, cutoff):
+        return self.backend.stale_keys(cutoff)
+
+    def delete_if_stale(self, key, cutoff):
+        return self.backend.delete_if_stale(key, cutoff)
+
+
+@pytest.mark.unit
+def test_range_reads_inflate_only_the_blocks_they_need(tmp_path):
+    """Byte and timestamp ranges match the text, and read a fraction of the blob."""
+    backend = CountingBackend(LocalBlobBackend(str(tmp_path)))
+    store = TranscriptStore(backend, block_size=1024)
+    data = TRANSCRIPT.encode("utf-8")
+
+    ref = store.put(TRANSCRIPT)
+    assert store.put(TRANSCRIPT) == ref and backend.puts == 1
+    blob_size = (tmp_path / ref.digest[:2] / ref.digest).stat().st_size
+    assert ref.length == len(TRANSCRIPT) and ref.size == len(data)
+    assert blob_size < len(data) / 2
+
+    assert store.read_text(ref.digest) == TRANSCRIPT
+    backend.bytes_read = 0
+    assert store.read(ref.digest, 5000, 5100) == data[5000:5100]
+    assert backend.bytes_read < blob_size / 10
+
+    window = store.read_text(ref.digest, start_time=120, end_time=180)
+    assert window.startswith("02:00 — A:") and window.endswith("02:45 — T: I’ve been thinking about turn 165…\n\n")
+    assert window == slice_transcript(TRANSCRIPT, start_time=120, end_time=180)
+    assert store.read_text(ref.digest, start_time=3590) == ""
+    assert store.read_text(ref.digest, end_time=15) == TRANSCRIPT[:TRANSCRIPT.index("00:15")]
+    # A cut through a multi-byte character drops it rather than failing
+    dash = data.index("—".encode("utf-8"))
+    assert store.read_text(ref.digest, start=dash + 1, end=dash + 6) == " A:"
+
+    with pytest.raises(ValidationError):
+        store.read_text(ref.digest, start=0, start_time=60)
+    with pytest.raises(ValidationError):
+        slice_transcript("no timestamps here", start_time=60)
+    assert store.sweep(lambda digests: set(), grace_seconds=0) == 1
+    with pytest.raises(NotFoundError):
+        store.read(ref.digest)
+    logger.info(f"✅ Transcript range reads passed ({len(data)} bytes stored in {blob_size})")
+
+
+class FakeDriver:
+    """Answers the session transcript queries from memory and records parameters."""
+
+    def __init__(self):
+        self.runs = []
+        self.sessions = {}
+
+    @contextmanager
+    def session(self):
+        yield self
+
+    def run(self, query, **params):
+        self.runs.append((query, params))
+        record = None
+        if query == queries.CREATE_SESSION_NODE:
+            self.sessions[params["session_id"]] = params
+            record = {"session_id": params["session_id"]}
+        elif query == queries.SESSION_TRANSCRIPT:
+            session = self.sessions.get(params["session_id"])
+            record = session and {"userId": session["user_id"], "transcript_ref": session.get("transcript_ref"),
+                                  "transcript": session.get("transcript")}
+        elif query == queries.DELETE_SESSION:
+            self.sessions.pop(params["session_id"])
+            record = {"relationship_count": 1}
+        elif query == queries.TRANSCRIPT_REFS_IN_USE:
+            record = {"in_use": [ref for ref in params["transcript_refs"]
+                                 if any(s.get("transcript_ref") == ref for s in self.sessions.values())]}
+        return type("Result", (), {"single": lambda _: record})()
+
+
+@pytest.mark.unit
+def test_session_nodes_keep_a_reference_not_the_transcript(monkeypatch):
+    """The transcript goes to the store; the node gets its digest and length."""
+    store = TranscriptStore(MemoryBlobBackend())
+    monkeypatch.setattr(transcript_store, "_transcript_store", store)
+    neo4j = Neo4jService("bolt://localhost:7687", "neo4j", "password")
+    neo4j.driver.close()
+    neo4j.driver = driver = FakeDriver()
+
+    first = neo4j.create_session_node("U_1", {"title": "One", "transcript": TRANSCRIPT})
+    second = neo4j.create_session_node("U_1", {"title": "Two", "transcript": TRANSCRIPT})
+    params = driver.sessions[first]
+    assert params["transcript"] is None and all(TRANSCRIPT not in map(str, p.values()) for _, p in driver.runs)
+    assert params["transcript_length"] == len(TRANSCRIPT)
+    assert store.backend.exists(params["transcript_ref"])
+
+    assert neo4j.get_session_transcript(first) == {"userId": "U_1", "transcript": TRANSCRIPT}
+    assert neo4j.get_session_transcript(first, start_time=60, end_time=75)["transcript"].startswith("01:00 — A:")
+    assert neo4j.get_session_transcript("S_gone") is None
+
+    # Sessions written before the store keep their transcript inline until migrated
+    driver.sessions["S_legacy"] = {"user_id": "U_1", "transcript": "00:05 — T: Hello\n00:09 — A: Hi\n"}
+    assert neo4j.get_session_transcript("S_legacy", start_time=9)["transcript"] == "00:09 — A: Hi\n"
+
+    # Deleting sessions leaves the shared blob to the sweep, which keeps it while referenced
+    digest = params["transcript_ref"]
+    assert neo4j.delete_session(first)
+    assert transcript_store.sweep_unreferenced_transcripts(driver, grace_seconds=0) == 0
+    assert neo4j.delete_session(second) and store.backend.exists(digest)
+    assert transcript_store.sweep_unreferenced_transcripts(driver, grace_seconds=60) == 0
+    assert transcript_store.sweep_unreferenced_transcripts(driver, grace_seconds=0) == 1
+    assert not store.backend.exists(digest)
+    logger.info("✅ Session transcript references passed")
+
+
+@pytest.mark.unit
+def test_transcripts_stay_inline_unless_the_store_is_enabled(monkeypatch, tmp_path):
+    """Without TRANSCRIPT_STORE_BACKEND nothing is moved off the node, and migration needs a store."""
+    monkeypatch.delenv("TRANSCRIPT_STORE_BACKEND", raising=False)
+    monkeypatch.setattr(transcript_store, "_transcript_store", None)
+    neo4j = Neo4jService("bolt://localhost:7687", "neo4j", "password")
+    neo4j.driver.close()
+    neo4j.driver = driver = FakeDriver()
+
+    session_id = neo4j.create_session_node("U_1", {"title": "One", "transcript": TRANSCRIPT})
+    params = driver.sessions[session_id]
+    assert params["transcript"] == TRANSCRIPT and params["transcript_ref"] is None
+    assert params["transcript_length"] == len(TRANSCRIPT)
+    assert neo4j.get_session_transcript(session_id, end_time=15)["transcript"].startswith("Therapy Session 1")
+    assert transcript_store.main(["--migrate"]) == 1
+
+    # The local backend only takes the sole copy of a transcript when forced
+    monkeypatch.setattr(transcript_store, "_transcript_store", TranscriptStore(LocalBlobBackend(str(tmp_path))))
+    assert transcript_store.main(["--migrate"]) == 1
+    logger.info("✅ Inline transcripts by default passed")
+
+
+@pytest.mark.unit
+def test_memory_backend_is_never_configured(monkeypatch):
+    """The memory backend would hold the only copy of each transcript in one process."""
+    monkeypatch.setenv("TRANSCRIPT_STORE_BACKEND", "memory")
+    monkeypatch.setattr(transcript_store, "_transcript_store", None)
+    with pytest.raises(ServiceError):
+        transcript_store.get_transcript_store()
+    assert transcript_store._transcript_store is None
+    assert transcript_store.main(["--migrate"]) == 1
+
+    # Even a store built directly around it is refused for migration, with or without --force
+    migrations = []
+    monkeypatch.setattr(transcript_store, "migrate_inline_transcripts",
+                        lambda *args, **kwargs: migrations.append(args) or 0)
+    monkeypatch.setattr(transcript_store, "_transcript_store", TranscriptStore(MemoryBlobBackend()))
+    assert transcript_store.main(["--migrate"]) == 1
+    assert transcript_store.main(["--migrate", "--force"]) == 1
+    assert migrations == []
+    logger.info("✅ Memory backend refusal passed")
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("backend", ["local", "memory"])
+def test_sweep_spares_a_blob_re_put_while_it_runs(tmp_path, backend):
+    """A re-upload between the sweep's reference check and its delete keeps the blob."""
+    store = TranscriptStore(LocalBlobBackend(str(tmp_path)) if backend == "local" else MemoryBlobBackend())
+    ref = store.put(TRANSCRIPT)
+    # Written an hour ago
+    written = time.time() - 3600
+    if backend == "local":
+        os.utime(tmp_path / ref.digest[:2] / ref.digest, (written, written))
+    else:
+        store.backend._blobs[ref.digest] = (store.backend._blobs[ref.digest][0], written)
+    assert list(store.backend.stale_keys(time.time() - 60)) == [ref.digest]
+
+    def referenced(digests):
+        # Nothing refers to the blob yet, but a new session is about to
+        store.put(TRANSCRIPT)
+        return set()
+
+    assert store.sweep(referenced, grace_seconds=60) == 0
+    assert store.read_text(ref.digest) == TRANSCRIPT
+    assert store.sweep(lambda digests: set(), grace_seconds=60) == 0
+    logger.info(f"✅ Sweep race with re-upload passed ({backend})")
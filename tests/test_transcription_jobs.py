@@ -0,0 +1,136 @@
+"""
+Tests for the shared transcription job store
+"""
+
+import threading
+import time
+import pytest
+import logging
+
+from services.transcription_jobs import RedisJobState, SQLiteJobState, TranscriptionJobStore
+
+logger = logging.getLogger(__name__)
+
+
+def _job(job_id, user_id="U_1", status="processing"):
+    return {"id": job_id, "user_id": user_id, "status": status, "progress": 0,
+            "options": {"language": "en"}}
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def backend(request, tmp_path):
+    """Each job state backend; Redis runs against fakeredis when installed."""
+    if request.param == "sqlite":
+        return SQLiteJobState(str(tmp_path / "jobs.db"))
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisJobState(fakeredis.FakeRedis())
+
+
+@pytest.mark.unit
+def test_jobs_are_visible_across_store_instances(tmp_path):
+    """A job written by one worker's store is read and listed by another's."""
+    path = str(tmp_path / "jobs.db")
+    writer = TranscriptionJobStore(SQLiteJobState(path))
+    reader = TranscriptionJobStore(SQLiteJobState(path))
+
+    writer.create(_job("T_1"))
+    writer.create(_job("T_2", status="completed"))
+    writer.create(_job("T_3", user_id="U_2"))
+    writer.update("T_1", {"progress": 40, "timings": {"probe_ms": 5.0}})
+    writer.update("T_1", {"status": "completed", "timings": {"segment_ms": 9.0}})
+
+    job = reader.get("T_1")
+    assert job["status"] == "completed"
+    assert job["progress"] == 40
+    assert job["timings"] == {"probe_ms": 5.0, "segment_ms": 9.0}
+    assert job["options"] == {"language": "en"}
+    assert [j["id"] for j in reader.list_for_user("U_1")] == ["T_2", "T_1"]
+    assert [j["id"] for j in reader.list_for_user("U_1", status="completed", limit=1)] == ["T_2"]
+    assert reader.get("T_missing") is None
+    assert not reader.update("T_missing", {"progress": 1})
+    logger.info("✅ Shared job state passed")
+
+
+@pytest.mark.unit
+def test_concurrent_updates_do_not_lose_fields(tmp_path):
+    """Updates of different fields from several threads all land."""
+    store = TranscriptionJobStore(SQLiteJobState(str(tmp_path / "jobs.db")))
+    store.create(_job("T_1"))
+
+    def write(n):
+        store.update("T_1", {"timings": {f"stage_{n}": float(n)}})
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.get("T_1")["timings"] == {f"stage_{n}": float(n) for n in range(20)}
+    logger.info("✅ Atomic updates passed")
+
+
+@pytest.mark.unit
+def test_expired_jobs_disappear_and_are_cleaned_up(tmp_path):
+    """Expiry is measured from the last update; cleanup removes only expired jobs."""
+    store = TranscriptionJobStore(SQLiteJobState(str(tmp_path / "jobs.db")), ttl=0.2)
+    store.create(_job("T_old"))
+    store.create(_job("T_active"))
+    time.sleep(0.12)
+    store.update("T_active", {"progress": 50})
+    time.sleep(0.12)
+
+    assert store.get("T_old") is None
+    assert not store.update("T_old", {"progress": 99})
+    assert store.get("T_active")["progress"] == 50
+    assert store.cleanup_expired() == 1
+    assert [j["id"] for j in store.list_for_user("U_1")] == ["T_active"]
+    logger.info("✅ Job expiry passed")
+
+
+@pytest.mark.unit
+def test_backends_merge_updates_the_same_way(backend):
+    """Partial nested updates keep sibling keys and None removes a field on every backend."""
+    store = TranscriptionJobStore(backend)
+    store.create(dict(_job("T_1"), error="stale"))
+
+    store.update("T_1", {"timings": {"probe_ms": 5.0, "upload_ms": 1.0}})
+    store.update("T_1", {"timings": {"segment_ms": 9.0, "upload_ms": None}})
+    store.update("T_1", {"options": {"language": "de"}, "error": None, "chunks": [1, 2]})
+    store.update("T_1", {"chunks": [3]})
+
+    job = store.get("T_1")
+    assert job["timings"] == {"probe_ms": 5.0, "segment_ms": 9.0}
+    assert job["options"] == {"language": "de"}
+    assert job["chunks"] == [3]
+    assert "error" not in job
+    assert job["progress"] == 0
+    logger.info("✅ Backend merge parity passed")
+
+
+@pytest.mark.unit
+def test_backends_list_by_status_and_forget_expired_jobs(backend):
+    """Listing by status follows status changes; expired jobs leave every index."""
+    store = TranscriptionJobStore(backend, ttl=0.3)
+    for n in range(4):
+        store.create(_job(f"T_{n}"))
+        time.sleep(0.01)
+    store.create(_job("T_other", user_id="U_2"))
+    store.update("T_1", {"status": "completed"})
+    store.update("T_3", {"status": "completed"})
+
+    assert [j["id"] for j in store.list_for_user("U_1", status="completed")] == ["T_3", "T_1"]
+    assert [j["id"] for j in store.list_for_user("U_1", status="processing")] == ["T_2", "T_0"]
+    assert [j["id"] for j in store.list_for_user("U_1", limit=3)] == ["T_3", "T_2", "T_1"]
+
+    time.sleep(0.2)
+    store.update("T_3", {"progress": 90})
+    time.sleep(0.15)
+    assert store.cleanup_expired() == 4
+    assert [j["id"] for j in store.list_for_user("U_1")] == ["T_3"]
+    assert store.list_for_user("U_1", status="processing") == []
+    if isinstance(backend, RedisJobState):
+        assert backend.client.zcard(backend._user_key("U_1")) == 1
+        assert backend.client.zcard(backend._user_key("U_1", "processing")) == 0
+        assert backend.client.hlen(backend._index_key) == 1
+    logger.info("✅ Status listing and expiry passed")
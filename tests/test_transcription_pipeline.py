@@ -0,0 +1,346 @@
+"""
+Tests for the concurrent chunked transcription pipeline
+
+ffmpeg and the Whisper API are replaced by in-process fakes so the tests
+measure the scheduling: concurrency bound, ordering, per-chunk retry. The
+segmentation tests check the single-pass ffmpeg invocation, and run it for
+real when ffmpeg is installed.
+"""
+
+import asyncio
+import shutil
+import subprocess
+import threading
+import time
+import pytest
+import logging
+from pathlib import Path
+
+from services import audio_segmentation, transcription_service
+from services.audio_segmentation import (
+    AudioSegment, SegmentationResult, parse_silences, plan_chunks, segment_audio
+)
+from services.transcription_jobs import SQLiteJobState, TranscriptionJobStore
+from services.result_cache import MemoryLRUBackend, ResultCache
+from services.transcription_service import TranscriptionService
+from services.upload_storage import StoredUpload
+
+logger = logging.getLogger(__name__)
+
+CHUNK_DELAY = 0.1
+
+
+class FakeChunks:
+    """Fake chunk extraction and transcription with optional failures."""
+
+    def __init__(self, tmp_path, chunks, fail_once=(), fail_always=()):
+        self.tmp_path = tmp_path
+        self.chunks = chunks
+        self.fail_once = set(fail_once)
+        self.fail_always = set(fail_always)
+        self.calls = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def segment(self, audio_path, chunk_seconds, work_dir=None, plan=None):
+        self.plan = plan
+        directory = self.tmp_path / "segments"
+        directory.mkdir()
+        segments = []
+        for n in range(self.chunks):
+            path = directory / f"chunk_{n * chunk_seconds}.mp3"
+            path.write_bytes(f"audio {n}".encode())
+            segments.append(AudioSegment(index=n, path=path, start=float(n * chunk_seconds)))
+        return SegmentationResult(segments, directory, "copy", {"segment_ms": 1.0})
+
+    async def transcribe(self, chunk_path, model, language="en"):
+        start = int(Path(chunk_path).stem.split("_")[1])
+        self.calls[start] = self.calls.get(start, 0) + 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(CHUNK_DELAY)
+            if start in self.fail_always or (start in self.fail_once and self.calls[start] == 1):
+                raise RuntimeError("Whisper 500")
+            return f"text@{start}"
+        finally:
+            self.in_flight -= 1
+
+
+def _service(monkeypatch, fake, max_concurrent, silence_detection=False, cache=None):
+    service = TranscriptionService(chunk_size_seconds=60, max_concurrent=max_concurrent,
+                                   max_retries=2, retry_backoff=0.0, silence_detection=silence_detection,
+                                   job_store=TranscriptionJobStore(SQLiteJobState(str(fake.tmp_path / "jobs.db"))))
+    monkeypatch.setattr(transcription_service, "segment_audio", fake.segment)
+    monkeypatch.setattr(transcription_service, "get_transcript_cache", lambda: cache)
+    monkeypatch.setattr(service, "_transcribe_chunk", fake.transcribe)
+    return service
+
+
+@pytest.mark.unit
+def test_chunks_run_concurrently_in_order(tmp_path, monkeypatch):
+    """Ten chunks run five at a time and are reassembled in audio order."""
+    fake = FakeChunks(tmp_path, chunks=10)
+    service = _service(monkeypatch, fake, max_concurrent=5)
+    timings = {}
+
+    started = time.perf_counter()
+    texts = asyncio.run(service._transcribe_chunks(tmp_path / "a.mp3", "whisper-1", timings=timings))
+    elapsed = time.perf_counter() - started
+
+    assert texts == [f"text@{start}" for start in range(0, 600, 60)]
+    assert fake.max_in_flight == 5
+    assert elapsed < 10 * CHUNK_DELAY / 2
+    assert not (tmp_path / "segments").exists()
+    assert set(timings) == {"segment_ms", "transcribe_ms"}
+    logger.info(f"✅ Concurrent chunks passed ({elapsed:.2f}s for 10 chunks)")
+
+
+@pytest.mark.unit
+def test_failed_chunk_is_retried_alone(tmp_path, monkeypatch):
+    """Only the failing chunk is retried; a chunk that keeps failing becomes None."""
+    fake = FakeChunks(tmp_path, chunks=5, fail_once={120}, fail_always={240})
+    service = _service(monkeypatch, fake, max_concurrent=3)
+    states = {}
+
+    texts = asyncio.run(service._transcribe_chunks(
+        tmp_path / "a.mp3", "whisper-1", on_chunk=lambda index, state: states.setdefault(index, []).append(state)
+    ))
+
+    assert texts == ["text@0", "text@60", "text@120", "text@180", None]
+    assert fake.calls == {0: 1, 60: 1, 120: 2, 180: 1, 240: 3}
+    assert states[2] == ["pending", "transcribing", "retrying", "completed"]
+    assert states[4][-1] == "failed"
+    logger.info("✅ Per-chunk retry passed")
+
+
+@pytest.mark.unit
+def test_job_reports_per_chunk_progress(tmp_path, monkeypatch):
+    """A long job records chunk states, failed chunks and the joined transcript."""
+    fake = FakeChunks(tmp_path, chunks=4, fail_always={180})
+    service = _service(monkeypatch, fake, max_concurrent=2)
+    service.client = object()
+    monkeypatch.setattr(service, "_get_audio_duration", lambda path: 240.0)
+    service.jobs.create({
+        "id": "T_1", "file_path": str(tmp_path / "a.mp3"), "status": "processing", "progress": 0,
+        "options": {"language": "en", "format": "text", "speaker_detection": False},
+    })
+    update = service.jobs.update
+    writer_threads = set()
+
+    def tracking_update(job_id, fields):
+        writer_threads.add(threading.get_ident())
+        return update(job_id, fields)
+
+    monkeypatch.setattr(service.jobs, "update", tracking_update)
+
+    asyncio.run(service._process_transcription_job("T_1"))
+
+    job = service.jobs.get("T_1")
+    assert writer_threads and threading.get_ident() not in writer_threads
+    assert job["status"] == "completed"
+    assert job["transcript"] == "text@0 text@60 text@120"
+    assert job["chunks"] == ["completed", "completed", "completed", "failed"]
+    assert job["failed_chunks"] == [3]
+    assert set(job["timings"]) == {"probe_ms", "segment_ms", "transcribe_ms"}
+    logger.info("✅ Job chunk progress passed")
+
+
+@pytest.mark.unit
+def test_segment_audio_single_pass(tmp_path, monkeypatch):
+    """One ffmpeg call stream-copies into a private directory; re-encode is the fallback."""
+    commands = []
+
+    def fake_run(cmd, **kwargs):
+        commands.append(cmd)
+        if "copy" in cmd:
+            raise subprocess.CalledProcessError(1, cmd, stderr=b"copy not possible")
+        pattern = Path(cmd[-1])
+        for n in range(3):
+            Path(str(pattern).replace("%04d", f"{n:04d}")).write_bytes(b"audio")
+        return subprocess.CompletedProcess(cmd, 0)
+
+    monkeypatch.setattr(audio_segmentation.subprocess, "run", fake_run)
+
+    result = segment_audio(Path("session.m4a"), 300, work_dir=str(tmp_path))
+
+    assert [cmd[cmd.index("-segment_time") + 1] for cmd in commands] == ["300", "300"]
+    assert commands[0][commands[0].index("-c") + 1] == "copy"
+    assert result.mode == "encode"
+    assert [segment.start for segment in result.segments] == [0.0, 300.0, 600.0]
+    assert all(segment.path.parent == result.directory for segment in result.segments)
+    assert result.directory.parent == tmp_path
+    result.cleanup()
+    assert not result.directory.exists()
+    logger.info("✅ Single-pass segmentation passed")
+
+
+@pytest.mark.unit
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_segment_audio_with_ffmpeg(tmp_path):
+    """A synthetic 25 s recording splits into three chunks."""
+    audio = tmp_path / "tone.mp3"
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=440:duration=25",
+         "-acodec", "libmp3lame", str(audio)],
+        check=True, capture_output=True
+    )
+
+    result = segment_audio(audio, 10, work_dir=str(tmp_path))
+
+    assert result.mode == "copy"
+    assert len(result.segments) == 3
+    result.cleanup()
+    logger.info("✅ ffmpeg segmentation passed")
+
+
+SILENCEDETECT_LOG = """
+[silencedetect @ 0x55] silence_start: 0
+[silencedetect @ 0x55] silence_end: 4.2 | silence_duration: 4.2
+[silencedetect @ 0x55] silence_start: 31.5
+[silencedetect @ 0x55] silence_end: 32.1 | silence_duration: 0.6
+[silencedetect @ 0x55] silence_start: 118.0
+"""
+
+
+@pytest.mark.unit
+def test_parse_silences():
+    """silencedetect output becomes spans; an open silence runs to the end."""
+    assert parse_silences(SILENCEDETECT_LOG, 120.0) == [(0.0, 4.2), (31.5, 32.1), (118.0, 120.0)]
+    logger.info("✅ Silence parsing passed")
+
+
+@pytest.mark.unit
+def test_plan_chunks_cuts_at_pauses_and_drops_silence():
+    """Chunks end at pauses, stay under the target and skip long silences."""
+    silences = [(0.0, 10.0), (100.0, 100.6), (170.0, 171.0), (250.0, 262.0), (340.0, 340.4)]
+
+    plan = plan_chunks(400.0, silences, target=120, drop_silence=3.0)
+
+    assert plan.speech == [(10.0, 250.0), (262.0, 400.0)]
+    assert plan.chunks == [(10.0, 100.3), (100.3, 170.5), (170.5, 250.0), (262.0, 340.2), (340.2, 400.0)]
+    assert all(end - start <= 120 for start, end in plan.chunks)
+    assert plan.dropped_seconds == 22.0
+    assert plan.boundaries()[0] == 10.0
+    logger.info("✅ Chunk planning passed")
+
+
+@pytest.mark.unit
+def test_plan_chunks_hard_cut_without_pauses():
+    """Continuous speech is still split at the target length."""
+    plan = plan_chunks(250.0, [], target=100)
+    assert plan.chunks == [(0.0, 100.0), (100.0, 200.0), (200.0, 250.0)]
+    assert plan.dropped_seconds == 0.0
+    logger.info("✅ Hard cut planning passed")
+
+
+@pytest.mark.unit
+def test_segment_audio_discards_silent_pieces(tmp_path, monkeypatch):
+    """With a plan, ffmpeg cuts at its boundaries and silent pieces are deleted."""
+    plan = plan_chunks(100.0, [(0.0, 5.0), (40.0, 50.0)], target=60)
+    commands = []
+
+    def fake_run(cmd, **kwargs):
+        commands.append(cmd)
+        pattern = cmd[-1]
+        for n in range(len(plan.boundaries()) + 1):
+            Path(pattern.replace("%04d", f"{n:04d}")).write_bytes(b"audio")
+        return subprocess.CompletedProcess(cmd, 0)
+
+    monkeypatch.setattr(audio_segmentation.subprocess, "run", fake_run)
+
+    result = segment_audio(Path("session.mp3"), 60, work_dir=str(tmp_path), plan=plan)
+
+    assert commands[0][commands[0].index("-segment_times") + 1] == "5.000,40.000,50.000"
+    assert [(segment.start, segment.end) for segment in result.segments] == [(5.0, 40.0), (50.0, 100.0)]
+    assert len(list(result.directory.iterdir())) == 2
+    result.cleanup()
+    logger.info("✅ Silent piece removal passed")
+
+
+@pytest.mark.unit
+def test_job_exposes_speech_map(tmp_path, monkeypatch):
+    """Silence detection drives segmentation and is reported in job status."""
+    fake = FakeChunks(tmp_path, chunks=2)
+    service = _service(monkeypatch, fake, max_concurrent=2, silence_detection=True)
+    service.client = object()
+    monkeypatch.setattr(service, "_get_audio_duration", lambda path: 150.0)
+    monkeypatch.setattr(transcription_service, "detect_silences",
+                        lambda path, duration, **kwargs: [(0.0, 20.0), (70.0, 70.5)])
+    service.jobs.create({
+        "id": "T_1", "file_path": str(tmp_path / "a.mp3"), "status": "processing", "progress": 0,
+        "options": {"language": "en", "format": "text", "speaker_detection": False},
+    })
+    update = service.jobs.update
+    writer_threads = set()
+
+    def tracking_update(job_id, fields):
+        writer_threads.add(threading.get_ident())
+        return update(job_id, fields)
+
+    monkeypatch.setattr(service.jobs, "update", tracking_update)
+
+    asyncio.run(service._process_transcription_job("T_1"))
+
+    job = service.jobs.get("T_1")
+    assert writer_threads and threading.get_ident() not in writer_threads
+    assert job["status"] == "completed"
+    assert job["speech_map"]["speech"] == [[20.0, 150.0]]
+    assert job["speech_map"]["dropped_seconds"] == 20.0
+    assert fake.plan.chunks == [(20.0, 70.25), (70.25, 130.25), (130.25, 150.0)]
+    assert "vad_ms" in job["timings"]
+    logger.info("✅ Speech map passed")
+
+
+@pytest.mark.unit
+def test_repeat_upload_completes_from_cache(tmp_path, monkeypatch):
+    """The same recording, model and language is answered without ffprobe or Whisper."""
+    cache = ResultCache(MemoryLRUBackend(), ttl=60, name="transcript-cache")
+    fake = FakeChunks(tmp_path, chunks=3)
+    service = _service(monkeypatch, fake, max_concurrent=3, cache=cache)
+    service.client = object()
+    probes = []
+    monkeypatch.setattr(service, "_get_audio_duration", lambda path: probes.append(path) or 180.0)
+    monkeypatch.setattr(service, "get_user_transcription_settings",
+                        lambda user_id=None: {"transcription_model": "whisper-1"})
+    audio = tmp_path / "a.mp3"
+    audio.write_bytes(b"recording")
+    upload = StoredUpload(path=audio, size=9, sha256="abc123", elapsed_ms=1.0)
+    options = {"language": "en", "format": "text", "speaker_detection": "false"}
+
+    async def run():
+        first = await service.api_transcribe(str(audio), "U_1", options=options, upload=upload)
+        while service.jobs.get(first["id"])["status"] == "processing":
+            await asyncio.sleep(0.01)
+        second = await service.api_transcribe(str(audio), "U_1", options=options, upload=upload)
+        other_language = await service.api_transcribe(str(audio), "U_1", options=dict(options, language="de"),
+                                                      upload=upload)
+        return first, second, other_language
+
+    first, second, other_language = asyncio.run(run())
+
+    assert first["status"] == "processing"
+    assert second["status"] == "completed" and second["cached"]
+    assert second["transcript"] == "text@0 text@60 text@120"
+    assert service.jobs.get(second["id"])["status"] == "completed"
+    assert other_language["status"] == "processing"
+    assert len(probes) == 3
+    assert fake.calls == {0: 1, 60: 1, 120: 1}
+    logger.info("✅ Repeat upload cache passed")
+
+
+@pytest.mark.unit
+def test_partly_failed_job_resumes_from_chunk_cache(tmp_path, monkeypatch):
+    """A second run only sends the chunk that failed the first time."""
+    cache = ResultCache(MemoryLRUBackend(), ttl=60, name="transcript-cache")
+    first = FakeChunks(tmp_path, chunks=4, fail_always={180})
+    service = _service(monkeypatch, first, max_concurrent=4, cache=cache)
+    assert asyncio.run(service._transcribe_chunks(tmp_path / "a.mp3", "whisper-1"))[3] is None
+
+    second = FakeChunks(tmp_path, chunks=4)
+    service = _service(monkeypatch, second, max_concurrent=4, cache=cache)
+    texts = asyncio.run(service._transcribe_chunks(tmp_path / "a.mp3", "whisper-1"))
+
+    assert texts == ["text@0", "text@60", "text@120", "text@180"]
+    assert second.calls == {180: 1}
+    logger.info("✅ Chunk cache resume passed")
@@ -0,0 +1,97 @@
+"""
+Tests for streaming uploads to disk
+"""
+
+import asyncio
+import hashlib
+import pytest
+import logging
+
+import httpx
+
+import main
+from routes import transcription_routes
+from services.errors import ValidationError
+from services.upload_storage import save_upload
+
+logger = logging.getLogger(__name__)
+
+
+class FakeUpload:
+    """Serves bytes through an async read(size), recording the sizes asked for."""
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+        self.requested = []
+
+    async def read(self, size=-1):
+        self.requested.append(size)
+        if size < 0:
+            size = len(self.data) - self.offset
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += len(chunk)
+        return chunk
+
+
+@pytest.mark.unit
+def test_upload_streams_in_bounded_chunks(tmp_path):
+    """The file is copied chunk by chunk and hashed on the way through."""
+    data = bytes(range(256)) * 4000
+    upload = FakeUpload(data)
+
+    stored = asyncio.run(save_upload(upload, tmp_path / "a.mp3", max_bytes=len(data), chunk_size=64 * 1024))
+
+    assert stored.path.read_bytes() == data
+    assert stored.size == len(data)
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert set(upload.requested) == {64 * 1024}
+    assert [p.name for p in tmp_path.iterdir()] == ["a.mp3"]
+    logger.info("✅ Bounded streaming passed")
+
+
+@pytest.mark.unit
+def test_oversized_upload_is_rejected_without_leftovers(tmp_path):
+    """Crossing the limit mid-stream stops reading and removes the partial file."""
+    upload = FakeUpload(b"x" * 10_000)
+
+    with pytest.raises(ValidationError) as error:
+        asyncio.run(save_upload(upload, tmp_path / "a.mp3", max_bytes=4_000, chunk_size=1_000))
+
+    assert error.value.error_code == "FILE_TOO_LARGE"
+    assert upload.offset == 5_000
+    assert list(tmp_path.iterdir()) == []
+    logger.info("✅ Upload size limit passed")
+
+
+@pytest.mark.unit
+def test_transcribe_route_streams_upload(tmp_path, monkeypatch):
+    """/transcribe stores the upload and hands its hash to the job; oversize gets a 400."""
+    received = {}
+
+    async def fake_api_transcribe(path, user_id, options=None, upload=None):
+        received.update(path=path, upload=upload)
+        return {"id": "T_1", "status": "processing", "progress": 0}
+
+    monkeypatch.setattr(transcription_routes, "get_file_storage_path", lambda: tmp_path)
+    monkeypatch.setattr(transcription_routes.transcription_service, "api_transcribe", fake_api_transcribe)
+    monkeypatch.setattr(transcription_routes, "MAX_FILE_SIZE", 50_000)
+
+    async def post(size):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/api/v1/transcribe",
+                files={"audio": ("session.mp3", b"a" * size, "audio/mpeg")},
+                data={"language": "en", "format": "text"},
+            )
+
+    accepted = asyncio.run(post(40_000))
+    assert accepted.status_code == 202
+    assert received["upload"].sha256 == hashlib.sha256(b"a" * 40_000).hexdigest()
+    assert open(received["path"], "rb").read() == b"a" * 40_000
+
+    rejected = asyncio.run(post(60_000))
+    assert rejected.status_code == 400
+    assert sorted(p.name for p in (tmp_path / "audio").iterdir()) == [received["upload"].path.name]
+    logger.info("✅ Streaming /transcribe passed")
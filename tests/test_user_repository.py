@@ -0,0 +1,95 @@
+"""
+Tests for the single-query user repository
+"""
+
+import asyncio
+import dataclasses
+import pytest
+import logging
+from contextlib import contextmanager
+
+from werkzeug.security import generate_password_hash
+
+from services import auth_service, neo4j_queries as queries
+from services.auth_service import AuthService
+from services.neo4j_service import Neo4jService
+from services.user_repository import UserRecord
+
+logger = logging.getLogger(__name__)
+
+USER_NODE = {"userId": "U_1", "email": "hashed-email", "name": "hashed-name",
+             "password_hash": generate_password_hash("secret"), "is_admin": True,
+             "created_at": "2024-01-01T00:00:00"}
+
+
+class FakeDriver:
+    """Answers the user lookups from memory and counts round trips."""
+
+    def __init__(self):
+        self.round_trips = []
+        self.sessions = 0
+        self.fail = False
+
+    @contextmanager
+    def session(self):
+        self.sessions += 1
+        yield self
+
+    def run(self, query, **params):
+        self.round_trips.append(query)
+        if self.fail:
+            raise RuntimeError("neo4j unavailable")
+        found = params.get("userId") == "U_1" or params.get("email") == "ada@example.com"
+        record = {"u": USER_NODE, "email": "ada@example.com"} if found else None
+        return type("Result", (), {"single": lambda _: record})()
+
+
+@pytest.fixture
+def neo4j(monkeypatch):
+    service = Neo4jService("bolt://localhost:7687", "neo4j", "password")
+    service.driver.close()
+    service.driver = FakeDriver()
+    monkeypatch.setattr("services.get_neo4j_service", lambda: service)
+    return service
+
+
+@pytest.mark.unit
+def test_login_token_resolution_and_profile_take_one_round_trip(neo4j):
+    """Each path runs exactly one query in one session."""
+    driver = neo4j.driver
+    auth = AuthService(neo4j, "test-secret")
+
+    success, response, _ = asyncio.run(auth.login_user("ada@example.com", "secret"))
+    assert success and response["user"]["password_hash"] is None
+    assert driver.round_trips == [queries.USER_BY_EMAIL] and driver.sessions == 1
+
+    principal = auth_service._load_principal("U_1")
+    assert driver.round_trips[1:] == [queries.USER_BY_ID] and driver.sessions == 2
+
+    profile = neo4j.get_user_by_id("U_1")
+    assert len(driver.round_trips) == 3 and driver.sessions == 3
+
+    assert principal == UserRecord.from_node(USER_NODE, "ada@example.com").without_secrets()
+    assert profile == UserRecord.from_node(USER_NODE, "ada@example.com").as_dict()
+    assert profile["email"] == "ada@example.com" and profile["hashed_email"] == "hashed-email"
+    assert not asyncio.run(auth.login_user("ada@example.com", "wrong"))[0]
+    logger.info("✅ Single round trip lookups passed")
+
+
+@pytest.mark.unit
+def test_user_record_is_immutable_and_errors_are_not_hidden(neo4j):
+    """Records can't be modified; the repository raises where the service returns None."""
+    record = neo4j.users.get_by_subject("ada@example.com")
+    assert record.user_id == "U_1" and record.is_admin
+    assert USER_NODE["password_hash"] not in repr(record)
+    assert not hasattr(record, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        record.disabled = True
+
+    assert neo4j.users.get_by_id("U_gone") is None
+
+    neo4j.driver.fail = True
+    with pytest.raises(RuntimeError):
+        neo4j.users.get_by_id("U_1")
+    assert neo4j.get_user_by_id("U_1") is None
+    logger.info("✅ User record passed")